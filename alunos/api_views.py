@@ -1,23 +1,27 @@
 """Views dedicadas a endpoints de API do aplicativo Alunos."""
 
-import csv
 import json
 import logging
 import traceback
-from datetime import date, datetime, timedelta
+from datetime import datetime
+from datetime import timezone as dt_timezone
 from io import BytesIO
+from itertools import chain
 
 from django.contrib.auth.decorators import login_required, permission_required
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db.models import Count, Q
+from django.db.models import Q
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django.utils.encoding import smart_str
-from django.views.decorators.http import require_GET, require_http_methods
+from django.views.decorators.http import condition, require_GET, require_http_methods
 from importlib import import_module
 from rest_framework import viewsets
 
+from core.exportacao_csv import TAMANHO_LOTE_CSV, resposta_csv
+from core.services import IndicadoresPainelService
+
 from .models import Aluno, RegistroHistorico
 from .serializers import AlunoSerializer
 from .services import HistoricoService, HistoricoValidationError, InstrutorService
@@ -54,7 +58,7 @@ def search_alunos(request):
                 "cpf": aluno.cpf,
                 "nome": aluno.nome,
                 "email": aluno.email or "N/A",
-                "foto": aluno.foto.url if getattr(aluno, "foto", None) else None,
+                "foto": aluno.miniatura_url,
             }
         )
 
@@ -90,7 +94,7 @@ def search_instrutores(request):
                     "cpf": aluno.cpf,
                     "nome": aluno.nome,
                     "numero_iniciatico": getattr(aluno, "numero_iniciatico", "N/A"),  # CORREÇÃO: Adicionado número iniciático
-                    "foto": aluno.foto.url if getattr(aluno, "foto", None) else None,
+                    "foto": aluno.miniatura_url,
                     "situacao": aluno.get_situacao_display()
                     if hasattr(aluno, "get_situacao_display")
                     else "",
@@ -505,74 +509,14 @@ def reativar_historico_aluno_api(request, aluno_id, registro_id):
 @require_GET
 def painel_kpis_api(request):
     """Retorna os indicadores principais exibidos no painel de alunos."""
-
-    total_alunos = Aluno.objects.count()
-    alunos_ativos_qs = Aluno.objects.filter(situacao="a")
-    alunos_ativos = alunos_ativos_qs.count()
-
-    datas_nascimento = list(
-        alunos_ativos_qs.filter(data_nascimento__isnull=False).values_list(
-            "data_nascimento", flat=True
-        )
-    )
-    if datas_nascimento:
-        hoje = date.today()
-        idades = [(hoje - data).days // 365 for data in datas_nascimento]
-        media_idade = int(sum(idades) / len(idades))
-    else:
-        media_idade = "-"
-
-    crit = Q(celular_primeiro_contato__isnull=False) & ~Q(celular_primeiro_contato="")
-    crit &= Q(rua__isnull=False) & ~Q(rua="")
-    crit &= Q(nome_primeiro_contato__isnull=False) & ~Q(nome_primeiro_contato="")
-    completos = alunos_ativos_qs.filter(crit).count()
-
-    total_ativos = alunos_ativos or 1
-    qualidade = int((completos / total_ativos) * 100)
-
-    return JsonResponse(
-        {
-            "total_alunos": total_alunos,
-            "alunos_ativos": alunos_ativos,
-            "media_idade": media_idade,
-            "qualidade_dados": qualidade,
-        }
-    )
+    return JsonResponse(IndicadoresPainelService.kpis_alunos())
 
 
 @login_required
 @require_GET
 def painel_graficos_api(request):
     """Agrupa dados para os gráficos do painel (situação e evolução mensal)."""
-
-    situacoes = Aluno.objects.values("situacao").annotate(qtd=Count("id"))
-    labels = []
-    values = []
-    mapa = dict(Aluno._meta.get_field("situacao").choices)
-    for situacao in situacoes:
-        labels.append(mapa.get(situacao["situacao"], situacao["situacao"]))
-        values.append(situacao["qtd"])
-
-    hoje = date.today()
-    meses = [
-        (hoje - timedelta(days=30 * i)).replace(day=1) for i in reversed(range(12))
-    ]
-    labels_mes = [mes.strftime("%b/%Y") for mes in meses]
-    valores_mes = []
-    for mes in meses:
-        proximo = (mes + timedelta(days=32)).replace(day=1)
-        valores_mes.append(
-            Aluno.objects.filter(
-                created_at__date__gte=mes, created_at__date__lt=proximo
-            ).count()
-        )
-
-    return JsonResponse(
-        {
-            "situacao": {"labels": labels, "values": values},
-            "novos_mes": {"labels": labels_mes, "values": valores_mes},
-        }
-    )
+    return JsonResponse(IndicadoresPainelService.graficos_alunos())
 
 
 @login_required
@@ -601,20 +545,17 @@ def painel_tabela_api(request):
 
     if export in ["csv", "xls", "pdf"]:
         if export == "csv":
-            response = HttpResponse(content_type="text/csv")
-            response["Content-Disposition"] = 'attachment; filename="alunos.csv"'
-            writer = csv.writer(response)
-            writer.writerow(["Nome", "CPF", "Email", "Situação"])
-            for aluno in alunos_qs:
-                writer.writerow(
-                    [
-                        smart_str(aluno.nome),
-                        smart_str(aluno.cpf),
-                        smart_str(aluno.email),
-                        dict(Aluno.SITUACAO_CHOICES).get(aluno.situacao, "-"),
-                    ]
-                )
-            return response
+            situacoes = dict(Aluno.SITUACAO_CHOICES)
+            registros = alunos_qs.values_list(
+                "nome", "cpf", "email", "situacao"
+            ).iterator(chunk_size=TAMANHO_LOTE_CSV)
+            linhas = (
+                (nome, cpf, email, situacoes.get(situacao, "-"))
+                for nome, cpf, email, situacao in registros
+            )
+            return resposta_csv(
+                chain([["Nome", "CPF", "Email", "Situação"]], linhas), "alunos.csv"
+            )
 
         if export == "xls":
             if not xlwt:
@@ -672,7 +613,8 @@ def buscar_foto_por_numero_iniciatico(request, numero_iniciatico):
     """
     Busca foto baseada no número iniciático.
 
-    Ordem: (1) banco (foto já salva no aluno) → (2) MEDIA_ROOT → (3) diretório externo.
+    Ordem: (1) banco (foto já salva no aluno) → (2) índice de fotos (MEDIA_ROOT e
+    diretório externo, a mais recente).
     Retorna URL para pré-visualização e caminho para posterior salvamento.
     """
     import os
@@ -700,37 +642,10 @@ def buscar_foto_por_numero_iniciatico(request, numero_iniciatico):
         # Não bloqueia fluxo se algo falhar na consulta
         pass
 
-    # Diretórios de fotos (em ordem de prioridade)
-    diretorios_fotos = [
-        Path(settings.MEDIA_ROOT) / "alunos" / "fotos",
-        Path("/fotos_externas")
-        if os.path.exists("/fotos_externas")
-        else Path(r"D:\Documentos Ordem\Ordem\CIIniciados\fotos"),
-    ]
-
-    # Extensões suportadas
-    extensoes = [".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"]
-
-    # Procura por arquivos com o número iniciático em todos os diretórios
-    arquivos_encontrados = []
-
-    for fotos_dir in diretorios_fotos:
-        if fotos_dir.exists():
-            for ext in extensoes:
-                # Procura exato: numero_iniciatico.ext
-                arquivo = fotos_dir / f"{numero_iniciatico}{ext}"
-                if arquivo.exists():
-                    arquivos_encontrados.append(arquivo)
-
-                # Procura variações: numero_iniciatico_*.ext
-                for variacao in fotos_dir.glob(f"{numero_iniciatico}_*{ext}"):
-                    arquivos_encontrados.append(variacao)
-
-                # Procura: *_numero_iniciatico.ext
-                for variacao in fotos_dir.glob(f"*_{numero_iniciatico}{ext}"):
-                    arquivos_encontrados.append(variacao)
-
-    if not arquivos_encontrados:
+    from alunos.services.fotos import IndiceFotos
+
+    foto = IndiceFotos.obter(numero_iniciatico)
+    if foto is None:
         return JsonResponse(
             {
                 "success": False,
@@ -738,76 +653,126 @@ def buscar_foto_por_numero_iniciatico(request, numero_iniciatico):
             }
         )
 
-    # Ordena por data de modificação (mais recente primeiro)
-    arquivos_encontrados.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-    arquivo_mais_recente = arquivos_encontrados[0]
-
-    # Verifica se o arquivo está no MEDIA_ROOT ou no diretório externo
-    media_root = Path(settings.MEDIA_ROOT)
-    if arquivo_mais_recente.is_relative_to(media_root):
-        # Arquivo dentro do MEDIA_ROOT - usa URL normal
-        caminho_relativo = arquivo_mais_recente.relative_to(media_root)
-        url_foto = f"{settings.MEDIA_URL}{caminho_relativo}".replace("\\", "/")
-        foto_path = str(caminho_relativo).replace("\\", "/")
+    url_foto = IndiceFotos.url(numero_iniciatico)
+    if foto.dentro_media:
+        foto_path = os.path.relpath(foto.caminho, settings.MEDIA_ROOT)
     else:
-        # Arquivo externo - usa endpoint de servir foto
-        url_foto = f"/alunos/api/servir-foto/{numero_iniciatico}/"
-        foto_path = str(arquivo_mais_recente).replace("\\", "/")
+        foto_path = foto.caminho
+    foto_path = foto_path.replace("\\", "/")
 
     return JsonResponse(
         {
             "success": True,
             "foto_url": url_foto,
             "foto_path": foto_path,
-            "nome_arquivo": arquivo_mais_recente.name,
-            "total_encontradas": len(arquivos_encontrados),
+            "nome_arquivo": Path(foto.caminho).name,
+            "total_encontradas": foto.total,
         }
     )
 
 
+def _foto_indexada(request, numero_iniciatico):
+    from alunos.services.fotos import IndiceFotos
+
+    return IndiceFotos.obter(numero_iniciatico)
+
+
+def _etag_foto(request, numero_iniciatico):
+    foto = _foto_indexada(request, numero_iniciatico)
+    if foto is None:
+        return None
+    return f'"{int(foto.mtime * 1000):x}-{foto.tamanho:x}"'
+
+
+def _ultima_modificacao_foto(request, numero_iniciatico):
+    foto = _foto_indexada(request, numero_iniciatico)
+    if foto is None:
+        return None
+    return datetime.fromtimestamp(foto.mtime, tz=dt_timezone.utc)
+
+
 @require_http_methods(["GET"])
 @login_required
+@condition(etag_func=_etag_foto, last_modified_func=_ultima_modificacao_foto)
 def servir_foto_externa(request, numero_iniciatico):
     """
-    Serve foto de diretório externo (fora do MEDIA_ROOT).
-    Usado para fotos em D:\\Documentos Ordem\\Ordem\\CIIniciados\\fotos
+    Serve a foto indexada de um número iniciático (inclusive de diretório
+    externo, fora do MEDIA_ROOT), com ETag e Last-Modified para que o
+    navegador revalide com 304 em vez de baixar de novo.
     """
-    import os
-    from pathlib import Path
+    import mimetypes
     from django.http import FileResponse, Http404
-    from django.conf import settings
+    from alunos.services.fotos import IndiceFotos
 
-    # Diretórios de fotos (mesma ordem da busca)
-    diretorios_fotos = [
-        Path(settings.MEDIA_ROOT) / "alunos" / "fotos",
-        Path("/fotos_externas")
-        if os.path.exists("/fotos_externas")
-        else Path(r"D:\Documentos Ordem\Ordem\CIIniciados\fotos"),
-    ]
-
-    # Extensões suportadas
-    extensoes = [".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"]
-
-    # Procura o arquivo
-    arquivos_encontrados = []
-    for fotos_dir in diretorios_fotos:
-        if fotos_dir.exists():
-            for ext in extensoes:
-                arquivo = fotos_dir / f"{numero_iniciatico}{ext}"
-                if arquivo.exists():
-                    arquivos_encontrados.append(arquivo)
-
-                for variacao in fotos_dir.glob(f"{numero_iniciatico}_*{ext}"):
-                    arquivos_encontrados.append(variacao)
-
-                for variacao in fotos_dir.glob(f"*_{numero_iniciatico}{ext}"):
-                    arquivos_encontrados.append(variacao)
-
-    if not arquivos_encontrados:
+    foto = IndiceFotos.obter(numero_iniciatico)
+    if foto is None:
         raise Http404("Foto não encontrada")
 
-    # Retorna o arquivo mais recente
-    arquivos_encontrados.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-    arquivo = arquivos_encontrados[0]
+    try:
+        arquivo = open(foto.caminho, "rb")
+    except OSError:
+        # Removido desde a última indexação; a próxima reindexação o descarta
+        logger.warning(f"Foto indexada não encontrada no disco: {foto.caminho}")
+        raise Http404("Foto não encontrada")
+
+    content_type = mimetypes.guess_type(foto.caminho)[0] or "application/octet-stream"
+    response = FileResponse(arquivo, content_type=content_type)
+    response["Cache-Control"] = "private, max-age=3600"
+    return response
+
+
+@require_GET
+@login_required
+def servir_miniatura(request, numero_iniciatico, tamanho):
+    """
+    Serve a miniatura da foto do aluno em um dos tamanhos fixos.
 
-    return FileResponse(open(arquivo, "rb"), content_type="image/jpeg")
+    Gera a miniatura (WebP ou JPEG, conforme o Accept) na primeira vez e a
+    reaproveita do cache em disco depois. Quando a URL traz a versão atual
+    da foto (``?v=``), a resposta pode ser cacheada por um ano.
+    """
+    from django.http import FileResponse, Http404
+    from django.utils.cache import (
+        get_conditional_response,
+        patch_cache_control,
+        patch_vary_headers,
+    )
+    from alunos.services import miniaturas
+
+    if tamanho not in miniaturas.TAMANHOS:
+        raise Http404("Tamanho de miniatura inválido")
+
+    aluno = (
+        get_aluno_model()
+        .objects.filter(numero_iniciatico=numero_iniciatico)
+        .only("id", "numero_iniciatico", "foto")
+        .first()
+    )
+    origem = miniaturas.origem_da_foto(
+        aluno.foto if aluno else None, numero_iniciatico
+    )
+    if origem is None:
+        raise Http404("Foto não encontrada")
+
+    formato = miniaturas.formato_aceito(request.headers.get("Accept"))
+    destino = miniaturas.caminho_miniatura(origem, tamanho, formato)
+    etag = f'"{destino.stem}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            destino = miniaturas.obter_miniatura(origem, tamanho, formato)
+        except Exception as exc:
+            logger.warning(f"Falha ao gerar miniatura de {numero_iniciatico}: {exc}")
+            raise Http404("Foto indisponível")
+        response = FileResponse(
+            open(destino, "rb"), content_type=miniaturas.FORMATOS[formato][1]
+        )
+        response["ETag"] = etag
+
+    if request.GET.get("v") == miniaturas.versao(origem):
+        patch_cache_control(response, private=True, max_age=31536000, immutable=True)
+    else:
+        patch_cache_control(response, private=True, max_age=300)
+    patch_vary_headers(response, ["Accept"])
+    return response
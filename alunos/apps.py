@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AlunosConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "alunos"
+
+    def ready(self):
+        """Importa os signals para garantir que sejam registrados."""
+        try:
+            import alunos.signals  # noqa
+        except ImportError:
+            pass
@@ -0,0 +1,89 @@
+"""
+Comando para pré-gerar as miniaturas das fotos de todos os alunos.
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alunos.models import Aluno
+from alunos.services import miniaturas
+from alunos.services.fotos import IndiceFotos
+
+
+class Command(BaseCommand):
+    help = "Gera as miniaturas das fotos dos alunos no cache em disco"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tamanhos",
+            type=str,
+            default=",".join(miniaturas.TAMANHOS),
+            help="Tamanhos a gerar, separados por vírgula (ex: p,m)",
+        )
+        parser.add_argument(
+            "--formatos",
+            type=str,
+            default=",".join(miniaturas.FORMATOS),
+            help="Formatos a gerar, separados por vírgula (ex: webp,jpeg)",
+        )
+        parser.add_argument(
+            "--limpar",
+            action="store_true",
+            help="Remove do cache as miniaturas fora das fotos, tamanhos e formatos atuais",
+        )
+
+    def handle(self, *args, **options):
+        tamanhos = [t for t in options["tamanhos"].split(",") if t]
+        formatos = [f for f in options["formatos"].split(",") if f]
+        invalidos = set(tamanhos) - set(miniaturas.TAMANHOS) | (
+            set(formatos) - set(miniaturas.FORMATOS)
+        )
+        if invalidos:
+            raise CommandError(f"Opções inválidas: {', '.join(sorted(invalidos))}")
+
+        IndiceFotos.atualizar()
+
+        geradas = existentes = sem_foto = erros = 0
+        esperadas = set()
+        alunos = Aluno.objects.only("id", "numero_iniciatico", "foto").iterator()
+        for aluno in alunos:
+            origem = miniaturas.origem_da_foto(aluno.foto, aluno.numero_iniciatico)
+            if origem is None:
+                sem_foto += 1
+                continue
+            for tamanho in tamanhos:
+                for formato in formatos:
+                    destino = miniaturas.caminho_miniatura(origem, tamanho, formato)
+                    esperadas.add(destino)
+                    if destino.exists():
+                        existentes += 1
+                        continue
+                    try:
+                        miniaturas.obter_miniatura(origem, tamanho, formato)
+                        geradas += 1
+                    except Exception as exc:
+                        erros += 1
+                        self.stderr.write(
+                            f"❌ {aluno.numero_iniciatico} ({tamanho}/{formato}): {exc}"
+                        )
+
+        removidas = self._limpar(esperadas) if options["limpar"] else 0
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Miniaturas: {geradas} geradas, {existentes} já existentes, "
+                f"{sem_foto} alunos sem foto, {erros} erros, {removidas} removidas"
+            )
+        )
+
+    def _limpar(self, esperadas):
+        removidas = 0
+        diretorio = miniaturas.diretorio_cache()
+        if not diretorio.exists():
+            return 0
+        for arquivo in diretorio.glob("*/*"):
+            if arquivo not in esperadas:
+                os.remove(arquivo)
+                removidas += 1
+        return removidas
@@ -1,10 +1,12 @@
 """
 Comando para importar bairros (distritos) das cidades usando a API do IBGE.
 """
+
 import requests
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from alunos.models import Cidade, Bairro
+from alunos.services.localidades import preencher_nome_busca
 
 
 class Command(BaseCommand):
@@ -87,9 +89,7 @@ class Command(BaseCommand):
                     ]
                     with transaction.atomic():
                         for nome in bairros_genericos:
-                            Bairro.objects.get_or_create(
-                                nome=nome, cidade=cidade
-                            )
+                            Bairro.objects.get_or_create(nome=nome, cidade=cidade)
                     self.stdout.write(
                         self.style.SUCCESS(
                             f"[{processadas}/{total_cidades}] {cidade.nome} ({cidade.estado.codigo}) - "
@@ -127,6 +127,9 @@ class Command(BaseCommand):
                         Bairro.objects.get_or_create(nome=nome, cidade=cidade)
                 sem_bairros += 1
 
+        # Bairros antigos ou gravados sem save() ainda sem o nome de busca
+        preencher_nome_busca(Bairro)
+
         # Resumo final
         self.stdout.write("\n" + "=" * 60)
         self.stdout.write(self.style.SUCCESS("\n📊 RESUMO DA IMPORTAÇÃO:\n"))
@@ -0,0 +1,155 @@
+"""
+Comando para importar um diretório de CEPs (CSV) para a tabela CepCache.
+
+Com o diretório carregado, ``buscar_cep`` responde sem consultar o ViaCEP.
+O CSV precisa de cabeçalho com as colunas ``cep`` e ``uf`` e aceita também
+``logradouro``, ``complemento``, ``bairro``, ``localidade`` (ou ``cidade``/
+``municipio``) e ``ibge`` (ou ``codigo_ibge``).
+"""
+
+import csv
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from alunos.models import CepCache
+from alunos.services.localidades import CepService
+
+ALIASES = {
+    "cep": ("cep",),
+    "logradouro": ("logradouro", "endereco"),
+    "complemento": ("complemento",),
+    "bairro": ("bairro",),
+    "localidade": ("localidade", "cidade", "municipio"),
+    "uf": ("uf", "estado"),
+    "ibge": ("ibge", "codigo_ibge"),
+}
+# Gravados em toda linha importada; os demais só se a coluna existir no CSV
+CAMPOS_FIXOS = ["encontrado", "origem", "atualizado_em"]
+
+
+class Command(BaseCommand):
+    help = "Importa um diretório de CEPs (CSV) para consulta offline em buscar_cep"
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo", type=str, help="Caminho do CSV de CEPs")
+        parser.add_argument(
+            "--delimitador",
+            type=str,
+            default=None,
+            help="Separador de colunas (padrão: detectado pelo cabeçalho)",
+        )
+        parser.add_argument(
+            "--encoding", type=str, default="utf-8-sig", help="Codificação do arquivo"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Quantidade de CEPs gravados por lote",
+        )
+
+    def handle(self, *args, **options):
+        caminho = Path(options["arquivo"])
+        if not caminho.exists():
+            raise CommandError(f"Arquivo não encontrado: {caminho}")
+
+        batch_size = options["batch_size"]
+        total = ignorados = 0
+        inicio = timezone.now()
+
+        with caminho.open(encoding=options["encoding"], newline="") as arquivo:
+            delimitador = options["delimitador"]
+            if not delimitador:
+                cabecalho = arquivo.readline()
+                arquivo.seek(0)
+                delimitador = (
+                    ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+                )
+
+            leitor = csv.DictReader(arquivo, delimiter=delimitador)
+            colunas = self._mapear_colunas(leitor.fieldnames or [])
+            # Colunas ausentes no CSV não apagam o que já está gravado
+            campos = CAMPOS_FIXOS + [campo for campo in colunas if campo != "cep"]
+
+            self.stdout.write(f"📂 Importando CEPs de {caminho}...")
+            while True:
+                linhas = list(islice(leitor, batch_size))
+                if not linhas:
+                    break
+                objetos = {}
+                for linha in linhas:
+                    obj = self._criar_objeto(linha, colunas, inicio)
+                    if obj is None:
+                        ignorados += 1
+                        continue
+                    objetos[obj.cep] = obj
+                self._gravar(list(objetos.values()), campos)
+                total += len(objetos)
+                self.stdout.write(f"   ... {total} CEPs gravados")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Diretório importado: {total} CEPs gravados, {ignorados} linhas ignoradas"
+            )
+        )
+
+    def _mapear_colunas(self, cabecalho):
+        normalizado = {nome.strip().lower(): nome for nome in cabecalho}
+        colunas = {}
+        for campo, nomes in ALIASES.items():
+            for nome in nomes:
+                if nome in normalizado:
+                    colunas[campo] = normalizado[nome]
+                    break
+        faltando = {"cep", "uf"} - colunas.keys()
+        if faltando:
+            raise CommandError(
+                f"Colunas obrigatórias ausentes no CSV: {', '.join(sorted(faltando))}"
+            )
+        return colunas
+
+    def _criar_objeto(self, linha, colunas, atualizado_em):
+        valores = {
+            campo: (linha.get(coluna) or "").strip()
+            for campo, coluna in colunas.items()
+        }
+        cep = "".join(filter(str.isdigit, valores.pop("cep")))
+        if len(cep) != 8:
+            return None
+        valores["uf"] = valores["uf"].upper()
+        if "ibge" in valores:
+            valores["ibge"] = "".join(filter(str.isdigit, valores["ibge"]))
+        valores = CepService.truncar(valores)
+        return CepCache(
+            cep=cep,
+            encontrado=True,
+            origem="diretorio",
+            atualizado_em=atualizado_em,
+            **valores,
+        )
+
+    def _gravar(self, objetos, campos):
+        if connection.features.supports_update_conflicts_with_target:
+            CepCache.objects.bulk_create(
+                objetos,
+                update_conflicts=True,
+                unique_fields=["cep"],
+                update_fields=campos,
+            )
+            return
+        with transaction.atomic():
+            existentes = dict(
+                CepCache.objects.filter(
+                    cep__in=[obj.cep for obj in objetos]
+                ).values_list("cep", "pk")
+            )
+            for obj in objetos:
+                obj.pk = existentes.get(obj.cep)
+            CepCache.objects.bulk_update(
+                [obj for obj in objetos if obj.pk], campos, batch_size=1000
+            )
+            CepCache.objects.bulk_create([obj for obj in objetos if not obj.pk])
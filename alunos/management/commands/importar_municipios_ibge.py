@@ -7,6 +7,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
 from alunos.models import Estado, Cidade
+from alunos.services.localidades import IndiceLocalidades, preencher_nome_busca
 
 REGIOES_UF = {
     "AC": "Norte",
@@ -184,12 +185,7 @@ class Command(BaseCommand):
 
         @transaction.atomic
         def processar():
-            nonlocal \
-                total_linhas, \
-                criadas_cidades, \
-                atualizadas_codigo, \
-                renomeadas, \
-                ignoradas_uf
+            nonlocal total_linhas, criadas_cidades, atualizadas_codigo, renomeadas, ignoradas_uf
             for row in linhas[header_idx + 1 :]:
                 if not row or len(row) <= idx_sigla_uf:
                     continue
@@ -253,7 +249,12 @@ class Command(BaseCommand):
             except RuntimeError:
                 pass
         else:
-            processar()
+            # Um único descarte do índice de localidades ao final, não por linha
+            with IndiceLocalidades.em_lote():
+                processar()
+                # Linhas antigas ou gravadas sem save() ainda sem o nome de busca
+                for modelo in (Estado, Cidade):
+                    preencher_nome_busca(modelo)
 
         resumo_parte1 = (
             f"Processadas: {total_linhas} | Criadas: {criadas_cidades} | "
@@ -0,0 +1,32 @@
+"""
+Comando para (re)construir o índice de fotos dos alunos.
+"""
+
+from django.core.management.base import BaseCommand
+
+from alunos.services.fotos import IndiceFotos, diretorios_fotos
+
+
+class Command(BaseCommand):
+    help = (
+        "Indexa as fotos dos diretórios de fotos por número iniciático, "
+        "gravando só as fotos novas, alteradas ou removidas."
+    )
+
+    def handle(self, *args, **options):
+        for diretorio in diretorios_fotos():
+            situacao = "✅" if diretorio.exists() else "⚠️  (não encontrado)"
+            self.stdout.write(f"📁 {diretorio} {situacao}")
+
+        resultado = IndiceFotos.atualizar()
+
+        if not resultado["reindexado"]:
+            self.stdout.write("ℹ️  Nenhuma foto alterada; índice mantido.")
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Índice de fotos atualizado: {resultado['criadas']} novas, "
+                f"{resultado['atualizadas']} atualizadas, {resultado['removidas']} removidas"
+            )
+        )
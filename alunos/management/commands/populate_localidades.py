@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from alunos.models import Pais, Estado, Cidade, Bairro
+from alunos.services.localidades import IndiceLocalidades
 
 BRASIL_PAISES = [
     {"codigo": "BRA", "nome": "Brasil", "nacionalidade": "Brasileira"},
@@ -72,6 +73,7 @@ class Command(BaseCommand):
         )
 
     @transaction.atomic
+    @IndiceLocalidades.em_lote()
     def handle(self, *args, **options):
         with_bairros = options["with_bairros"]
         replace = options["replace"]
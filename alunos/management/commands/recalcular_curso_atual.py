@@ -0,0 +1,21 @@
+"""
+Comando para reconstruir o curso atual (ultimo_curso/grau_atual) dos alunos.
+"""
+
+from importlib import import_module
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula ultimo_curso e grau_atual de todos os alunos a partir das "
+        "matrículas ativas"
+    )
+
+    def handle(self, *args, **options):
+        servicos = import_module("matriculas.services")
+
+        self.stdout.write("🔄 Recalculando curso atual dos alunos...")
+        total = servicos.atualizar_curso_atual_alunos()
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} alunos atualizados"))
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:16
+
+import unicodedata
+
+from django.db import migrations, models
+
+TABELAS_TRIGRAMA = {
+    "alunos_estado": "estado_nome_busca_trgm_idx",
+    "alunos_cidade": "cidade_nome_busca_trgm_idx",
+    "alunos_bairro": "bairro_nome_busca_trgm_idx",
+}
+
+
+def normalizar_busca(texto):
+    # Cópia de alunos.utils.normalizar_busca, congelada para a migração
+    if not texto:
+        return ""
+    sem_acento = "".join(
+        c for c in unicodedata.normalize("NFD", texto) if unicodedata.category(c) != "Mn"
+    )
+    return " ".join(sem_acento.lower().split())
+
+
+def preencher_nome_busca(apps, schema_editor):
+    """Preenche nome_busca das localidades já cadastradas."""
+    for nome_modelo in ("Estado", "Cidade", "Bairro"):
+        Modelo = apps.get_model("alunos", nome_modelo)
+        lote = []
+        for obj in Modelo.objects.only("id", "nome").iterator(chunk_size=2000):
+            obj.nome_busca = normalizar_busca(obj.nome)
+            lote.append(obj)
+        Modelo.objects.bulk_update(lote, ["nome_busca"], batch_size=1000)
+
+
+def criar_indices_trigrama(apps, schema_editor):
+    """No PostgreSQL, índices GIN de trigramas para buscas por palavra."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for tabela, indice in TABELAS_TRIGRAMA.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {indice} ON {tabela} "
+            "USING gin (nome_busca gin_trgm_ops)"
+        )
+
+
+def remover_indices_trigrama(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for indice in TABELAS_TRIGRAMA.values():
+        schema_editor.execute(f"DROP INDEX IF EXISTS {indice}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0014_update_foto_upload_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bairro',
+            name='nome_busca',
+            field=models.CharField(default='', editable=False, max_length=100, verbose_name='Nome para busca'),
+        ),
+        migrations.AddField(
+            model_name='cidade',
+            name='nome_busca',
+            field=models.CharField(default='', editable=False, max_length=100, verbose_name='Nome para busca'),
+        ),
+        migrations.AddField(
+            model_name='estado',
+            name='nome_busca',
+            field=models.CharField(default='', editable=False, max_length=100, verbose_name='Nome para busca'),
+        ),
+        migrations.AddIndex(
+            model_name='bairro',
+            index=models.Index(fields=['nome_busca'], name='bairro_nome_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='cidade',
+            index=models.Index(fields=['nome_busca'], name='cidade_nome_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='estado',
+            index=models.Index(fields=['nome_busca'], name='estado_nome_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(preencher_nome_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indices_trigrama, remover_indices_trigrama),
+    ]
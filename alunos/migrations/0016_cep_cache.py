@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0015_localidades_nome_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CepCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cep', models.CharField(max_length=8, unique=True, verbose_name='CEP')),
+                ('encontrado', models.BooleanField(default=True, verbose_name='Encontrado')),
+                ('logradouro', models.CharField(blank=True, default='', max_length=200, verbose_name='Logradouro')),
+                ('complemento', models.CharField(blank=True, default='', max_length=200, verbose_name='Complemento')),
+                ('bairro', models.CharField(blank=True, default='', max_length=100, verbose_name='Bairro')),
+                ('localidade', models.CharField(blank=True, default='', max_length=100, verbose_name='Cidade')),
+                ('uf', models.CharField(blank=True, default='', max_length=2, verbose_name='UF')),
+                ('ibge', models.CharField(blank=True, default='', max_length=7, verbose_name='Código IBGE')),
+                ('origem', models.CharField(choices=[('viacep', 'ViaCEP'), ('diretorio', 'Diretório importado')], default='viacep', max_length=10, verbose_name='Origem')),
+                ('atualizado_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'CEP em cache',
+                'verbose_name_plural': 'CEPs em cache',
+            },
+        ),
+    ]
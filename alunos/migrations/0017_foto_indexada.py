@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0016_cep_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FotoIndexada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero_iniciatico', models.CharField(max_length=20, unique=True, verbose_name='Número Iniciático')),
+                ('caminho', models.CharField(max_length=500, verbose_name='Caminho do arquivo')),
+                ('dentro_media', models.BooleanField(default=True, verbose_name='Dentro do MEDIA_ROOT')),
+                ('mtime', models.FloatField(verbose_name='Data de modificação')),
+                ('tamanho', models.BigIntegerField(default=0, verbose_name='Tamanho (bytes)')),
+                ('total', models.PositiveIntegerField(default=1, verbose_name='Fotos encontradas')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Foto indexada',
+                'verbose_name_plural': 'Fotos indexadas',
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Mesmo UPDATE com subquery correlacionada de
+# matriculas.services.atualizar_curso_atual_alunos, em SQL: o estado histórico
+# de matriculas não tem as relações quando o app roda sem migrações (testes).
+ULTIMA_MATRICULA = """
+    FROM matriculas_matricula AS m
+    JOIN turmas_turma AS t ON t.id = m.turma_id
+    JOIN cursos_curso AS c ON c.id = t.curso_id
+    WHERE m.aluno_id = alunos_aluno.id AND m.status = 'A'
+    ORDER BY m.data_matricula DESC, m.id DESC
+    LIMIT 1
+"""
+
+
+def preencher_curso_atual(apps, schema_editor):
+    """
+    Preenche a projeção do curso atual dos alunos já cadastrados.
+
+    O grau_atual digitado de quem não tem matrícula ativa é preservado.
+    """
+    schema_editor.execute(
+        "UPDATE alunos_aluno SET "
+        f"ultimo_curso_id = (SELECT t.curso_id {ULTIMA_MATRICULA}), "
+        f"grau_atual = COALESCE((SELECT c.nome {ULTIMA_MATRICULA}), grau_atual)"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0017_foto_indexada'),
+        ('cursos', '0001_initial'),
+        ('matriculas', '0003_matricula_aluno_ativa_idx'),
+        ('turmas', '0006_alter_turma_dias_semana'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aluno',
+            name='ultimo_curso',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cursos.curso', verbose_name='Último Curso Matriculado'),
+        ),
+        migrations.RunPython(preencher_curso_atual, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0018_aluno_ultimo_curso'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aluno',
+            index=models.Index(condition=models.Q(('situacao', 'a')), fields=['nome', 'id'], name='aluno_ativo_nome_id_idx'),
+        ),
+    ]
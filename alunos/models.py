@@ -7,6 +7,9 @@ from django.core.validators import RegexValidator
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
+from alunos.utils import normalizar_busca
+from core.models import CamposRastreadosMixin
+
 
 def _upload_foto_path(instance, filename):
     """Normaliza o caminho de upload da foto para usar barras normais."""
@@ -48,7 +51,38 @@ class Pais(models.Model):
         return self.nome
 
 
-class Estado(models.Model):
+class NomeBuscaMixin(models.Model):
+    """
+    Mantém ``nome_busca`` (nome sem acentos e em minúsculas) para autocomplete.
+
+    A coluna é indexada e preenchida a cada ``save``; as buscas usam
+    ``filtro_nome_busca`` em vez de comparar acentos em Python.
+    """
+
+    nome_busca = models.CharField(
+        max_length=100, editable=False, default="", verbose_name=_("Nome para busca")
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.nome_busca = normalizar_busca(self.nome)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "nome" in update_fields:
+            kwargs["update_fields"] = set(update_fields) | {"nome_busca"}
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def filtro_nome_busca(termo):
+        """Filtro por início do nome ou de qualquer palavra do nome."""
+        termo = normalizar_busca(termo)
+        return models.Q(nome_busca__startswith=termo) | models.Q(
+            nome_busca__contains=f" {termo}"
+        )
+
+
+class Estado(NomeBuscaMixin):
     """Modelo para estados brasileiros."""
 
     REGIAO_CHOICES = [
@@ -79,6 +113,11 @@ class Estado(models.Model):
         indexes = [
             models.Index(fields=["nome"]),
             models.Index(fields=["codigo"]),
+            models.Index(
+                fields=["nome_busca"],
+                name="estado_nome_busca_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
             models.Index(fields=["regiao"]),
         ]
 
@@ -86,7 +125,7 @@ class Estado(models.Model):
         return f"{self.nome} ({self.codigo})"
 
 
-class Cidade(models.Model):
+class Cidade(NomeBuscaMixin):
     """Modelo para cidades brasileiras."""
 
     nome = models.CharField(max_length=100, verbose_name=_("Nome da Cidade"))
@@ -114,6 +153,11 @@ class Cidade(models.Model):
             models.Index(fields=["nome"]),
             models.Index(fields=["estado"]),
             models.Index(fields=["codigo_ibge"]),
+            models.Index(
+                fields=["nome_busca"],
+                name="cidade_nome_busca_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
         ]
 
     def __str__(self):
@@ -125,7 +169,7 @@ class Cidade(models.Model):
         return f"{self.nome}, {self.estado.nome}"
 
 
-class Bairro(models.Model):
+class Bairro(NomeBuscaMixin):
     """Modelo para bairros (associados a uma cidade). Simples para futura expansão.
 
     Motivação: Normalizar endereço e permitir autocomplete/controlar consistência.
@@ -151,13 +195,101 @@ class Bairro(models.Model):
         indexes = [
             models.Index(fields=["nome"]),
             models.Index(fields=["cidade"]),
+            models.Index(
+                fields=["nome_busca"],
+                name="bairro_nome_busca_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
         ]
 
     def __str__(self):
         return f"{self.nome} - {self.cidade.nome}/{self.cidade.estado.codigo}"  # pragma: no cover
 
 
-class Aluno(models.Model):
+class CepCache(models.Model):
+    """Endereço de um CEP, consultado no ViaCEP ou importado de um diretório.
+
+    Evita repetir a consulta externa para CEPs já vistos. Entradas vindas do
+    ViaCEP expiram após ``CEP_CACHE_DIAS``; as do diretório importado não.
+    """
+
+    ORIGEM_CHOICES = [
+        ("viacep", "ViaCEP"),
+        ("diretorio", "Diretório importado"),
+    ]
+
+    cep = models.CharField(max_length=8, unique=True, verbose_name=_("CEP"))
+    encontrado = models.BooleanField(default=True, verbose_name=_("Encontrado"))
+    logradouro = models.CharField(
+        max_length=200, blank=True, default="", verbose_name=_("Logradouro")
+    )
+    complemento = models.CharField(
+        max_length=200, blank=True, default="", verbose_name=_("Complemento")
+    )
+    bairro = models.CharField(
+        max_length=100, blank=True, default="", verbose_name=_("Bairro")
+    )
+    localidade = models.CharField(
+        max_length=100, blank=True, default="", verbose_name=_("Cidade")
+    )
+    uf = models.CharField(max_length=2, blank=True, default="", verbose_name=_("UF"))
+    ibge = models.CharField(
+        max_length=7, blank=True, default="", verbose_name=_("Código IBGE")
+    )
+    origem = models.CharField(
+        max_length=10,
+        choices=ORIGEM_CHOICES,
+        default="viacep",
+        verbose_name=_("Origem"),
+    )
+    atualizado_em = models.DateTimeField(
+        default=timezone.now, verbose_name=_("Atualizado em")
+    )
+
+    class Meta:
+        verbose_name = _("CEP em cache")
+        verbose_name_plural = _("CEPs em cache")
+
+    def __str__(self):
+        return f"{self.cep} - {self.localidade}/{self.uf}"  # pragma: no cover
+
+
+class FotoIndexada(models.Model):
+    """Foto mais recente de cada número iniciático nos diretórios de fotos.
+
+    Mantido pelo comando ``indexar_fotos`` (e pela task periódica de mesmo
+    nome) para evitar varrer os diretórios com glob a cada aluno exibido.
+    """
+
+    numero_iniciatico = models.CharField(
+        max_length=20, unique=True, verbose_name=_("Número Iniciático")
+    )
+    caminho = models.CharField(max_length=500, verbose_name=_("Caminho do arquivo"))
+    dentro_media = models.BooleanField(
+        default=True, verbose_name=_("Dentro do MEDIA_ROOT")
+    )
+    mtime = models.FloatField(verbose_name=_("Data de modificação"))
+    tamanho = models.BigIntegerField(default=0, verbose_name=_("Tamanho (bytes)"))
+    total = models.PositiveIntegerField(default=1, verbose_name=_("Fotos encontradas"))
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name=_("Atualizado em"))
+
+    class Meta:
+        verbose_name = _("Foto indexada")
+        verbose_name_plural = _("Fotos indexadas")
+
+    def __str__(self):
+        return f"{self.numero_iniciatico} - {self.caminho}"  # pragma: no cover
+
+
+class AlunoQuerySet(models.QuerySet):
+    """QuerySet de alunos com atalhos para listagens."""
+
+    def com_curso_atual(self):
+        """Anota ``ultimo_curso_nome`` na mesma consulta da listagem."""
+        return self.annotate(ultimo_curso_nome=models.F("ultimo_curso__nome"))
+
+
+class Aluno(CamposRastreadosMixin):
     """Modelo que representa um aluno."""
 
     SEXO_CHOICES = [
@@ -200,8 +332,14 @@ class Aluno(models.Model):
         ("medio_completo", "Médio - Completo"),
         ("superior_incompleto", "Superior - Incompleto"),
         ("superior_completo", "Superior - Completo"),
-        ("pos_especializacao_incompleto", "Pós-graduação (Especialização/MBA) - Incompleto"),
-        ("pos_especializacao_completo", "Pós-graduação (Especialização/MBA) - Completo"),
+        (
+            "pos_especializacao_incompleto",
+            "Pós-graduação (Especialização/MBA) - Incompleto",
+        ),
+        (
+            "pos_especializacao_completo",
+            "Pós-graduação (Especialização/MBA) - Completo",
+        ),
         ("mestrado_incompleto", "Mestrado - Incompleto"),
         ("mestrado_completo", "Mestrado - Completo"),
         ("doutorado_incompleto", "Doutorado - Incompleto"),
@@ -423,6 +561,17 @@ class Aluno(models.Model):
     grau_atual = models.CharField(
         max_length=50, blank=True, null=True, verbose_name=_("Grau Atual")
     )
+    # Curso da matrícula ativa mais recente; mantido pelos signals de
+    # matrículas junto com grau_atual (nome do curso)
+    ultimo_curso = models.ForeignKey(
+        "cursos.Curso",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+        verbose_name=_("Último Curso Matriculado"),
+    )
     situacao_iniciatica = models.CharField(
         max_length=20,
         default="a",
@@ -451,6 +600,11 @@ class Aluno(models.Model):
     created_at = models.DateTimeField(default=timezone.now, verbose_name=_("Criado em"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Atualizado em"))
 
+    objects = AlunoQuerySet.as_manager()
+
+    # Campos cujo valor lido do banco é guardado para detectar alterações
+    CAMPOS_RASTREADOS = ("situacao",)
+
     class Meta:
         verbose_name = _("Aluno")
         verbose_name_plural = _("Alunos")
@@ -465,6 +619,12 @@ class Aluno(models.Model):
             models.Index(fields=["nome"]),
             models.Index(fields=["cidade_ref"], name="aluno_cidade_ref_idx"),
             models.Index(fields=["bairro_ref"], name="aluno_bairro_ref_idx"),
+            # Paginação por keyset (nome, id) dos alunos ativos
+            models.Index(
+                fields=["nome", "id"],
+                condition=models.Q(situacao="a"),
+                name="aluno_ativo_nome_id_idx",
+            ),
         ]
 
     def __str__(self):
@@ -491,10 +651,10 @@ class Aluno(models.Model):
     def ativo(self):
         """
         Property que retorna True se o aluno está ativo.
-        
+
         IMPORTANTE: Este campo foi convertido de BooleanField para property.
         Use 'situacao' para filtros no banco de dados.
-        
+
         Returns:
             bool: True se situacao == 'a', False caso contrário
         """
@@ -504,7 +664,7 @@ class Aluno(models.Model):
     def esta_ativo(self):
         """
         Alias para ativo (mantido para compatibilidade).
-        
+
         Returns:
             bool: True se situacao == 'a', False caso contrário
         """
@@ -535,39 +695,63 @@ class Aluno(models.Model):
 
     @property
     def ultimo_curso_matriculado(self):
-        """Retorna o nome do último curso em que o aluno foi matriculado."""
-        try:
-            from importlib import import_module
-
-            matriculas_module = import_module("matriculas.models")
-            Matricula = matriculas_module.Matricula
-
-            ultima_matricula = (
-                Matricula.objects.filter(aluno=self, status='A')
-                .order_by("-data_matricula")
-                .first()
-            )
+        """
+        Retorna o nome do último curso em que o aluno foi matriculado.
 
-            if ultima_matricula and ultima_matricula.turma.curso:
-                return ultima_matricula.turma.curso.nome
-            return None
-        except (ImportError, AttributeError):
+        Lê a projeção ``ultimo_curso`` mantida pelos signals de matrículas,
+        sem consultar Matricula; em querysets com ``com_curso_atual()`` usa
+        o nome anotado (ou ``select_related("ultimo_curso")``).
+        """
+        if "ultimo_curso_nome" in self.__dict__:
+            return self.ultimo_curso_nome
+        if self.ultimo_curso_id is None:
             return None
+        return self.ultimo_curso.nome
 
     @property
     def grau_atual_automatico(self):
         """Retorna o grau atual baseado no último curso matriculado."""
         return self.ultimo_curso_matriculado or self.grau_atual or "Não informado"
 
+    def get_miniatura_url(self, tamanho="p"):
+        """
+        Retorna a URL da miniatura da foto do aluno ou None se não houver foto.
+
+        A URL leva a versão da foto (mtime), então muda quando a foto muda e
+        pode ser cacheada pelo navegador indefinidamente.
+        """
+        try:
+            from django.urls import reverse
+            from alunos.services.miniaturas import origem_da_foto, versao
+
+            origem = origem_da_foto(self.foto, self.numero_iniciatico)
+            if origem is None:
+                return None
+            url = reverse(
+                "alunos:api_miniatura_foto", args=[self.numero_iniciatico, tamanho]
+            )
+            return f"{url}?v={versao(origem)}"
+        except Exception as e:
+            import logging
+
+            logger = logging.getLogger(__name__)
+            logger.warning(f"Erro ao montar miniatura para aluno {self.id}: {e}")
+            return None
+
+    @property
+    def miniatura_url(self):
+        """Miniatura no tamanho padrão, para listagens e autocompletes."""
+        return self.get_miniatura_url()
+
     def get_foto_url(self):
         """
-        Retorna a URL da foto do aluno com fallback para busca nos diretórios.
+        Retorna a URL da foto do aluno com fallback para os diretórios de fotos.
 
         Lógica:
         1. Se aluno.foto existe no banco → retorna foto.url
-        2. Caso contrário, busca nos diretórios (MEDIA_ROOT e externo) por numero_iniciatico
-        3. Se encontrar múltiplas fotos, retorna a mais recente (st_mtime)
-        4. Se não encontrar nada, retorna None
+        2. Caso contrário, consulta o índice de fotos por numero_iniciatico
+           (a foto mais recente nos diretórios MEDIA_ROOT e externo)
+        3. Se não encontrar nada, retorna None
 
         Returns:
             str: URL da foto ou None se não encontrada
@@ -576,70 +760,14 @@ class Aluno(models.Model):
         if self.foto:
             return self.foto.url
 
-        # Prioridade 2: Buscar nos diretórios por numero_iniciatico
+        # Prioridade 2: Índice dos diretórios por numero_iniciatico
         if not self.numero_iniciatico:
             return None
 
         try:
-            from django.conf import settings
-            import os
-            import glob
-            from pathlib import Path
-
-            # Diretórios de busca (em ordem de prioridade)
-            diretorios = [
-                os.path.join(settings.MEDIA_ROOT, "alunos", "fotos"),
-                "/fotos_externas"
-                if os.path.exists("/fotos_externas")
-                else r"D:\Documentos Ordem\Ordem\CIIniciados\fotos",
-            ]
-
-            # Padrões de busca
-            extensoes = ["jpg", "jpeg", "png", "gif", "webp", "bmp"]
-            padroes = [
-                f"{self.numero_iniciatico}.{{ext}}",
-                f"{self.numero_iniciatico}_*.{{ext}}",
-                f"*_{self.numero_iniciatico}.{{ext}}",
-            ]
-
-            fotos_encontradas = []
-            for foto_dir in diretorios:
-                if os.path.exists(foto_dir):
-                    for padrao in padroes:
-                        for ext in extensoes:
-                            busca = os.path.join(foto_dir, padrao.format(ext=ext))
-                            fotos_encontradas.extend(glob.glob(busca))
-
-            if not fotos_encontradas:
-                return None
-
-            # Se múltiplas fotos, retorna a mais recente
-            if len(fotos_encontradas) > 1:
-                fotos_encontradas.sort(key=lambda x: os.path.getmtime(x), reverse=True)
-
-            # Verifica se está no MEDIA_ROOT ou externo
-            foto_path = fotos_encontradas[0]
-            media_root_path = Path(settings.MEDIA_ROOT)
-            foto_path_obj = Path(foto_path)
-
-            try:
-                if foto_path_obj.is_relative_to(media_root_path):
-                    # Foto dentro do MEDIA_ROOT - URL normal
-                    relative_path = os.path.relpath(foto_path, settings.MEDIA_ROOT)
-                    relative_path = relative_path.replace("\\", "/")
-                    return f"{settings.MEDIA_URL}{relative_path}"
-                else:
-                    # Foto externa - endpoint de servir foto
-                    return f"/alunos/api/servir-foto/{self.numero_iniciatico}/"
-            except (ValueError, AttributeError):
-                # Fallback para Python < 3.9 ou outros erros
-                if foto_path.startswith(str(media_root_path)):
-                    relative_path = os.path.relpath(foto_path, settings.MEDIA_ROOT)
-                    relative_path = relative_path.replace("\\", "/")
-                    return f"{settings.MEDIA_URL}{relative_path}"
-                else:
-                    return f"/alunos/api/servir-foto/{self.numero_iniciatico}/"
+            from alunos.services.fotos import IndiceFotos
 
+            return IndiceFotos.url(self.numero_iniciatico)
         except Exception as e:
             # Log do erro mas não quebra a página
             import logging
@@ -714,22 +842,34 @@ class Aluno(models.Model):
 
     def save(self, *args, **kwargs):
         """Override do save para lógicas automáticas."""
+        update_fields = kwargs.get("update_fields")
+        grava_situacao = update_fields is None or "situacao" in update_fields
+
         # Detectar mudança de situacao de ativo para inativo
-        if self.pk:
-            try:
-                original = Aluno.objects.get(pk=self.pk)
-                # Se mudou de ativo ("a") para qualquer outra situacao
-                if original.situacao == "a" and self.situacao != "a":
-                    # Auto-remover de turmas ativas como instrutor
-                    self._remover_de_turmas_como_instrutor(nova_situacao=self.situacao)  # noqa: F841
-            except Aluno.DoesNotExist:
-                pass  # Aluno novo, não há o que remover
-        
+        if grava_situacao and self.situacao != "a":
+            if self._situacao_original() == "a":
+                # Auto-remover de turmas ativas como instrutor
+                self._remover_de_turmas_como_instrutor(nova_situacao=self.situacao)
+
         super().save(*args, **kwargs)
-    
+
+    def _situacao_original(self):
+        """Situação gravada no banco, do snapshot de ``from_db`` quando houver."""
+        if self.tem_valor_original("situacao"):
+            return self.valor_original("situacao")
+        if self._state.adding or not self.pk:
+            return None
+        # Instância sem snapshot (ex.: situacao adiada com only())
+        return (
+            Aluno.objects.filter(pk=self.pk).values_list("situacao", flat=True).first()
+        )
+
     def _remover_de_turmas_como_instrutor(self, nova_situacao):  # noqa: ARG002
         """Remove o aluno de todas as turmas ativas onde atua como instrutor.
 
+        Os três papéis (instrutor, instrutor auxiliar e auxiliar de instrução)
+        são limpos em um único UPDATE.
+
         Args:
             nova_situacao (str): Nova situação do aluno (d/f/e). Não utilizado atualmente.
 
@@ -741,40 +881,52 @@ class Aluno(models.Model):
         try:
             turmas_module = import_module("turmas.models")
             Turma = getattr(turmas_module, "Turma")
-
-            # Buscar turmas ativas onde é instrutor
-            from django.db.models import Q
-            turmas_ativas = Turma.objects.filter(
-                Q(instrutor=self) |
-                Q(instrutor_auxiliar=self) |
-                Q(auxiliar_instrucao=self)
-            ).filter(status="A")
-            
-            turmas_removidas = []
-            for turma in turmas_ativas:
-                papel = None
-                if turma.instrutor == self:
-                    turma.instrutor = None
-                    papel = "Instrutor Principal"
-                if turma.instrutor_auxiliar == self:
-                    turma.instrutor_auxiliar = None
-                    papel = "Instrutor Auxiliar" if not papel else f"{papel} e Instrutor Auxiliar"
-                if turma.auxiliar_instrucao == self:
-                    turma.auxiliar_instrucao = None
-                    papel = "Auxiliar de Instrução" if not papel else f"{papel} e Auxiliar de Instrução"
-                
-                turma.save()
-                turmas_removidas.append({
-                    'nome': turma.nome,
-                    'papel': papel
-                })
-            
-            return turmas_removidas
-        
         except (ImportError, AttributeError):
             # Se módulo turmas não disponível, apenas continuar
             return []
 
+        from django.db.models import Case, F, Q, Value, When
+
+        papeis = [
+            ("instrutor", "Instrutor Principal"),
+            ("instrutor_auxiliar", "Instrutor Auxiliar"),
+            ("auxiliar_instrucao", "Auxiliar de Instrução"),
+        ]
+        turmas_ativas = Turma.objects.filter(
+            Q(instrutor=self) | Q(instrutor_auxiliar=self) | Q(auxiliar_instrucao=self),
+            status="A",
+        )
+
+        turmas_removidas = [
+            {
+                "nome": turma["nome"],
+                "papel": " e ".join(
+                    rotulo
+                    for campo, rotulo in papeis
+                    if turma[f"{campo}_id"] == self.pk
+                ),
+            }
+            for turma in turmas_ativas.values(
+                "nome", *(f"{campo}_id" for campo, _ in papeis)
+            )
+        ]
+        if not turmas_removidas:
+            return []
+
+        turmas_ativas.update(
+            **{
+                campo: Case(
+                    When(**{campo: self.pk}, then=Value(None)),
+                    default=F(campo),
+                    output_field=Turma._meta.get_field(campo),
+                )
+                for campo, _ in papeis
+            }
+        )
+        # O UPDATE não dispara signals de Turma
+        import_module("core.services").IndicadoresPainelService.invalidar_apos_commit()
+        return turmas_removidas
+
 
 class TipoCodigo(models.Model):
     """Tipo de código iniciático (modelo concreto original)."""
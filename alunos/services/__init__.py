@@ -192,7 +192,7 @@ def listar_alunos(
 ) -> QuerySet[Aluno]:
     """Lista alunos com filtros opcionais para buscas e dashboards."""
 
-    alunos = Aluno.objects.all().select_related(
+    alunos = Aluno.objects.com_curso_atual().select_related(
         "pais_nacionalidade",
         "cidade_ref",
         "bairro_ref",
@@ -240,7 +240,7 @@ def listar_alunos_para_relatorio(
 ) -> QuerySet[Aluno]:
     """Retorna uma queryset otimizada para geração de relatórios."""
 
-    queryset = Aluno.objects.all()
+    queryset = Aluno.objects.com_curso_atual()
 
     if aluno_id:
         queryset = queryset.filter(id=aluno_id)
@@ -0,0 +1,220 @@
+"""
+Índice das fotos de alunos guardadas nos diretórios de fotos.
+
+Os arquivos seguem os padrões ``<numero>.<ext>``, ``<numero>_*.<ext>`` e
+``*_<numero>.<ext>``. Em vez de procurar esses padrões com glob a cada aluno
+exibido, os diretórios são listados pelo comando ``indexar_fotos`` (ou pela
+task periódica ``alunos.tasks.indexar_fotos``) e a foto mais recente de cada
+número iniciático fica na tabela ``FotoIndexada``, carregada em memória para
+consulta direta por número. Requisições apenas leem o índice.
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from alunos.models import FotoIndexada
+from core import cache_versionado
+
+logger = logging.getLogger(__name__)
+
+EXTENSOES = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
+TAMANHO_CHAVE = FotoIndexada._meta.get_field("numero_iniciatico").max_length
+
+
+class Foto(NamedTuple):
+    caminho: str
+    dentro_media: bool
+    mtime: float
+    tamanho: int
+    total: int
+
+
+def diretorios_fotos() -> List[Path]:
+    """Diretórios de fotos em ordem de prioridade."""
+    externo = getattr(settings, "FOTOS_EXTERNAS_DIR", None)
+    if not externo:
+        externo = (
+            "/fotos_externas"
+            if os.path.exists("/fotos_externas")
+            else r"D:\Documentos Ordem\Ordem\CIIniciados\fotos"
+        )
+    return [Path(settings.MEDIA_ROOT) / "alunos" / "fotos", Path(externo)]
+
+
+def numeros_do_arquivo(stem: str) -> set:
+    """
+    Números iniciáticos que um nome de arquivo (sem extensão) representa.
+
+    Equivale aos padrões de glob ``N``, ``N_*`` e ``*_N``: o nome inteiro,
+    cada prefixo antes de um ``_`` e cada sufixo depois de um ``_``.
+    """
+    numeros = {stem}
+    for i, caractere in enumerate(stem):
+        if caractere == "_":
+            numeros.add(stem[:i])
+            numeros.add(stem[i + 1 :])
+    return {n for n in numeros if n and len(n) <= TAMANHO_CHAVE}
+
+
+class IndiceFotos:
+    """
+    Consulta e manutenção do índice de fotos.
+
+    O índice em memória é recarregado quando a versão no cache muda
+    (``atualizar`` em qualquer processo). A consulta nunca acessa o disco;
+    ``atualizar`` roda fora das requisições, no comando ou na task periódica.
+    """
+
+    NAMESPACE = ("alunos", "fotos")
+
+    _lock = threading.Lock()
+    _mapa: Optional[Dict[str, Foto]] = None
+    _versao: Optional[int] = None
+
+    @classmethod
+    def obter(cls, numero_iniciatico: str) -> Optional[Foto]:
+        """Foto mais recente do número iniciático, sem acessar o disco."""
+        if not numero_iniciatico:
+            return None
+        return cls._obter_mapa().get(str(numero_iniciatico))
+
+    @classmethod
+    def url(cls, numero_iniciatico: str) -> Optional[str]:
+        """URL da foto: MEDIA_URL para o MEDIA_ROOT, endpoint para as externas."""
+        foto = cls.obter(numero_iniciatico)
+        if foto is None:
+            return None
+        if foto.dentro_media:
+            relativo = os.path.relpath(foto.caminho, settings.MEDIA_ROOT)
+            return f"{settings.MEDIA_URL}{relativo}".replace("\\", "/")
+        return f"/alunos/api/servir-foto/{numero_iniciatico}/"
+
+    @classmethod
+    def atualizar(cls) -> Dict[str, Any]:
+        """
+        Reindexa os diretórios gravando só as fotos que mudaram.
+
+        Cada arquivo é comparado pelo caminho, data de modificação e tamanho
+        obtidos na listagem, então uma foto sobrescrita no mesmo nome também
+        é detectada. As novas são gravadas com upsert, de modo que duas
+        reindexações simultâneas não colidem na chave única. Fotos indexadas
+        em um diretório que não pôde ser listado (ex.: montagem externa fora
+        do ar) não são alteradas nem removidas até ele voltar a ser listado.
+
+        Returns:
+            Dict com as contagens de fotos criadas, atualizadas e removidas
+        """
+        encontradas, nao_listados = cls._varrer()
+        existentes, preservadas = {}, set()
+        for foto in FotoIndexada.objects.all():
+            # Diretório não listado: a foto indexada nele fica como está
+            if any(Path(foto.caminho).is_relative_to(d) for d in nao_listados):
+                preservadas.add(foto.numero_iniciatico)
+            else:
+                existentes[foto.numero_iniciatico] = foto
+
+        novas, alteradas = [], []
+        for numero, foto in encontradas.items():
+            if numero in preservadas:
+                continue
+            atual = existentes.get(numero)
+            if atual is None:
+                novas.append(FotoIndexada(numero_iniciatico=numero, **foto._asdict()))
+            elif cls._foto(atual) != foto:
+                for campo, valor in foto._asdict().items():
+                    setattr(atual, campo, valor)
+                alteradas.append(atual)
+        removidas = [numero for numero in existentes if numero not in encontradas]
+
+        with transaction.atomic():
+            FotoIndexada.objects.bulk_create(
+                novas,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["numero_iniciatico"],
+                update_fields=list(Foto._fields),
+            )
+            FotoIndexada.objects.bulk_update(
+                alteradas, list(Foto._fields), batch_size=1000
+            )
+            FotoIndexada.objects.filter(numero_iniciatico__in=removidas).delete()
+
+        resultado = {
+            "reindexado": bool(novas or alteradas or removidas),
+            "criadas": len(novas),
+            "atualizadas": len(alteradas),
+            "removidas": len(removidas),
+        }
+        if resultado["reindexado"]:
+            transaction.on_commit(cls.invalidar)
+            logger.info(f"Índice de fotos atualizado: {resultado}")
+        return resultado
+
+    @classmethod
+    def invalidar(cls) -> None:
+        with cls._lock:
+            cls._mapa = None
+        cache_versionado.invalidar(cls.NAMESPACE)
+
+    @staticmethod
+    def _varrer() -> Tuple[Dict[str, Foto], List[Path]]:
+        """
+        Lista os diretórios e escolhe a foto mais recente de cada número.
+
+        Returns:
+            (fotos por número, diretórios que não puderam ser listados)
+        """
+        media_root = Path(settings.MEDIA_ROOT)
+        candidatas: Dict[str, List[Foto]] = {}
+        nao_listados: List[Path] = []
+        for diretorio in diretorios_fotos():
+            try:
+                entradas = list(os.scandir(diretorio))
+            except OSError as e:
+                logger.warning(f"Diretório de fotos não listado: {diretorio} ({e})")
+                nao_listados.append(diretorio)
+                continue
+            dentro_media = diretorio.is_relative_to(media_root)
+            for entrada in entradas:
+                stem, extensao = os.path.splitext(entrada.name)
+                if extensao.lower() not in EXTENSOES or not entrada.is_file():
+                    continue
+                estado = entrada.stat()
+                foto = Foto(
+                    entrada.path, dentro_media, estado.st_mtime, estado.st_size, 1
+                )
+                for numero in numeros_do_arquivo(stem):
+                    candidatas.setdefault(numero, []).append(foto)
+
+        # Mais recente vence; no empate, a do diretório de maior prioridade
+        encontradas = {
+            numero: max(fotos, key=lambda foto: foto.mtime)._replace(total=len(fotos))
+            for numero, fotos in candidatas.items()
+        }
+        return encontradas, nao_listados
+
+    @staticmethod
+    def _foto(indexada: FotoIndexada) -> Foto:
+        return Foto(*(getattr(indexada, campo) for campo in Foto._fields))
+
+    @classmethod
+    def _obter_mapa(cls) -> Dict[str, Foto]:
+        versao = cache_versionado.geracao(cls.NAMESPACE)
+        with cls._lock:
+            if cls._mapa is not None and versao == cls._versao:
+                return cls._mapa
+
+        mapa = {
+            foto.numero_iniciatico: cls._foto(foto)
+            for foto in FotoIndexada.objects.all()
+        }
+        with cls._lock:
+            cls._mapa = mapa
+            cls._versao = versao
+        return mapa
@@ -0,0 +1,423 @@
+"""
+Busca de localidades (Estado, Cidade, Bairro) e de endereços por CEP.
+
+As consultas usam a coluna indexada ``nome_busca`` (sem acentos, minúscula).
+Estados e cidades também podem ser respondidos por um índice de prefixos em
+memória, sem acessar o banco a cada tecla digitada; o mesmo mecanismo mantém
+o mapa de códigos IBGE usado para resolver o endereço de um CEP.
+"""
+
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from alunos.models import Bairro, CepCache, Cidade, Estado
+from alunos.utils import normalizar_busca
+from core import cache_versionado
+
+logger = logging.getLogger(__name__)
+
+LIMITE_ESTADOS = 10
+LIMITE_CIDADES = 15
+LIMITE_BAIRROS = 15
+
+# Importações em lote suspendem a invalidação por linha nesta thread
+_lote = threading.local()
+
+
+CAMPOS_CIDADE = (
+    "id",
+    "nome",
+    "codigo_ibge",
+    "estado_id",
+    "estado__nome",
+    "estado__codigo",
+)
+
+
+def _linha_cidade(linha: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": linha["id"],
+        "nome": linha["nome"],
+        "codigo_ibge": linha["codigo_ibge"],
+        "estado_id": linha["estado_id"],
+        "estado_nome": linha["estado__nome"],
+        "estado_codigo": linha["estado__codigo"],
+    }
+
+
+def preencher_nome_busca(modelo) -> int:
+    """
+    Preenche ``nome_busca`` das linhas que ainda não o possuem.
+
+    Cobre registros gravados sem passar por ``save()`` (fixtures, bulk_create).
+
+    Returns:
+        Quantidade de linhas atualizadas
+    """
+    pendentes = []
+    for obj in modelo.objects.filter(nome_busca="").only("id", "nome").iterator():
+        obj.nome_busca = normalizar_busca(obj.nome)
+        pendentes.append(obj)
+    modelo.objects.bulk_update(pendentes, ["nome_busca"], batch_size=1000)
+    return len(pendentes)
+
+
+def _ordenar_por_prefixo(queryset, termo: str):
+    """Ordena nomes que começam pelo termo antes dos que o contêm em outra palavra."""
+    return queryset.annotate(
+        _prefixo=Case(
+            When(nome_busca__startswith=normalizar_busca(termo), then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by("_prefixo", "nome")
+
+
+def buscar_estados_db(termo: str, limite: int = LIMITE_ESTADOS) -> List[Dict[str, Any]]:
+    """Busca estados pelo nome normalizado ou pela sigla em uma consulta."""
+    estados = Estado.objects.filter(
+        Estado.filtro_nome_busca(termo) | Q(codigo__istartswith=termo)
+    )
+    return list(
+        _ordenar_por_prefixo(estados, termo).values("id", "codigo", "nome", "regiao")[
+            :limite
+        ]
+    )
+
+
+def buscar_cidades_db(
+    termo: str, estado_id: Optional[int] = None, limite: int = LIMITE_CIDADES
+) -> List[Dict[str, Any]]:
+    """Busca cidades pelo nome normalizado em uma consulta."""
+    cidades = Cidade.objects.filter(Cidade.filtro_nome_busca(termo))
+    if estado_id:
+        cidades = cidades.filter(estado_id=estado_id)
+    return [
+        _linha_cidade(linha)
+        for linha in _ordenar_por_prefixo(cidades, termo).values(*CAMPOS_CIDADE)[
+            :limite
+        ]
+    ]
+
+
+def buscar_bairros_db(
+    termo: str, cidade_id: Optional[int] = None, limite: int = LIMITE_BAIRROS
+) -> List[Dict[str, Any]]:
+    """Busca bairros pelo nome normalizado em uma consulta."""
+    bairros = Bairro.objects.filter(Bairro.filtro_nome_busca(termo))
+    if cidade_id:
+        bairros = bairros.filter(cidade_id=cidade_id)
+    return list(
+        _ordenar_por_prefixo(bairros, termo).values(
+            "id", "nome", "cidade_id", "cidade__nome", "cidade__estado__codigo"
+        )[:limite]
+    )
+
+
+class IndicePrefixos:
+    """
+    Índice de prefixos de palavras sobre uma lista de linhas.
+
+    Em vez de nós de trie, guarda as chaves (cada sufixo do nome normalizado
+    que começa em uma palavra) em uma lista ordenada; um prefixo vira uma
+    faixa contígua localizada com ``bisect``.
+    """
+
+    def __init__(self, linhas: List[Dict[str, Any]], chaves_extras=None):
+        entradas = []
+        for posicao, linha in enumerate(linhas):
+            nome = normalizar_busca(linha["nome"])
+            entradas.append((nome, posicao))
+            entradas.extend(
+                (nome[i + 1 :], posicao) for i, c in enumerate(nome) if c == " "
+            )
+            if chaves_extras:
+                entradas.extend(
+                    (chave, posicao) for chave in chaves_extras(linha) if chave
+                )
+        entradas.sort()
+        self._chaves = [chave for chave, _ in entradas]
+        self._posicoes = [posicao for _, posicao in entradas]
+        self._linhas = linhas
+
+    def buscar(
+        self,
+        termo: str,
+        limite: int,
+        filtro: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Linhas com alguma palavra iniciada pelo termo, na ordem original."""
+        termo = normalizar_busca(termo)
+        if not termo:
+            return []
+        posicoes = set()
+        i = bisect_left(self._chaves, termo)
+        while i < len(self._chaves) and self._chaves[i].startswith(termo):
+            posicoes.add(self._posicoes[i])
+            i += 1
+
+        linhas = (self._linhas[p] for p in sorted(posicoes))
+        if filtro:
+            linhas = (linha for linha in linhas if filtro(linha))
+        # Nomes iniciados pelo termo primeiro, como na busca no banco
+        encontrados = list(linhas)
+        encontrados.sort(
+            key=lambda linha: not normalizar_busca(linha["nome"]).startswith(termo)
+        )
+        return encontrados[:limite]
+
+    def __len__(self):
+        return len(self._linhas)
+
+
+class MapaIBGE:
+    """Estados por sigla e cidades por código IBGE ou por (UF, nome)."""
+
+    def __init__(self, estados: List[Dict[str, Any]], cidades: List[Dict[str, Any]]):
+        self.estados = {estado["codigo"]: estado for estado in estados}
+        self.por_codigo = {
+            cidade["codigo_ibge"]: cidade for cidade in cidades if cidade["codigo_ibge"]
+        }
+        self.por_nome = {
+            (cidade["estado_codigo"], normalizar_busca(cidade["nome"])): cidade
+            for cidade in cidades
+        }
+
+    def estado(self, uf: str) -> Optional[Dict[str, Any]]:
+        return self.estados.get(uf)
+
+    def cidade(self, codigo_ibge: str, uf: str, nome: str) -> Optional[Dict[str, Any]]:
+        """Cidade pelo código IBGE ou, na falta dele, pelo nome dentro da UF."""
+        cidade = self.por_codigo.get(codigo_ibge) if codigo_ibge else None
+        if cidade is None and nome:
+            cidade = self.por_nome.get((uf, normalizar_busca(nome)))
+        return cidade
+
+    def __len__(self):
+        return len(self.por_codigo)
+
+
+class IndiceLocalidades:
+    """
+    Índices em memória de estados e cidades, compartilhados pelo processo.
+
+    São construídos sob demanda e descartados quando a versão gravada no
+    cache muda (``invalidar`` é chamado pelos signals de Estado e Cidade),
+    o que propaga a invalidação para os demais processos. A invalidação
+    acontece no commit, para que nenhum processo reconstrua o índice com
+    dados ainda não confirmados.
+    """
+
+    NAMESPACE = ("alunos", "localidades")
+
+    _lock = threading.Lock()
+    _indices: Dict[str, Any] = {}
+    _versao: Optional[int] = None
+
+    @staticmethod
+    def habilitado() -> bool:
+        return getattr(settings, "LOCALIDADES_INDICE_EM_MEMORIA", True)
+
+    @classmethod
+    def invalidar(cls) -> None:
+        """Agenda o descarte dos índices para o commit da transação corrente."""
+        if getattr(_lote, "ativo", False):
+            return
+        transaction.on_commit(cls._descartar)
+
+    @classmethod
+    @contextmanager
+    def em_lote(cls):
+        """
+        Suspende a invalidação por linha durante uma importação.
+
+        Os índices são invalidados uma única vez ao final do bloco.
+        """
+        anterior = getattr(_lote, "ativo", False)
+        _lote.ativo = True
+        try:
+            yield
+        finally:
+            _lote.ativo = anterior
+            cls.invalidar()
+
+    @classmethod
+    def _descartar(cls) -> None:
+        """Descarta os índices locais e sinaliza os demais processos."""
+        with cls._lock:
+            cls._indices = {}
+            cls._versao = None
+        cache_versionado.invalidar(cls.NAMESPACE)
+
+    @classmethod
+    def buscar_estados(cls, termo: str, limite: int = LIMITE_ESTADOS):
+        indice = cls._obter("estados", cls._construir_estados)
+        return indice.buscar(termo, limite)
+
+    @classmethod
+    def buscar_cidades(
+        cls, termo: str, estado_id: Optional[int] = None, limite: int = LIMITE_CIDADES
+    ):
+        indice = cls._obter("cidades", cls._construir_cidades)
+        filtro = (lambda linha: linha["estado_id"] == estado_id) if estado_id else None
+        return indice.buscar(termo, limite, filtro)
+
+    @classmethod
+    def mapa_ibge(cls) -> MapaIBGE:
+        return cls._obter("ibge", cls._construir_mapa_ibge)
+
+    @classmethod
+    def _obter(cls, nome: str, construir):
+        versao = cache_versionado.geracao(cls.NAMESPACE)
+        with cls._lock:
+            if cls._versao != versao:
+                cls._indices = {}
+                cls._versao = versao
+            indice = cls._indices.get(nome)
+            if indice is None:
+                indice = construir()
+                cls._indices[nome] = indice
+                logger.debug(f"Índice de {nome} construído com {len(indice)} linhas")
+            return indice
+
+    @staticmethod
+    def _construir_estados() -> IndicePrefixos:
+        linhas = list(
+            Estado.objects.order_by("nome").values("id", "codigo", "nome", "regiao")
+        )
+        return IndicePrefixos(
+            linhas, chaves_extras=lambda linha: [linha["codigo"].lower()]
+        )
+
+    @staticmethod
+    def _construir_cidades() -> IndicePrefixos:
+        linhas = [
+            _linha_cidade(linha)
+            for linha in Cidade.objects.order_by("nome").values(*CAMPOS_CIDADE)
+        ]
+        return IndicePrefixos(linhas)
+
+    @staticmethod
+    def _construir_mapa_ibge() -> MapaIBGE:
+        estados = list(Estado.objects.values("id", "codigo", "nome"))
+        cidades = [
+            _linha_cidade(linha) for linha in Cidade.objects.values(*CAMPOS_CIDADE)
+        ]
+        return MapaIBGE(estados, cidades)
+
+
+def buscar_estados(termo: str, limite: int = LIMITE_ESTADOS):
+    """Busca estados pelo índice em memória ou, se desabilitado, no banco."""
+    if IndiceLocalidades.habilitado():
+        return IndiceLocalidades.buscar_estados(termo, limite)
+    return buscar_estados_db(termo, limite)
+
+
+def buscar_cidades(
+    termo: str, estado_id: Optional[int] = None, limite: int = LIMITE_CIDADES
+):
+    """Busca cidades pelo índice em memória ou, se desabilitado, no banco."""
+    if IndiceLocalidades.habilitado():
+        return IndiceLocalidades.buscar_cidades(termo, estado_id, limite)
+    return buscar_cidades_db(termo, estado_id, limite)
+
+
+class CepService:
+    """
+    Consulta de CEP com cache persistente em ``CepCache``.
+
+    CEPs repetidos são respondidos pela tabela, sem a ida ao ViaCEP; se o
+    ViaCEP falhar, uma entrada expirada ainda é melhor que nenhuma.
+    """
+
+    URL_VIACEP = "https://viacep.com.br/ws/{cep}/json/"
+    TIMEOUT = 5
+    CAMPOS = ("logradouro", "complemento", "bairro", "localidade", "uf", "ibge")
+    TAMANHOS = {campo: CepCache._meta.get_field(campo).max_length for campo in CAMPOS}
+    # CEPs inexistentes são reconsultados antes dos encontrados
+    HORAS_NAO_ENCONTRADO = 24
+
+    @staticmethod
+    def limpar(cep: str) -> str:
+        return "".join(filter(str.isdigit, cep or ""))
+
+    @staticmethod
+    def dias_validade() -> int:
+        return getattr(settings, "CEP_CACHE_DIAS", 30)
+
+    @classmethod
+    def consultar(cls, cep: str) -> Optional[Dict[str, str]]:
+        """
+        Retorna os dados do CEP (já limpo) ou None se ele não existir.
+
+        Raises:
+            requests.RequestException: ViaCEP indisponível e CEP fora do cache
+        """
+        entrada = CepCache.objects.filter(cep=cep).first()
+        if entrada and cls._valida(entrada):
+            return cls._dados(entrada)
+
+        try:
+            dados = cls._consultar_viacep(cep)
+        except requests.RequestException:
+            if entrada:
+                logger.warning(
+                    f"ViaCEP indisponível, usando cache expirado do CEP {cep}"
+                )
+                return cls._dados(entrada)
+            raise
+
+        valores = cls.truncar(
+            {campo: (dados or {}).get(campo) or "" for campo in cls.CAMPOS}
+        )
+        CepCache.objects.update_or_create(
+            cep=cep,
+            defaults={
+                **valores,
+                "encontrado": dados is not None,
+                "origem": "viacep",
+                "atualizado_em": timezone.now(),
+            },
+        )
+        # Mesmo formato das consultas seguintes, respondidas pelo cache
+        return valores if dados is not None else None
+
+    @classmethod
+    def truncar(cls, valores: Dict[str, str]) -> Dict[str, str]:
+        """Corta cada valor no ``max_length`` da coluna de ``CepCache``."""
+        return {campo: valor[: cls.TAMANHOS[campo]] for campo, valor in valores.items()}
+
+    @classmethod
+    def _valida(cls, entrada: CepCache) -> bool:
+        if entrada.origem == "diretorio":
+            return True
+        if entrada.encontrado:
+            validade = timedelta(days=cls.dias_validade())
+        else:
+            validade = timedelta(hours=cls.HORAS_NAO_ENCONTRADO)
+        return timezone.now() - entrada.atualizado_em < validade
+
+    @classmethod
+    def _dados(cls, entrada: CepCache) -> Optional[Dict[str, str]]:
+        if not entrada.encontrado:
+            return None
+        return {campo: getattr(entrada, campo) for campo in cls.CAMPOS}
+
+    @classmethod
+    def _consultar_viacep(cls, cep: str) -> Optional[Dict[str, str]]:
+        response = requests.get(cls.URL_VIACEP.format(cep=cep), timeout=cls.TIMEOUT)
+        response.raise_for_status()
+        dados = response.json()
+        if dados.get("erro"):
+            return None
+        return dados
@@ -0,0 +1,111 @@
+"""
+Miniaturas das fotos de alunos, geradas uma vez e guardadas em disco.
+
+O arquivo da miniatura é endereçado pelo conteúdo da origem: o nome é o hash
+de (caminho da foto, mtime, tamanho, formato). Trocar a foto muda o mtime e,
+com ele, a miniatura e a URL — por isso a resposta pode ser cacheada pelo
+navegador por tempo indeterminado.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from alunos.services.fotos import IndiceFotos
+
+logger = logging.getLogger(__name__)
+
+# Lado máximo, em pixels, de cada tamanho (o dobro do exibido, para telas HiDPI)
+TAMANHOS = {"p": 120, "m": 240, "g": 480}
+TAMANHO_PADRAO = "p"
+
+FORMATOS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+QUALIDADE = 80
+
+
+class Origem(NamedTuple):
+    caminho: str
+    mtime: float
+
+
+def diretorio_cache() -> Path:
+    return Path(
+        getattr(settings, "MINIATURAS_DIR", None)
+        or Path(settings.MEDIA_ROOT) / "cache" / "miniaturas"
+    )
+
+
+def origem_da_foto(
+    foto=None, numero_iniciatico: Optional[str] = None
+) -> Optional[Origem]:
+    """
+    Arquivo de origem da miniatura: a foto enviada (campo ``foto`` do aluno)
+    ou, na falta dela, a foto indexada do número iniciático.
+    """
+    if foto:
+        try:
+            return Origem(foto.path, os.stat(foto.path).st_mtime)
+        except (OSError, NotImplementedError, ValueError):
+            return None
+    indexada = IndiceFotos.obter(numero_iniciatico)
+    if indexada is None:
+        return None
+    return Origem(indexada.caminho, indexada.mtime)
+
+
+def versao(origem: Origem) -> str:
+    """Identificador curto da versão da foto, usado na URL da miniatura."""
+    return f"{int(origem.mtime * 1000):x}"
+
+
+def formato_aceito(accept: str) -> str:
+    """WebP para navegadores que o anunciam; JPEG para os demais."""
+    return "webp" if "image/webp" in (accept or "") else "jpeg"
+
+
+def caminho_miniatura(origem: Origem, tamanho: str, formato: str) -> Path:
+    chave = f"{origem.caminho}|{origem.mtime!r}|{TAMANHOS[tamanho]}|{formato}"
+    digest = hashlib.sha1(chave.encode("utf-8")).hexdigest()
+    return diretorio_cache() / digest[:2] / f"{digest}.{formato}"
+
+
+def obter_miniatura(origem: Origem, tamanho: str, formato: str) -> Path:
+    """
+    Caminho da miniatura, gerando-a se ainda não estiver no cache em disco.
+
+    A gravação passa por um arquivo temporário renomeado no fim, para que
+    requisições concorrentes nunca leiam uma miniatura pela metade.
+    """
+    destino = caminho_miniatura(origem, tamanho, formato)
+    if destino.exists():
+        return destino
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    formato_pil, _ = FORMATOS[formato]
+    lado = TAMANHOS[tamanho]
+
+    with Image.open(origem.caminho) as imagem:
+        imagem = ImageOps.exif_transpose(imagem)
+        imagem.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+        if imagem.mode not in ("RGB", "L"):
+            imagem = imagem.convert("RGB")
+        fd, temporario = tempfile.mkstemp(dir=destino.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as arquivo:
+                imagem.save(arquivo, formato_pil, quality=QUALIDADE)
+            os.replace(temporario, destino)
+        except Exception:
+            os.unlink(temporario)
+            raise
+
+    logger.debug(f"Miniatura {tamanho}/{formato} gerada para {origem.caminho}")
+    return destino
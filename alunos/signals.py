@@ -0,0 +1,20 @@
+"""
+Signals para o aplicativo de alunos.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender="alunos.Estado")
+@receiver(post_delete, sender="alunos.Estado")
+@receiver(post_save, sender="alunos.Cidade")
+@receiver(post_delete, sender="alunos.Cidade")
+def invalidar_indice_localidades(sender, **kwargs):
+    """Descarta, no commit, o índice em memória dos autocompletes de localidade."""
+    if kwargs.get("raw"):
+        return
+
+    from alunos.services.localidades import IndiceLocalidades
+
+    IndiceLocalidades.invalidar()
@@ -0,0 +1,27 @@
+"""
+Tasks assíncronas para o aplicativo de alunos.
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def indexar_fotos(self):
+    """
+    Task periódica que reindexa as fotos dos diretórios de fotos.
+
+    Mantém a varredura do disco fora das requisições, que apenas leem o
+    índice; só as fotos novas, alteradas ou removidas são gravadas.
+    """
+    try:
+        from .services.fotos import IndiceFotos
+
+        return IndiceFotos.atualizar()
+
+    except Exception as exc:
+        logger.error(f"Erro ao indexar fotos: {str(exc)}")
+        raise self.retry(exc=exc)
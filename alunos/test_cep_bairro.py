@@ -2,10 +2,20 @@
 Testes para busca de CEP e criação de bairro.
 """
 
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import requests
+from django.core.management import call_command
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
-from alunos.models import Estado, Cidade, Bairro
-import json
+from django.utils import timezone
+from alunos.models import Estado, Cidade, Bairro, CepCache
+from alunos.services.localidades import IndiceLocalidades
 
 
 class CepBairroTestCase(TestCase):
@@ -14,41 +24,35 @@ class CepBairroTestCase(TestCase):
     def setUp(self):
         """Configura dados de teste."""
         self.client = Client()
-        
+
         # Cria usuário de teste
         self.user = User.objects.create_user(
-            username='testuser',
-            password='testpass123'
+            username='testuser', password='testpass123'
         )
         self.client.login(username='testuser', password='testpass123')
-        
+
         # Cria estado e cidade de teste
         self.estado_ma = Estado.objects.create(
-            codigo='MA',
-            nome='Maranhão',
-            regiao='Nordeste'
+            codigo='MA', nome='Maranhão', regiao='Nordeste'
         )
-        
+
         self.cidade_slz = Cidade.objects.create(
-            nome='São Luís',
-            estado=self.estado_ma,
-            codigo_ibge='2111300'
+            nome='São Luís', estado=self.estado_ma, codigo_ibge='2111300'
         )
-        
+
         # Cria um bairro de teste
         self.bairro_centro = Bairro.objects.create(
-            nome='Centro',
-            cidade=self.cidade_slz
+            nome='Centro', cidade=self.cidade_slz
         )
 
     def test_01_buscar_cep_autenticado(self):
         """Testa busca de CEP com usuário autenticado."""
         # Teste com CEP de São Luís - MA (65000-000)
         response = self.client.get('/alunos/api/localidade/cep/65000-000/')
-        
+
         self.assertEqual(response.status_code, 200)
         data = response.json()
-        
+
         # Pode não ter sucesso se a API externa falhar, mas deve retornar JSON válido
         self.assertIn('success', data)
 
@@ -56,14 +60,14 @@ class CepBairroTestCase(TestCase):
         """Testa que busca de CEP requer autenticação."""
         self.client.logout()
         response = self.client.get('/alunos/api/localidade/cep/65000-000/')
-        
+
         # Deve redirecionar para login ou retornar 403
         self.assertIn(response.status_code, [302, 403])
 
     def test_03_buscar_cep_invalido(self):
         """Testa busca com CEP inválido."""
         response = self.client.get('/alunos/api/localidade/cep/123/')
-        
+
         self.assertEqual(response.status_code, 400)
         data = response.json()
         self.assertFalse(data['success'])
@@ -73,20 +77,17 @@ class CepBairroTestCase(TestCase):
         """Testa criação de novo bairro."""
         response = self.client.post(
             '/alunos/api/localidade/bairros/criar/',
-            data=json.dumps({
-                'nome': 'Bairro Novo',
-                'cidade_id': self.cidade_slz.id
-            }),
-            content_type='application/json'
+            data=json.dumps({'nome': 'Bairro Novo', 'cidade_id': self.cidade_slz.id}),
+            content_type='application/json',
         )
-        
+
         self.assertEqual(response.status_code, 200)
         data = response.json()
-        
+
         self.assertTrue(data['success'])
         self.assertEqual(data['nome'], 'Bairro Novo')
         self.assertFalse(data['ja_existia'])
-        
+
         # Verifica que foi criado no banco
         bairro = Bairro.objects.get(id=data['bairro_id'])
         self.assertEqual(bairro.nome, 'Bairro Novo')
@@ -96,16 +97,15 @@ class CepBairroTestCase(TestCase):
         """Testa criação de bairro que já existe."""
         response = self.client.post(
             '/alunos/api/localidade/bairros/criar/',
-            data=json.dumps({
-                'nome': 'Centro',  # Já existe
-                'cidade_id': self.cidade_slz.id
-            }),
-            content_type='application/json'
+            data=json.dumps(
+                {'nome': 'Centro', 'cidade_id': self.cidade_slz.id}  # Já existe
+            ),
+            content_type='application/json',
         )
-        
+
         self.assertEqual(response.status_code, 200)
         data = response.json()
-        
+
         self.assertTrue(data['success'])
         self.assertEqual(data['bairro_id'], self.bairro_centro.id)
         self.assertTrue(data['ja_existia'])
@@ -114,13 +114,10 @@ class CepBairroTestCase(TestCase):
         """Testa criação de bairro sem nome."""
         response = self.client.post(
             '/alunos/api/localidade/bairros/criar/',
-            data=json.dumps({
-                'nome': '',
-                'cidade_id': self.cidade_slz.id
-            }),
-            content_type='application/json'
+            data=json.dumps({'nome': '', 'cidade_id': self.cidade_slz.id}),
+            content_type='application/json',
         )
-        
+
         self.assertEqual(response.status_code, 400)
         data = response.json()
         self.assertFalse(data['success'])
@@ -130,13 +127,10 @@ class CepBairroTestCase(TestCase):
         """Testa criação de bairro sem cidade."""
         response = self.client.post(
             '/alunos/api/localidade/bairros/criar/',
-            data=json.dumps({
-                'nome': 'Bairro Teste',
-                'cidade_id': None
-            }),
-            content_type='application/json'
+            data=json.dumps({'nome': 'Bairro Teste', 'cidade_id': None}),
+            content_type='application/json',
         )
-        
+
         self.assertEqual(response.status_code, 400)
         data = response.json()
         self.assertFalse(data['success'])
@@ -145,14 +139,143 @@ class CepBairroTestCase(TestCase):
         """Testa criação de bairro com cidade inexistente."""
         response = self.client.post(
             '/alunos/api/localidade/bairros/criar/',
-            data=json.dumps({
-                'nome': 'Bairro Teste',
-                'cidade_id': 99999
-            }),
-            content_type='application/json'
+            data=json.dumps({'nome': 'Bairro Teste', 'cidade_id': 99999}),
+            content_type='application/json',
         )
-        
+
         self.assertEqual(response.status_code, 404)
         data = response.json()
         self.assertFalse(data['success'])
         self.assertIn('não encontrada', data['error'].lower())
+
+
+class CepCacheTestCase(TestCase):
+    """Testes do cache de CEP e do diretório de CEPs importado."""
+
+    def setUp(self):
+        User.objects.create_user(username='cepcache', password='testpass123')
+        self.client.login(username='cepcache', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            IndiceLocalidades.invalidar()
+
+        self.estado_ma = Estado.objects.create(
+            codigo='MA', nome='Maranhão', regiao='Nordeste'
+        )
+        self.cidade_slz = Cidade.objects.create(
+            nome='São Luís', estado=self.estado_ma, codigo_ibge='2111300'
+        )
+
+    def _resposta_viacep(self, dados):
+        resposta = mock.Mock(status_code=200)
+        resposta.json.return_value = dados
+        resposta.raise_for_status.return_value = None
+        return resposta
+
+    def test_cep_repetido_nao_consulta_viacep(self):
+        dados = {
+            'logradouro': 'Rua Grande',
+            'complemento': '',
+            'bairro': 'Centro',
+            'localidade': 'São Luís',
+            'uf': 'MA',
+            'ibge': '2111300',
+        }
+        with mock.patch(
+            'alunos.services.localidades.requests.get',
+            return_value=self._resposta_viacep(dados),
+        ) as viacep:
+            primeira = self.client.get('/alunos/api/localidade/cep/65010-000/').json()
+            segunda = self.client.get('/alunos/api/localidade/cep/65010000/').json()
+
+        self.assertEqual(viacep.call_count, 1)
+        self.assertTrue(primeira['bairro_criado'])
+        self.assertFalse(segunda['bairro_criado'])
+        self.assertEqual(segunda['cidade_id'], self.cidade_slz.id)
+        self.assertEqual(segunda['bairro_id'], primeira['bairro_id'])
+
+    def test_cache_expirado_usado_quando_viacep_falha(self):
+        CepCache.objects.create(
+            cep='65010000',
+            localidade='São Luís',
+            uf='MA',
+            ibge='2111300',
+            atualizado_em=timezone.now() - timedelta(days=365),
+        )
+        with mock.patch(
+            'alunos.services.localidades.requests.get',
+            side_effect=requests.ConnectionError,
+        ):
+            response = self.client.get('/alunos/api/localidade/cep/65010000/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['estado_id'], self.estado_ma.id)
+
+    def test_cep_inexistente_fica_em_cache(self):
+        with mock.patch(
+            'alunos.services.localidades.requests.get',
+            return_value=self._resposta_viacep({'erro': True}),
+        ) as viacep:
+            self.client.get('/alunos/api/localidade/cep/99999999/')
+            response = self.client.get('/alunos/api/localidade/cep/99999999/')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(viacep.call_count, 1)
+
+    def test_diretorio_importado_responde_offline(self):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', delete=False, encoding='utf-8'
+        ) as arquivo:
+            arquivo.write('CEP;Logradouro;Bairro;Cidade;UF;IBGE\n')
+            arquivo.write('65075-000;Av. dos Holandeses;Calhau;São Luís;MA;2111300\n')
+            arquivo.write('invalido;;;;MA;\n')
+        self.addCleanup(os.remove, arquivo.name)
+
+        saida = StringIO()
+        call_command('importar_diretorio_cep', arquivo.name, stdout=saida)
+        self.assertIn('1 CEPs gravados, 1 linhas ignoradas', saida.getvalue())
+
+        with mock.patch('alunos.services.localidades.requests.get') as viacep:
+            response = self.client.get('/alunos/api/localidade/cep/65075000/')
+
+        viacep.assert_not_called()
+        data = response.json()
+        self.assertEqual(data['logradouro'], 'Av. dos Holandeses')
+        self.assertEqual(data['cidade_id'], self.cidade_slz.id)
+
+    def test_diretorio_trunca_valores_e_preserva_colunas_ausentes(self):
+        CepCache.objects.create(
+            cep='65075000', complemento='lado par', origem='diretorio'
+        )
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', delete=False, encoding='utf-8'
+        ) as arquivo:
+            arquivo.write('CEP;Logradouro;Bairro;UF\n')
+            arquivo.write(f"65075000;{'L' * 250};{'B' * 150};MA\n")
+        self.addCleanup(os.remove, arquivo.name)
+
+        call_command('importar_diretorio_cep', arquivo.name, stdout=StringIO())
+
+        entrada = CepCache.objects.get(cep='65075000')
+        self.assertEqual(entrada.logradouro, 'L' * 200)
+        self.assertEqual(entrada.bairro, 'B' * 100)
+        self.assertEqual(entrada.complemento, 'lado par')
+
+    def test_viacep_valores_longos_sao_truncados(self):
+        dados = {
+            'logradouro': 'L' * 250,
+            'bairro': 'B' * 150,
+            'localidade': 'São Luís',
+            'uf': 'MA',
+            'ibge': '2111300',
+        }
+        with mock.patch(
+            'alunos.services.localidades.requests.get',
+            return_value=self._resposta_viacep(dados),
+        ):
+            response = self.client.get('/alunos/api/localidade/cep/65010000/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['bairro'], 'B' * 100)
+        entrada = CepCache.objects.get(cep='65010000')
+        self.assertEqual(entrada.logradouro, 'L' * 200)
+        self.assertEqual(entrada.bairro, 'B' * 100)
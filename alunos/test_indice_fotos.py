@@ -0,0 +1,246 @@
+"""
+Testes do índice de fotos por número iniciático.
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import date
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image
+
+from alunos.models import Aluno, FotoIndexada
+from alunos.services import miniaturas
+from alunos.services.fotos import IndiceFotos, numeros_do_arquivo
+
+User = get_user_model()
+
+
+class DiretoriosFotosMixin:
+    """Diretórios de fotos temporários e helpers para criar fotos e alunos."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.externo = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        self.addCleanup(shutil.rmtree, self.externo)
+        os.makedirs(os.path.join(self.media, "alunos", "fotos"))
+
+        configuracao = override_settings(
+            MEDIA_ROOT=self.media,
+            MEDIA_URL="/media/",
+            FOTOS_EXTERNAS_DIR=self.externo,
+            MINIATURAS_DIR=os.path.join(self.media, "miniaturas"),
+        )
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.addCleanup(IndiceFotos.invalidar)
+
+        User.objects.create_user(username="fotos", password="senha123")
+        self.client.login(username="fotos", password="senha123")
+
+    def _foto(self, diretorio, nome, mtime, imagem=False):
+        caminho = os.path.join(diretorio, nome)
+        if imagem:
+            Image.new("RGB", (800, 600), "navy").save(caminho)
+        else:
+            with open(caminho, "wb") as arquivo:
+                arquivo.write(b"\x89PNG" if nome.endswith(".png") else b"\xff\xd8")
+        os.utime(caminho, (mtime, mtime))
+        return caminho
+
+    def _aluno(self, numero):
+        return Aluno.objects.create(
+            nome=f"Aluno {numero}",
+            data_nascimento=date(2000, 1, 1),
+            numero_iniciatico=numero,
+            email=f"foto{numero}@teste.com",
+            cpf=f"{int(numero):011d}",
+        )
+
+
+class IndiceFotosTest(DiretoriosFotosMixin, TestCase):
+    """Indexação dos diretórios e consulta sem varredura por aluno."""
+
+    def test_numeros_do_arquivo_seguem_padroes_de_glob(self):
+        self.assertEqual(numeros_do_arquivo("123"), {"123"})
+        self.assertEqual(
+            numeros_do_arquivo("123_frente"), {"123_frente", "123", "frente"}
+        )
+
+    def test_indice_escolhe_foto_mais_recente_entre_diretorios(self):
+        fotos_media = os.path.join(self.media, "alunos", "fotos")
+        self._foto(fotos_media, "101.jpg", 1_000)
+        self._foto(self.externo, "101_nova.png", 2_000)
+        self._foto(fotos_media, "202.jpg", 1_000)
+        self._foto(self.externo, "leiame.txt", 3_000)
+
+        resultado = IndiceFotos.atualizar()
+
+        self.assertEqual(resultado["criadas"], 4)
+        foto = IndiceFotos.obter("101")
+        self.assertTrue(foto.caminho.endswith("101_nova.png"))
+        self.assertEqual(foto.total, 2)
+        self.assertEqual(IndiceFotos.url("101"), "/alunos/api/servir-foto/101/")
+        self.assertEqual(IndiceFotos.url("202"), "/media/alunos/fotos/202.jpg")
+
+    def test_get_foto_url_consulta_indice_sem_queries(self):
+        self._foto(os.path.join(self.media, "alunos", "fotos"), "303.jpg", 1_000)
+        alunos = [self._aluno("303"), self._aluno("404")]
+        IndiceFotos.atualizar()
+        IndiceFotos.obter("303")
+
+        with self.assertNumQueries(0):
+            urls = [aluno.get_foto_url() for aluno in alunos]
+
+        self.assertEqual(urls, ["/media/alunos/fotos/303.jpg", None])
+
+    def test_reindexacao_grava_apenas_diferencas(self):
+        caminho = self._foto(self.externo, "505.jpg", 1_000)
+        IndiceFotos.atualizar()
+
+        os.remove(caminho)
+        self._foto(self.externo, "606.jpg", 1_000)
+        saida = StringIO()
+        call_command("indexar_fotos", stdout=saida)
+
+        self.assertIn("1 novas, 0 atualizadas, 1 removidas", saida.getvalue())
+        self.assertEqual(
+            list(FotoIndexada.objects.values_list("numero_iniciatico", flat=True)),
+            ["606"],
+        )
+
+    def test_diretorio_indisponivel_preserva_suas_fotos(self):
+        self._foto(self.externo, "535.jpg", 1_000)
+        self._foto(self.externo, "545.jpg", 1_000)
+        self._foto(os.path.join(self.media, "alunos", "fotos"), "545.jpg", 500)
+        IndiceFotos.atualizar()
+
+        # Montagem externa fora do ar durante a varredura
+        desmontado = f"{self.externo}_off"
+        os.rename(self.externo, desmontado)
+        try:
+            resultado = IndiceFotos.atualizar()
+        finally:
+            os.rename(desmontado, self.externo)
+
+        self.assertFalse(resultado["reindexado"])
+        self.assertEqual(IndiceFotos.url("535"), "/alunos/api/servir-foto/535/")
+        self.assertTrue(IndiceFotos.obter("545").caminho.startswith(self.externo))
+
+    def test_foto_sobrescrita_no_mesmo_nome_e_detectada(self):
+        caminho = self._foto(self.externo, "515.jpg", 1_000)
+        IndiceFotos.atualizar()
+        self.assertFalse(IndiceFotos.atualizar()["reindexado"])
+
+        # Mesmo nome: a data do diretório não muda, a do arquivo sim
+        with open(caminho, "wb") as arquivo:
+            arquivo.write(b"\xff\xd8 nova")
+        os.utime(caminho, (2_000, 2_000))
+        resultado = IndiceFotos.atualizar()
+
+        self.assertEqual(resultado["atualizadas"], 1)
+        foto = FotoIndexada.objects.get(numero_iniciatico="515")
+        self.assertEqual((foto.mtime, foto.tamanho), (2_000, 7))
+
+    def test_consulta_nao_varre_diretorios(self):
+        self._foto(self.externo, "525.jpg", 1_000)
+
+        self.assertIsNone(IndiceFotos.obter("525"))
+        self.assertFalse(FotoIndexada.objects.exists())
+
+    def test_servir_foto_com_etag_e_content_type(self):
+        self._foto(self.externo, "707.png", 1_700_000_000)
+        IndiceFotos.atualizar()
+        url = reverse("alunos:api_servir_foto_externa", args=["707"])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("Last-Modified", response)
+        b"".join(response.streaming_content)
+        response.close()
+
+        revalidacao = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidacao.status_code, 304)
+
+        self.assertEqual(
+            self.client.get(
+                reverse("alunos:api_servir_foto_externa", args=["999"])
+            ).status_code,
+            404,
+        )
+
+    def test_buscar_foto_por_numero_iniciatico(self):
+        self._foto(os.path.join(self.media, "alunos", "fotos"), "808.jpg", 1_000)
+        IndiceFotos.atualizar()
+
+        dados = self.client.get(
+            reverse("alunos:api_buscar_foto_numero_iniciatico", args=["808"])
+        ).json()
+
+        self.assertTrue(dados["success"])
+        self.assertEqual(dados["foto_path"], "alunos/fotos/808.jpg")
+        self.assertEqual(dados["nome_arquivo"], "808.jpg")
+
+
+class MiniaturasTest(DiretoriosFotosMixin, TestCase):
+    """Miniaturas geradas uma vez, cacheadas em disco e servidas com cache longo."""
+
+    def setUp(self):
+        super().setUp()
+        self._foto(self.externo, "909.jpg", 1_700_000_000, imagem=True)
+        self.aluno = self._aluno("909")
+        IndiceFotos.atualizar()
+
+    def test_miniatura_gerada_uma_vez_em_webp(self):
+        url = self.aluno.miniatura_url
+        self.assertIn("?v=", url)
+
+        response = self.client.get(url, HTTP_ACCEPT="image/webp,*/*")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept", response["Vary"])
+        with Image.open(BytesIO(b"".join(response.streaming_content))) as imagem:
+            self.assertEqual(imagem.size, (120, 90))
+        response.close()
+
+        gerada = next(miniaturas.diretorio_cache().glob("*/*.webp"))
+        mtime = gerada.stat().st_mtime_ns
+        segunda = self.client.get(url, HTTP_ACCEPT="image/webp")
+        segunda.close()
+        self.assertEqual(gerada.stat().st_mtime_ns, mtime)
+
+        revalidacao = self.client.get(
+            url, HTTP_ACCEPT="image/webp", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(revalidacao.status_code, 304)
+
+    def test_jpeg_para_navegador_sem_webp_e_tamanho_invalido(self):
+        url = reverse("alunos:api_miniatura_foto", args=["909", "m"])
+        response = self.client.get(url, HTTP_ACCEPT="image/*")
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertNotIn("immutable", response["Cache-Control"])
+        response.close()
+
+        url = reverse("alunos:api_miniatura_foto", args=["909", "xxl"])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_comando_pre_gera_miniaturas(self):
+        saida = StringIO()
+        call_command(
+            "gerar_miniaturas", "--tamanhos", "p,g", "--formatos", "jpeg", stdout=saida
+        )
+        self.assertIn("2 geradas, 0 já existentes, 0 alunos sem foto", saida.getvalue())
+
+        saida = StringIO()
+        call_command("gerar_miniaturas", "--tamanhos", "p", "--limpar", stdout=saida)
+        self.assertIn("1 geradas, 1 já existentes", saida.getvalue())
+        self.assertIn("1 removidas", saida.getvalue())
@@ -0,0 +1,115 @@
+"""
+Testes da busca sem acentos de Estado, Cidade e Bairro.
+"""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from alunos.models import Bairro, Cidade, Estado
+from alunos.services.localidades import (
+    IndiceLocalidades,
+    buscar_cidades_db,
+    buscar_estados_db,
+    preencher_nome_busca,
+)
+
+User = get_user_model()
+
+CACHE_LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class BuscaLocalidadeTest(TestCase):
+    """Busca indexada por ``nome_busca`` e índice de prefixos em memória."""
+
+    def setUp(self):
+        User.objects.create_user(username="busca", password="senha123")
+        self.client.login(username="busca", password="senha123")
+        with self.captureOnCommitCallbacks(execute=True):
+            IndiceLocalidades.invalidar()
+
+        self.sp = Estado.objects.create(nome="São Paulo", codigo="SP", regiao="Sudeste")
+        self.pi = Estado.objects.create(nome="Piauí", codigo="PI", regiao="Nordeste")
+        self.sao_paulo = Cidade.objects.create(nome="São Paulo", estado=self.sp)
+        self.sao_jose = Cidade.objects.create(
+            nome="São José dos Campos", estado=self.sp
+        )
+        self.teresina = Cidade.objects.create(nome="Teresina", estado=self.pi)
+        self.bairro = Bairro.objects.create(
+            nome="Jardim Paulistano", cidade=self.sao_paulo
+        )
+
+    def test_save_preenche_nome_busca(self):
+        self.assertEqual(self.sao_jose.nome_busca, "sao jose dos campos")
+
+        self.teresina.nome = "Teresína"
+        self.teresina.save(update_fields=["nome"])
+        self.teresina.refresh_from_db()
+        self.assertEqual(self.teresina.nome_busca, "teresina")
+
+    def test_preencher_nome_busca_para_linhas_sem_save(self):
+        Cidade.objects.filter(pk=self.teresina.pk).update(nome_busca="")
+
+        self.assertEqual(preencher_nome_busca(Cidade), 1)
+        self.teresina.refresh_from_db()
+        self.assertEqual(self.teresina.nome_busca, "teresina")
+
+    def test_busca_no_banco_ignora_acentos_em_uma_query(self):
+        with self.assertNumQueries(1):
+            cidades = buscar_cidades_db("sao")
+        self.assertEqual(
+            [c["nome"] for c in cidades], ["São José dos Campos", "São Paulo"]
+        )
+
+        # Palavras internas também casam, mas depois dos prefixos do nome
+        nomes = [c["nome"] for c in buscar_cidades_db("PAULO")]
+        self.assertEqual(nomes, ["São Paulo"])
+        self.assertEqual(buscar_cidades_db("jose", estado_id=self.pi.id), [])
+        self.assertEqual([e["codigo"] for e in buscar_estados_db("piaui")], ["PI"])
+
+    def test_indice_em_memoria_responde_sem_queries(self):
+        IndiceLocalidades.buscar_cidades("sao")
+        IndiceLocalidades.buscar_estados("sao")
+
+        with self.assertNumQueries(0):
+            cidades = IndiceLocalidades.buscar_cidades("SÃO J")
+            estados = IndiceLocalidades.buscar_estados("sp")
+
+        self.assertEqual([c["id"] for c in cidades], [self.sao_jose.id])
+        self.assertEqual([e["id"] for e in estados], [self.sp.id])
+        self.assertEqual(
+            IndiceLocalidades.buscar_cidades("campos"), buscar_cidades_db("campos")
+        )
+
+    @override_settings(CACHES=CACHE_LOCAL)
+    def test_indice_invalidado_ao_salvar_cidade(self):
+        self.assertEqual(IndiceLocalidades.buscar_cidades("timon"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Cidade.objects.create(nome="Timon", estado=self.pi)
+            # Até o commit os demais processos seguem com o índice anterior
+            self.assertEqual(IndiceLocalidades.buscar_cidades("timon"), [])
+
+        nomes = [c["nome"] for c in IndiceLocalidades.buscar_cidades("timon")]
+        self.assertEqual(nomes, ["Timon"])
+
+    def test_importacao_em_lote_invalida_uma_vez(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with IndiceLocalidades.em_lote():
+                for nome in ("Timon", "Caxias", "Codó"):
+                    Cidade.objects.create(nome=nome, estado=self.pi)
+
+        self.assertEqual(callbacks, [IndiceLocalidades._descartar])
+
+    def test_apis_de_autocomplete(self):
+        resposta = self.client.get(
+            reverse("alunos:api_search_cidades"), {"q": "sao jo"}
+        )
+        dados = resposta.json()
+        self.assertEqual([c["nome"] for c in dados], ["São José dos Campos"])
+        self.assertEqual(dados[0]["display"], "São José dos Campos - SP")
+
+        resposta = self.client.get(
+            reverse("alunos:api_search_bairros"), {"q": "paulis"}
+        )
+        self.assertEqual([b["id"] for b in resposta.json()], [self.bairro.id])
@@ -53,3 +53,70 @@ class AlunoModelTest(TestCase):
             sexo="F",  # Campo obrigatório
         )
         self.assertEqual(str(aluno), "Maria Silva")
+
+
+class AlunoSituacaoInstrutorTest(TestCase):
+    """Mudança de situação detectada sem SELECT extra e cascata em lote."""
+
+    def setUp(self):
+        from cursos.models import Curso
+        from turmas.models import Turma
+
+        self.instrutor = Aluno.objects.create(
+            nome="Instrutor", cpf="11122233344", data_nascimento=date(1980, 1, 1)
+        )
+        curso = Curso.objects.create(nome="Curso Situação")
+        self.turma_principal = Turma.objects.create(
+            nome="Turma A", curso=curso, status="A", instrutor=self.instrutor
+        )
+        self.turma_dupla = Turma.objects.create(
+            nome="Turma B",
+            curso=curso,
+            status="A",
+            instrutor_auxiliar=self.instrutor,
+            auxiliar_instrucao=self.instrutor,
+        )
+        self.turma_encerrada = Turma.objects.create(
+            nome="Turma C", curso=curso, status="C", instrutor=self.instrutor
+        )
+
+    def test_save_sem_mudar_situacao_nao_consulta_banco(self):
+        aluno = Aluno.objects.get(pk=self.instrutor.pk)
+        aluno.grau_atual = "Aprendiz"
+
+        with self.assertNumQueries(1):
+            aluno.save(update_fields=["grau_atual"])
+        self.assertFalse(aluno.campo_alterado("situacao"))
+
+    def test_remocao_informa_papeis_por_turma(self):
+        removidas = self.instrutor._remover_de_turmas_como_instrutor("d")
+
+        self.assertEqual(
+            sorted((t["nome"], t["papel"]) for t in removidas),
+            [
+                ("Turma A", "Instrutor Principal"),
+                ("Turma B", "Instrutor Auxiliar e Auxiliar de Instrução"),
+            ],
+        )
+
+    def test_desligamento_remove_instrutor_das_turmas_ativas(self):
+        aluno = Aluno.objects.get(pk=self.instrutor.pk)
+        aluno.situacao = "d"
+        self.assertTrue(aluno.campo_alterado("situacao"))
+
+        # SELECT das turmas + UPDATE em lote + UPDATE do aluno
+        with self.assertNumQueries(3):
+            aluno.save()
+        self.assertFalse(aluno.campo_alterado("situacao"))
+
+        self.turma_principal.refresh_from_db()
+        self.turma_dupla.refresh_from_db()
+        self.turma_encerrada.refresh_from_db()
+        self.assertIsNone(self.turma_principal.instrutor)
+        self.assertIsNone(self.turma_dupla.instrutor_auxiliar)
+        self.assertIsNone(self.turma_dupla.auxiliar_instrucao)
+        self.assertEqual(self.turma_encerrada.instrutor, self.instrutor)
+
+        # Salvar de novo com a mesma situação não repete a cascata
+        with self.assertNumQueries(1):
+            aluno.save()
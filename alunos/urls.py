@@ -175,6 +175,12 @@ urlpatterns = [
         api_views.servir_foto_externa,
         name="api_servir_foto_externa",
     ),
+    # API para miniaturas das fotos (tamanhos fixos, cache em disco)
+    path(
+        "api/miniatura/<str:numero_iniciatico>/<str:tamanho>/",
+        api_views.servir_miniatura,
+        name="api_miniatura_foto",
+    ),
     path("", include(router.urls)),
     # URLs de autocomplete para Select2
     path("autocomplete/", include("alunos.urls_autocomplete")),
@@ -6,6 +6,7 @@ transição de modelos entre apps (ex: extração de dados iniciáticos).
 
 from importlib import import_module
 import logging
+import unicodedata
 
 logger = logging.getLogger(__name__)
 
@@ -95,3 +96,15 @@ def mask_cpf(cpf):
     if len(cpf) == 11:
         return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
     return cpf
+
+
+def normalizar_busca(texto):
+    """Normaliza texto para busca: sem acentos, minúsculo e espaços simples."""
+    if not texto:
+        return ""
+    sem_acento = "".join(
+        c
+        for c in unicodedata.normalize("NFD", texto)
+        if unicodedata.category(c) != "Mn"
+    )
+    return " ".join(sem_acento.lower().split())
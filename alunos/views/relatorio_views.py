@@ -4,6 +4,7 @@ import csv
 import json
 from datetime import datetime, date, timedelta
 from io import BytesIO
+from itertools import chain
 
 import pandas as pd
 from django.contrib.auth.decorators import login_required
@@ -21,6 +22,7 @@ from alunos.models import Aluno, RegistroHistorico, Codigo
 from turmas.models import Turma
 from cursos.models import Curso
 from alunos.services import listar_alunos_para_relatorio
+from core.exportacao_csv import TAMANHO_LOTE_CSV, resposta_csv
 
 NOME_ORGANIZACAO_PADRAO = "OMAUM - Ordem Mística de Aspiração Universal ao Mestrado"
 NOME_SISTEMA_PADRAO = "Sistema de Gestão Integrada"
@@ -714,26 +716,17 @@ def relatorio_aniversariantes(request):
         headers = ["Nome", "CPF", "Data Nasc.", "Email", "Telefone"]
 
         if export == "csv":
-            response = HttpResponse(content_type="text/csv")
-            response["Content-Disposition"] = (
-                'attachment; filename="aniversariantes.csv"'
+            registros = alunos_qs.values_list(
+                "nome", "cpf", "data_nascimento", "email", "celular_primeiro_contato"
+            ).iterator(chunk_size=TAMANHO_LOTE_CSV)
+            linhas = (
+                (nome, cpf, nascimento, email, celular or "-")
+                for nome, cpf, nascimento, email, celular in registros
+            )
+            return resposta_csv(
+                chain([[header_org], [header_data], [], headers], linhas),
+                "aniversariantes.csv",
             )
-            writer = csv.writer(response)
-            writer.writerow([header_org])
-            writer.writerow([header_data])
-            writer.writerow([])
-            writer.writerow(headers)
-            for aluno in alunos_qs:
-                writer.writerow(
-                    [
-                        smart_str(aluno.nome),
-                        smart_str(aluno.cpf),
-                        aluno.data_nascimento,
-                        smart_str(aluno.email),
-                        smart_str(aluno.celular_primeiro_contato or "-"),
-                    ]
-                )
-            return response
 
         if export == "xls":
             if not xlwt:
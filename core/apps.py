@@ -6,4 +6,9 @@ class CoreConfig(AppConfig):
     name = "core"
 
     def ready(self):
-        pass  # Debug visual agora via django-debug-toolbar
+        """Importa os signals para garantir que sejam registrados."""
+        # Debug visual agora via django-debug-toolbar
+        try:
+            import core.signals  # noqa
+        except ImportError:
+            pass
@@ -0,0 +1,138 @@
+"""
+Namespaces de cache versionados, compartilhados pelos apps.
+
+Cada namespace tem um contador de geração no cache; as chaves embutem a
+geração atual e invalidar o namespace é um único ``INCR`` atômico, em vez de
+apagar chaves por padrão (``delete_pattern`` varre todo o keyspace no Redis e
+não existe nos demais backends). As chaves antigas simplesmente deixam de ser
+lidas e expiram pelo próprio timeout.
+
+Um namespace é um nome (``"presencas"``, ``"pagamentos"``) ou uma tupla com
+escopo (``("turma", 5)``, ``("periodo", 5, 2025, 3)``). Uma chave pode
+depender de vários namespaces; as gerações são lidas em um único
+``get_many``.
+"""
+
+import time
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Union
+
+from django.core.cache import cache
+
+Namespace = Union[str, Tuple[Any, ...]]
+
+PREFIXO_GERACAO = "omaum:geracao"
+
+
+def _nome(namespace: Namespace) -> str:
+    if isinstance(namespace, str):
+        return namespace
+    return ":".join(str(parte) for parte in namespace)
+
+
+def _chave_geracao(namespace: Namespace) -> str:
+    return f"{PREFIXO_GERACAO}:{_nome(namespace)}"
+
+
+def _lista(namespaces) -> List[Namespace]:
+    """Aceita um namespace isolado (nome ou tupla) ou uma lista deles."""
+    if isinstance(namespaces, (str, tuple)):
+        return [namespaces]
+    return list(namespaces)
+
+
+def geracoes(namespaces) -> List[int]:
+    """
+    Gerações atuais dos namespaces, em uma ida ao cache.
+
+    Contador ausente vale 0 (nenhuma invalidação registrada).
+    """
+    namespaces = _lista(namespaces)
+    chaves = [_chave_geracao(namespace) for namespace in namespaces]
+    atuais = cache.get_many(chaves)
+    return [atuais.get(chave, 0) for chave in chaves]
+
+
+def geracao(namespace: Namespace) -> int:
+    return geracoes(namespace)[0]
+
+
+def chave(namespaces, *partes: Any) -> str:
+    """Chave de cache com as gerações atuais dos namespaces embutidas."""
+    versoes = ".".join(str(valor) for valor in geracoes(namespaces))
+    return ":".join([*(str(parte) for parte in partes), f"g{versoes}"])
+
+
+def invalidar(*namespaces: Namespace) -> None:
+    """
+    Avança a geração de cada namespace com um ``INCR`` atômico.
+
+    Se o contador não existe (nunca invalidado ou despejado do cache), ele é
+    criado com o instante atual em milissegundos: a nova geração fica acima
+    de qualquer geração usada antes da perda do contador.
+    """
+    for namespace in namespaces:
+        chave_geracao = _chave_geracao(namespace)
+        try:
+            cache.incr(chave_geracao)
+        except ValueError:
+            if not cache.add(chave_geracao, int(time.time() * 1000), None):
+                cache.incr(chave_geracao)
+
+
+def obter_ou_calcular(
+    namespaces, partes: Iterable[Any], calcular: Callable[[], Any], timeout: int
+) -> Any:
+    """Lê o valor da geração atual ou o calcula e grava."""
+    chave_valor = chave(namespaces, *partes)
+    valor = cache.get(chave_valor)
+    if valor is None:
+        valor = calcular()
+        cache.set(chave_valor, valor, timeout)
+    return valor
+
+
+def contar(chave_contador: str, timeout: int) -> int:
+    """
+    Incrementa um contador com expiração e retorna o novo valor.
+
+    ``add`` cria o contador com o timeout da janela e ``incr`` não o altera,
+    então requisições concorrentes nunca perdem incrementos.
+    """
+    if cache.add(chave_contador, 1, timeout):
+        return 1
+    try:
+        return cache.incr(chave_contador)
+    except ValueError:
+        # Expirou entre o add e o incr: começa uma nova janela
+        cache.set(chave_contador, 1, timeout)
+        return 1
+
+
+def consumir(janelas: Iterable[Tuple[str, int, int]]) -> Optional[Tuple[int, int]]:
+    """
+    Conta uma requisição nas janelas ``(chave, timeout, limite)`` de um limitador.
+
+    As janelas vão da mais curta para a mais longa e só são incrementadas
+    depois que as anteriores passaram: uma requisição recusada tem seus
+    incrementos desfeitos e não consome a cota das janelas maiores. A
+    primeira janela é deslizante, com o timeout renovado a cada requisição
+    admitida.
+
+    Returns:
+        None se a requisição foi admitida; senão (índice da janela excedida,
+        contagem que ela atingiu)
+    """
+    janelas = list(janelas)
+    for indice, (chave_contador, timeout, limite) in enumerate(janelas):
+        atual = contar(chave_contador, timeout)
+        if atual > limite:
+            for chave_anterior, _, _ in janelas[: indice + 1]:
+                try:
+                    cache.decr(chave_anterior)
+                except ValueError:
+                    pass  # Expirou nesse meio tempo: nada a desfazer
+            return indice, atual
+
+    chave_deslizante, timeout, _ = janelas[0]
+    cache.touch(chave_deslizante, timeout)
+    return None
@@ -0,0 +1,81 @@
+"""
+Exportação CSV em fluxo, compartilhada pelos apps.
+
+As linhas são produzidas por geradores (tipicamente sobre
+``values_list().iterator(chunk_size=TAMANHO_LOTE_CSV)``) e enviadas ao
+cliente por ``StreamingHttpResponse`` à medida que são formatadas: o
+primeiro byte sai logo e a memória não cresce com o número de registros.
+"""
+
+import csv
+from typing import Any, Iterable, Iterator
+
+from django.http import StreamingHttpResponse
+
+# Registros lidos do banco por vez nas exportações
+TAMANHO_LOTE_CSV = 2000
+
+# Texto acumulado antes de cada envio ao cliente (menos chamadas de escrita)
+TAMANHO_BLOCO_CSV = 16 * 1024
+
+BOM_UTF8 = "\ufeff"
+
+
+class _Eco:
+    """Pseudo-arquivo: devolve o texto recebido em vez de guardá-lo."""
+
+    def write(self, valor: str) -> str:
+        return valor
+
+
+def linhas_csv(
+    linhas: Iterable[Iterable[Any]], delimitador: str = ",", bom: bool = False
+) -> Iterator[str]:
+    """
+    Formata as linhas em CSV, entregando o texto em blocos.
+
+    O primeiro bloco (BOM e primeira linha) é entregue imediatamente; os
+    demais acumulam até ``TAMANHO_BLOCO_CSV`` caracteres.
+
+    Args:
+        linhas: Iterável de linhas (sequências de valores)
+        delimitador: Separador de campos (";" para o Excel em português)
+        bom: Prefixa o BOM UTF-8 para o Excel reconhecer a codificação
+    """
+    writer = csv.writer(_Eco(), delimiter=delimitador)
+    bloco = [BOM_UTF8] if bom else []
+    tamanho = 0
+    primeira = True
+
+    for linha in linhas:
+        texto = writer.writerow(linha)
+        bloco.append(texto)
+        tamanho += len(texto)
+        if primeira or tamanho >= TAMANHO_BLOCO_CSV:
+            yield "".join(bloco)
+            bloco = []
+            tamanho = 0
+            primeira = False
+
+    if bloco:
+        yield "".join(bloco)
+
+
+def resposta_csv(
+    linhas: Iterable[Iterable[Any]],
+    nome_arquivo: str,
+    delimitador: str = ",",
+    bom: bool = False,
+) -> StreamingHttpResponse:
+    """
+    Resposta de download CSV gerada em fluxo.
+
+    As consultas usadas por ``linhas`` só são executadas durante o envio,
+    então devem ser montadas de forma preguiçosa (geradores/querysets).
+    """
+    response = StreamingHttpResponse(
+        linhas_csv(linhas, delimitador=delimitador, bom=bom),
+        content_type="text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
+    return response
@@ -2,6 +2,65 @@ from django.db import models
 from django.utils import timezone
 
 
+class CamposRastreadosMixin(models.Model):
+    """
+    Guarda os valores lidos do banco dos campos em ``CAMPOS_RASTREADOS``.
+
+    O snapshot é tirado em ``from_db`` e renovado após cada ``save``, para
+    que ``save()`` e os signals saibam quais campos mudaram sem SELECT extra.
+
+    Regra única: sem snapshot do campo (instância nova, criada em memória ou
+    carregada com o campo adiado por ``only()``/``defer()``), o valor
+    original é desconhecido e o campo conta como alterado.
+    """
+
+    CAMPOS_RASTREADOS = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        carregados = dict(zip(field_names, values))
+        instance._valores_originais = {
+            campo: carregados[campo]
+            for campo in cls.CAMPOS_RASTREADOS
+            if campo in carregados
+        }
+        return instance
+
+    def tem_valor_original(self, campo):
+        """Indica se há snapshot do campo."""
+        return campo in getattr(self, "_valores_originais", {})
+
+    def valor_original(self, campo):
+        """Valor do campo lido do banco; None sem snapshot."""
+        return getattr(self, "_valores_originais", {}).get(campo)
+
+    def campo_alterado(self, campo):
+        """Indica se o campo mudou desde a leitura do banco (ver regra acima)."""
+        if not self.tem_valor_original(campo):
+            return True
+        return self.valor_original(campo) != getattr(self, campo)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        # Após os signals: o snapshot passa a refletir o que foi gravado
+        update_fields = kwargs.get("update_fields")
+        self._valores_originais = {
+            **getattr(self, "_valores_originais", {}),
+            **{
+                campo: getattr(self, campo)
+                for campo in self.CAMPOS_RASTREADOS
+                if update_fields is None
+                or campo in update_fields
+                or self._meta.get_field(campo).name in update_fields
+            },
+        }
+
+
 class ConfiguracaoSistema(models.Model):
     """Configurações globais do sistema"""
 
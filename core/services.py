@@ -2,8 +2,27 @@
 Serviços para o app core.
 """
 
-from typing import Optional, Dict, Any
-from django.db.models import QuerySet
+from datetime import date, datetime
+from importlib import import_module
+from typing import Optional, Dict, Any, Callable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Avg,
+    Count,
+    DateField,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Q,
+    QuerySet,
+    Value,
+)
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import cache_versionado
 from .models import ConfiguracaoSistema, LogAtividade
 from .repositories import ConfiguracaoSistemaRepository, LogAtividadeRepository
 
@@ -107,3 +126,162 @@ class LogAtividadeService:
             "logs_hoje": self.repository.count_hoje(),
             "logs_recentes": self.repository.get_recentes(10),
         }
+
+
+def _modelo(app_label: str, nome: str):
+    return getattr(import_module(f"{app_label}.models"), nome)
+
+
+class IndicadoresPainelService:
+    """
+    Indicadores compartilhados pelos painéis (core e painel de alunos).
+
+    Cada grupo de indicadores é calculado com consultas agregadas e guardado
+    no cache por ``INDICADORES_CACHE_SEGUNDOS`` (padrão 60). As chaves levam
+    a geração do namespace ``indicadores``, que os signals de Aluno, Curso,
+    Turma, Matricula e Atividade e as gravações em lote desses modelos
+    avançam, invalidando todos os grupos de uma vez.
+    """
+
+    NAMESPACE = "indicadores"
+
+    @staticmethod
+    def _timeout() -> int:
+        return getattr(settings, "INDICADORES_CACHE_SEGUNDOS", 60)
+
+    @classmethod
+    def invalidar(cls) -> None:
+        """Descarta todos os indicadores em cache."""
+        cache_versionado.invalidar(cls.NAMESPACE)
+
+    @classmethod
+    def invalidar_apos_commit(cls) -> None:
+        """
+        Descarta os indicadores quando a transação corrente for confirmada.
+
+        Usado pelos signals e pelas gravações em lote (``bulk_create``,
+        ``update``), que não disparam signals.
+        """
+        transaction.on_commit(cls.invalidar)
+
+    @classmethod
+    def _em_cache(cls, nome: str, calcular: Callable[[], Dict[str, Any]]):
+        return cache_versionado.obter_ou_calcular(
+            cls.NAMESPACE, ("core:indicadores", nome), calcular, cls._timeout()
+        )
+
+    @classmethod
+    def resumo_geral(cls) -> Dict[str, int]:
+        """Totais de alunos (e ativos), cursos, turmas e atividades."""
+        return cls._em_cache("resumo_geral", cls._calcular_resumo_geral)
+
+    @classmethod
+    def alunos_por_curso(cls) -> Dict[str, list]:
+        """Matrículas por curso, no formato labels/values dos gráficos."""
+        return cls._em_cache("alunos_por_curso", cls._calcular_alunos_por_curso)
+
+    @classmethod
+    def kpis_alunos(cls) -> Dict[str, Any]:
+        """Totais, média de idade e qualidade cadastral dos alunos ativos."""
+        return cls._em_cache("kpis_alunos", cls._calcular_kpis_alunos)
+
+    @classmethod
+    def graficos_alunos(cls) -> Dict[str, Dict[str, list]]:
+        """Distribuição por situação e novos alunos nos últimos 12 meses."""
+        return cls._em_cache("graficos_alunos", cls._calcular_graficos_alunos)
+
+    @staticmethod
+    def _calcular_resumo_geral() -> Dict[str, int]:
+        alunos = _modelo("alunos", "Aluno").objects.aggregate(
+            total=Count("id"), ativos=Count("id", filter=Q(situacao="a"))
+        )
+        return {
+            "total_alunos": alunos["total"],
+            "alunos_ativos": alunos["ativos"],
+            "total_cursos": _modelo("cursos", "Curso").objects.count(),
+            "total_turmas": _modelo("turmas", "Turma").objects.count(),
+            "total_atividades": _modelo("atividades", "Atividade").objects.count(),
+        }
+
+    @staticmethod
+    def _calcular_alunos_por_curso() -> Dict[str, list]:
+        cursos = (
+            _modelo("cursos", "Curso")
+            .objects.annotate(total=Count("turmas__matriculas"))
+            .order_by("id")
+            .values_list("nome", "total")
+        )
+        return {
+            "labels": [nome for nome, _ in cursos],
+            "values": [total for _, total in cursos],
+        }
+
+    @staticmethod
+    def _calcular_kpis_alunos() -> Dict[str, Any]:
+        hoje = date.today()
+        idade = ExpressionWrapper(
+            Value(hoje, output_field=DateField()) - F("data_nascimento"),
+            output_field=DurationField(),
+        )
+        completos = (
+            Q(situacao="a")
+            & Q(celular_primeiro_contato__isnull=False)
+            & ~Q(celular_primeiro_contato="")
+            & Q(rua__isnull=False)
+            & ~Q(rua="")
+            & Q(nome_primeiro_contato__isnull=False)
+            & ~Q(nome_primeiro_contato="")
+        )
+        dados = _modelo("alunos", "Aluno").objects.aggregate(
+            total=Count("id"),
+            ativos=Count("id", filter=Q(situacao="a")),
+            completos=Count("id", filter=completos),
+            idade_media=Avg(
+                idade, filter=Q(situacao="a", data_nascimento__isnull=False)
+            ),
+        )
+        media_idade = dados["idade_media"]
+        return {
+            "total_alunos": dados["total"],
+            "alunos_ativos": dados["ativos"],
+            "media_idade": int(media_idade.days / 365) if media_idade else "-",
+            "qualidade_dados": int(dados["completos"] / (dados["ativos"] or 1) * 100),
+        }
+
+    @staticmethod
+    def _calcular_graficos_alunos() -> Dict[str, Dict[str, list]]:
+        Aluno = _modelo("alunos", "Aluno")
+
+        rotulos = dict(Aluno.SITUACAO_CHOICES)
+        situacoes = (
+            Aluno.objects.order_by().values("situacao").annotate(qtd=Count("id"))
+        )
+
+        # Últimos 12 meses de calendário, incluindo o atual
+        atual = timezone.localdate().replace(day=1)
+        meses = []
+        for deslocamento in range(11, -1, -1):
+            ano, mes = divmod(atual.year * 12 + atual.month - 1 - deslocamento, 12)
+            meses.append(date(ano, mes + 1, 1))
+        inicio = timezone.make_aware(datetime(meses[0].year, meses[0].month, 1))
+        por_mes = dict(
+            Aluno.objects.filter(created_at__gte=inicio)
+            .annotate(mes=TruncMonth("created_at", output_field=DateField()))
+            .order_by()
+            .values("mes")
+            .annotate(qtd=Count("id"))
+            .values_list("mes", "qtd")
+        )
+
+        return {
+            "situacao": {
+                "labels": [
+                    rotulos.get(s["situacao"], s["situacao"]) for s in situacoes
+                ],
+                "values": [s["qtd"] for s in situacoes],
+            },
+            "novos_mes": {
+                "labels": [mes.strftime("%b/%Y") for mes in meses],
+                "values": [por_mes.get(mes, 0) for mes in meses],
+            },
+        }
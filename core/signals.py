@@ -0,0 +1,25 @@
+"""
+Signals para o aplicativo core.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .services import IndicadoresPainelService
+
+
+@receiver(post_save, sender="alunos.Aluno")
+@receiver(post_delete, sender="alunos.Aluno")
+@receiver(post_save, sender="cursos.Curso")
+@receiver(post_delete, sender="cursos.Curso")
+@receiver(post_save, sender="turmas.Turma")
+@receiver(post_delete, sender="turmas.Turma")
+@receiver(post_save, sender="matriculas.Matricula")
+@receiver(post_delete, sender="matriculas.Matricula")
+@receiver(post_save, sender="atividades.Atividade")
+@receiver(post_delete, sender="atividades.Atividade")
+def invalidar_indicadores_painel(sender, **kwargs):
+    """Descarta os indicadores dos painéis após a transação ser confirmada."""
+    if kwargs.get("raw"):
+        return
+    IndicadoresPainelService.invalidar_apos_commit()
@@ -0,0 +1,119 @@
+"""
+Testes dos namespaces de cache versionados (core.cache_versionado).
+"""
+
+import time
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core import cache_versionado
+from omaum.middleware.rate_limiting import rate_limit_decorator
+
+CACHE_LOCAL = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "cache_versionado",
+    }
+}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class CacheVersionadoTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_invalidar_muda_apenas_chaves_do_namespace(self):
+        turma = cache_versionado.chave(["presencas", ("turma", 5)], "filtros")
+        outra = cache_versionado.chave(["presencas", ("turma", 6)], "filtros")
+        self.assertEqual(turma, "filtros:g0.0")
+
+        cache_versionado.invalidar(("turma", 5))
+
+        self.assertNotEqual(
+            cache_versionado.chave(["presencas", ("turma", 5)], "filtros"), turma
+        )
+        self.assertEqual(
+            cache_versionado.chave(["presencas", ("turma", 6)], "filtros"), outra
+        )
+
+    def test_contador_perdido_volta_acima_das_geracoes_anteriores(self):
+        cache_versionado.invalidar("presencas")
+        cache_versionado.invalidar("presencas")
+        self.assertGreater(cache_versionado.geracao("presencas"), 1)
+
+        anterior = cache_versionado.geracao("presencas")
+        cache.delete(cache_versionado._chave_geracao("presencas"))
+        self.assertEqual(cache_versionado.geracao("presencas"), 0)
+
+        time.sleep(0.005)  # a semente é o instante em milissegundos
+
+        cache_versionado.invalidar("presencas")
+        self.assertGreaterEqual(cache_versionado.geracao("presencas"), anterior)
+
+    def test_obter_ou_calcular_recalcula_apos_invalidar(self):
+        chamadas = []
+
+        def calcular():
+            chamadas.append(1)
+            return len(chamadas)
+
+        def obter():
+            return cache_versionado.obter_ou_calcular(
+                "indicadores", ("kpi",), calcular, 60
+            )
+
+        self.assertEqual((obter(), obter()), (1, 1))
+        cache_versionado.invalidar("indicadores")
+        self.assertEqual(obter(), 2)
+
+    def test_contar_incrementa_e_limitador_responde_429(self):
+        self.assertEqual(
+            [cache_versionado.contar("omaum:teste", 60) for _ in range(3)], [1, 2, 3]
+        )
+
+        view = rate_limit_decorator(requests_per_minute=2, burst_limit=10)(
+            lambda request: HttpResponse("ok")
+        )
+        request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.1")
+        request.user = type("Anonimo", (), {"is_authenticated": False})()
+
+        self.assertEqual([view(request).status_code for _ in range(3)], [200, 200, 429])
+
+        # Invalidar o namespace dos limitadores zera os contadores
+        cache_versionado.invalidar("limites")
+        self.assertEqual(view(request).status_code, 200)
+
+    def test_consumir_desfaz_incrementos_da_requisicao_recusada(self):
+        janelas = [("omaum:curta", 10, 1), ("omaum:longa", 60, 5)]
+
+        self.assertIsNone(cache_versionado.consumir(janelas))
+        for _ in range(10):
+            self.assertEqual(cache_versionado.consumir(janelas), (0, 2))
+
+        self.assertEqual(cache.get("omaum:curta"), 1)
+        self.assertEqual(cache.get("omaum:longa"), 1)
+
+    def test_recusas_no_burst_nao_consomem_a_cota_do_minuto(self):
+        view = rate_limit_decorator(requests_per_minute=2, burst_limit=1)(
+            lambda request: HttpResponse("ok")
+        )
+        request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.2")
+        request.user = type("Anonimo", (), {"is_authenticated": False})()
+        burst = (
+            cache_versionado.chave("limites", "custom_rate_limit", "ip_10.0.0.2")
+            + ":burst"
+        )
+
+        # Cliente insistindo acima do burst
+        self.assertEqual(
+            [view(request).status_code for _ in range(5)], [200, 429, 429, 429, 429]
+        )
+
+        # Fim da janela de burst: a cota do minuto ainda tem uma requisição
+        cache.delete(burst)
+        self.assertEqual(view(request).status_code, 200)
+        cache.delete(burst)
+        self.assertEqual(view(request).status_code, 429)
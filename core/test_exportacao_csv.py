@@ -0,0 +1,87 @@
+"""
+Testes da exportação CSV em fluxo (core.exportacao_csv).
+"""
+
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from alunos.models import Aluno
+from core import exportacao_csv
+from core.exportacao_csv import linhas_csv, resposta_csv
+
+
+class LinhasCsvTest(TestCase):
+    @patch.object(exportacao_csv, "TAMANHO_BLOCO_CSV", 30)
+    def test_primeira_linha_sai_sozinha_e_demais_em_blocos(self):
+        linhas = [["Nome", "Situação"]] + [[f"Aluno {i}", "Ativo"] for i in range(3)]
+
+        blocos = list(linhas_csv(linhas, delimitador=";", bom=True))
+
+        self.assertEqual(blocos[0], "\ufeffNome;Situação\r\n")
+        self.assertEqual(blocos[1], "Aluno 0;Ativo\r\nAluno 1;Ativo\r\n")
+        self.assertEqual(blocos[2], "Aluno 2;Ativo\r\n")
+
+    def test_linhas_consumidas_sob_demanda(self):
+        consumidas = []
+
+        def gerar():
+            for i in range(3):
+                consumidas.append(i)
+                yield [i]
+
+        resposta = resposta_csv(gerar(), "teste.csv")
+
+        self.assertEqual(consumidas, [])
+        self.assertEqual(next(resposta.streaming_content), b"0\r\n")
+        self.assertEqual(consumidas, [0])
+        self.assertIn('filename="teste.csv"', resposta["Content-Disposition"])
+
+
+class ExportacoesAlunosCsvTest(TestCase):
+    def setUp(self):
+        for i, situacao in enumerate(["a", "d"]):
+            Aluno.objects.create(
+                nome=f"Aluno CSV {i}",
+                cpf=f"{73000000000 + i:011d}",
+                email=f"csv{i}@teste.com",
+                numero_iniciatico=f"C{i:03d}",
+                data_nascimento=date(1990, 5, 10 + i),
+                situacao=situacao,
+            )
+        self.client.force_login(User.objects.create_user(username="u", password="s"))
+
+    def test_painel_tabela_em_fluxo(self):
+        resposta = self.client.get(
+            reverse("alunos:api_painel_tabela"), {"export": "csv"}
+        )
+
+        self.assertTrue(resposta.streaming)
+        conteudo = b"".join(resposta.streaming_content).decode()
+        self.assertEqual(
+            conteudo.splitlines(),
+            [
+                "Nome,CPF,Email,Situação",
+                "Aluno CSV 1,73000000001,csv1@teste.com,Desligado",
+                "Aluno CSV 0,73000000000,csv0@teste.com,Ativo",
+            ],
+        )
+
+    def test_aniversariantes_em_fluxo(self):
+        resposta = self.client.get(
+            reverse("alunos:relatorio_aniversariantes"), {"mes": 5, "export": "csv"}
+        )
+
+        self.assertTrue(resposta.streaming)
+        linhas = b"".join(resposta.streaming_content).decode().splitlines()
+        self.assertEqual(linhas[3], "Nome,CPF,Data Nasc.,Email,Telefone")
+        self.assertEqual(
+            linhas[4:],
+            [
+                "Aluno CSV 0,73000000000,1990-05-10,csv0@teste.com,-",
+                "Aluno CSV 1,73000000001,1990-05-11,csv1@teste.com,-",
+            ],
+        )
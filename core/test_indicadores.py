@@ -0,0 +1,125 @@
+"""
+Testes do serviço de indicadores dos painéis (IndicadoresPainelService).
+"""
+
+from datetime import date, timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from alunos.models import Aluno
+from core.services import IndicadoresPainelService
+from cursos.models import Curso
+from matriculas.models import Matricula
+from turmas.models import Turma
+
+CACHE_LOCAL = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "indicadores",
+    }
+}
+
+
+class IndicadoresPainelServiceTest(TestCase):
+    def _aluno(self, i, situacao="a", nascimento=date(2000, 1, 1), **extras):
+        return Aluno.objects.create(
+            nome=f"Aluno KPI {i}",
+            cpf=f"{72000000000 + i:011d}",
+            email=f"kpi{i}@teste.com",
+            numero_iniciatico=f"K{i:03d}",
+            data_nascimento=nascimento,
+            situacao=situacao,
+            **extras,
+        )
+
+    def test_kpis_em_uma_consulta(self):
+        hoje = date.today()
+        self._aluno(
+            1,
+            nascimento=hoje - timedelta(days=365 * 30 + 10),
+            rua="Rua A",
+            nome_primeiro_contato="Maria",
+            celular_primeiro_contato="11999999999",
+        )
+        self._aluno(2, nascimento=hoje - timedelta(days=365 * 40 + 10))
+        self._aluno(3, situacao="d")
+
+        with self.assertNumQueries(1):
+            kpis = IndicadoresPainelService._calcular_kpis_alunos()
+
+        self.assertEqual(
+            kpis,
+            {
+                "total_alunos": 3,
+                "alunos_ativos": 2,
+                "media_idade": 35,
+                "qualidade_dados": 50,
+            },
+        )
+
+    def test_graficos_agrupam_por_mes(self):
+        agora = timezone.now()
+        self._aluno(1)
+        self._aluno(2, situacao="d")
+        antigo = self._aluno(3)
+        Aluno.objects.filter(pk=antigo.pk).update(
+            created_at=agora - timedelta(days=800)
+        )
+
+        with self.assertNumQueries(2):
+            graficos = IndicadoresPainelService._calcular_graficos_alunos()
+
+        novos = graficos["novos_mes"]
+        self.assertEqual(len(novos["labels"]), 12)
+        self.assertEqual(novos["labels"][-1], timezone.localdate().strftime("%b/%Y"))
+        self.assertEqual(novos["values"][-1], 2)
+        self.assertEqual(sum(novos["values"]), 2)
+        self.assertEqual(
+            dict(zip(graficos["situacao"]["labels"], graficos["situacao"]["values"])),
+            {"Ativo": 2, "Desligado": 1},
+        )
+
+    def test_alunos_por_curso_sem_consulta_por_curso(self):
+        curso_a = Curso.objects.create(nome="Curso A", ativo=True)
+        curso_b = Curso.objects.create(nome="Curso B", ativo=True)
+        turma = Turma.objects.create(nome="Turma A", curso=curso_a)
+        for i in range(3):
+            Matricula.objects.create(
+                aluno=self._aluno(i), turma=turma, data_matricula=date(2025, 1, 1)
+            )
+
+        with self.assertNumQueries(1):
+            dados = IndicadoresPainelService._calcular_alunos_por_curso()
+
+        self.assertEqual(
+            dados, {"labels": [curso_a.nome, curso_b.nome], "values": [3, 0]}
+        )
+
+    @override_settings(CACHES=CACHE_LOCAL)
+    def test_cache_invalidado_por_signal(self):
+        self._aluno(1)
+        self.assertEqual(IndicadoresPainelService.resumo_geral()["total_alunos"], 1)
+
+        with self.assertNumQueries(0):
+            IndicadoresPainelService.resumo_geral()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._aluno(2)
+
+        self.assertEqual(IndicadoresPainelService.resumo_geral()["total_alunos"], 2)
+
+    @override_settings(CACHES=CACHE_LOCAL)
+    def test_cache_invalidado_pela_matricula_em_lote(self):
+        from matriculas.services import criar_matriculas_em_lote
+
+        curso = Curso.objects.create(nome="Curso Lote", ativo=True)
+        turma = Turma.objects.create(nome="Turma Lote", curso=curso)
+        alunos = [self._aluno(i) for i in range(2)]
+        self.assertEqual(IndicadoresPainelService.alunos_por_curso()["values"], [0])
+
+        # bulk_create e UPDATE em lote não disparam signals
+        with self.captureOnCommitCallbacks(execute=True):
+            criar_matriculas_em_lote(turma.id, [aluno.id for aluno in alunos])
+
+        self.assertEqual(IndicadoresPainelService.alunos_por_curso()["values"], [2])
@@ -9,6 +9,8 @@ from django.db.models import Q
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import redirect, render
 
+from .services import IndicadoresPainelService
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,25 +39,13 @@ def get_forms():
 def pagina_inicial(request):
     """Exibe a página inicial do sistema (dashboard)."""
     try:
-        # Obter estatísticas para o dashboard
-        Aluno = get_models()
-        total_alunos = Aluno.objects.count() if Aluno else 0
-        alunos_ativos = Aluno.objects.filter(situacao="a").count() if Aluno else 0
-        try:
-            Curso = import_module("cursos.models").Curso
-            total_cursos = Curso.objects.count()
-        except (ImportError, AttributeError):
-            total_cursos = 0
-        try:
-            Atividade = import_module("atividades.models").Atividade
-            atividades_recentes = Atividade.objects.count()
-        except (ImportError, AttributeError):
-            atividades_recentes = 0
+        # Obter estatísticas para o dashboard (em cache, ver IndicadoresPainelService)
+        resumo = IndicadoresPainelService.resumo_geral()
         context = {
-            "total_alunos": total_alunos,
-            "alunos_ativos": alunos_ativos,
-            "total_cursos": total_cursos,
-            "atividades_recentes": atividades_recentes,
+            "total_alunos": resumo["total_alunos"],
+            "alunos_ativos": resumo["alunos_ativos"],
+            "total_cursos": resumo["total_cursos"],
+            "atividades_recentes": resumo["total_atividades"],
             "pagamentos_atrasados": [],
             "pagamentos_atrasados_count": 0,
         }
@@ -95,29 +85,14 @@ def painel_controle(request):
 
     try:
         # Obter estatísticas para o painel de controle
-        Aluno = get_models()
-        total_alunos = Aluno.objects.count() if Aluno else 0
-        alunos_ativos = Aluno.objects.filter(situacao="a").count() if Aluno else 0
-
-        # Tentar importar outros modelos para estatísticas
-        try:
-            Curso = import_module("cursos.models").Curso
-            total_cursos = Curso.objects.count()
-        except (ImportError, AttributeError):
-            total_cursos = 0
-
-        try:
-            Turma = import_module("turmas.models").Turma
-            total_turmas = Turma.objects.count()
-        except (ImportError, AttributeError):
-            total_turmas = 0
+        resumo = IndicadoresPainelService.resumo_geral()
 
         # Preparar contexto para o template
         context = {
-            "total_alunos": total_alunos,
-            "alunos_ativos": alunos_ativos,
-            "total_cursos": total_cursos,
-            "total_turmas": total_turmas,
+            "total_alunos": resumo["total_alunos"],
+            "alunos_ativos": resumo["alunos_ativos"],
+            "total_cursos": resumo["total_cursos"],
+            "total_turmas": resumo["total_turmas"],
         }
 
         return render(request, "core/painel_controle.html", context)
@@ -194,36 +169,16 @@ def dashboard(request):
     """Exibe o dashboard com estatísticas gerais."""
     try:
         # Obter estatísticas para o dashboard
-        Aluno = get_models()
-        total_alunos = Aluno.objects.count() if Aluno else 0
-        alunos_ativos = Aluno.objects.filter(situacao="a").count() if Aluno else 0
-
-        # Tentar importar outros modelos para estatísticas
-        try:
-            Curso = import_module("cursos.models").Curso
-            total_cursos = Curso.objects.count()
-            cursos = Curso.objects.all()
-            cursos_labels = [curso.nome for curso in cursos]
-        except (ImportError, AttributeError):
-            total_cursos = 0
-            cursos_labels = []
-
-        try:
-            Matricula = import_module("matriculas.models").Matricula
-            alunos_por_curso = []
-            for curso in cursos:
-                count = Matricula.objects.filter(turma__curso=curso).count()
-                alunos_por_curso.append(count)
-        except (ImportError, AttributeError):
-            alunos_por_curso = [0] * len(cursos_labels)
+        resumo = IndicadoresPainelService.resumo_geral()
+        por_curso = IndicadoresPainelService.alunos_por_curso()
 
         # Preparar contexto para o template
         context = {
-            "total_alunos": total_alunos,
-            "alunos_ativos": alunos_ativos,
-            "total_cursos": total_cursos,
-            "cursos_labels": cursos_labels,
-            "alunos_por_curso_data": alunos_por_curso,
+            "total_alunos": resumo["total_alunos"],
+            "alunos_ativos": resumo["alunos_ativos"],
+            "total_cursos": resumo["total_cursos"],
+            "cursos_labels": por_curso["labels"],
+            "alunos_por_curso_data": por_curso["values"],
         }
 
         return render(request, "core/dashboard.html", context)
@@ -333,3 +288,35 @@ class CustomLoginView(LoginView):
 def health_check(request):
     """View simples para healthcheck do Docker."""
     return HttpResponse("ok", content_type="text/plain")
+
+
+@login_required
+def metricas_performance(request):
+    """
+    Views mais lentas na janela informada (JSON, apenas staff).
+
+    Parâmetros: ``minutos`` (padrão 60, limitado à retenção das métricas),
+    ``limite`` (padrão 10) e ``ordenar`` (p50_ms, p95_ms, p99_ms,
+    duracao_media_ms ou requisicoes).
+    """
+    from omaum.metricas import ORDENACOES, MetricasPerformance, limitar_minutos
+
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Acesso restrito à equipe."}, status=403)
+
+    try:
+        minutos = limitar_minutos(request.GET.get("minutos", 60))
+        limite = max(int(request.GET.get("limite", 10)), 1)
+    except ValueError:
+        return JsonResponse({"error": "Parâmetros inválidos."}, status=400)
+    ordenar = request.GET.get("ordenar", "p95_ms")
+    if ordenar not in ORDENACOES:
+        return JsonResponse({"error": "Ordenação inválida."}, status=400)
+
+    return JsonResponse(
+        {
+            "minutos": minutos,
+            "totais": MetricasPerformance.totais(minutos),
+            "views": MetricasPerformance.mais_lentas(minutos, limite, ordenar),
+        }
+    )
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matriculas', '0002_remove_ativa_field'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='matricula',
+            index=models.Index(condition=models.Q(('status', 'A')), fields=['aluno'], name='matricula_aluno_ativa_idx'),
+        ),
+    ]
@@ -44,6 +44,14 @@ class Matricula(models.Model):
         verbose_name_plural = "Matrículas"
         ordering = ["-data_matricula"]
         unique_together = ["aluno", "turma"]
+        indexes = [
+            # Anti-join "aluno sem matrícula ativa" (matrícula em lote)
+            models.Index(
+                fields=["aluno"],
+                condition=models.Q(status="A"),
+                name="matricula_aluno_ativa_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.aluno.nome} - {self.turma.nome}"
@@ -52,10 +60,10 @@ class Matricula(models.Model):
     def ativa(self):
         """
         Property que retorna True se a matrícula está ativa.
-        
+
         IMPORTANTE: Este campo foi convertido de BooleanField para property.
         Use 'status' para filtros no banco de dados.
-        
+
         Returns:
             bool: True se status == 'A', False caso contrário
         """
@@ -3,15 +3,33 @@ Serviços para o aplicativo matriculas.
 Contém a lógica de negócios complexa.
 """
 
+import base64
+import json
 import logging
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from importlib import import_module
 from .models import Matricula
 
 logger = logging.getLogger(__name__)
 
+# Máximo de alunos por chamada de criar_matriculas_em_lote
+LIMITE_MATRICULAS_LOTE = 2000
+
+# Tamanho padrão da página de alunos elegíveis para matrícula em lote
+LIMITE_PAGINA_ELEGIVEIS = 50
+
+# Campos devolvidos por aluno elegível (API de matrícula em lote)
+CAMPOS_ALUNO_ELEGIVEL = (
+    "id",
+    "nome",
+    "cpf",
+    "numero_iniciatico",
+    "situacao",
+    "grau_atual",
+)
+
 
 def get_aluno_model():
     """Obtém o modelo Aluno dinamicamente."""
@@ -25,6 +43,50 @@ def get_turma_model():
     return getattr(turmas_module, "Turma")
 
 
+def atualizar_curso_atual_alunos(alunos_ids=None, limpar_sem_matricula=False):
+    """
+    Recalcula a projeção do curso atual dos alunos em um único UPDATE.
+
+    ``ultimo_curso`` passa a ser o curso da matrícula ativa mais recente de
+    cada aluno (vazio se não houver nenhuma) e ``grau_atual`` recebe o nome
+    desse curso. Como ``grau_atual`` também é editado no formulário, alunos
+    sem matrícula ativa mantêm o valor informado, exceto com
+    ``limpar_sem_matricula`` (exclusão de matrícula). O UPDATE não dispara
+    signals, então os indicadores dos painéis são descartados no commit
+    (cobre também as matrículas do ``bulk_create`` em lote).
+
+    Args:
+        alunos_ids (list ou QuerySet, optional): IDs dos alunos. Se None, todos.
+        limpar_sem_matricula (bool): Esvazia o grau_atual de quem ficou sem
+            matrícula ativa.
+
+    Returns:
+        int: Quantidade de alunos atualizados
+    """
+    from django.db.models import F, OuterRef, Subquery, Value
+    from django.db.models.functions import Coalesce
+
+    Aluno = get_aluno_model()
+
+    ultima_matricula = Matricula.objects.filter(
+        aluno=OuterRef("pk"), status="A", turma__curso__isnull=False
+    ).order_by("-data_matricula", "-id")
+
+    alunos = Aluno.objects.all()
+    if alunos_ids is not None:
+        alunos = alunos.filter(pk__in=alunos_ids)
+
+    atualizados = alunos.update(
+        ultimo_curso_id=Subquery(ultima_matricula.values("turma__curso_id")[:1]),
+        grau_atual=Coalesce(
+            Subquery(ultima_matricula.values("turma__curso__nome")[:1]),
+            Value("") if limpar_sem_matricula else F("grau_atual"),
+        ),
+    )
+    import_module("core.services").IndicadoresPainelService.invalidar_apos_commit()
+    return atualizados
+
+
 def listar_matriculas():
     """Lista todas as matrículas."""
     return Matricula.objects.select_related("aluno", "turma").all()
@@ -283,57 +345,121 @@ def excluir_matricula(matricula_id):
 def obter_alunos_sem_matricula_ativa(filtros=None):
     """
     Retorna alunos que NÃO possuem matrícula ativa em nenhuma turma.
-    
+
+    A elegibilidade é um anti-join (``NOT EXISTS``) apoiado no índice parcial
+    de matrículas ativas, sem ``DISTINCT`` sobre o JOIN com Matricula.
+
     Args:
         filtros (dict, optional): Dicionário com filtros opcionais:
             - nome (str): Busca parcial no nome
             - cpf (str): Busca no CPF
             - numero_iniciatico (str): Busca no número iniciático
             - situacao (str): Situação do aluno ('a' para ativo)
-            - grau (int): ID do grau iniciático
-    
+            - grau (str): Grau atual (nome do curso)
+
     Returns:
-        QuerySet: Alunos elegíveis para matrícula
+        QuerySet: Alunos elegíveis para matrícula, ordenados por nome e id
     """
+    from django.db.models import Exists, OuterRef
+
     Aluno = get_aluno_model()
-    
-    # Buscar alunos sem matrícula ativa
-    alunos = Aluno.objects.exclude(
-        matricula__status='A'
-    ).filter(
-        situacao='a'  # Apenas alunos ativos
-    ).distinct()
-    
+
+    matricula_ativa = Matricula.objects.filter(aluno=OuterRef("pk"), status="A")
+    alunos = Aluno.objects.filter(~Exists(matricula_ativa), situacao="a")
+
     # Aplicar filtros se fornecidos
     if filtros:
         if filtros.get('nome'):
             alunos = alunos.filter(nome__icontains=filtros['nome'])
-        
+
         if filtros.get('cpf'):
             cpf_limpo = filtros['cpf'].replace('.', '').replace('-', '')
             alunos = alunos.filter(cpf__icontains=cpf_limpo)
-        
+
         if filtros.get('numero_iniciatico'):
             alunos = alunos.filter(numero_iniciatico__icontains=filtros['numero_iniciatico'])
-        
+
         if filtros.get('situacao'):
             alunos = alunos.filter(situacao=filtros['situacao'])
-        
+
         if filtros.get('grau'):
-            alunos = alunos.filter(grau_atual_id=filtros['grau'])
-    
-    return alunos.order_by('nome')
+            alunos = alunos.filter(grau_atual=filtros['grau'])
+
+    # ``id`` desempata nomes iguais e torna a ordem estável para a paginação
+    return alunos.order_by('nome', 'id')
+
+
+def codificar_cursor_alunos(nome, aluno_id):
+    """Codifica a posição (nome, id) de um aluno como cursor opaco."""
+    bruto = json.dumps([nome, aluno_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(bruto).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor_alunos(cursor):
+    """
+    Decodifica um cursor gerado por ``codificar_cursor_alunos``.
+
+    Raises:
+        ValueError: Se o cursor estiver malformado
+    """
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        nome, aluno_id = json.loads(bruto.decode("utf-8"))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+    if not isinstance(nome, str) or not isinstance(aluno_id, int):
+        raise ValueError("Cursor inválido")
+    return nome, aluno_id
+
+
+def paginar_alunos_elegiveis(alunos, cursor=None, limite=LIMITE_PAGINA_ELEGIVEIS):
+    """
+    Página de alunos elegíveis por keyset sobre (nome, id).
+
+    Em vez de OFFSET, cada página continua a partir do último aluno da
+    anterior, de modo que o custo não cresce com a posição na lista.
+
+    Args:
+        alunos (QuerySet): Resultado de ``obter_alunos_sem_matricula_ativa``
+        cursor (str, optional): Cursor devolvido pela página anterior
+        limite (int): Quantidade máxima de alunos na página
+
+    Returns:
+        tuple: (lista de dicts com os campos exibidos, próximo cursor ou None)
+
+    Raises:
+        ValueError: Se o cursor estiver malformado
+    """
+    from django.db.models import Q
+
+    if cursor:
+        nome, aluno_id = decodificar_cursor_alunos(cursor)
+        alunos = alunos.filter(Q(nome__gt=nome) | Q(nome=nome, id__gt=aluno_id))
+
+    pagina = list(alunos.values(*CAMPOS_ALUNO_ELEGIVEL)[: limite + 1])
+    proximo = None
+    if len(pagina) > limite:
+        pagina = pagina[:limite]
+        proximo = codificar_cursor_alunos(pagina[-1]["nome"], pagina[-1]["id"])
+    return pagina, proximo
 
 
 def criar_matriculas_em_lote(turma_id, alunos_ids, data_matricula=None):
     """
     Cria múltiplas matrículas de uma vez.
-    
+
+    A validação usa consultas em conjunto (alunos e matrículas existentes de
+    todos os candidatos), as matrículas são inseridas com ``bulk_create`` e
+    o grau dos alunos é atualizado em um único UPDATE — o número de queries
+    não cresce com a quantidade de alunos. Se uma matrícula concorrente na
+    mesma turma violar a unicidade, só os alunos em conflito entram nas
+    falhas e o restante do lote é inserido.
+
     Args:
         turma_id (int): ID da turma
         alunos_ids (list): Lista de IDs dos alunos
         data_matricula (date, optional): Data da matrícula. Se None, usa data atual.
-    
+
     Returns:
         dict: Resultado com sucesso, matriculados, falhas
             {
@@ -343,95 +469,131 @@ def criar_matriculas_em_lote(turma_id, alunos_ids, data_matricula=None):
                 'mensagem': str
             }
     """
+    from django.db.models import Q
     from django.utils import timezone
-    
+
     Aluno = get_aluno_model()
     Turma = get_turma_model()
-    
+
     if data_matricula is None:
         data_matricula = timezone.now().date()
-    
+
     resultado = {
         'success': True,
         'matriculados': 0,
         'falhas': [],
         'mensagem': ''
     }
-    
+
     try:
         turma = Turma.objects.get(id=turma_id)
     except Turma.DoesNotExist:
         resultado['success'] = False
         resultado['mensagem'] = 'Turma não encontrada.'
         return resultado
-    
+
+    # Remove repetições mantendo a ordem da seleção
+    alunos_ids = list(dict.fromkeys(alunos_ids))
+
+    alunos = Aluno.objects.only("id", "nome", "situacao").in_bulk(alunos_ids)
+    com_matricula_ativa = set()
+    na_turma = set()
+    for aluno_id, matricula_turma_id, status in (
+        Matricula.objects.filter(
+            Q(status='A') | Q(turma_id=turma.id), aluno_id__in=list(alunos)
+        )
+        .order_by()
+        .values_list("aluno_id", "turma_id", "status")
+    ):
+        if status == 'A':
+            com_matricula_ativa.add(aluno_id)
+        if matricula_turma_id == turma.id:
+            na_turma.add(aluno_id)
+
+    novas = []
     for aluno_id in alunos_ids:
+        aluno = alunos.get(aluno_id)
+        if aluno is None:
+            erro = 'Aluno não encontrado'
+        elif aluno_id in com_matricula_ativa:
+            erro = 'Aluno já possui matrícula ativa em outra turma'
+        elif aluno.situacao != 'a':
+            erro = 'Aluno não está ativo'
+        elif aluno_id in na_turma:
+            erro = 'Aluno já está matriculado nesta turma'
+        else:
+            novas.append(aluno_id)
+            continue
+
+        resultado['falhas'].append(
+            {
+                'aluno_id': aluno_id,
+                'aluno_nome': aluno.nome if aluno else 'Desconhecido',
+                'erro': erro,
+            }
+        )
+
+    while novas:
         try:
             with transaction.atomic():
-                aluno = Aluno.objects.get(id=aluno_id)
-                
-                # Verificar se aluno já possui matrícula ativa
-                matricula_existente = Matricula.objects.filter(
-                    aluno=aluno,
-                    status='A'
-                ).exists()
-                
-                if matricula_existente:
-                    resultado['falhas'].append({
-                        'aluno_id': aluno_id,
-                        'aluno_nome': aluno.nome,
-                        'erro': 'Aluno já possui matrícula ativa em outra turma'
-                    })
-                    continue
-                
-                # Verificar se aluno está ativo
-                if aluno.situacao != 'a':
-                    resultado['falhas'].append({
-                        'aluno_id': aluno_id,
-                        'aluno_nome': aluno.nome,
-                        'erro': 'Aluno não está ativo'
-                    })
-                    continue
-                
-                # Verificar se já existe matrícula nesta turma
-                matricula_na_turma = Matricula.objects.filter(
-                    aluno=aluno,
-                    turma=turma
-                ).exists()
-                
-                if matricula_na_turma:
-                    resultado['falhas'].append({
-                        'aluno_id': aluno_id,
-                        'aluno_nome': aluno.nome,
-                        'erro': 'Aluno já está matriculado nesta turma'
-                    })
-                    continue
-                
-                # Criar matrícula
-                Matricula.objects.create(
-                    aluno=aluno,
-                    turma=turma,
-                    data_matricula=data_matricula,
-                    status='A'
+                # bulk_create não dispara post_save: o grau é atualizado em lote
+                Matricula.objects.bulk_create(
+                    [
+                        Matricula(
+                            aluno_id=aluno_id,
+                            turma=turma,
+                            data_matricula=data_matricula,
+                            status='A',
+                        )
+                        for aluno_id in novas
+                    ],
+                    batch_size=500,
                 )
-                
-                resultado['matriculados'] += 1
-                logger.info(f"Matrícula criada em lote: {aluno.nome} na turma {turma.nome}")
-                
-        except Aluno.DoesNotExist:
-            resultado['falhas'].append({
-                'aluno_id': aluno_id,
-                'aluno_nome': 'Desconhecido',
-                'erro': 'Aluno não encontrado'
-            })
+                atualizar_curso_atual_alunos(novas)
+        except IntegrityError as e:
+            # Matrícula concorrente na mesma turma: só esses alunos falham e
+            # o restante do lote é inserido de novo
+            conflitos = set(
+                Matricula.objects.filter(turma=turma, aluno_id__in=novas).values_list(
+                    'aluno_id', flat=True
+                )
+            )
+            erro = 'Aluno já está matriculado nesta turma'
+            if not conflitos:
+                logger.error(
+                    f"Erro ao criar matrículas em lote na turma {turma.id}: {str(e)}"
+                )
+                conflitos, erro = set(novas), str(e)
+            resultado['falhas'].extend(
+                {
+                    'aluno_id': aluno_id,
+                    'aluno_nome': alunos[aluno_id].nome,
+                    'erro': erro,
+                }
+                for aluno_id in novas
+                if aluno_id in conflitos
+            )
+            novas = [aluno_id for aluno_id in novas if aluno_id not in conflitos]
         except Exception as e:
-            resultado['falhas'].append({
-                'aluno_id': aluno_id,
-                'aluno_nome': 'Erro',
-                'erro': str(e)
-            })
-            logger.error(f"Erro ao criar matrícula para aluno {aluno_id}: {str(e)}")
-    
+            logger.error(
+                f"Erro ao criar matrículas em lote na turma {turma.id}: {str(e)}"
+            )
+            resultado['falhas'].extend(
+                {
+                    'aluno_id': aluno_id,
+                    'aluno_nome': alunos[aluno_id].nome,
+                    'erro': str(e),
+                }
+                for aluno_id in novas
+            )
+            break
+        else:
+            resultado['matriculados'] = len(novas)
+            logger.info(
+                f"{len(novas)} matrículas criadas em lote na turma {turma.nome}"
+            )
+            break
+
     # Montar mensagem final
     total_processados = resultado['matriculados'] + len(resultado['falhas'])
     
@@ -3,90 +3,67 @@ Signals para o módulo de matrículas.
 
 Este módulo contém os signals que são disparados quando ocorrem
 eventos relacionados a matrículas, como criação, atualização ou exclusão.
+
+O curso atual do aluno (``Aluno.ultimo_curso``) é uma projeção das matrículas
+ativas, recalculada aqui com UPDATEs em lote junto com ``Aluno.grau_atual``.
 """
 
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import Matricula
+from .services import atualizar_curso_atual_alunos, get_aluno_model
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=Matricula)
-def atualizar_grau_atual_aluno(sender, instance, created, **kwargs):
-    """
-    Atualiza o campo grau_atual do aluno quando uma matrícula é criada ou ativada.
-
-    Args:
-        sender: O modelo que enviou o signal (Matricula)
-        instance: A instância da matrícula que foi salva
-        created: Boolean indicando se é uma nova matrícula
-        **kwargs: Argumentos adicionais
-    """
-    # Só atualiza se a matrícula está ativa (status == 'A')
-    if instance.status == "A":
-        try:
-            aluno = instance.aluno
-            turma = instance.turma
-
-            # Verifica se a turma tem curso vinculado
-            if hasattr(turma, "curso") and turma.curso:
-                # Atualiza o grau_atual com o nome do curso
-                aluno.grau_atual = turma.curso.nome
-                aluno.save(update_fields=["grau_atual"])
-
-                logger.info(
-                    f"Grau atual do aluno {aluno.nome} atualizado para: {turma.curso.nome}"
-                )
-            else:
-                logger.warning(
-                    f"Turma {turma.nome} não possui curso vinculado. "
-                    f"Grau atual do aluno {aluno.nome} não foi atualizado."
-                )
-        except Exception as e:
-            logger.error(
-                f"Erro ao atualizar grau atual do aluno {instance.aluno.nome}: {str(e)}"
-            )
-
-
 @receiver(post_delete, sender=Matricula)
-def atualizar_grau_apos_exclusao(sender, instance, **kwargs):
+def atualizar_grau_atual_aluno(sender, instance, **kwargs):
     """
-    Atualiza o grau_atual do aluno para o curso da matrícula ativa mais recente
-    após a exclusão de uma matrícula.
+    Atualiza o curso atual (grau_atual) do aluno quando uma matrícula é
+    criada, alterada (ex.: cancelada) ou excluída.
 
     Args:
         sender: O modelo que enviou o signal (Matricula)
-        instance: A instância da matrícula que foi excluída
+        instance: A instância da matrícula salva ou excluída
         **kwargs: Argumentos adicionais
     """
+    if kwargs.get("raw"):
+        return
     try:
-        aluno = instance.aluno
-
-        # Busca a matrícula ativa mais recente do aluno
-        matricula_mais_recente = (
-            Matricula.objects.filter(aluno=aluno, status="A")
-            .order_by("-data_matricula")
-            .first()
+        # Só a exclusão da última matrícula ativa esvazia o grau_atual
+        atualizar_curso_atual_alunos(
+            [instance.aluno_id],
+            limpar_sem_matricula=kwargs.get("signal") is post_delete,
+        )
+    except Exception as e:
+        logger.error(
+            f"Erro ao atualizar grau atual do aluno {instance.aluno_id}: {str(e)}"
         )
 
-        if matricula_mais_recente and matricula_mais_recente.turma.curso:
-            # Atualiza para o curso da matrícula mais recente
-            aluno.grau_atual = matricula_mais_recente.turma.curso.nome
-            aluno.save(update_fields=["grau_atual"])
 
-            logger.info(
-                f"Grau atual do aluno {aluno.nome} atualizado para: "
-                f"{matricula_mais_recente.turma.curso.nome} após exclusão de matrícula"
-            )
-        else:
-            # Se não há mais matrículas ativas, limpa o campo
-            aluno.grau_atual = ""
-            aluno.save(update_fields=["grau_atual"])
+@receiver(post_save, sender="turmas.Turma")
+def atualizar_grau_apos_alterar_turma(sender, instance, created, **kwargs):
+    """Recalcula o curso atual dos alunos da turma se o curso dela mudar."""
+    if created or kwargs.get("raw"):
+        return
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and not {"curso", "curso_id"} & set(update_fields):
+        return
+    if not instance.campo_alterado("curso_id"):
+        return
+    alunos_ids = Matricula.objects.filter(turma=instance, status="A").values_list(
+        "aluno_id", flat=True
+    )
+    atualizar_curso_atual_alunos(alunos_ids)
 
-            logger.info(
-                f"Grau atual do aluno {aluno.nome} limpo (sem matrículas ativas)"
-            )
-    except Exception as e:
-        logger.error(f"Erro ao atualizar grau após exclusão de matrícula: {str(e)}")
+
+@receiver(post_save, sender="cursos.Curso")
+def atualizar_grau_apos_renomear_curso(sender, instance, created, **kwargs):
+    """Propaga o novo nome do curso para o grau_atual dos alunos."""
+    if created or kwargs.get("raw"):
+        return
+    get_aluno_model().objects.filter(ultimo_curso=instance).exclude(
+        grau_atual=instance.nome
+    ).update(grau_atual=instance.nome)
@@ -0,0 +1,216 @@
+"""
+Testes da matrícula em lote (criar_matriculas_em_lote).
+"""
+
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from alunos.models import Aluno
+from cursos.models import Curso
+from matriculas.models import Matricula
+from matriculas.services import (
+    criar_matriculas_em_lote,
+    obter_alunos_sem_matricula_ativa,
+    paginar_alunos_elegiveis,
+)
+from turmas.models import Turma
+
+
+class CriarMatriculasEmLoteTestCase(TestCase):
+    """Validação em conjunto e inserção com bulk_create."""
+
+    def setUp(self):
+        self.curso = Curso.objects.create(nome="Aprendiz", ativo=True)
+        self.turma = Turma.objects.create(
+            nome="Turma Lote", curso=self.curso, status="A"
+        )
+        self.outra_turma = Turma.objects.create(
+            nome="Outra Turma", curso=self.curso, status="A"
+        )
+
+    def _alunos(self, quantidade, inicio=0, situacao="a"):
+        return Aluno.objects.bulk_create(
+            [
+                Aluno(
+                    nome=f"Aluno Lote {i:03d}",
+                    cpf=f"{70000000000 + i:011d}",
+                    numero_iniciatico=f"L{i:04d}",
+                    email=f"lote{i}@teste.com",
+                    data_nascimento=date(2000, 1, 1),
+                    situacao=situacao,
+                )
+                for i in range(inicio, inicio + quantidade)
+            ]
+        )
+
+    def test_falhas_por_aluno_e_grau_atualizado(self):
+        novo, ja_ativo, ja_na_turma = self._alunos(3)
+        (inativo,) = self._alunos(1, inicio=3, situacao="d")
+        Matricula.objects.create(
+            aluno=ja_ativo, turma=self.outra_turma, data_matricula=date(2025, 1, 1)
+        )
+        Matricula.objects.create(
+            aluno=ja_na_turma,
+            turma=self.turma,
+            data_matricula=date(2024, 1, 1),
+            status="C",
+        )
+
+        resultado = criar_matriculas_em_lote(
+            self.turma.id,
+            [novo.id, inativo.id, ja_ativo.id, ja_na_turma.id, 999999, novo.id],
+        )
+
+        self.assertEqual(resultado["matriculados"], 1)
+        self.assertEqual(
+            [(f["aluno_id"], f["erro"]) for f in resultado["falhas"]],
+            [
+                (inativo.id, "Aluno não está ativo"),
+                (ja_ativo.id, "Aluno já possui matrícula ativa em outra turma"),
+                (ja_na_turma.id, "Aluno já está matriculado nesta turma"),
+                (999999, "Aluno não encontrado"),
+            ],
+        )
+        self.assertIn("1 de 5 alunos matriculados", resultado["mensagem"])
+        novo.refresh_from_db()
+        self.assertEqual(novo.grau_atual, "Aprendiz")
+        self.assertEqual(novo.ultimo_curso, self.curso)
+
+    def test_matricula_concorrente_falha_so_para_o_aluno(self):
+        primeiro, concorrido = self._alunos(2)
+        atomic = transaction.atomic
+        concorrente = []
+
+        def atomic_apos_matricula_concorrente(*args, **kwargs):
+            # Outra requisição matricula o aluno depois da validação
+            if not concorrente:
+                concorrente.append(concorrido)
+                Matricula.objects.create(
+                    aluno=concorrido, turma=self.turma, data_matricula=date(2025, 1, 1)
+                )
+            return atomic(*args, **kwargs)
+
+        with patch.object(
+            transaction, "atomic", side_effect=atomic_apos_matricula_concorrente
+        ):
+            resultado = criar_matriculas_em_lote(
+                self.turma.id, [primeiro.id, concorrido.id]
+            )
+
+        self.assertEqual(resultado["matriculados"], 1)
+        self.assertEqual(
+            resultado["falhas"],
+            [
+                {
+                    "aluno_id": concorrido.id,
+                    "aluno_nome": concorrido.nome,
+                    "erro": "Aluno já está matriculado nesta turma",
+                }
+            ],
+        )
+        self.assertTrue(
+            Matricula.objects.filter(aluno=primeiro, turma=self.turma).exists()
+        )
+
+    def test_numero_de_queries_nao_cresce_com_o_lote(self):
+        alunos = self._alunos(200)
+
+        # turma + alunos + matrículas existentes + savepoint/INSERT/UPDATE/release
+        with self.assertNumQueries(7):
+            resultado = criar_matriculas_em_lote(self.turma.id, [a.id for a in alunos])
+
+        self.assertTrue(resultado["success"])
+        self.assertEqual(resultado["matriculados"], 200)
+        self.assertEqual(Aluno.objects.filter(grau_atual="Aprendiz").count(), 200)
+
+
+class AlunosElegiveisTestCase(TestCase):
+    """Anti-join de elegibilidade e paginação por cursor."""
+
+    def setUp(self):
+        self.curso = Curso.objects.create(nome="Aprendiz", ativo=True)
+        self.turma = Turma.objects.create(nome="Turma A", curso=self.curso, status="A")
+        self.outra_turma = Turma.objects.create(
+            nome="Turma B", curso=self.curso, status="A"
+        )
+
+    def _aluno(self, i, nome=None, situacao="a"):
+        return Aluno.objects.create(
+            nome=nome or f"Aluno {i:02d}",
+            cpf=f"{71000000000 + i:011d}",
+            numero_iniciatico=f"E{i:03d}",
+            email=f"elegivel{i}@teste.com",
+            data_nascimento=date(2000, 1, 1),
+            situacao=situacao,
+        )
+
+    def test_exclui_matricula_ativa_sem_duplicar(self):
+        livre = self._aluno(1)
+        cancelado = self._aluno(2)
+        ativo = self._aluno(3)
+        self._aluno(4, situacao="d")
+        for turma in (self.turma, self.outra_turma):
+            Matricula.objects.create(
+                aluno=cancelado,
+                turma=turma,
+                data_matricula=date(2024, 1, 1),
+                status="C",
+            )
+        Matricula.objects.create(
+            aluno=ativo, turma=self.turma, data_matricula=date(2024, 1, 1)
+        )
+
+        self.assertEqual(list(obter_alunos_sem_matricula_ativa()), [livre, cancelado])
+
+    def test_paginas_percorrem_todos_os_alunos_em_ordem(self):
+        for i, nome in enumerate(["Bia", "Ana", "Caio", "Ana", "Davi", "Ana", "Eva"]):
+            self._aluno(i, nome=nome)
+        esperados = list(
+            obter_alunos_sem_matricula_ativa().values_list("id", flat=True)
+        )
+
+        vistos, cursor = [], None
+        for _ in range(4):
+            pagina, cursor = paginar_alunos_elegiveis(
+                obter_alunos_sem_matricula_ativa(), cursor=cursor, limite=3
+            )
+            vistos += [aluno["id"] for aluno in pagina]
+            if cursor is None:
+                break
+
+        self.assertEqual(vistos, esperados)
+        self.assertIsNone(cursor)
+
+    def test_cursor_invalido(self):
+        with self.assertRaises(ValueError):
+            paginar_alunos_elegiveis(
+                obter_alunos_sem_matricula_ativa(), cursor="nao-e-cursor"
+            )
+
+    def test_api_retorna_pagina_compacta(self):
+        for i in range(3):
+            self._aluno(i)
+        user = User.objects.create_user(username="lote", password="senha")
+        self.client.force_login(user)
+        url = reverse("turmas:api_alunos_elegiveis", args=[self.turma.id])
+
+        dados = self.client.get(url, {"limite": 2}).json()
+
+        self.assertTrue(dados["success"])
+        self.assertEqual(
+            [aluno["nome"] for aluno in dados["alunos"]], ["Aluno 00", "Aluno 01"]
+        )
+        self.assertEqual(dados["situacoes"]["a"], "Ativo")
+        self.assertEqual(dados["alunos"][0]["situacao"], "a")
+
+        dados = self.client.get(url, {"limite": 2, "cursor": dados["proximo"]}).json()
+        self.assertEqual([aluno["nome"] for aluno in dados["alunos"]], ["Aluno 02"])
+        self.assertIsNone(dados["proximo"])
+
+        resposta = self.client.get(url, {"cursor": "!!"})
+        self.assertEqual(resposta.status_code, 400)
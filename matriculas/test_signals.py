@@ -39,16 +39,12 @@ class MatriculaSignalsTestCase(TestCase):
         self.curso1 = Curso.objects.create(
             nome="Aprendiz",
             descricao="Curso de Aprendiz",
-            carga_horaria=40,
-            duracao_meses=6,
             ativo=True,
         )
 
         self.curso2 = Curso.objects.create(
             nome="Companheiro",
             descricao="Curso de Companheiro",
-            carga_horaria=60,
-            duracao_meses=12,
             ativo=True,
         )
 
@@ -56,18 +52,18 @@ class MatriculaSignalsTestCase(TestCase):
         self.turma1 = Turma.objects.create(
             nome="Turma Aprendiz 2025",
             curso=self.curso1,
-            data_inicio=timezone.now().date(),
-            data_fim=timezone.now().date(),
-            vagas_totais=30,
+            data_inicio_ativ=timezone.now().date(),
+            data_termino_atividades=timezone.now().date(),
+            vagas=30,
             status="A",
         )
 
         self.turma2 = Turma.objects.create(
             nome="Turma Companheiro 2025",
             curso=self.curso2,
-            data_inicio=timezone.now().date(),
-            data_fim=timezone.now().date(),
-            vagas_totais=20,
+            data_inicio_ativ=timezone.now().date(),
+            data_termino_atividades=timezone.now().date(),
+            vagas=20,
             status="A",
         )
 
@@ -81,7 +77,6 @@ class MatriculaSignalsTestCase(TestCase):
             aluno=self.aluno,
             turma=self.turma1,
             data_matricula=timezone.now().date(),
-            status='A',
             status="A",
         )
 
@@ -98,7 +93,6 @@ class MatriculaSignalsTestCase(TestCase):
             aluno=self.aluno,
             turma=self.turma1,
             data_matricula=timezone.now().date(),
-            status='A',
             status="A",
         )
 
@@ -112,7 +106,6 @@ class MatriculaSignalsTestCase(TestCase):
             aluno=self.aluno,
             turma=self.turma2,
             data_matricula=timezone.now().date() + timedelta(days=1),
-            status='A',
             status="A",
         )
 
@@ -128,7 +121,6 @@ class MatriculaSignalsTestCase(TestCase):
             aluno=self.aluno,
             turma=self.turma1,
             data_matricula=timezone.now().date(),
-            status='A',
             status="A",
         )
 
@@ -150,7 +142,6 @@ class MatriculaSignalsTestCase(TestCase):
             aluno=self.aluno,
             turma=self.turma1,
             data_matricula=timezone.now().date(),
-            status='C',  # Inativa
             status="C",  # Cancelada
         )
 
@@ -168,7 +159,6 @@ class MatriculaSignalsTestCase(TestCase):
             aluno=self.aluno,
             turma=self.turma1,
             data_matricula=timezone.now().date(),
-            status='A',
             status="A",
         )
 
@@ -176,7 +166,6 @@ class MatriculaSignalsTestCase(TestCase):
             aluno=self.aluno,
             turma=self.turma2,
             data_matricula=timezone.now().date() + timedelta(days=1),
-            status='A',
             status="A",
         )
 
@@ -190,3 +179,111 @@ class MatriculaSignalsTestCase(TestCase):
 
         # Verificar que voltou para o curso da primeira matrícula
         self.assertEqual(self.aluno.grau_atual, "Aprendiz")
+
+    def test_cancelar_matricula_recalcula_grau(self):
+        """Cancelar a matrícula limpa o curso atual, mas mantém o grau_atual."""
+        matricula = Matricula.objects.create(
+            aluno=self.aluno,
+            turma=self.turma1,
+            data_matricula=timezone.now().date(),
+            status="A",
+        )
+        self.aluno.refresh_from_db()
+        self.assertEqual(self.aluno.ultimo_curso, self.curso1)
+
+        matricula.status = "C"
+        matricula.save()
+
+        self.aluno.refresh_from_db()
+        self.assertIsNone(self.aluno.ultimo_curso)
+        self.assertEqual(self.aluno.grau_atual, "Aprendiz")
+
+    def test_ultimo_curso_lido_sem_consultar_matriculas(self):
+        """A projeção e a anotação evitam queries por aluno nas listagens."""
+        Matricula.objects.create(
+            aluno=self.aluno,
+            turma=self.turma1,
+            data_matricula=timezone.now().date(),
+            status="A",
+        )
+        aluno = Aluno.objects.select_related("ultimo_curso").get(pk=self.aluno.pk)
+        # Um grau digitado no formulário não muda o curso atual
+        aluno.grau_atual = "Mestre"
+        with self.assertNumQueries(0):
+            self.assertEqual(aluno.ultimo_curso_matriculado, "Aprendiz")
+            self.assertEqual(aluno.grau_atual_automatico, "Aprendiz")
+
+        with self.assertNumQueries(1):
+            nomes = [
+                a.ultimo_curso_matriculado for a in Aluno.objects.com_curso_atual()
+            ]
+        self.assertEqual(nomes, ["Aprendiz"])
+
+    def test_renomear_curso_propaga_para_grau(self):
+        """Renomear o curso atualiza o grau_atual dos alunos do curso."""
+        Matricula.objects.create(
+            aluno=self.aluno,
+            turma=self.turma1,
+            data_matricula=timezone.now().date(),
+            status="A",
+        )
+        self.curso1.nome = "Aprendiz I"
+        self.curso1.save()
+
+        self.aluno.refresh_from_db()
+        self.assertEqual(self.aluno.grau_atual, "Aprendiz I")
+
+    def test_comando_reconstroi_projecao(self):
+        """O comando de backfill recalcula a projeção de todos os alunos."""
+        from io import StringIO
+        from django.core.management import call_command
+
+        Matricula.objects.create(
+            aluno=self.aluno,
+            turma=self.turma2,
+            data_matricula=timezone.now().date(),
+            status="A",
+        )
+        Aluno.objects.update(ultimo_curso=None, grau_atual="")
+
+        call_command("recalcular_curso_atual", stdout=StringIO())
+
+        self.aluno.refresh_from_db()
+        self.assertEqual(self.aluno.ultimo_curso, self.curso2)
+        self.assertEqual(self.aluno.grau_atual, "Companheiro")
+
+    def test_comando_preserva_grau_de_aluno_sem_matricula(self):
+        """Alunos sem matrícula ativa mantêm o grau_atual digitado."""
+        from io import StringIO
+        from django.core.management import call_command
+
+        Aluno.objects.filter(pk=self.aluno.pk).update(grau_atual="Mestre")
+
+        call_command("recalcular_curso_atual", stdout=StringIO())
+
+        self.aluno.refresh_from_db()
+        self.assertIsNone(self.aluno.ultimo_curso)
+        self.assertEqual(self.aluno.grau_atual, "Mestre")
+
+    def test_salvar_turma_sem_mudar_curso_nao_recalcula(self):
+        """Só a troca de curso da turma recalcula o curso atual dos alunos."""
+        from unittest.mock import patch
+
+        Matricula.objects.create(
+            aluno=self.aluno,
+            turma=self.turma1,
+            data_matricula=timezone.now().date(),
+            status="A",
+        )
+        turma = Turma.objects.get(pk=self.turma1.pk)
+
+        with patch("matriculas.signals.atualizar_curso_atual_alunos") as atualizar:
+            turma.vagas = 40
+            turma.save()
+            atualizar.assert_not_called()
+
+            turma.curso = self.curso2
+            turma.save(update_fields=["curso"])
+            # Snapshot renovado: salvar de novo não recalcula outra vez
+            turma.save()
+            atualizar.assert_called_once()
@@ -55,6 +55,10 @@ app.conf.update(
         "presencas.tasks.processar_exportacao_pesada": {"queue": "heavy"},
         "presencas.tasks.recalcular_estatisticas": {"queue": "statistics"},
         "presencas.tasks.enviar_relatorio_email": {"queue": "email"},
+        "presencas.tasks.atualizar_visao_presencas": {"queue": "statistics"},
+        "presencas.tasks.atualizar_agregados_turma": {"queue": "statistics"},
+        "pagamentos.tasks.marcar_pagamentos_atrasados": {"queue": "statistics"},
+        "alunos.tasks.indexar_fotos": {"queue": "statistics"},
     },
     # Queues
     task_default_queue="default",
@@ -71,6 +75,27 @@ app.conf.update(
             "task": "presencas.tasks.backup_dados_criticos",
             "schedule": 86400.0,  # Diário
         },
+        "atualizar-visao-presencas": {
+            "task": "presencas.tasks.atualizar_visao_presencas",
+            "schedule": 300.0,  # A cada 5 minutos, se houver alterações
+        },
+        "atualizar-visao-presencas-completa": {
+            "task": "presencas.tasks.atualizar_visao_presencas",
+            "schedule": 86400.0,  # Diário, mesmo sem alterações sinalizadas
+            "kwargs": {"forcar": True},
+        },
+        "despachar-agendamentos-relatorio": {
+            "task": "presencas.tasks.despachar_agendamentos_relatorio",
+            "schedule": 60.0,  # A cada minuto; agendamentos vencidos
+        },
+        "marcar-pagamentos-atrasados": {
+            "task": "pagamentos.tasks.marcar_pagamentos_atrasados",
+            "schedule": 3600.0,  # A cada hora; cobre a virada do dia
+        },
+        "indexar-fotos": {
+            "task": "alunos.tasks.indexar_fotos",
+            "schedule": 300.0,  # A cada 5 minutos; só grava fotos alteradas
+        },
     },
 )
 
@@ -5,7 +5,7 @@ Este módulo adiciona variáveis globais ao contexto do Django.
 
 import logging
 from django.conf import settings
-from pagamentos.views.dashboard_views import get_pagamento_model
+from django.utils.functional import SimpleLazyObject
 
 logger = logging.getLogger(__name__)
 
@@ -14,25 +14,25 @@ logger = logging.getLogger(__name__)
 
 def pagamentos_context(request):
     """
-    Adiciona a variável pagamentos_atrasados_count ao contexto global.
+    Adiciona o resumo de pagamentos atrasados ao contexto global.
+
+    Os valores são callables resolvidos pelo template apenas quando usados,
+    a partir do resumo em cache de ``ResumoAtrasadosService`` (contagem e os
+    pagamentos mais atrasados). A lista completa fica em
+    ``pagamentos:pagamentos_atrasados_ajax``.
     """
-    Pagamento = get_pagamento_model()  # noqa: E1101
-
-    if request.user.is_authenticated:
-        pagamentos_atrasados_qs = Pagamento.objects.filter(status="ATRASADO").select_related('aluno')
-        pagamentos_atrasados = list(pagamentos_atrasados_qs)
-        pagamentos_atrasados_count = pagamentos_atrasados_qs.count()
-    else:
-        pagamentos_atrasados = []
-        pagamentos_atrasados_count = 0
-
-    logger.debug(
-        "Context processor executado: pagamentos_atrasados_count=%d",
-        pagamentos_atrasados_count,
-    )
+    if not request.user.is_authenticated:
+        return {"pagamentos_atrasados_count": 0, "pagamentos_atrasados": []}
+
+    def _obter_resumo():
+        from pagamentos.services import ResumoAtrasadosService
+
+        return ResumoAtrasadosService.obter()
+
+    resumo = SimpleLazyObject(_obter_resumo)
     return {
-        "pagamentos_atrasados_count": pagamentos_atrasados_count,
-        "pagamentos_atrasados": pagamentos_atrasados,
+        "pagamentos_atrasados_count": lambda: resumo["total"],
+        "pagamentos_atrasados": lambda: resumo["itens"],
     }
 
 
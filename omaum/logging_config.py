@@ -20,6 +20,11 @@ class StructuredFormatter(logging.Formatter):
         if hasattr(record, "metrics"):
             metrics = record.metrics
             record.msg = f"{record.msg} | Duration: {metrics.get('duration', 'N/A')}s | Queries: {metrics.get('queries_count', 'N/A')}"
+            if metrics.get("db_time") is not None:
+                record.msg = (
+                    f"{record.msg} | DB: {metrics['db_time']}s"
+                    f" | Cache: {metrics.get('cache_hits', 0)}/{metrics.get('cache_misses', 0)}"
+                )
 
         return super().format(record)
 
@@ -190,6 +195,10 @@ class PerformanceLogger:
         queries_count: int,
         status_code: int,
         user_id: int = None,
+        db_time: float = None,
+        cache_hits: int = None,
+        cache_misses: int = None,
+        slow_queries: list = None,
     ):
         """Log de métricas de requisição."""
         self.logger.info(
@@ -198,10 +207,14 @@ class PerformanceLogger:
                 "metrics": {
                     "duration": duration,
                     "queries_count": queries_count,
+                    "db_time": db_time,
+                    "cache_hits": cache_hits,
+                    "cache_misses": cache_misses,
                     "status_code": status_code,
                     "user_id": user_id,
                     "path": request_path,
-                }
+                },
+                "slow_queries": slow_queries or [],
             },
         )
 
@@ -0,0 +1,74 @@
+"""Comando para listar as views mais lentas no armazém de métricas."""
+
+from django.core.management.base import BaseCommand
+
+from omaum.metricas import ORDENACOES, MetricasPerformance, limitar_minutos
+
+
+class Command(BaseCommand):
+    """Mostra as views mais lentas na janela escolhida."""
+
+    help = (
+        "Lista as views mais lentas (percentis de duração, queries e erros) "
+        "registradas pelo PerformanceMonitoringMiddleware. Sem Redis as "
+        "métricas ficam na memória de cada processo e não são visíveis aqui."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--minutos",
+            type=int,
+            default=60,
+            help="Janela em minutos (padrão: 60; limitada à retenção)",
+        )
+        parser.add_argument(
+            "--limite", type=int, default=10, help="Quantidade de views (padrão: 10)"
+        )
+        parser.add_argument(
+            "--ordenar",
+            choices=ORDENACOES,
+            default="p95_ms",
+            help="Critério de ordenação (padrão: p95_ms)",
+        )
+        parser.add_argument(
+            "--reiniciar",
+            action="store_true",
+            help="Descarta as métricas acumuladas (avança a geração do namespace)",
+        )
+
+    def handle(self, *args, **options):
+        """Imprime a tabela de views."""
+        if options["reiniciar"]:
+            MetricasPerformance.reiniciar()
+            self.stdout.write(self.style.SUCCESS("✅ Métricas reiniciadas"))
+            return
+
+        options["minutos"] = limitar_minutos(options["minutos"])
+        views = MetricasPerformance.mais_lentas(
+            options["minutos"], options["limite"], options["ordenar"]
+        )
+        if not views:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️ Nenhuma métrica nos últimos {options['minutos']} minutos"
+                )
+            )
+            return
+
+        self.stdout.write(
+            f"{'view':<50} {'req':>7} {'méd':>8} {'p50':>6} {'p95':>6} "
+            f"{'p99':>6} {'qry':>6} {'4xx':>5} {'5xx':>5}"
+        )
+        for v in views:
+            self.stdout.write(
+                f"{v['view'][:50]:<50} {v['requisicoes']:>7} "
+                f"{v['duracao_media_ms']:>8} {v['p50_ms']:>6} {v['p95_ms']:>6} "
+                f"{v['p99_ms']:>6} {v['queries_media']:>6} "
+                f"{v['erros_4xx']:>5} {v['erros_5xx']:>5}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {len(views)} view(s) nos últimos {options['minutos']} minutos "
+                "(durações em ms)"
+            )
+        )
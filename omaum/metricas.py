@@ -0,0 +1,263 @@
+"""
+Armazém de métricas de performance por view.
+
+Cada requisição incrementa contadores em fatias de tempo de
+``METRICAS_FATIA_SEGUNDOS``: requisições, duração e queries acumuladas,
+erros e um histograma de duração em faixas fixas (base dos percentis).
+
+Com Redis (``django_redis``) os contadores são campos de um hash por fatia
+incrementados com HINCRBY em pipeline — sem leitura prévia, portanto sem
+perda de atualizações entre workers. Nos demais backends de cache os
+contadores ficam em memória do processo, protegidos por lock.
+
+As chaves embutem a geração do namespace ``metricas`` (core.cache_versionado):
+``MetricasPerformance.reiniciar`` descarta tudo com um único INCR, sem
+varrer as chaves das fatias.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+
+from core import cache_versionado
+
+# Limites superiores (ms) das faixas do histograma; a última faixa é aberta
+LIMITES_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+PREFIXO = "omaum:metricas"
+
+NAMESPACE_METRICAS = "metricas"
+
+# Critérios aceitos para ordenar as views mais lentas
+ORDENACOES = ("p50_ms", "p95_ms", "p99_ms", "duracao_media_ms", "requisicoes")
+
+
+def _fatia_segundos() -> int:
+    return getattr(settings, "METRICAS_FATIA_SEGUNDOS", 300)
+
+
+def _retencao_segundos() -> int:
+    return getattr(settings, "METRICAS_RETENCAO_HORAS", 24) * 3600
+
+
+def limitar_minutos(minutos: int) -> int:
+    """Janela limitada à retenção: fatias mais antigas já expiraram."""
+    return min(max(int(minutos), 1), _retencao_segundos() // 60)
+
+
+def faixa_da_duracao(duracao_ms: float) -> int:
+    """Índice da faixa do histograma correspondente à duração."""
+    for indice, limite in enumerate(LIMITES_MS):
+        if duracao_ms <= limite:
+            return indice
+    return len(LIMITES_MS)
+
+
+def percentil(histograma: List[int], fracao: float) -> int:
+    """
+    Percentil aproximado a partir do histograma.
+
+    Retorna o limite superior da faixa que contém o percentil; na faixa
+    aberta, o último limite (o valor real é maior ou igual a ele).
+    """
+    total = sum(histograma)
+    if not total:
+        return 0
+    alvo = fracao * total
+    acumulado = 0
+    for indice, quantidade in enumerate(histograma):
+        acumulado += quantidade
+        if acumulado >= alvo:
+            return LIMITES_MS[min(indice, len(LIMITES_MS) - 1)]
+    return LIMITES_MS[-1]
+
+
+class _ArmazemRedis:
+    """Hash por fatia no Redis, incrementado atomicamente."""
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+
+    def geracao(self) -> int:
+        return cache_versionado.geracao(NAMESPACE_METRICAS)
+
+    def reiniciar(self):
+        cache_versionado.invalidar(NAMESPACE_METRICAS)
+
+    def incrementar(self, chave: str, campos: Dict[str, int], ttl: int):
+        pipe = self.conexao.pipeline(transaction=False)
+        for campo, valor in campos.items():
+            pipe.hincrby(chave, campo, valor)
+        pipe.expire(chave, ttl)
+        pipe.execute()
+
+    def ler(self, chaves: Iterable[str]) -> List[Dict[str, int]]:
+        pipe = self.conexao.pipeline(transaction=False)
+        for chave in chaves:
+            pipe.hgetall(chave)
+        return [
+            {campo.decode(): int(valor) for campo, valor in dados.items()}
+            for dados in pipe.execute()
+        ]
+
+
+class _ArmazemLocal:
+    """Contadores em memória do processo (fallback sem Redis)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dados = defaultdict(Counter)
+        self._expira = {}
+        self._geracao = 0
+
+    def geracao(self) -> int:
+        return self._geracao
+
+    def reiniciar(self):
+        with self._lock:
+            self._geracao += 1
+
+    def incrementar(self, chave: str, campos: Dict[str, int], ttl: int):
+        agora = time.time()
+        with self._lock:
+            self._dados[chave].update(campos)
+            self._expira[chave] = agora + ttl
+            for antiga in [c for c, t in self._expira.items() if t < agora]:
+                self._dados.pop(antiga, None)
+                self._expira.pop(antiga, None)
+
+    def ler(self, chaves: Iterable[str]) -> List[Dict[str, int]]:
+        with self._lock:
+            return [dict(self._dados.get(chave, {})) for chave in chaves]
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+            self._expira.clear()
+
+
+_armazem_local = _ArmazemLocal()
+
+
+def obter_armazem():
+    """Redis quando o cache padrão usa django_redis; senão, memória local."""
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if backend.startswith("django_redis."):
+        from django_redis import get_redis_connection
+
+        return _ArmazemRedis(get_redis_connection("default"))
+    return _armazem_local
+
+
+class MetricasPerformance:
+    """
+    Registro e consulta das métricas agregadas por view.
+
+    Campos por view na fatia: ``n`` (requisições), ``ms`` (duração total),
+    ``q`` (queries), ``e4``/``e5`` (respostas 4xx/5xx) e ``b0``..``bN``
+    (histograma de duração).
+    """
+
+    @staticmethod
+    def _chave(fatia: int, geracao: int) -> str:
+        return f"{PREFIXO}:g{geracao}:{fatia}"
+
+    @classmethod
+    def registrar(
+        cls, view: str, duracao: float, queries: int, status_code: int
+    ) -> None:
+        """Contabiliza uma requisição (duração em segundos)."""
+        duracao_ms = duracao * 1000
+        campos = {
+            f"{view}|n": 1,
+            f"{view}|ms": int(round(duracao_ms)),
+            f"{view}|q": queries,
+            f"{view}|b{faixa_da_duracao(duracao_ms)}": 1,
+        }
+        if status_code >= 500:
+            campos[f"{view}|e5"] = 1
+        elif status_code >= 400:
+            campos[f"{view}|e4"] = 1
+
+        fatia = int(time.time()) // _fatia_segundos()
+        armazem = obter_armazem()
+        armazem.incrementar(
+            cls._chave(fatia, armazem.geracao()), campos, _retencao_segundos()
+        )
+
+    @classmethod
+    def reiniciar(cls) -> None:
+        """Descarta as métricas acumuladas (as fatias antigas expiram sozinhas)."""
+        obter_armazem().reiniciar()
+
+    @classmethod
+    def resumo(cls, minutos: int = 60) -> List[Dict[str, Any]]:
+        """
+        Métricas por view somadas nas fatias dos últimos ``minutos``.
+
+        A janela é limitada à retenção (``limitar_minutos``), o que também
+        limita a quantidade de chaves lidas.
+
+        Returns:
+            Lista de dicts com requisições, médias, erros e percentis (ms)
+        """
+        tamanho = _fatia_segundos()
+        atual = int(time.time()) // tamanho
+        quantidade = max(1, -(-limitar_minutos(minutos) * 60 // tamanho))
+        armazem = obter_armazem()
+        geracao = armazem.geracao()
+        chaves = [
+            cls._chave(fatia, geracao)
+            for fatia in range(atual - quantidade + 1, atual + 1)
+        ]
+
+        somas = defaultdict(Counter)
+        for dados in armazem.ler(chaves):
+            for campo, valor in dados.items():
+                view, _, nome = campo.rpartition("|")
+                somas[view][nome] += valor
+
+        resultado = []
+        for view, campos in somas.items():
+            total = campos["n"]
+            if not total:
+                continue
+            histograma = [campos[f"b{i}"] for i in range(len(LIMITES_MS) + 1)]
+            resultado.append(
+                {
+                    "view": view,
+                    "requisicoes": total,
+                    "duracao_media_ms": round(campos["ms"] / total, 1),
+                    "queries_media": round(campos["q"] / total, 1),
+                    "erros_4xx": campos["e4"],
+                    "erros_5xx": campos["e5"],
+                    "p50_ms": percentil(histograma, 0.50),
+                    "p95_ms": percentil(histograma, 0.95),
+                    "p99_ms": percentil(histograma, 0.99),
+                    "histograma": histograma,
+                }
+            )
+        return resultado
+
+    @classmethod
+    def mais_lentas(
+        cls, minutos: int = 60, limite: int = 10, ordenar_por: str = "p95_ms"
+    ) -> List[Dict[str, Any]]:
+        """Views mais lentas da janela, ordenadas pelo percentil escolhido."""
+        views = cls.resumo(minutos)
+        views.sort(key=lambda v: (v[ordenar_por], v["duracao_media_ms"]), reverse=True)
+        return views[:limite]
+
+    @classmethod
+    def totais(cls, minutos: int = 60, limite_lenta_ms: int = 1000) -> Dict[str, int]:
+        """Total de requisições, lentas (acima de ``limite_lenta_ms``) e erros."""
+        primeira_lenta = faixa_da_duracao(limite_lenta_ms) + 1
+        totais = {"total_requests": 0, "slow_requests": 0, "errors": 0}
+        for view in cls.resumo(minutos):
+            totais["total_requests"] += view["requisicoes"]
+            totais["slow_requests"] += sum(view["histograma"][primeira_lenta:])
+            totais["errors"] += view["erros_5xx"]
+        return totais
@@ -2,102 +2,316 @@
 FASE 3C: Middleware para monitoramento de performance e métricas.
 """
 
+import heapq
 import logging
+import re
 import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, Any, Optional
-from collections import defaultdict
 
-from django.core.cache import cache
+from django.core.cache import caches
 from django.conf import settings
-from django.db import connection
+from django.db import connection, connections
 from django.utils.deprecation import MiddlewareMixin
 from django.http import HttpRequest, HttpResponse
 from django.urls import resolve
 
+from omaum.logging_config import PerformanceLogger
+from omaum.metricas import MetricasPerformance
+
 logger = logging.getLogger(__name__)
+performance_logger = PerformanceLogger()
+
+# Coletor da requisição em andamento (lido pelos métodos de cache instrumentados)
+_coletor_atual: ContextVar[Optional["ColetorRequisicao"]] = ContextVar(
+    "coletor_requisicao", default=None
+)
+
+_AUSENTE = object()
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTA = re.compile(r"\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)")
+_RE_ESPACOS = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalizar_sql(sql: str) -> str:
+    """
+    Impressão digital de uma instrução SQL.
+
+    Literais viram ``?`` e listas de parâmetros (``IN (%s, %s, ...)``) viram
+    ``(...)``, de modo que consultas de mesmo formato compartilham a mesma
+    impressão digital independentemente dos valores.
+    """
+    sql = _RE_STRING.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    sql = _RE_LISTA.sub("(...)", sql)
+    return _RE_ESPACOS.sub(" ", sql).strip()
+
+
+class ColetorRequisicao:
+    """
+    Métricas de banco e cache de uma requisição.
+
+    É instalado como *execute wrapper* em todas as conexões, portanto conta
+    as queries mesmo com ``DEBUG=False`` (``connection.queries`` só é
+    preenchido em modo debug). Por query guarda apenas contadores e as N
+    instruções mais lentas; a normalização do SQL é feita no final, só para
+    as instruções relatadas.
+    """
+
+    def __init__(self, max_lentas: int = 5):
+        self.max_lentas = max_lentas
+        self.queries = 0
+        self.tempo_db = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lentas = []  # heap de (duração, seq, sql)
+        self._por_sql = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.queries += 1
+            self.tempo_db += duracao
+            self._por_sql[sql] += 1
+            item = (duracao, self.queries, sql)
+            if len(self._lentas) < self.max_lentas:
+                heapq.heappush(self._lentas, item)
+            elif duracao > self._lentas[0][0]:
+                heapq.heapreplace(self._lentas, item)
+
+    @contextmanager
+    def ativar(self):
+        """Instala o coletor nas conexões e no cache durante o bloco."""
+        _instrumentar_caches()
+        token = _coletor_atual.set(self)
+        try:
+            with ExitStack() as pilha:
+                for conexao in connections.all():
+                    pilha.enter_context(conexao.execute_wrapper(self))
+                yield self
+        finally:
+            _coletor_atual.reset(token)
+
+    def mais_lentas(self):
+        """Instruções mais lentas, da mais lenta para a mais rápida."""
+        return [
+            {"fingerprint": normalizar_sql(sql), "duration": round(duracao, 4)}
+            for duracao, _, sql in sorted(self._lentas, reverse=True)
+        ]
+
+    def mais_repetida(self):
+        """(impressão digital, execuções) da instrução mais repetida."""
+        if not self._por_sql:
+            return None, 0
+        sql, total = self._por_sql.most_common(1)[0]
+        return normalizar_sql(sql), total
+
+
+def _instrumentar_caches():
+    """
+    Envolve ``get``/``get_many`` das instâncias de cache da thread atual.
+
+    As instâncias de ``caches`` são por thread; a instrumentação é feita uma
+    única vez por instância e, fora de uma requisição monitorada, custa
+    apenas a leitura do ``ContextVar``.
+    """
+    for alias in settings.CACHES:
+        instancia = caches[alias]
+        if getattr(instancia, "_instrumentado", False):
+            continue
+
+        def get(key, default=None, version=None, _get=instancia.get):
+            coletor = _coletor_atual.get()
+            if coletor is None:
+                return _get(key, default, version)
+            valor = _get(key, _AUSENTE, version)
+            if valor is _AUSENTE:
+                coletor.cache_misses += 1
+                return default
+            coletor.cache_hits += 1
+            return valor
+
+        def get_many(keys, version=None, _get_many=instancia.get_many):
+            coletor = _coletor_atual.get()
+            if coletor is None:
+                return _get_many(keys, version)
+            keys = list(keys)
+            # Backends que implementam get_many via get() não contam em dobro
+            token = _coletor_atual.set(None)
+            try:
+                resultado = _get_many(keys, version)
+            finally:
+                _coletor_atual.reset(token)
+            coletor.cache_hits += len(resultado)
+            coletor.cache_misses += len(keys) - len(resultado)
+            return resultado
+
+        instancia.get = get
+        instancia.get_many = get_many
+        instancia._instrumentado = True
 
 
 class PerformanceMonitoringMiddleware(MiddlewareMixin):
     """
     Middleware para monitoramento de performance do sistema de presenças.
+
+    Queries, tempo de banco e acessos ao cache vêm do ``ColetorRequisicao``
+    e funcionam com ``DEBUG=False``. Para usuários staff (ou em DEBUG) as
+    métricas também são enviadas em cabeçalhos da resposta; em respostas
+    de streaming são registradas só no fim do corpo, sem cabeçalhos.
     """
 
+    async_capable = False
+
     def __init__(self, get_response):
         self.get_response = get_response
         self.slow_query_threshold = getattr(
             settings, "SLOW_QUERY_THRESHOLD", 1.0
         )  # segundos
-        self.metrics_cache_timeout = getattr(
-            settings, "METRICS_CACHE_TIMEOUT", 300
-        )  # 5 minutos
+        self.slow_sql_threshold = getattr(
+            settings, "SLOW_SQL_THRESHOLD", 0.1
+        )  # segundos, por instrução
+        self.many_queries_threshold = getattr(settings, "MANY_QUERIES_THRESHOLD", 10)
         super().__init__(get_response)
 
-    def process_request(self, request: HttpRequest) -> Optional[HttpResponse]:
-        """Inicializa o monitoramento da requisição."""
-        request._start_time = time.time()
-        request._start_queries = len(connection.queries)
-        request._cache_hits = 0
-        request._cache_misses = 0
-        return None
-
-    def process_response(
-        self, request: HttpRequest, response: HttpResponse
-    ) -> HttpResponse:
-        """Processa métricas no final da requisição."""
-        try:
-            # Calcular métricas básicas
-            end_time = time.time()
-            duration = end_time - getattr(request, "_start_time", end_time)
-
-            # Contar queries executadas
-            total_queries = len(connection.queries) - getattr(
-                request, "_start_queries", 0
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        coletor = ColetorRequisicao()
+        inicio = time.perf_counter()
+        with coletor.ativar():
+            response = self.get_response(request)
+
+        if self._stream_com_queries(response):
+            # As queries de um streaming rodam enquanto o corpo é consumido,
+            # depois que a view retorna; o coletor acompanha o stream
+            response.streaming_content = self._coletar_stream(
+                request, response, coletor, inicio, response.streaming_content
             )
+            return response
 
-            # Obter informações da view
-            url_info = self._get_url_info(request)
-
-            # Métricas da requisição
-            metrics = {
-                "duration": round(duration, 4),
-                "queries_count": total_queries,
-                "path": request.path,
-                "method": request.method,
-                "view_name": url_info.get("view_name", "unknown"),
-                "app_name": url_info.get("app_name", "unknown"),
-                "status_code": response.status_code,
-                "timestamp": datetime.now().isoformat(),
-                "user_id": getattr(request.user, "id", None)
-                if hasattr(request, "user")
-                else None,
-            }
-
-            # Detectar consultas lentas
-            if duration > self.slow_query_threshold:
-                self._log_slow_request(request, metrics, connection.queries)
-
-            # Detectar muitas queries (N+1 problem)
-            if total_queries > 10:
-                self._log_many_queries(request, metrics, total_queries)
+        self._finalizar(request, response, coletor, time.perf_counter() - inicio)
+        return response
 
-            # Armazenar métricas agregadas
-            self._store_aggregated_metrics(metrics)
+    @staticmethod
+    def _stream_com_queries(response: HttpResponse) -> bool:
+        """
+        Streaming síncrono gerado pela aplicação.
+
+        Um ``FileResponse`` pode ser entregue pelo ``wsgi.file_wrapper`` sem
+        passar pelo iterador, e um stream assíncrono não pode ser envolvido
+        por um gerador síncrono; ambos são registrados ao sair da view.
+        """
+        return (
+            response.streaming
+            and not getattr(response, "is_async", False)
+            and getattr(response, "file_to_stream", None) is None
+        )
 
-            # Adicionar headers de debug em desenvolvimento
-            if settings.DEBUG:
-                response["X-Response-Time"] = f"{duration:.4f}s"
-                response["X-DB-Queries"] = str(total_queries)
+    def _coletar_stream(self, request, response, coletor, inicio, conteudo):
+        """Repassa o corpo do streaming com o coletor ativo e registra no fim."""
+        try:
+            with coletor.ativar():
+                yield from conteudo
+        finally:
+            # Os cabeçalhos já foram enviados quando o stream termina
+            self._finalizar(
+                request,
+                response,
+                coletor,
+                time.perf_counter() - inicio,
+                cabecalhos=False,
+            )
 
+    def _finalizar(self, request, response, coletor, duracao, cabecalhos=True):
+        try:
+            self._registrar(request, response, coletor, duracao, cabecalhos)
         except Exception as e:
             logger.error(f"Erro no middleware de performance: {e}")
 
-        return response
+    def _registrar(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        coletor: ColetorRequisicao,
+        duration: float,
+        cabecalhos: bool = True,
+    ):
+        """Processa métricas no final da requisição."""
+        url_info = self._get_url_info(request)
+        user = getattr(request, "user", None)
+
+        # Métricas da requisição
+        metrics = {
+            "duration": round(duration, 4),
+            "queries_count": coletor.queries,
+            "db_time": round(coletor.tempo_db, 4),
+            "cache_hits": coletor.cache_hits,
+            "cache_misses": coletor.cache_misses,
+            "path": request.path,
+            "method": request.method,
+            "view_name": url_info.get("view_name", "unknown"),
+            "app_name": url_info.get("app_name", "unknown"),
+            "status_code": response.status_code,
+            "timestamp": datetime.now().isoformat(),
+            "user_id": getattr(user, "id", None),
+        }
+
+        slow_queries = [
+            q for q in coletor.mais_lentas() if q["duration"] >= self.slow_sql_threshold
+        ]
+        performance_logger.log_request_metrics(
+            request.path,
+            metrics["duration"],
+            coletor.queries,
+            response.status_code,
+            metrics["user_id"],
+            db_time=metrics["db_time"],
+            cache_hits=coletor.cache_hits,
+            cache_misses=coletor.cache_misses,
+            slow_queries=slow_queries,
+        )
+        for query in slow_queries:
+            performance_logger.log_slow_query(
+                query["fingerprint"], query["duration"], request.path
+            )
+
+        # Detectar consultas lentas
+        if duration > self.slow_query_threshold:
+            self._log_slow_request(request, metrics, coletor.mais_lentas())
+
+        # Detectar muitas queries (N+1 problem)
+        if coletor.queries > self.many_queries_threshold:
+            self._log_many_queries(request, metrics, coletor)
+
+        # Armazenar métricas agregadas
+        self._store_aggregated_metrics(metrics)
+
+        # Cabeçalhos de diagnóstico para staff (ou em desenvolvimento)
+        if cabecalhos and (settings.DEBUG or getattr(user, "is_staff", False)):
+            response["X-Response-Time"] = f"{duration:.4f}s"
+            response["X-DB-Queries"] = str(coletor.queries)
+            response["X-DB-Time"] = f"{coletor.tempo_db:.4f}s"
+            response["X-Cache-Hits"] = str(coletor.cache_hits)
+            response["X-Cache-Misses"] = str(coletor.cache_misses)
+            response["Server-Timing"] = (
+                f"db;dur={coletor.tempo_db * 1000:.1f}, "
+                f"total;dur={duration * 1000:.1f}"
+            )
 
     def _get_url_info(self, request: HttpRequest) -> Dict[str, str]:
         """Extrai informações da URL e view."""
+        resolved = getattr(request, "resolver_match", None)
         try:
-            resolved = resolve(request.path)
+            resolved = resolved or resolve(request.path_info)
             return {
                 "view_name": resolved.view_name,
                 "app_name": resolved.app_name or "unknown",
@@ -111,7 +325,7 @@ class PerformanceMonitoringMiddleware(MiddlewareMixin):
             }
 
     def _log_slow_request(
-        self, request: HttpRequest, metrics: Dict[str, Any], queries: list
+        self, request: HttpRequest, metrics: Dict[str, Any], slow_queries: list
     ):
         """Log para requisições lentas."""
         logger.warning(
@@ -121,85 +335,37 @@ class PerformanceMonitoringMiddleware(MiddlewareMixin):
                 "metrics": metrics,
                 "user_agent": request.META.get("HTTP_USER_AGENT", ""),
                 "remote_addr": self._get_client_ip(request),
+                "slow_queries": slow_queries,
             },
         )
 
-        # Log das queries mais lentas
-        if hasattr(connection, "queries"):
-            slow_queries = [
-                q
-                for q in queries[-metrics["queries_count"] :]
-                if float(q.get("time", 0)) > 0.1
-            ]
-
-            if slow_queries:
-                logger.warning(
-                    f"Queries lentas na requisição {metrics['path']}:",
-                    extra={"slow_queries": slow_queries[:5]},  # Limitar a 5 queries
-                )
-
     def _log_many_queries(
-        self, request: HttpRequest, metrics: Dict[str, Any], query_count: int
+        self,
+        request: HttpRequest,
+        metrics: Dict[str, Any],
+        coletor: ColetorRequisicao,
     ):
         """Log para requisições com muitas queries."""
+        fingerprint, repeticoes = coletor.mais_repetida()
         logger.warning(
             f"Possível problema N+1 detectado: {metrics['path']} "
-            f"({query_count} queries)",
+            f"({coletor.queries} queries, {repeticoes}x a mesma instrução)",
             extra={
                 "metrics": metrics,
+                "repeated_query": fingerprint,
                 "suggestion": "Considere usar select_related() ou prefetch_related()",
             },
         )
 
     def _store_aggregated_metrics(self, metrics: Dict[str, Any]):
-        """Armazena métricas agregadas no cache."""
+        """Contabiliza a requisição no armazém de métricas (incrementos atômicos)."""
         try:
-            cache_key = f"metrics_aggregated_{datetime.now().strftime('%Y%m%d_%H')}"
-
-            # Obter métricas existentes
-            aggregated = cache.get(
-                cache_key,
-                {
-                    "total_requests": 0,
-                    "total_duration": 0,
-                    "slow_requests": 0,
-                    "views": defaultdict(
-                        lambda: {
-                            "count": 0,
-                            "total_duration": 0,
-                            "avg_queries": 0,
-                            "error_count": 0,
-                        }
-                    ),
-                    "last_updated": datetime.now().isoformat(),
-                },
+            MetricasPerformance.registrar(
+                f"{metrics['app_name']}.{metrics['view_name']}",
+                metrics["duration"],
+                metrics["queries_count"],
+                metrics["status_code"],
             )
-
-            # Atualizar totais
-            aggregated["total_requests"] += 1
-            aggregated["total_duration"] += metrics["duration"]
-
-            if metrics["duration"] > self.slow_query_threshold:
-                aggregated["slow_requests"] += 1
-
-            # Atualizar métricas por view
-            view_key = f"{metrics['app_name']}.{metrics['view_name']}"
-            view_metrics = aggregated["views"][view_key]
-            view_metrics["count"] += 1
-            view_metrics["total_duration"] += metrics["duration"]
-            view_metrics["avg_queries"] = (
-                view_metrics["avg_queries"] * (view_metrics["count"] - 1)
-                + metrics["queries_count"]
-            ) / view_metrics["count"]
-
-            if metrics["status_code"] >= 400:
-                view_metrics["error_count"] += 1
-
-            aggregated["last_updated"] = datetime.now().isoformat()
-
-            # Salvar no cache
-            cache.set(cache_key, aggregated, timeout=self.metrics_cache_timeout * 4)
-
         except Exception as e:
             logger.error(f"Erro ao armazenar métricas agregadas: {e}")
 
@@ -308,9 +474,11 @@ class SecurityAuditMiddleware(MiddlewareMixin):
                             "query_string": query_string,
                             "user_agent": request.META.get("HTTP_USER_AGENT", ""),
                             "remote_addr": self._get_client_ip(request),
-                            "user_id": getattr(request.user, "id", None)
-                            if hasattr(request, "user")
-                            else None,
+                            "user_id": (
+                                getattr(request.user, "id", None)
+                                if hasattr(request, "user")
+                                else None
+                            ),
                         },
                     )
                     break
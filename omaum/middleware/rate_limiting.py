@@ -7,13 +7,17 @@ import logging
 from datetime import datetime
 from typing import Dict, Any, Optional
 
-from django.core.cache import cache
 from django.http import JsonResponse, HttpRequest, HttpResponse
 from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 
+from core import cache_versionado
+
 logger = logging.getLogger(__name__)
 
+# Contadores de todos os limitadores; invalidar o namespace zera os limites
+NAMESPACE_LIMITES = "limites"
+
 
 class RateLimitMiddleware(MiddlewareMixin):
     """
@@ -101,47 +105,44 @@ class RateLimitMiddleware(MiddlewareMixin):
         current_time = time.time()
 
         # Chaves de cache para diferentes janelas de tempo
-        minute_key = f"rate_limit_minute_{client_id}_{int(current_time // 60)}"
-        hour_key = f"rate_limit_hour_{client_id}_{int(current_time // 3600)}"
-        burst_key = f"rate_limit_burst_{client_id}"
-
-        # Verificar limites
-        minute_count = cache.get(minute_key, 0)
-        hour_count = cache.get(hour_key, 0)
-        burst_count = cache.get(burst_key, 0)
-
-        # Verificar se excedeu algum limite
-        if minute_count >= limits["requests_per_minute"]:
-            return True, {
-                "type": "minute",
-                "limit": limits["requests_per_minute"],
-                "current": minute_count,
-                "reset_time": (int(current_time // 60) + 1) * 60,
-            }
-
-        if hour_count >= limits["requests_per_hour"]:
-            return True, {
-                "type": "hour",
-                "limit": limits["requests_per_hour"],
-                "current": hour_count,
-                "reset_time": (int(current_time // 3600) + 1) * 3600,
-            }
-
-        # Verificar burst limit (últimos 10 segundos)
-        if burst_count >= limits["burst_limit"]:
-            return True, {
-                "type": "burst",
-                "limit": limits["burst_limit"],
-                "current": burst_count,
-                "reset_time": current_time + 10,
-            }
-
-        # Incrementar contadores
-        cache.set(minute_key, minute_count + 1, timeout=60)
-        cache.set(hour_key, hour_count + 1, timeout=3600)
-        cache.set(burst_key, burst_count + 1, timeout=10)
-
-        return False, {}
+        prefixo = cache_versionado.chave(NAMESPACE_LIMITES, "rate_limit", client_id)
+        minute_key = f"{prefixo}:minute:{int(current_time // 60)}"
+        hour_key = f"{prefixo}:hour:{int(current_time // 3600)}"
+        burst_key = f"{prefixo}:burst"
+
+        # Da janela mais curta para a mais longa: uma requisição recusada não
+        # consome a cota das janelas maiores (burst: últimos 10 segundos)
+        janelas = [
+            ("burst", burst_key, 10, limits["burst_limit"], current_time + 10),
+            (
+                "minute",
+                minute_key,
+                60,
+                limits["requests_per_minute"],
+                (int(current_time // 60) + 1) * 60,
+            ),
+            (
+                "hour",
+                hour_key,
+                3600,
+                limits["requests_per_hour"],
+                (int(current_time // 3600) + 1) * 3600,
+            ),
+        ]
+        excedida = cache_versionado.consumir(
+            (chave, timeout, limite) for _, chave, timeout, limite, _ in janelas
+        )
+        if excedida is None:
+            return False, {}
+
+        indice, contagem = excedida
+        tipo, _, _, limite, reset_time = janelas[indice]
+        return True, {
+            "type": tipo,
+            "limit": limite,
+            "current": contagem,
+            "reset_time": reset_time,
+        }
 
     def _get_endpoint_limits(self, path: str) -> Dict[str, int]:
         """Obtém limites específicos para o endpoint."""
@@ -222,28 +223,32 @@ class APIThrottlingMixin:
         client_id = self._get_client_identifier(request)
 
         current_time = time.time()
-        minute_key = f"api_throttle_{action}_{client_id}_{int(current_time // 60)}"
-        burst_key = f"api_throttle_burst_{action}_{client_id}"
-
-        minute_count = cache.get(minute_key, 0)
-        burst_count = cache.get(burst_key, 0)
+        prefixo = cache_versionado.chave(
+            NAMESPACE_LIMITES, "api_throttle", action, client_id
+        )
 
-        # Verificar limites
-        if minute_count >= limits["requests_per_minute"]:
-            return self._create_throttle_response(
-                "minute", limits["requests_per_minute"], minute_count
-            )
+        # Burst antes do minuto: recusas não consomem a cota do minuto
+        excedida = cache_versionado.consumir(
+            [
+                (f"{prefixo}:burst", 10, limits["burst_limit"]),
+                (
+                    f"{prefixo}:minute:{int(current_time // 60)}",
+                    60,
+                    limits["requests_per_minute"],
+                ),
+            ]
+        )
+        if excedida is None:
+            return None
 
-        if burst_count >= limits["burst_limit"]:
+        indice, contagem = excedida
+        if indice == 0:
             return self._create_throttle_response(
-                "burst", limits["burst_limit"], burst_count
+                "burst", limits["burst_limit"], contagem
             )
-
-        # Incrementar contadores
-        cache.set(minute_key, minute_count + 1, timeout=60)
-        cache.set(burst_key, burst_count + 1, timeout=10)
-
-        return None
+        return self._create_throttle_response(
+            "minute", limits["requests_per_minute"], contagem
+        )
 
     def _get_client_identifier(self, request: HttpRequest) -> str:
         """Obtém identificador do cliente para throttling."""
@@ -288,36 +293,42 @@ def rate_limit_decorator(requests_per_minute: int = 60, burst_limit: int = 10):
             client_id = _get_client_identifier(request)
 
             current_time = time.time()
-            minute_key = f"custom_rate_limit_{client_id}_{int(current_time // 60)}"
-            burst_key = f"custom_burst_limit_{client_id}"
+            prefixo = cache_versionado.chave(
+                NAMESPACE_LIMITES, "custom_rate_limit", client_id
+            )
 
-            minute_count = cache.get(minute_key, 0)
-            burst_count = cache.get(burst_key, 0)
+            # Burst antes do minuto: recusas não consomem a cota do minuto
+            excedida = cache_versionado.consumir(
+                [
+                    (f"{prefixo}:burst", 10, burst_limit),
+                    (
+                        f"{prefixo}:minute:{int(current_time // 60)}",
+                        60,
+                        requests_per_minute,
+                    ),
+                ]
+            )
 
-            if minute_count >= requests_per_minute:
+            if excedida is not None:
+                indice, contagem = excedida
+                if indice == 0:
+                    return JsonResponse(
+                        {
+                            "error": "Burst limit exceeded",
+                            "limit": burst_limit,
+                            "current": contagem,
+                        },
+                        status=429,
+                    )
                 return JsonResponse(
                     {
                         "error": "Rate limit exceeded",
                         "limit": requests_per_minute,
-                        "current": minute_count,
+                        "current": contagem,
                     },
                     status=429,
                 )
 
-            if burst_count >= burst_limit:
-                return JsonResponse(
-                    {
-                        "error": "Burst limit exceeded",
-                        "limit": burst_limit,
-                        "current": burst_count,
-                    },
-                    status=429,
-                )
-
-            # Incrementar contadores
-            cache.set(minute_key, minute_count + 1, timeout=60)
-            cache.set(burst_key, burst_count + 1, timeout=10)
-
             return view_func(request, *args, **kwargs)
 
         return wrapper
@@ -3,13 +3,44 @@ Modelos para o app relatorios_presenca.
 Gerencia configurações e histórico de relatórios de presença.
 """
 
+import os
+
 from django.db import models
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
 from django.utils import timezone
+from django.utils.deconstruct import deconstructible
 from django.core.exceptions import ValidationError
 import json
 
 
+@deconstructible
+class ArmazenamentoRelatoriosGerados(FileSystemStorage):
+    """
+    Armazenamento dos arquivos de relatórios gerados.
+
+    Fica fora de MEDIA_ROOT (``RELATORIOS_GERADOS_ROOT``), pois os arquivos
+    só podem ser baixados pela view autenticada de download.
+    """
+
+    @property
+    def base_location(self):
+        return getattr(
+            settings,
+            "RELATORIOS_GERADOS_ROOT",
+            os.path.join(settings.BASE_DIR, "relatorios_gerados"),
+        )
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    @property
+    def base_url(self):
+        return None
+
+
 class ConfiguracaoRelatorio(models.Model):
     """
     Configurações para geração de relatórios de presença.
@@ -78,6 +109,7 @@ class ConfiguracaoRelatorio(models.Model):
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
 
     class Meta:
+        app_label = "relatorios_presenca"
         verbose_name = "Configuração de Relatório"
         verbose_name_plural = "Configurações de Relatórios"
         ordering = ["tipo_relatorio", "nome"]
@@ -140,7 +172,8 @@ class HistoricoRelatorio(models.Model):
     )
 
     arquivo_gerado = models.FileField(
-        upload_to="relatorios_gerados/%Y/%m/",
+        upload_to="%Y/%m/",
+        storage=ArmazenamentoRelatoriosGerados(),
         blank=True,
         null=True,
         verbose_name="Arquivo Gerado",
@@ -154,6 +187,17 @@ class HistoricoRelatorio(models.Model):
         null=True, blank=True, verbose_name="Tamanho do Arquivo (bytes)"
     )
 
+    checksum = models.CharField(
+        max_length=64, blank=True, verbose_name="Checksum (SHA-256)"
+    )
+
+    chave_parametros = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name="Chave dos Parâmetros",
+        help_text="Hash do template, formato e filtros (reaproveitamento)",
+    )
+
     status = models.CharField(
         max_length=15,
         choices=STATUS_CHOICES,
@@ -161,6 +205,13 @@ class HistoricoRelatorio(models.Model):
         verbose_name="Status",
     )
 
+    destinos_pendentes = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name="Destinos Pendentes",
+        help_text="Pares [usuario_id, emails] que recebem o link ao concluir",
+    )
+
     mensagem_erro = models.TextField(
         blank=True, null=True, verbose_name="Mensagem de Erro"
     )
@@ -174,6 +225,7 @@ class HistoricoRelatorio(models.Model):
     )
 
     class Meta:
+        app_label = "relatorios_presenca"
         verbose_name = "Histórico de Relatório"
         verbose_name_plural = "Históricos de Relatórios"
         ordering = ["-data_geracao"]
@@ -181,6 +233,10 @@ class HistoricoRelatorio(models.Model):
             models.Index(fields=["usuario", "data_geracao"]),
             models.Index(fields=["tipo_relatorio"]),
             models.Index(fields=["status"]),
+            models.Index(
+                fields=["chave_parametros", "data_geracao"],
+                name="historico_chave_data_idx",
+            ),
         ]
 
     def __str__(self):
@@ -271,18 +327,26 @@ class AgendamentoRelatorio(models.Model):
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
 
     class Meta:
+        app_label = "relatorios_presenca"
         verbose_name = "Agendamento de Relatório"
         verbose_name_plural = "Agendamentos de Relatórios"
         ordering = ["nome"]
+        indexes = [
+            # Consulta do despacho: ativo=True, proxima_execucao <= agora
+            models.Index(
+                fields=["ativo", "proxima_execucao"],
+                name="agendamento_ativo_prox_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.nome} - {self.get_frequencia_display()}"
 
-    def calcular_proxima_execucao(self):
-        """Calcula a próxima data de execução."""
+    def calcular_proxima_execucao(self, agora=None):
+        """Calcula a próxima data de execução a partir de ``agora``."""
         from datetime import timedelta
 
-        agora = timezone.now()
+        agora = agora or timezone.now()
         base_date = agora.replace(
             hour=self.hora_execucao.hour,
             minute=self.hora_execucao.minute,
@@ -305,22 +369,22 @@ class AgendamentoRelatorio(models.Model):
             self.proxima_execucao = base_date + timedelta(days=15)
 
         elif self.frequencia == "mensal":
-            if agora.month == 12:
-                proximo_mes = base_date.replace(year=agora.year + 1, month=1)
-            else:
-                proximo_mes = base_date.replace(month=agora.month + 1)
-            self.proxima_execucao = proximo_mes
+            self.proxima_execucao = self._somar_meses(base_date, 1)
 
         elif self.frequencia == "trimestral":
-            meses_adicionar = 3
-            novo_mes = agora.month + meses_adicionar
-            novo_ano = agora.year
-
-            while novo_mes > 12:
-                novo_mes -= 12
-                novo_ano += 1
-
-            self.proxima_execucao = base_date.replace(year=novo_ano, month=novo_mes)
+            self.proxima_execucao = self._somar_meses(base_date, 3)
+
+    @staticmethod
+    def _somar_meses(data, meses):
+        """Soma meses mantendo o dia, limitado ao último dia do mês (31/01 -> 28/02)."""
+        from calendar import monthrange
+
+        ano, mes = divmod(data.month - 1 + meses, 12)
+        ano += data.year
+        mes += 1
+        return data.replace(
+            year=ano, month=mes, day=min(data.day, monthrange(ano, mes)[1])
+        )
 
     def save(self, *args, **kwargs):
         """Sobrescreve save para calcular próxima execução."""
@@ -364,6 +428,7 @@ class TemplatePersonalizado(models.Model):
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
 
     class Meta:
+        app_label = "relatorios_presenca"
         verbose_name = "Template Personalizado"
         verbose_name_plural = "Templates Personalizados"
         ordering = ["tipo_relatorio", "nome"]
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "omaum.middleware.performance.PerformanceMonitoringMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -113,6 +114,23 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Relatórios exportados em segundo plano (fora de MEDIA_ROOT: download só
+# pela view autenticada)
+RELATORIOS_GERADOS_ROOT = config(
+    "RELATORIOS_GERADOS_ROOT", default=os.path.join(BASE_DIR, "relatorios_gerados")
+)
+# Janela em que uma exportação idêntica reaproveita o arquivo já gerado
+EXPORTACAO_REUTILIZAR_MINUTOS = config(
+    "EXPORTACAO_REUTILIZAR_MINUTOS", default=30, cast=int
+)
+# Pedido em processamento há mais tempo que isso é considerado abandonado
+# (worker interrompido) e deixa de ser reaproveitado
+EXPORTACAO_TIMEOUT_GERACAO_MINUTOS = config(
+    "EXPORTACAO_TIMEOUT_GERACAO_MINUTOS", default=15, cast=int
+)
+# Endereço público usado nos links enviados por e-mail
+SITE_URL = config("SITE_URL", default="http://localhost:8000")
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
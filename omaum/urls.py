@@ -12,6 +12,11 @@ from core import views as core_views
 
 urlpatterns = [
     path("health/", core_views.health_check, name="health_check"),
+    path(
+        "metricas/performance/",
+        core_views.metricas_performance,
+        name="metricas_performance",
+    ),
     # URLs de autenticação do Django
     path("accounts/login/", core_views.CustomLoginView.as_view(), name="login"),
     path("accounts/", include("django.contrib.auth.urls")),
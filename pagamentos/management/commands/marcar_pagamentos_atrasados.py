@@ -0,0 +1,38 @@
+"""Comando para marcar como ATRASADO os pagamentos pendentes vencidos."""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pagamentos.services import StatusPagamentoService
+
+
+class Command(BaseCommand):
+    """Executa a transição PENDENTE -> ATRASADO em um único UPDATE."""
+
+    help = (
+        "Marca como ATRASADO todos os pagamentos pendentes com vencimento "
+        "anterior à data de referência e aquece os caches de painel"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--data", help="Data de referência (YYYY-MM-DD, padrão: hoje)"
+        )
+
+    def handle(self, *args, **options):
+        """Executa a transição de status."""
+        data_referencia = None
+        if options["data"]:
+            try:
+                data_referencia = datetime.strptime(options["data"], "%Y-%m-%d").date()
+            except ValueError as exc:
+                raise CommandError(f"Data inválida: {options['data']}") from exc
+
+        resultado = StatusPagamentoService.marcar_atrasados(data_referencia)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {resultado['atualizados']} pagamento(s) marcados como "
+                f"ATRASADO em {resultado['duracao']}s"
+            )
+        )
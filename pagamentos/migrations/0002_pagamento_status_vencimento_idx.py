@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0014_update_foto_upload_path'),
+        ('pagamentos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pagamento',
+            index=models.Index(fields=['status', 'data_vencimento'], name='pag_status_venc_idx'),
+        ),
+    ]
@@ -97,6 +97,11 @@ class Pagamento(models.Model):
         verbose_name = _("Pagamento")
         verbose_name_plural = _("Pagamentos")
         ordering = ["-data_vencimento"]
+        indexes = [
+            models.Index(
+                fields=["status", "data_vencimento"], name="pag_status_venc_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Pagamento de {self.aluno.nome} - R$ {self.valor} ({self.get_status_display()})"
@@ -2,13 +2,20 @@
 Services para o app Pagamentos - Lógica de negócios
 """
 
+import datetime
 import importlib
+import time
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
 from django.utils import timezone
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
 from decimal import Decimal
 import logging
 
+from core import cache_versionado
+
 logger = logging.getLogger(__name__)
 
 
@@ -346,3 +353,339 @@ class PagamentoService:
 
         # Outras regras de negócio podem ser adicionadas aqui
         return True
+
+
+class ResumoAtrasadosService:
+    """
+    Resumo em cache dos pagamentos atrasados exibido no menu de notificações.
+
+    Guarda a contagem e os N pagamentos mais atrasados; é invalidado pelos
+    signals de Pagamento e recalculado na próxima leitura.
+    """
+
+    NAMESPACE = ("pagamentos", "atrasados")
+    CACHE_KEY = "pagamentos:atrasados:resumo"
+    CACHE_TTL = 600
+    LIMITE_ITENS = 5
+
+    @staticmethod
+    def _get_model():
+        pagamentos_module = importlib.import_module("pagamentos.models")
+        return getattr(pagamentos_module, "Pagamento")
+
+    @classmethod
+    def obter(cls):
+        """
+        Retorna o resumo dos pagamentos atrasados.
+
+        Returns:
+            Dict com ``total`` e ``itens`` (dicts com id, aluno, valor,
+            data_vencimento e dias_atraso, nos mesmos caminhos de atributo do
+            modelo), do mais antigo para o mais recente
+        """
+        resumo = cache_versionado.obter_ou_calcular(
+            cls.NAMESPACE, (cls.CACHE_KEY,), cls._calcular, cls.CACHE_TTL
+        )
+
+        # Dias de atraso calculados na leitura para não envelhecerem no cache
+        hoje = timezone.now().date()
+        return {
+            "total": resumo["total"],
+            "itens": [
+                {**item, "dias_atraso": max((hoje - item["data_vencimento"]).days, 0)}
+                for item in resumo["itens"]
+            ],
+        }
+
+    @classmethod
+    def invalidar(cls):
+        """Invalida o resumo em cache após a transação corrente."""
+        transaction.on_commit(lambda: cache_versionado.invalidar(cls.NAMESPACE))
+
+    @classmethod
+    def aquecer(cls):
+        """Recalcula e grava o resumo no cache imediatamente."""
+        resumo = cls._calcular()
+        cache.set(
+            cache_versionado.chave(cls.NAMESPACE, cls.CACHE_KEY),
+            resumo,
+            cls.CACHE_TTL,
+        )
+        return resumo
+
+    @classmethod
+    def listar(cls, pagina=1, por_pagina=50):
+        """
+        Lista paginada de todos os pagamentos atrasados (sem cache).
+
+        Returns:
+            Dict com total, página atual, total de páginas e itens
+        """
+        from django.core.paginator import Paginator
+
+        queryset = (
+            cls._get_model()
+            .objects.filter(status="ATRASADO")
+            .order_by("data_vencimento", "id")
+            .values("id", "aluno__nome", "valor", "data_vencimento", "observacoes")
+        )
+        pagina_atual = Paginator(queryset, por_pagina).get_page(pagina)
+        hoje = timezone.now().date()
+        return {
+            "total": pagina_atual.paginator.count,
+            "pagina": pagina_atual.number,
+            "paginas": pagina_atual.paginator.num_pages,
+            "itens": [
+                {
+                    "id": linha["id"],
+                    "aluno": {"nome": linha["aluno__nome"]},
+                    "valor": linha["valor"],
+                    "data_vencimento": linha["data_vencimento"],
+                    "observacoes": linha["observacoes"] or "",
+                    "dias_atraso": max((hoje - linha["data_vencimento"]).days, 0),
+                }
+                for linha in pagina_atual.object_list
+            ],
+        }
+
+    @classmethod
+    def _calcular(cls):
+        atrasados = cls._get_model().objects.filter(status="ATRASADO")
+        itens = [
+            {
+                "id": linha["id"],
+                "aluno": {"nome": linha["aluno__nome"]},
+                "valor": linha["valor"],
+                "data_vencimento": linha["data_vencimento"],
+            }
+            for linha in atrasados.order_by("data_vencimento", "id").values(
+                "id", "aluno__nome", "valor", "data_vencimento"
+            )[: cls.LIMITE_ITENS]
+        ]
+        return {"total": atrasados.count(), "itens": itens}
+
+
+class StatusPagamentoService:
+    """Transições de status de pagamentos executadas em lote."""
+
+    @staticmethod
+    def marcar_atrasados(data_referencia=None):
+        """
+        Move para ATRASADO todos os pagamentos pendentes já vencidos.
+
+        Executa um único UPDATE no banco e, em seguida, aquece os caches de
+        painel que dependem do status dos pagamentos.
+
+        Args:
+            data_referencia: Data de corte (padrão: hoje)
+
+        Returns:
+            Dict com quantidade de pagamentos atualizados, data de
+            referência e duração em segundos
+        """
+        data_referencia = data_referencia or timezone.now().date()
+        Pagamento = ResumoAtrasadosService._get_model()
+
+        inicio = time.perf_counter()
+        atualizados = Pagamento.objects.filter(
+            status="PENDENTE", data_vencimento__lt=data_referencia
+        ).update(status="ATRASADO")
+        duracao = round(time.perf_counter() - inicio, 3)
+
+        logger.info(
+            f"{atualizados} pagamento(s) marcados como ATRASADO "
+            f"(vencimento < {data_referencia}) em {duracao}s"
+        )
+
+        # update() não dispara signals: recalcular os resumos em cache
+        ResumoAtrasadosService.aquecer()
+        PainelFinanceiroService.aquecer()
+
+        return {
+            "atualizados": atualizados,
+            "data_referencia": data_referencia.isoformat(),
+            "duracao": duracao,
+        }
+
+
+class PainelFinanceiroService:
+    """
+    Agregações financeiras dos painéis de pagamentos, em cache por dia.
+
+    Contagens e somas por status, a série dos últimos meses, os métodos de
+    pagamento e os recebimentos diários do mês são obtidos com agregação
+    condicional em quatro consultas agrupadas, compartilhadas por
+    ``painel_geral``, ``painel_mensal`` e ``painel_financeiro``.
+    """
+
+    NAMESPACE = ("pagamentos", "painel_financeiro")
+    CACHE_PREFIX = "pagamentos:painel_financeiro"
+    CACHE_TTL = 60 * 60 * 24
+    MESES_SERIE = 6
+
+    @classmethod
+    def obter(cls, hoje=None):
+        """
+        Retorna as agregações financeiras do dia.
+
+        Returns:
+            Dict com ``contagens``, ``valores``, ``faixas_atraso``,
+            ``por_mes``, ``metodos`` e ``pagos_por_dia``
+        """
+        hoje = hoje or timezone.now().date()
+        return cache_versionado.obter_ou_calcular(
+            cls.NAMESPACE,
+            (cls.CACHE_PREFIX, hoje.isoformat()),
+            lambda: cls._calcular(hoje),
+            cls.CACHE_TTL,
+        )
+
+    @classmethod
+    def invalidar(cls):
+        """Invalida as agregações em cache após a transação corrente."""
+        transaction.on_commit(lambda: cache_versionado.invalidar(cls.NAMESPACE))
+
+    @classmethod
+    def aquecer(cls):
+        """Recalcula e grava as agregações do dia no cache imediatamente."""
+        hoje = timezone.now().date()
+        dados = cls._calcular(hoje)
+        cache.set(
+            cache_versionado.chave(cls.NAMESPACE, cls.CACHE_PREFIX, hoje.isoformat()),
+            dados,
+            cls.CACHE_TTL,
+        )
+        return dados
+
+    @staticmethod
+    def _somar_mes(data, meses):
+        """Primeiro dia do mês deslocado em ``meses`` a partir de ``data``."""
+        indice = data.year * 12 + data.month - 1 + meses
+        return datetime.date(indice // 12, indice % 12 + 1, 1)
+
+    @classmethod
+    def _calcular(cls, hoje):
+        Pagamento = ResumoAtrasadosService._get_model()
+        pagamentos = Pagamento.objects.order_by()
+
+        pago = Q(status="PAGO")
+        pendente = Q(status="PENDENTE")
+        atrasado = Q(status="ATRASADO")
+        valor_recebido = Coalesce("valor_pago", "valor")
+        limite_15 = hoje - datetime.timedelta(days=15)
+        limite_30 = hoje - datetime.timedelta(days=30)
+
+        # 1) Contagens, somas e faixas de atraso em uma única agregação
+        totais = pagamentos.aggregate(
+            total=Count("id"),
+            pagos=Count("id", filter=pago),
+            pendentes=Count("id", filter=pendente),
+            atrasados=Count("id", filter=atrasado),
+            cancelados=Count("id", filter=Q(status="CANCELADO")),
+            valor_pago=Sum(valor_recebido, filter=pago),
+            valor_pendente=Sum("valor", filter=pendente),
+            valor_atrasado=Sum("valor", filter=atrasado),
+            atrasados_ate_15=Count(
+                "id", filter=atrasado & Q(data_vencimento__gte=limite_15)
+            ),
+            atrasados_15_30=Count(
+                "id",
+                filter=atrasado
+                & Q(data_vencimento__lt=limite_15, data_vencimento__gte=limite_30),
+            ),
+            atrasados_mais_30=Count(
+                "id", filter=atrasado & Q(data_vencimento__lt=limite_30)
+            ),
+        )
+
+        # 2) Série mensal por vencimento, agrupada por TruncMonth
+        mes_atual = hoje.replace(day=1)
+        inicio_serie = cls._somar_mes(mes_atual, -(cls.MESES_SERIE - 1))
+        linhas_mes = {
+            linha["mes"]: linha
+            for linha in pagamentos.filter(
+                data_vencimento__gte=inicio_serie,
+                data_vencimento__lt=cls._somar_mes(mes_atual, 1),
+            )
+            .annotate(mes=TruncMonth("data_vencimento"))
+            .values("mes")
+            .annotate(
+                total=Sum("valor"),
+                pagos=Count("id", filter=pago),
+                pendentes=Count("id", filter=pendente),
+                atrasados=Count("id", filter=atrasado),
+                valor_pago=Sum(valor_recebido, filter=pago),
+                valor_pendente=Sum("valor", filter=pendente),
+                valor_atrasado=Sum("valor", filter=atrasado),
+            )
+        }
+        campos_mes = (
+            "total",
+            "pagos",
+            "pendentes",
+            "atrasados",
+            "valor_pago",
+            "valor_pendente",
+            "valor_atrasado",
+        )
+        por_mes = []
+        for deslocamento in range(cls.MESES_SERIE):
+            mes = cls._somar_mes(inicio_serie, deslocamento)
+            linha = linhas_mes.get(mes, {})
+            por_mes.append(
+                {"mes": mes, **{campo: linha.get(campo) or 0 for campo in campos_mes}}
+            )
+
+        # 3) Métodos de pagamento (geral e do mês corrente)
+        metodos = list(
+            pagamentos.filter(pago)
+            .values("metodo_pagamento")
+            .annotate(
+                total=Count("id"),
+                total_mes=Count(
+                    "id",
+                    filter=Q(
+                        data_vencimento__gte=mes_atual,
+                        data_vencimento__lt=cls._somar_mes(mes_atual, 1),
+                    ),
+                ),
+            )
+            .order_by("-total")
+        )
+
+        # 4) Recebimentos diários do mês corrente
+        recebidos = dict(
+            pagamentos.filter(
+                pago, data_pagamento__gte=mes_atual, data_pagamento__lte=hoje
+            )
+            .values("data_pagamento")
+            .annotate(valor=Sum(valor_recebido))
+            .values_list("data_pagamento", "valor")
+        )
+        pagos_por_dia = [
+            {"data": data, "valor": recebidos.get(data) or 0}
+            for data in (
+                mes_atual + datetime.timedelta(days=dia)
+                for dia in range((hoje - mes_atual).days + 1)
+            )
+        ]
+
+        return {
+            "contagens": {
+                campo: totais[campo]
+                for campo in ("total", "pagos", "pendentes", "atrasados", "cancelados")
+            },
+            "valores": {
+                "pago": totais["valor_pago"] or 0,
+                "pendente": totais["valor_pendente"] or 0,
+                "atrasado": totais["valor_atrasado"] or 0,
+            },
+            "faixas_atraso": {
+                "ate_15": totais["atrasados_ate_15"],
+                "15_30": totais["atrasados_15_30"],
+                "mais_30": totais["atrasados_mais_30"],
+            },
+            "por_mes": por_mes,
+            "metodos": metodos,
+            "pagos_por_dia": pagos_por_dia,
+        }
@@ -0,0 +1,27 @@
+"""
+Tasks assíncronas para o aplicativo de pagamentos.
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def marcar_pagamentos_atrasados(self):
+    """
+    Task periódica que marca como ATRASADO os pagamentos pendentes vencidos.
+
+    Um único UPDATE cobre todos os pagamentos, inclusive os que não são
+    alterados por nenhum usuário; os caches de painel são aquecidos ao final.
+    """
+    try:
+        from .services import StatusPagamentoService
+
+        return StatusPagamentoService.marcar_atrasados()
+
+    except Exception as exc:
+        logger.error(f"Erro ao marcar pagamentos atrasados: {str(exc)}")
+        raise self.retry(exc=exc)
@@ -20,7 +20,12 @@ from .views.relatorio_views import (
     dados_grafico_pagamentos,
     dados_distribuicao_pagamentos,
 )
-from .views.dashboard_views import painel_geral, painel_mensal, painel_financeiro
+from .views.dashboard_views import (
+    painel_geral,
+    painel_mensal,
+    painel_financeiro,
+    pagamentos_atrasados_ajax,
+)
 
 app_name = "pagamentos"
 
@@ -52,6 +57,9 @@ urlpatterns = [
     path("painel/", painel_geral, name="painel_geral"),
     path("painel/mensal/", painel_mensal, name="painel_mensal"),
     path("painel/financeiro/", painel_financeiro, name="painel_financeiro"),
+    path(
+        "atrasados/ajax/", pagamentos_atrasados_ajax, name="pagamentos_atrasados_ajax"
+    ),
     # APIs para gráficos
     path(
         "pagamentos/grafico-pagamentos/",
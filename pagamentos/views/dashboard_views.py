@@ -5,8 +5,9 @@ Views relacionadas ao dashboard financeiro.
 import datetime
 import json
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.urls import reverse
 from django.utils import timezone
 
 
@@ -23,93 +24,55 @@ def get_aluno_model():
     return Aluno
 
 
+def _rotulo_metodo(Pagamento, metodo):
+    return dict(Pagamento.METODO_PAGAMENTO_CHOICES).get(metodo, "Não informado")
+
+
 @login_required
 def painel_geral(request):
     """
     Painel geral do módulo de pagamentos.
     Exibe estatísticas gerais e links para outras seções.
     """
+    from pagamentos.services import PainelFinanceiroService
+
     Pagamento = get_pagamento_model()
     Aluno = get_aluno_model()
-    total_alunos = Aluno.objects.count()
-    total_pagamentos = Pagamento.objects.count()
-    pagamentos_pagos = Pagamento.objects.filter(status="PAGO").count()
-    pagamentos_pendentes = Pagamento.objects.filter(status="PENDENTE").count()
-    pagamentos_atrasados = Pagamento.objects.filter(status="ATRASADO").count()
-    total_pago = sum(
-        [
-            p.valor_pago if p.valor_pago is not None else p.valor
-            for p in Pagamento.objects.filter(status="PAGO")
-        ]
-    )
-    total_pendente = (
-        Pagamento.objects.filter(status="PENDENTE").aggregate(Sum("valor"))[
-            "valor__sum"
-        ]
-        or 0
-    )
-    total_atrasado = (
-        Pagamento.objects.filter(status="ATRASADO").aggregate(Sum("valor"))[
-            "valor__sum"
-        ]
-        or 0
-    )
-    pagamentos_recentes = Pagamento.objects.all().order_by("-data_pagamento")[:5]
+    dados = PainelFinanceiroService.obter()
+    contagens = dados["contagens"]
     hoje = timezone.now().date()
     data_limite = hoje + datetime.timedelta(days=7)
-    pagamentos_proximos = Pagamento.objects.filter(
-        status="PENDENTE", data_vencimento__gte=hoje, data_vencimento__lte=data_limite
-    ).order_by("data_vencimento")[:5]
-    pagamentos_cancelados = Pagamento.objects.filter(status="CANCELADO").count()
-    hoje = timezone.now().date()
-    pagamentos_por_mes = []
-    for i in range(5, -1, -1):
-        mes_data = hoje.replace(day=1)
-        if i > 0:
-            ano = mes_data.year
-            mes = mes_data.month - i
-            if mes <= 0:
-                mes = 12 + mes
-                ano -= 1
-            mes_data = mes_data.replace(year=ano, month=mes)
-        if mes_data.month == 12:
-            ultimo_dia = mes_data.replace(
-                year=mes_data.year + 1, month=1, day=1
-            ) - datetime.timedelta(days=1)
-        else:
-            ultimo_dia = mes_data.replace(
-                month=mes_data.month + 1, day=1
-            ) - datetime.timedelta(days=1)
-        total_mes = (
-            Pagamento.objects.filter(
-                data_vencimento__gte=mes_data, data_vencimento__lte=ultimo_dia
-            ).aggregate(Sum("valor"))["valor__sum"]
-            or 0
-        )
-        pagamentos_por_mes.append(
-            {"mes": mes_data.strftime("%b/%Y"), "total": float(total_mes)}
+    pagamentos_recentes = Pagamento.objects.select_related("aluno").order_by(
+        "-data_pagamento"
+    )[:5]
+    pagamentos_proximos = (
+        Pagamento.objects.select_related("aluno")
+        .filter(
+            status="PENDENTE",
+            data_vencimento__gte=hoje,
+            data_vencimento__lte=data_limite,
         )
+        .order_by("data_vencimento")[:5]
+    )
+    pagamentos_por_mes = [
+        {"mes": item["mes"].strftime("%b/%Y"), "total": float(item["total"])}
+        for item in dados["por_mes"]
+    ]
     context = {
-        "total_alunos": total_alunos,
-        "total_pagamentos": total_pagamentos,
-        "pagamentos_pagos": pagamentos_pagos,
-        "pagamentos_pendentes": pagamentos_pendentes,
-        "pagamentos_atrasados": pagamentos_atrasados,
-        "total_pago": total_pago,
-        "total_pendente": total_pendente,
-        "total_atrasado": total_atrasado,
+        "total_alunos": Aluno.objects.count(),
+        "total_pagamentos": contagens["total"],
+        "pagamentos_pagos": contagens["pagos"],
+        "pagamentos_pendentes": contagens["pendentes"],
+        "pagamentos_atrasados_count": contagens["atrasados"],
+        "total_pago": dados["valores"]["pago"],
+        "total_pendente": dados["valores"]["pendente"],
+        "total_atrasado": dados["valores"]["atrasado"],
         "pagamentos_recentes": pagamentos_recentes,
         "pagamentos_proximos": pagamentos_proximos,
         "pagamentos_por_mes": pagamentos_por_mes,
-        "total_cancelado": pagamentos_cancelados,
+        "total_cancelado": contagens["cancelados"],
     }
-    # Adicione ao contexto de cada view que renderiza templates com base.html
-    Pagamento = get_pagamento_model()
-    pagamentos_atrasados_qs = Pagamento.objects.filter(status="ATRASADO")
-    context["pagamentos_atrasados"] = pagamentos_atrasados_qs  # queryset para o menu
-    context["pagamentos_atrasados_count"] = (
-        pagamentos_atrasados_qs.count()
-    )  # inteiro para badge/card
+    # Lista de atrasados do menu vem de omaum.context_processors
     return render(request, "pagamentos/painel_geral.html", context)
 
 
@@ -119,178 +82,103 @@ def painel_mensal(request):
     Painel mensal específico para análise de pagamentos.
     Exibe gráficos e estatísticas sobre pagamentos.
     """
+    from pagamentos.services import PainelFinanceiroService
+
     Pagamento = get_pagamento_model()
-    hoje = timezone.now().date()
-    mes_atual = hoje.replace(day=1)
-    if mes_atual.month == 12:
-        proximo_mes = mes_atual.replace(year=mes_atual.year + 1, month=1)
-    else:
-        proximo_mes = mes_atual.replace(month=mes_atual.month + 1)
-    pagamentos_mes = Pagamento.objects.filter(
-        data_vencimento__gte=mes_atual, data_vencimento__lt=proximo_mes
-    )
-    pagos_mes = pagamentos_mes.filter(status="PAGO").count()
-    pendentes_mes = pagamentos_mes.filter(status="PENDENTE").count()
-    atrasados_mes = pagamentos_mes.filter(status="ATRASADO").count()
-    valor_pago_mes = sum(
-        [
-            p.valor_pago if p.valor_pago is not None else p.valor
-            for p in pagamentos_mes.filter(status="PAGO")
-        ]
-    )
-    valor_pendente_mes = (
-        pagamentos_mes.filter(status="PENDENTE").aggregate(Sum("valor"))["valor__sum"]
-        or 0
+    dados = PainelFinanceiroService.obter()
+    mes = dados["por_mes"][-1]
+    metodos_mes = sorted(
+        (item for item in dados["metodos"] if item["total_mes"]),
+        key=lambda item: -item["total_mes"],
     )
-    valor_atrasado_mes = (
-        pagamentos_mes.filter(status="ATRASADO").aggregate(Sum("valor"))["valor__sum"]
-        or 0
-    )
-    dias = []
-    valores_por_dia = []
-    for dia in range(1, (proximo_mes - mes_atual).days):
-        data = mes_atual + datetime.timedelta(days=dia - 1)
-        if data > hoje:
-            break
-        pagamentos_dia = Pagamento.objects.filter(data_pagamento=data, status="PAGO")
-        valor_dia = sum(
+    context = {
+        "pagos_mes": mes["pagos"],
+        "pendentes_mes": mes["pendentes"],
+        "atrasados_mes": mes["atrasados"],
+        "valor_pago_mes": mes["valor_pago"],
+        "valor_pendente_mes": mes["valor_pendente"],
+        "valor_atrasado_mes": mes["valor_atrasado"],
+        "dias": json.dumps(
+            [item["data"].strftime("%d/%m") for item in dados["pagos_por_dia"]]
+        ),
+        "valores_por_dia": json.dumps(
+            [float(item["valor"]) for item in dados["pagos_por_dia"]]
+        ),
+        "metodos": json.dumps(
             [
-                p.valor_pago if p.valor_pago is not None else p.valor
-                for p in pagamentos_dia
+                _rotulo_metodo(Pagamento, item["metodo_pagamento"])
+                for item in metodos_mes
             ]
-        )
-        dias.append(data.strftime("%d/%m"))
-        valores_por_dia.append(float(valor_dia))
-    pagamentos_por_metodo = (
-        pagamentos_mes.filter(status="PAGO")
-        .values("metodo_pagamento")
-        .annotate(total=Count("id"))
-        .order_by("-total")
-    )
-    metodos = []
-    contagens = []
-    for item in pagamentos_por_metodo:
-        metodo = dict(Pagamento.METODO_PAGAMENTO_CHOICES).get(
-            item["metodo_pagamento"], "Não informado"
-        )
-        metodos.append(metodo)
-        contagens.append(item["total"])
-    hoje = timezone.now().date()
-    atrasados_ate_15 = Pagamento.objects.filter(
-        status="ATRASADO", data_vencimento__gte=hoje - datetime.timedelta(days=15)
-    ).count()
-    atrasados_15_30 = Pagamento.objects.filter(
-        status="ATRASADO",
-        data_vencimento__lt=hoje - datetime.timedelta(days=15),
-        data_vencimento__gte=hoje - datetime.timedelta(days=30),
-    ).count()
-    atrasados_mais_30 = Pagamento.objects.filter(
-        status="ATRASADO", data_vencimento__lt=hoje - datetime.timedelta(days=30)
-    ).count()
-    context = {
-        "pagos_mes": pagos_mes,
-        "pendentes_mes": pendentes_mes,
-        "atrasados_mes": atrasados_mes,
-        "valor_pago_mes": valor_pago_mes,
-        "valor_pendente_mes": valor_pendente_mes,
-        "valor_atrasado_mes": valor_atrasado_mes,
-        "dias": json.dumps(dias),
-        "valores_por_dia": json.dumps(valores_por_dia),
-        "metodos": json.dumps(metodos),
-        "contagens": json.dumps(contagens),
-        "atrasados_ate_15": atrasados_ate_15,
-        "atrasados_15_30": atrasados_15_30,
-        "atrasados_mais_30": atrasados_mais_30,
-        "mes_atual": mes_atual.strftime("%B/%Y"),
+        ),
+        "contagens": json.dumps([item["total_mes"] for item in metodos_mes]),
+        "atrasados_ate_15": dados["faixas_atraso"]["ate_15"],
+        "atrasados_15_30": dados["faixas_atraso"]["15_30"],
+        "atrasados_mais_30": dados["faixas_atraso"]["mais_30"],
+        "mes_atual": mes["mes"].strftime("%B/%Y"),
     }
-    # Adicione ao contexto de cada view que renderiza templates com base.html
-    Pagamento = get_pagamento_model()
-    pagamentos_atrasados_qs = Pagamento.objects.filter(status="ATRASADO")
-    context["pagamentos_atrasados"] = pagamentos_atrasados_qs
-    context["pagamentos_atrasados_count"] = pagamentos_atrasados_qs.count()
+    # Contagem/lista de atrasados do menu vêm de omaum.context_processors
     return render(request, "pagamentos/painel_mensal.html", context)
 
 
 @login_required
 def painel_financeiro(request):
     """Exibe o painel financeiro."""
+    from pagamentos.services import PainelFinanceiroService
+
     Pagamento = get_pagamento_model()
-    hoje = timezone.now().date()
-    pagamentos_pagos = Pagamento.objects.filter(status="PAGO")
-    pagamentos_pendentes = Pagamento.objects.filter(status="PENDENTE")
-    pagamentos_atrasados = Pagamento.objects.filter(status="ATRASADO")
-    total_pago = sum(
-        [
-            p.valor_pago if p.valor_pago is not None else p.valor
-            for p in pagamentos_pagos
-        ]
-    )
-    total_pendente = pagamentos_pendentes.aggregate(Sum("valor"))["valor__sum"] or 0
-    total_atrasado = pagamentos_atrasados.aggregate(Sum("valor"))["valor__sum"] or 0
-    meses = []
-    valores_pagos = []
-    valores_pendentes = []
-    for i in range(5, -1, -1):
-        mes_data = hoje.replace(day=1)
-        if i > 0:
-            ano = mes_data.year
-            mes = mes_data.month - i
-            if mes <= 0:
-                mes = 12 + mes
-                ano -= 1
-            mes_data = mes_data.replace(year=ano, month=mes)
-        if mes_data.month == 12:
-            ultimo_dia = mes_data.replace(
-                year=mes_data.year + 1, month=1, day=1
-            ) - datetime.timedelta(days=1)
-        else:
-            ultimo_dia = mes_data.replace(
-                month=mes_data.month + 1, day=1
-            ) - datetime.timedelta(days=1)
-        pagamentos_mes = Pagamento.objects.filter(
-            data_vencimento__gte=mes_data, data_vencimento__lte=ultimo_dia
-        )
-        total_pago_mes = sum(
+    dados = PainelFinanceiroService.obter()
+    context = {
+        "total_pago": dados["valores"]["pago"],
+        "total_pendente": dados["valores"]["pendente"],
+        "total_atrasado": dados["valores"]["atrasado"],
+        "meses": json.dumps(
+            [item["mes"].strftime("%b/%Y") for item in dados["por_mes"]]
+        ),
+        "valores_pagos": json.dumps(
+            [float(item["valor_pago"]) for item in dados["por_mes"]]
+        ),
+        "valores_pendentes": json.dumps(
+            [float(item["valor_pendente"]) for item in dados["por_mes"]]
+        ),
+        "metodos": json.dumps(
             [
-                p.valor_pago if p.valor_pago is not None else p.valor
-                for p in pagamentos_mes.filter(status="PAGO")
+                _rotulo_metodo(Pagamento, item["metodo_pagamento"])
+                for item in dados["metodos"]
             ]
-        )
-        total_pendente_mes = (
-            pagamentos_mes.filter(status="PENDENTE").aggregate(Sum("valor"))[
-                "valor__sum"
-            ]
-            or 0
-        )
-        meses.append(mes_data.strftime("%b/%Y"))
-        valores_pagos.append(float(total_pago_mes))
-        valores_pendentes.append(float(total_pendente_mes))
-    pagamentos_por_metodo = (
-        pagamentos_pagos.values("metodo_pagamento")
-        .annotate(total=Count("id"))
-        .order_by("-total")
-    )
-    metodos = []
-    contagens = []
-    for item in pagamentos_por_metodo:
-        metodo = dict(Pagamento.METODO_PAGAMENTO_CHOICES).get(
-            item["metodo_pagamento"], "Não informado"
-        )
-        metodos.append(metodo)
-        contagens.append(item["total"])
-    context = {
-        "total_pago": total_pago,
-        "total_pendente": total_pendente,
-        "total_atrasado": total_atrasado,
-        "meses": json.dumps(meses),
-        "valores_pagos": json.dumps(valores_pagos),
-        "valores_pendentes": json.dumps(valores_pendentes),
-        "metodos": json.dumps(metodos),
-        "contagens": json.dumps(contagens),
+        ),
+        "contagens": json.dumps([item["total"] for item in dados["metodos"]]),
     }
-    # Adicione ao contexto de cada view que renderiza templates com base.html
-    Pagamento = get_pagamento_model()
-    pagamentos_atrasados_qs = Pagamento.objects.filter(status="ATRASADO")
-    context["pagamentos_atrasados"] = pagamentos_atrasados_qs
-    context["pagamentos_atrasados_count"] = pagamentos_atrasados_qs.count()
+    # A tabela de atrasados é paginada via pagamentos_atrasados_ajax
     return render(request, "pagamentos/painel_financeiro.html", context)
+
+
+@login_required
+def pagamentos_atrasados_ajax(request):
+    """
+    Lista paginada dos pagamentos atrasados em JSON.
+
+    Substitui a lista completa que era montada no contexto global de todas
+    as páginas; o menu exibe apenas o resumo em cache.
+    """
+    from pagamentos.services import ResumoAtrasadosService
+
+    try:
+        por_pagina = max(1, min(int(request.GET.get("por_pagina", 50)), 200))
+    except ValueError:
+        por_pagina = 50
+    resultado = ResumoAtrasadosService.listar(
+        pagina=request.GET.get("page", 1), por_pagina=por_pagina
+    )
+    resultado["itens"] = [
+        {
+            "id": item["id"],
+            "aluno_nome": item["aluno"]["nome"],
+            "valor": float(item["valor"]),
+            "data_vencimento": item["data_vencimento"].isoformat(),
+            "observacoes": item["observacoes"],
+            "dias_atraso": item["dias_atraso"],
+            "url": reverse("pagamentos:detalhar_pagamento", args=[item["id"]]),
+        }
+        for item in resultado["itens"]
+    ]
+    return JsonResponse(resultado)
@@ -6,6 +6,9 @@ import json
 import logging
 from functools import wraps
 from django.views.decorators.csrf import csrf_exempt
+
+from core import cache_versionado
+
 from .utils import api_response, log_api_request, validate_required_fields
 
 logger = logging.getLogger(__name__)
@@ -139,9 +142,9 @@ def api_handle_exceptions(view_func):
                     "view_func": view_func.__name__,
                     "request_path": request.path,
                     "request_method": request.method,
-                    "user_id": request.user.id
-                    if request.user.is_authenticated
-                    else None,
+                    "user_id": (
+                        request.user.id if request.user.is_authenticated else None
+                    ),
                 },
             )
 
@@ -205,8 +208,6 @@ def api_throttle(rate_limit=100):
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            from django.core.cache import cache
-
             # Identificar cliente
             if request.user.is_authenticated:
                 client_id = f"user_{request.user.id}"
@@ -219,13 +220,17 @@ def api_throttle(rate_limit=100):
                 client_id = f"ip_{ip}"
 
             # Chave do cache
-            cache_key = f"throttle_{view_func.__name__}_{client_id}"
+            cache_key = cache_versionado.chave(
+                "limites", "throttle", view_func.__name__, client_id
+            )
 
-            # Obter contador atual
-            current_requests = cache.get(cache_key, 0)
+            # Incrementar contador (INCR atômico); recusas são desfeitas
+            excedida = cache_versionado.consumir(
+                [(cache_key, 3600, rate_limit)]  # 1 hora
+            )
 
             # Verificar limite
-            if current_requests >= rate_limit:
+            if excedida is not None:
                 return api_response(
                     success=False,
                     message="Limite de requisições excedido",
@@ -233,9 +238,6 @@ def api_throttle(rate_limit=100):
                     status_code=429,
                 )
 
-            # Incrementar contador
-            cache.set(cache_key, current_requests + 1, 3600)  # 1 hora
-
             return view_func(request, *args, **kwargs)
 
         return wrapper
@@ -6,6 +6,9 @@ import json
 import logging
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
+
+from core import cache_versionado
+
 from .utils import log_api_request
 
 logger = logging.getLogger(__name__)
@@ -60,9 +63,9 @@ class PresencasAPIMiddleware(MiddlewareMixin):
                 extra={
                     "request_path": request.path,
                     "request_method": request.method,
-                    "user_id": request.user.id
-                    if request.user.is_authenticated
-                    else None,
+                    "user_id": (
+                        request.user.id if request.user.is_authenticated else None
+                    ),
                 },
             )
 
@@ -97,9 +100,9 @@ class PresencasAPIMiddleware(MiddlewareMixin):
                         "request_path": request.path,
                         "request_method": request.method,
                         "status_code": response.status_code,
-                        "user_id": request.user.id
-                        if request.user.is_authenticated
-                        else None,
+                        "user_id": (
+                            request.user.id if request.user.is_authenticated else None
+                        ),
                     },
                 )
 
@@ -152,8 +155,6 @@ class RateLimitMiddleware(MiddlewareMixin):
         Verifica rate limit para APIs de presenças.
         """
         if request.path.startswith("/presencas/api/"):
-            from django.core.cache import cache
-
             # Identificar cliente
             if request.user.is_authenticated:
                 client_id = f"user_{request.user.id}"
@@ -161,13 +162,15 @@ class RateLimitMiddleware(MiddlewareMixin):
                 client_id = self.get_client_ip(request)
 
             # Chave do cache
-            cache_key = f"rate_limit_{client_id}"
+            cache_key = cache_versionado.chave("limites", "rate_limit_api", client_id)
 
-            # Obter contador atual
-            current_requests = cache.get(cache_key, 0)
+            # Incrementar contador (INCR atômico); recusas são desfeitas
+            excedida = cache_versionado.consumir(
+                [(cache_key, 60, self.requests_per_minute)]  # 1 minuto
+            )
 
             # Verificar limite
-            if current_requests >= self.requests_per_minute:
+            if excedida is not None:
                 return JsonResponse(
                     {
                         "success": False,
@@ -179,9 +182,6 @@ class RateLimitMiddleware(MiddlewareMixin):
                     status=429,
                 )
 
-            # Incrementar contador
-            cache.set(cache_key, current_requests + 1, 60)  # 1 minuto
-
         return None
 
     def get_client_ip(self, request):
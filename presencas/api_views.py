@@ -15,10 +15,13 @@ from django.contrib.auth.decorators import login_required
 from django.core.cache import cache
 from django.db import transaction
 from django.db.models import Q, Prefetch
+import hashlib
 import json
 import logging
 from importlib import import_module
 
+from core import cache_versionado
+
 from .models import RegistroPresenca
 from .serializers import (
     PresencaSerializer,
@@ -90,7 +93,11 @@ class PresencaViewSet(ModelViewSet):
         """FASE 3B: Customiza queryset com cache inteligente e filtros otimizados."""
         # Cache baseado nos parâmetros de filtro
         filter_params = self.request.query_params.copy()
-        cache_key = f"presencas_api_{hash(str(sorted(filter_params.items())))}"
+        cache_key = cache_versionado.chave(
+            "presencas",
+            "presencas_api",
+            hashlib.md5(str(sorted(filter_params.lists())).encode()).hexdigest(),
+        )
 
         cached_ids = cache.get(cache_key)
         if cached_ids:
@@ -166,9 +173,6 @@ class PresencaViewSet(ModelViewSet):
             )
 
 
-    
-
-
 # Mantendo as funções existentes para compatibilidade
 
 
@@ -211,9 +215,9 @@ def obter_alunos_por_turmas(request):
                     {
                         "cpf": matricula.aluno.cpf,
                         "nome": matricula.aluno.nome,
-                        "foto": matricula.aluno.foto.url
-                        if matricula.aluno.foto
-                        else None,
+                        "foto": (
+                            matricula.aluno.foto.url if matricula.aluno.foto else None
+                        ),
                         "numero_iniciatico": matricula.aluno.numero_iniciatico,
                     }
                 )
@@ -315,9 +319,9 @@ def salvar_presencas_multiplas(request):
                     data=data_presenca,
                     defaults={
                         "situacao": situacao,
-                        "justificativa": justificativa
-                        if situacao == "JUSTIFICADO"
-                        else "",
+                        "justificativa": (
+                            justificativa if situacao == "JUSTIFICADO" else ""
+                        ),
                     },
                 )
 
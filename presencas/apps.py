@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class PresencasConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "presencas"
+
+    def ready(self):
+        """
+        Importa os signals quando o app estiver pronto.
+        """
+        import presencas.signals  # noqa: F401
@@ -4,14 +4,17 @@ Implementa bulk operations para melhor performance.
 """
 
 import logging
+from collections import defaultdict
 from datetime import date
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Tuple
 from importlib import import_module
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 from .models import RegistroPresenca
+from .services.resumo_mensal import ResumoPresencaMensalService
 
 
 def _get_model(app_name: str, model_name: str):
@@ -26,6 +29,13 @@ Atividade = _get_model("atividades", "Atividade")
 
 logger = logging.getLogger(__name__)
 
+CAMPOS_CHAVE = ["aluno", "turma", "atividade", "data"]
+CAMPOS_ATUALIZAVEIS = ["status", "justificativa", "registrado_por", "data_registro"]
+
+# Registros por INSERT/UPDATE e grupos (turma, atividade, data) por consulta
+TAMANHO_LOTE_UPSERT = 1000
+TAMANHO_LOTE_GRUPOS = 200
+
 
 class BulkPresencaOperations:
     """Classe para operações em lote otimizadas."""
@@ -36,7 +46,16 @@ class BulkPresencaOperations:
         dados_presencas: List[Dict[str, Any]], registrado_por: str
     ) -> Dict[str, int]:
         """
-        Cria múltiplas presenças em lote com validação otimizada.
+        Cria ou atualiza múltiplas presenças em lote (upsert).
+
+        O número de consultas não depende da quantidade de registros: uma
+        validação por modelo relacionado, uma verificação das chaves já
+        existentes e um INSERT ... ON CONFLICT DO UPDATE por lote. Em bancos
+        sem suporte a conflito por chave, novos registros usam bulk_create e
+        os existentes bulk_update, ambos em lotes.
+
+        Itens repetidos para a mesma chave (aluno, turma, atividade, data)
+        prevalecem pela última ocorrência.
 
         Args:
             dados_presencas: Lista de dicionários com dados das presenças
@@ -62,16 +81,21 @@ class BulkPresencaOperations:
                     f"Item {i}: Campos obrigatórios ausentes: {missing_fields}"
                 )
 
-        # Pré-carregar todos os objetos relacionados em uma única query
+        # Validar existência dos objetos relacionados (uma query por modelo)
         aluno_ids = {dados["aluno_id"] for dados in dados_presencas}
         turma_ids = {dados["turma_id"] for dados in dados_presencas}
         atividade_ids = {dados["atividade_id"] for dados in dados_presencas}
 
-        alunos = {a.id: a for a in Aluno.objects.filter(id__in=aluno_ids)}
-        turmas = {t.id: t for t in Turma.objects.filter(id__in=turma_ids)}
-        atividades = {a.id: a for a in Atividade.objects.filter(id__in=atividade_ids)}
+        alunos = set(
+            Aluno.objects.filter(id__in=aluno_ids).values_list("id", flat=True)
+        )
+        turmas = set(
+            Turma.objects.filter(id__in=turma_ids).values_list("id", flat=True)
+        )
+        atividades = set(
+            Atividade.objects.filter(id__in=atividade_ids).values_list("id", flat=True)
+        )
 
-        # Validar que todos os objetos existem
         for dados in dados_presencas:
             if dados["aluno_id"] not in alunos:
                 raise ValidationError(f"Aluno ID {dados['aluno_id']} não encontrado")
@@ -82,37 +106,14 @@ class BulkPresencaOperations:
                     f"Atividade ID {dados['atividade_id']} não encontrada"
                 )
 
-        # Verificar presenças existentes para evitar duplicatas
-        existing_keys = set()
-        for dados in dados_presencas:
-            key = (
-                dados["aluno_id"],
-                dados["turma_id"],
-                dados["atividade_id"],
-                dados["data"],
-            )
-            existing_keys.add(key)
-
-        existing_presencas = set(
-            RegistroPresenca.objects.filter(
-                aluno_id__in=aluno_ids,
-                turma_id__in=turma_ids,
-                atividade_id__in=atividade_ids,
-                data__in=[dados["data"] for dados in dados_presencas],
-            ).values_list("aluno_id", "turma_id", "atividade_id", "data")
-        )
-
-        # Preparar objetos para inserção
-        presencas_para_criar = []
-        presencas_para_atualizar = []
+        # Preparar objetos, um por chave (a última ocorrência prevalece)
+        agora = timezone.now()
+        presencas_por_chave = {}
 
         for dados in dados_presencas:
-            key = (
-                dados["aluno_id"],
-                dados["turma_id"],
-                dados["atividade_id"],
-                dados["data"],
-            )
+            data_presenca = dados["data"]
+            if isinstance(data_presenca, str):
+                data_presenca = date.fromisoformat(data_presenca)
 
             # Mapear booleano 'presente' para status
             status = "P" if dados["presente"] else "F"
@@ -121,54 +122,70 @@ class BulkPresencaOperations:
                 aluno_id=dados["aluno_id"],
                 turma_id=dados["turma_id"],
                 atividade_id=dados["atividade_id"],
-                data=dados["data"],
+                data=data_presenca,
                 status=status,
                 justificativa=(dados.get("observacao") or "") if status != "P" else "",
                 registrado_por=registrado_por,
-                data_registro=timezone.now(),
+                data_registro=agora,
             )
+            presencas_por_chave[BulkPresencaOperations._chave(presenca_obj)] = (
+                presenca_obj
+            )
+
+        # Verificar quais chaves exatas já existem
+        existentes = BulkPresencaOperations._ids_existentes(presencas_por_chave.keys())
 
-            if key in existing_presencas:
-                # Atualizar presença existente
+        presencas_para_criar = []
+        presencas_para_atualizar = []
+        for chave, presenca_obj in presencas_por_chave.items():
+            if chave in existentes:
                 presencas_para_atualizar.append(presenca_obj)
             else:
-                # Criar nova presença
                 presencas_para_criar.append(presenca_obj)
 
-            # Observação agora é armazenada em 'justificativa' do próprio registro
-
         # Executar operações em lote
         stats = {"criadas": 0, "atualizadas": 0, "observacoes": 0, "erros": 0}
 
         try:
-            # Bulk create para novas presenças
-            if presencas_para_criar:
-                created_presencas = RegistroPresenca.objects.bulk_create(
-                    presencas_para_criar, batch_size=1000, ignore_conflicts=True
-                )
-                stats["criadas"] = len(created_presencas)
-
-            # Bulk update para presenças existentes (requer Django 4.2+)
-            if presencas_para_atualizar:
-                # Para versões anteriores do Django, usar update individual ou raw SQL
-                for presenca in presencas_para_atualizar:
-                    RegistroPresenca.objects.filter(
-                        aluno_id=presenca.aluno_id,
-                        turma_id=presenca.turma_id,
-                        atividade_id=presenca.atividade_id,
-                        data=presenca.data,
-                    ).update(
-                        status=presenca.status,
-                        justificativa=presenca.justificativa,
-                        registrado_por=presenca.registrado_por,
-                        data_registro=presenca.data_registro,
+            if connection.features.supports_update_conflicts_with_target:
+                if presencas_por_chave:
+                    RegistroPresenca.objects.bulk_create(
+                        list(presencas_por_chave.values()),
+                        batch_size=TAMANHO_LOTE_UPSERT,
+                        update_conflicts=True,
+                        unique_fields=CAMPOS_CHAVE,
+                        update_fields=CAMPOS_ATUALIZAVEIS,
                     )
-                stats["atualizadas"] = len(presencas_para_atualizar)
+            else:
+                if presencas_para_criar:
+                    RegistroPresenca.objects.bulk_create(
+                        presencas_para_criar, batch_size=TAMANHO_LOTE_UPSERT
+                    )
+                if presencas_para_atualizar:
+                    for presenca_obj in presencas_para_atualizar:
+                        presenca_obj.pk = existentes[
+                            BulkPresencaOperations._chave(presenca_obj)
+                        ]
+                    RegistroPresenca.objects.bulk_update(
+                        presencas_para_atualizar,
+                        CAMPOS_ATUALIZAVEIS,
+                        batch_size=TAMANHO_LOTE_UPSERT,
+                    )
+
+            stats["criadas"] = len(presencas_para_criar)
+            stats["atualizadas"] = len(presencas_para_atualizar)
+
+            # bulk_create/update não disparam signals: atualizar resumo mensal
+            ResumoPresencaMensalService.agendar(
+                ResumoPresencaMensalService.chaves_de_registros(
+                    presencas_por_chave.values()
+                )
+            )
 
             # Observações incorporadas em 'justificativa' dos registros
             stats["observacoes"] = sum(
                 1
-                for p in presencas_para_criar + presencas_para_atualizar
+                for p in presencas_por_chave.values()
                 if (p.justificativa or "").strip()
             )
 
@@ -180,6 +197,55 @@ class BulkPresencaOperations:
             stats["erros"] = 1
             raise e
 
+    @staticmethod
+    def _chave(presenca: RegistroPresenca) -> Tuple[int, int, int, date]:
+        """Chave única (aluno, turma, atividade, data) de um registro."""
+        return (
+            presenca.aluno_id,
+            presenca.turma_id,
+            presenca.atividade_id,
+            presenca.data,
+        )
+
+    @staticmethod
+    def _ids_existentes(
+        chaves: Iterable[Tuple[int, int, int, date]],
+    ) -> Dict[Tuple[int, int, int, date], int]:
+        """
+        Busca os IDs dos registros que já existem para as chaves exatas.
+
+        As chaves são agrupadas por (turma, atividade, data), com a lista de
+        alunos de cada grupo em um único IN; uma folha mensal vira uma única
+        consulta sem o produto cartesiano de todos os filtros.
+
+        Returns:
+            Dict chave -> ID do registro existente
+        """
+        alunos_por_grupo = defaultdict(set)
+        for aluno_id, turma_id, atividade_id, data_presenca in chaves:
+            alunos_por_grupo[(turma_id, atividade_id, data_presenca)].add(aluno_id)
+
+        grupos = list(alunos_por_grupo.items())
+        existentes = {}
+        for inicio in range(0, len(grupos), TAMANHO_LOTE_GRUPOS):
+            filtro = Q()
+            for (turma_id, atividade_id, data_presenca), grupo_alunos in grupos[
+                inicio : inicio + TAMANHO_LOTE_GRUPOS
+            ]:
+                filtro |= Q(
+                    turma_id=turma_id,
+                    atividade_id=atividade_id,
+                    data=data_presenca,
+                    aluno_id__in=grupo_alunos,
+                )
+            linhas = RegistroPresenca.objects.filter(filtro).values_list(
+                "id", "aluno_id", "turma_id", "atividade_id", "data"
+            )
+            for registro_id, *chave in linhas:
+                existentes[tuple(chave)] = registro_id
+
+        return existentes
+
     @staticmethod
     @transaction.atomic
     def excluir_presencas_lote(presenca_ids: List[int]) -> int:
@@ -218,7 +284,9 @@ class BulkPresencaOperations:
         logger.info("Calculando estatísticas com queries otimizadas")
 
         # Query base otimizada
-        queryset = RegistroPresenca.objects.select_related("aluno", "turma", "atividade")
+        queryset = RegistroPresenca.objects.select_related(
+            "aluno", "turma", "atividade"
+        )
 
         if turma_id:
             queryset = queryset.filter(turma_id=turma_id)
@@ -4,7 +4,6 @@ FASE 3C: Management command para monitoramento de saúde do sistema.
 
 import time
 import logging
-from datetime import datetime
 from typing import Dict, Any
 
 from django.core.management.base import BaseCommand
@@ -292,9 +291,9 @@ class Command(BaseCommand):
                 "summary": f"{len(stats) if stats else 0} workers ativos",
                 "details": {
                     "workers": stats or {},
-                    "active_tasks_count": total_active_tasks
-                    if "total_active_tasks" in locals()
-                    else 0,
+                    "active_tasks_count": (
+                        total_active_tasks if "total_active_tasks" in locals() else 0
+                    ),
                     "issues": issues,
                 },
             }
@@ -313,9 +312,10 @@ class Command(BaseCommand):
         issues = []
 
         try:
-            # Verificar métricas de cache
-            cache_key = f"metrics_aggregated_{datetime.now().strftime('%Y%m%d_%H')}"
-            metrics = cache.get(cache_key, {})
+            # Métricas agregadas da última hora
+            from omaum.metricas import MetricasPerformance
+
+            metrics = MetricasPerformance.totais(minutos=60)
 
             if metrics:
                 total_requests = metrics.get("total_requests", 0)
@@ -0,0 +1,61 @@
+"""Comando para recalcular as carências do resumo mensal de presenças."""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from presencas.services.carencias import CalculadoraCarencias
+
+
+class Command(BaseCommand):
+    """Recalcula ResumoPresencaMensal.carencias pelo percentual mínimo da turma."""
+
+    help = (
+        "Recalcula as carências do resumo mensal em um único UPDATE "
+        "(ou em lotes, com --em-lotes) e informa a vazão obtida"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--turma", type=int, help="ID da turma")
+        parser.add_argument("--atividade", type=int, help="ID da atividade")
+        parser.add_argument("--inicio", help="Mês inicial (YYYY-MM-DD)")
+        parser.add_argument("--fim", help="Mês final (YYYY-MM-DD)")
+        parser.add_argument(
+            "--em-lotes",
+            action="store_true",
+            help="Calcula em Python e grava com bulk_update em lotes",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Tamanho dos lotes no modo --em-lotes (padrão: 2000)",
+        )
+
+    def handle(self, *args, **options):
+        """Executa o recálculo."""
+        resultado = CalculadoraCarencias.recalcular_todas(
+            turma_id=options["turma"],
+            atividade_id=options["atividade"],
+            periodo_inicio=self._parse_data(options["inicio"]),
+            periodo_fim=self._parse_data(options["fim"]),
+            em_lotes=options["em_lotes"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Carências recalculadas ({resultado['metodo']}): "
+                f"{resultado['presencas_atualizadas']}/{resultado['total_presencas']} "
+                f"linhas alteradas em {resultado['duracao_segundos']}s "
+                f"({resultado['linhas_por_segundo']} linhas/s)"
+            )
+        )
+
+    @staticmethod
+    def _parse_data(valor):
+        if not valor:
+            return None
+        try:
+            return datetime.strptime(valor, "%Y-%m-%d").date()
+        except ValueError as exc:
+            raise CommandError(f"Data inválida: {valor}") from exc
@@ -0,0 +1,71 @@
+"""Comando para reconstruir ou verificar o resumo mensal de presenças."""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from presencas.services.resumo_mensal import ResumoPresencaMensalService
+
+
+class Command(BaseCommand):
+    """Reconstrói a tabela ResumoPresencaMensal a partir de RegistroPresenca."""
+
+    help = (
+        "Reconstrói (ou apenas verifica, com --verificar) o resumo mensal de "
+        "presenças a partir dos registros brutos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--turma", type=int, help="ID da turma")
+        parser.add_argument("--inicio", help="Mês inicial (YYYY-MM-DD)")
+        parser.add_argument("--fim", help="Mês final (YYYY-MM-DD)")
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Apenas compara o resumo com os registros, sem gravar",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Tamanho dos lotes de inserção (padrão: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        """Executa a reconstrução ou verificação."""
+        filtros = {
+            "turma_id": options["turma"],
+            "periodo_inicio": self._parse_data(options["inicio"]),
+            "periodo_fim": self._parse_data(options["fim"]),
+        }
+
+        if options["verificar"]:
+            divergencias = ResumoPresencaMensalService.verificar(**filtros)
+            if not divergencias:
+                self.stdout.write(self.style.SUCCESS("✅ Resumo mensal consistente"))
+                return
+            for item in divergencias[:50]:
+                self.stdout.write(
+                    f"  → {item['chave']}: esperado={item['esperado']} "
+                    f"atual={item['atual']}"
+                )
+            raise CommandError(f"{len(divergencias)} divergência(s) encontrada(s)")
+
+        resultado = ResumoPresencaMensalService.reconstruir(
+            batch_size=options["batch_size"], **filtros
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Resumo reconstruído: {resultado['criadas']} linhas criadas, "
+                f"{resultado['removidas']} removidas"
+            )
+        )
+
+    @staticmethod
+    def _parse_data(valor):
+        if not valor:
+            return None
+        try:
+            return datetime.strptime(valor, "%Y-%m-%d").date()
+        except ValueError as exc:
+            raise CommandError(f"Data inválida: {valor}") from exc
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:01
+
+import django.db.models.deletion
+import presencas.models
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+
+def popular_resumo(apps, schema_editor):
+    """Carga inicial do resumo mensal a partir dos registros existentes."""
+    RegistroPresenca = apps.get_model("presencas", "RegistroPresenca")
+    ResumoPresencaMensal = apps.get_model("presencas", "ResumoPresencaMensal")
+    faltas = Q(status__in=["F", "J"])
+    linhas = (
+        RegistroPresenca.objects.order_by()
+        .annotate(periodo=TruncMonth("data"))
+        .values("aluno_id", "turma_id", "atividade_id", "periodo")
+        .annotate(
+            convocacoes=Count("id", filter=Q(convocado=True)),
+            presencas=Count("id", filter=Q(status="P")),
+            faltas=Count("id", filter=faltas),
+            voluntario_extra=Count("id", filter=Q(status="V1")),
+            voluntario_simples=Count("id", filter=Q(status="V2")),
+            carencias=Count("id", filter=faltas),
+        )
+    )
+    lote = []
+    for linha in linhas.iterator(chunk_size=1000):
+        lote.append(ResumoPresencaMensal(**linha))
+        if len(lote) >= 1000:
+            ResumoPresencaMensal.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        ResumoPresencaMensal.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alunos', '0014_update_foto_upload_path'),
+        ('atividades', '0002_alter_atividade_tipo_atividade'),
+        ('presencas', '0005_registropresenca_rp_data_idx_and_more'),
+        ('turmas', '0006_alter_turma_dias_semana'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoPresencaMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField(help_text='Primeiro dia do mês de referência')),
+                ('convocacoes', models.PositiveIntegerField(default=0)),
+                ('presencas', models.PositiveIntegerField(default=0)),
+                ('faltas', models.PositiveIntegerField(default=0)),
+                ('voluntario_extra', models.PositiveIntegerField(default=0)),
+                ('voluntario_simples', models.PositiveIntegerField(default=0)),
+                ('carencias', models.PositiveIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='alunos.aluno')),
+                ('atividade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='atividades.atividade')),
+                ('turma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='turmas.turma')),
+            ],
+            options={
+                'verbose_name': 'Resumo Mensal de Presença',
+                'verbose_name_plural': 'Resumos Mensais de Presença',
+                'ordering': ['-periodo', 'aluno__nome'],
+                'indexes': [models.Index(fields=['turma', 'periodo'], name='rpm_turma_periodo_idx'), models.Index(fields=['periodo'], name='rpm_periodo_idx'), models.Index(fields=['atividade', 'periodo'], name='rpm_atividade_periodo_idx')],
+                'unique_together': {('aluno', 'turma', 'atividade', 'periodo')},
+            },
+            bases=(presencas.models.AgregadoPresencaMixin, models.Model),
+        ),
+        migrations.RunPython(popular_resumo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,113 @@
+# Generated manually: materialized aggregate view on PostgreSQL.
+from django.db import migrations
+
+
+VIEW_NAME = "presencas_presencadetalhada"
+
+POSTGRES_SELECT = """
+SELECT
+    ROW_NUMBER() OVER (
+        ORDER BY rp.aluno_id, rp.turma_id, rp.atividade_id,
+                 date_trunc('month', rp.data)::date
+    ) AS id,
+    rp.aluno_id,
+    rp.turma_id,
+    rp.atividade_id,
+    date_trunc('month', rp.data)::date AS periodo,
+    COUNT(*) FILTER (WHERE rp.convocado) AS convocacoes,
+    COUNT(*) FILTER (WHERE rp.status = 'P') AS presencas,
+    COUNT(*) FILTER (WHERE rp.status IN ('F', 'J')) AS faltas,
+    COUNT(*) FILTER (WHERE rp.status = 'V1') AS voluntario_extra,
+    COUNT(*) FILTER (WHERE rp.status = 'V2') AS voluntario_simples,
+    COUNT(*) FILTER (WHERE rp.status IN ('F', 'J')) AS carencias
+FROM presencas_registropresenca AS rp
+GROUP BY
+    rp.aluno_id,
+    rp.turma_id,
+    rp.atividade_id,
+    date_trunc('month', rp.data)::date
+"""
+
+# O índice único espelha a granularidade da chave de RegistroPresenca
+# (aluno, turma, atividade) agregada por mês e é exigido pelo
+# REFRESH MATERIALIZED VIEW CONCURRENTLY.
+POSTGRES_CREATE = [
+    f"CREATE MATERIALIZED VIEW {VIEW_NAME} AS {POSTGRES_SELECT} WITH DATA",
+    f"CREATE UNIQUE INDEX pd_chave_uidx ON {VIEW_NAME} "
+    "(aluno_id, turma_id, atividade_id, periodo)",
+    f"CREATE INDEX pd_turma_periodo_idx ON {VIEW_NAME} (turma_id, periodo)",
+    f"CREATE INDEX pd_periodo_idx ON {VIEW_NAME} (periodo)",
+]
+
+SQLITE_CREATE_VIEW = f"""
+CREATE VIEW {VIEW_NAME} AS
+SELECT
+    ROW_NUMBER() OVER (
+        ORDER BY rp.aluno_id, rp.turma_id, rp.atividade_id,
+                 DATE(rp.data, 'start of month')
+    ) AS id,
+    rp.aluno_id,
+    rp.turma_id,
+    rp.atividade_id,
+    DATE(rp.data, 'start of month') AS periodo,
+    SUM(CASE WHEN rp.convocado = 1 THEN 1 ELSE 0 END) AS convocacoes,
+    SUM(CASE WHEN rp.status = 'P' THEN 1 ELSE 0 END) AS presencas,
+    SUM(CASE WHEN rp.status IN ('F', 'J') THEN 1 ELSE 0 END) AS faltas,
+    SUM(CASE WHEN rp.status = 'V1' THEN 1 ELSE 0 END) AS voluntario_extra,
+    SUM(CASE WHEN rp.status = 'V2' THEN 1 ELSE 0 END) AS voluntario_simples,
+    SUM(CASE WHEN rp.status IN ('F', 'J') THEN 1 ELSE 0 END) AS carencias
+FROM presencas_registropresenca AS rp
+GROUP BY
+    rp.aluno_id,
+    rp.turma_id,
+    rp.atividade_id,
+    DATE(rp.data, 'start of month');
+"""
+
+
+def _drop_postgres_relation(cursor):
+    """Remove a relação existente, seja tabela, view ou view materializada."""
+    cursor.execute(
+        "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)",
+        [VIEW_NAME],
+    )
+    row = cursor.fetchone()
+    if not row:
+        return
+    drop = {
+        "r": "DROP TABLE",
+        "v": "DROP VIEW",
+        "m": "DROP MATERIALIZED VIEW",
+    }.get(row[0])
+    if drop:
+        cursor.execute(f"{drop} {VIEW_NAME}")
+
+
+def create_view(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == "postgresql":
+            _drop_postgres_relation(cursor)
+            for statement in POSTGRES_CREATE:
+                cursor.execute(statement)
+        elif vendor == "sqlite":
+            cursor.execute(f"DROP VIEW IF EXISTS {VIEW_NAME}")
+            cursor.execute(SQLITE_CREATE_VIEW)
+
+
+def drop_view(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == "postgresql":
+            _drop_postgres_relation(cursor)
+            cursor.execute(f"CREATE VIEW {VIEW_NAME} AS {POSTGRES_SELECT}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("presencas", "0006_resumopresencamensal"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_view, drop_view),
+    ]
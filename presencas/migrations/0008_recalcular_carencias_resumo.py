@@ -0,0 +1,44 @@
+import math
+
+from django.db import migrations
+
+
+def recalcular_carencias(apps, schema_editor):
+    """
+    Aplica a regra do percentual mínimo da turma às carências do resumo.
+
+    A carga inicial (0006) gravou as faltas como carências; a regra é
+    reproduzida aqui porque migrações não devem importar serviços.
+    """
+    Turma = apps.get_model("turmas", "Turma")
+    ResumoPresencaMensal = apps.get_model("presencas", "ResumoPresencaMensal")
+    percentuais = dict(Turma.objects.values_list("id", "perc_presenca_minima"))
+
+    lote = []
+    linhas = ResumoPresencaMensal.objects.order_by().values_list(
+        "id", "turma_id", "convocacoes", "presencas", "carencias"
+    )
+    for resumo_id, turma_id, convocacoes, presencas, carencias in linhas.iterator(
+        chunk_size=1000
+    ):
+        minimo = percentuais.get(turma_id)
+        novas = 0
+        if convocacoes > 0 and minimo is not None:
+            minimo = float(minimo)
+            if presencas * 100.0 / convocacoes < minimo:
+                novas = max(0, math.floor(minimo * convocacoes / 100.0 - presencas))
+        if novas != carencias:
+            lote.append(ResumoPresencaMensal(id=resumo_id, carencias=novas))
+    ResumoPresencaMensal.objects.bulk_update(lote, ["carencias"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("presencas", "0007_presencadetalhada_materialized_view"),
+        ("turmas", "0006_alter_turma_dias_semana"),
+    ]
+
+    operations = [
+        migrations.RunPython(recalcular_carencias, migrations.RunPython.noop),
+    ]
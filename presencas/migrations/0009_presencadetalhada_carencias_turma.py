@@ -0,0 +1,169 @@
+# Generated manually: carências da visão agregada pela regra da turma.
+#
+# Muda o significado da coluna ``carencias`` da visão: até a 0007 era a
+# contagem de faltas (F/J) do mês; a partir daqui é quantas presenças faltam
+# para atingir o ``perc_presenca_minima`` da turma, como no resumo mensal.
+# Regras por atividade (ConfiguracaoPresenca) não são aplicadas: o modelo é
+# um placeholder sem tabela.
+from importlib import import_module
+
+from django.db import migrations
+
+# Definição anterior (carências = faltas), usada na reversão
+visao_anterior = import_module(
+    "presencas.migrations.0007_presencadetalhada_materialized_view"
+)
+
+VIEW_NAME = "presencas_presencadetalhada"
+
+# Mesma regra de presencas.services.carencias.calcular_carencias_turma,
+# aplicada sobre os agregados do mês: abaixo do percentual mínimo da turma,
+# carências = piso(mínimo * convocações / 100 - presenças); caso contrário 0.
+POSTGRES_SELECT = """
+SELECT
+    agg.id,
+    agg.aluno_id,
+    agg.turma_id,
+    agg.atividade_id,
+    agg.periodo,
+    agg.convocacoes,
+    agg.presencas,
+    agg.faltas,
+    agg.voluntario_extra,
+    agg.voluntario_simples,
+    CASE
+        WHEN agg.convocacoes > 0
+            AND t.perc_presenca_minima IS NOT NULL
+            AND agg.presencas * 100.0 / agg.convocacoes
+                < t.perc_presenca_minima::double precision
+        THEN GREATEST(
+            FLOOR(
+                t.perc_presenca_minima::double precision * agg.convocacoes / 100.0
+                - agg.presencas
+            )::integer,
+            0
+        )
+        ELSE 0
+    END AS carencias
+FROM (
+    SELECT
+        ROW_NUMBER() OVER (
+            ORDER BY rp.aluno_id, rp.turma_id, rp.atividade_id,
+                     date_trunc('month', rp.data)::date
+        ) AS id,
+        rp.aluno_id,
+        rp.turma_id,
+        rp.atividade_id,
+        date_trunc('month', rp.data)::date AS periodo,
+        COUNT(*) FILTER (WHERE rp.convocado) AS convocacoes,
+        COUNT(*) FILTER (WHERE rp.status = 'P') AS presencas,
+        COUNT(*) FILTER (WHERE rp.status IN ('F', 'J')) AS faltas,
+        COUNT(*) FILTER (WHERE rp.status = 'V1') AS voluntario_extra,
+        COUNT(*) FILTER (WHERE rp.status = 'V2') AS voluntario_simples
+    FROM presencas_registropresenca AS rp
+    GROUP BY
+        rp.aluno_id,
+        rp.turma_id,
+        rp.atividade_id,
+        date_trunc('month', rp.data)::date
+) AS agg
+LEFT JOIN turmas_turma AS t ON t.id = agg.turma_id
+"""
+
+POSTGRES_CREATE = [
+    f"CREATE MATERIALIZED VIEW {VIEW_NAME} AS {POSTGRES_SELECT} WITH DATA",
+    f"CREATE UNIQUE INDEX pd_chave_uidx ON {VIEW_NAME} "
+    "(aluno_id, turma_id, atividade_id, periodo)",
+    f"CREATE INDEX pd_turma_periodo_idx ON {VIEW_NAME} (turma_id, periodo)",
+    f"CREATE INDEX pd_periodo_idx ON {VIEW_NAME} (periodo)",
+]
+
+# O valor é positivo sempre que o percentual está abaixo do mínimo, então o
+# CAST para INTEGER (truncamento) equivale ao piso.
+SQLITE_CREATE_VIEW = f"""
+CREATE VIEW {VIEW_NAME} AS
+SELECT
+    agg.id,
+    agg.aluno_id,
+    agg.turma_id,
+    agg.atividade_id,
+    agg.periodo,
+    agg.convocacoes,
+    agg.presencas,
+    agg.faltas,
+    agg.voluntario_extra,
+    agg.voluntario_simples,
+    CASE
+        WHEN agg.convocacoes > 0
+            AND t.perc_presenca_minima IS NOT NULL
+            AND agg.presencas * 100.0 / agg.convocacoes
+                < CAST(t.perc_presenca_minima AS REAL)
+        THEN MAX(
+            CAST(
+                CAST(t.perc_presenca_minima AS REAL) * agg.convocacoes / 100.0
+                - agg.presencas
+                AS INTEGER
+            ),
+            0
+        )
+        ELSE 0
+    END AS carencias
+FROM (
+    SELECT
+        ROW_NUMBER() OVER (
+            ORDER BY rp.aluno_id, rp.turma_id, rp.atividade_id,
+                     DATE(rp.data, 'start of month')
+        ) AS id,
+        rp.aluno_id,
+        rp.turma_id,
+        rp.atividade_id,
+        DATE(rp.data, 'start of month') AS periodo,
+        SUM(CASE WHEN rp.convocado = 1 THEN 1 ELSE 0 END) AS convocacoes,
+        SUM(CASE WHEN rp.status = 'P' THEN 1 ELSE 0 END) AS presencas,
+        SUM(CASE WHEN rp.status IN ('F', 'J') THEN 1 ELSE 0 END) AS faltas,
+        SUM(CASE WHEN rp.status = 'V1' THEN 1 ELSE 0 END) AS voluntario_extra,
+        SUM(CASE WHEN rp.status = 'V2' THEN 1 ELSE 0 END) AS voluntario_simples
+    FROM presencas_registropresenca AS rp
+    GROUP BY
+        rp.aluno_id,
+        rp.turma_id,
+        rp.atividade_id,
+        DATE(rp.data, 'start of month')
+) AS agg
+LEFT JOIN turmas_turma AS t ON t.id = agg.turma_id;
+"""
+
+
+def _recriar(schema_editor, postgres_create, sqlite_create_view):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == "postgresql":
+            visao_anterior._drop_postgres_relation(cursor)
+            for statement in postgres_create:
+                cursor.execute(statement)
+        elif vendor == "sqlite":
+            cursor.execute(f"DROP VIEW IF EXISTS {VIEW_NAME}")
+            cursor.execute(sqlite_create_view)
+
+
+def aplicar_regra_turma(apps, schema_editor):
+    _recriar(schema_editor, POSTGRES_CREATE, SQLITE_CREATE_VIEW)
+
+
+def restaurar_contagem_faltas(apps, schema_editor):
+    _recriar(
+        schema_editor,
+        visao_anterior.POSTGRES_CREATE,
+        visao_anterior.SQLITE_CREATE_VIEW,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("presencas", "0008_recalcular_carencias_resumo"),
+        ("turmas", "0006_alter_turma_dias_semana"),
+    ]
+
+    operations = [
+        migrations.RunPython(aplicar_regra_turma, restaurar_contagem_faltas),
+    ]
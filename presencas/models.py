@@ -55,6 +55,25 @@ class RegistroPresenca(models.Model):
     def __str__(self):
         return f"{self.aluno.nome} - {self.data} - {self.get_status_display()}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Guarda a chave do resumo mensal carregada do banco.
+
+        Permite que o resumo mensal atualize também a chave antiga quando
+        aluno, turma, atividade ou data forem alterados, sem SELECT extra.
+        """
+        instance = super().from_db(db, field_names, values)
+        carregados = dict(zip(field_names, values))
+        campos_chave = ("aluno_id", "turma_id", "atividade_id", "data")
+        if all(campo in carregados for campo in campos_chave):
+            instance._chave_resumo_original = (
+                carregados["aluno_id"],
+                carregados["turma_id"],
+                carregados["atividade_id"],
+                carregados["data"].replace(day=1),
+            )
+        return instance
+
     # Propriedades de compatibilidade com código legado que usa booleano "presente"
     @property
     def presente(self) -> bool:
@@ -67,7 +86,72 @@ class RegistroPresenca(models.Model):
         self.status = "P" if value else "F"
 
 
-class PresencaDetalhada(models.Model):
+class AgregadoPresencaMixin:
+    """Métodos utilitários comuns aos agregados mensais de presença."""
+
+    def calcular_percentual(self) -> float:
+        """Retorna o percentual de presença considerando convocações."""
+        total_convocacoes = self.convocacoes or 0
+        total_presencas = self.presencas or 0
+        if total_convocacoes <= 0:
+            return 0.0
+        return round((total_presencas / total_convocacoes) * 100, 2)
+
+    def calcular_voluntarios(self) -> int:
+        """Soma os voluntariados extra e simples."""
+        return (self.voluntario_extra or 0) + (self.voluntario_simples or 0)
+
+    def calcular_carencias(self) -> int:
+        """Retorna a quantidade de carências registradas."""
+        return self.carencias or 0
+
+
+class ResumoPresencaMensal(AgregadoPresencaMixin, models.Model):
+    """
+    Tabela de resumo mensal de presenças por aluno/turma/atividade.
+
+    Substitui a leitura da view ``presencas_presencadetalhada`` pelos painéis
+    e relatórios consolidados. As linhas são mantidas de forma incremental
+    pelo ``ResumoPresencaMensalService`` a cada gravação de RegistroPresenca
+    e podem ser reconstruídas com ``manage.py reconstruir_resumo_presencas``.
+    """
+
+    aluno = models.ForeignKey(
+        "alunos.Aluno", on_delete=models.CASCADE, related_name="+"
+    )
+    turma = models.ForeignKey(
+        "turmas.Turma", on_delete=models.CASCADE, related_name="+"
+    )
+    atividade = models.ForeignKey(
+        "atividades.Atividade", on_delete=models.CASCADE, related_name="+"
+    )
+    periodo = models.DateField(help_text="Primeiro dia do mês de referência")
+    convocacoes = models.PositiveIntegerField(default=0)
+    presencas = models.PositiveIntegerField(default=0)
+    faltas = models.PositiveIntegerField(default=0)
+    voluntario_extra = models.PositiveIntegerField(default=0)
+    voluntario_simples = models.PositiveIntegerField(default=0)
+    carencias = models.PositiveIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ["aluno", "turma", "atividade", "periodo"]
+        verbose_name = "Resumo Mensal de Presença"
+        verbose_name_plural = "Resumos Mensais de Presença"
+        ordering = ["-periodo", "aluno__nome"]
+        indexes = [
+            models.Index(fields=["turma", "periodo"], name="rpm_turma_periodo_idx"),
+            models.Index(fields=["periodo"], name="rpm_periodo_idx"),
+            models.Index(
+                fields=["atividade", "periodo"], name="rpm_atividade_periodo_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.aluno} - {self.periodo:%m/%Y}"
+
+
+class PresencaDetalhada(AgregadoPresencaMixin, models.Model):
     """Representa a visão agregada utilizada pelos relatórios legados."""
 
     aluno = models.ForeignKey(
@@ -106,41 +190,24 @@ class PresencaDetalhada(models.Model):
     def __str__(self):
         return f"{self.aluno} - {self.periodo:%m/%Y}"
 
-    # Métodos utilitários mantêm compatibilidade com scripts e serviços legados
-    def calcular_percentual(self) -> float:
-        """Retorna o percentual de presença considerando convocações."""
-        total_convocacoes = self.convocacoes or 0
-        total_presencas = self.presencas or 0
-        if total_convocacoes <= 0:
-            return 0.0
-        return round((total_presencas / total_convocacoes) * 100, 2)
-
-    def calcular_voluntarios(self) -> int:
-        """Soma os voluntariados extra e simples."""
-        return (self.voluntario_extra or 0) + (self.voluntario_simples or 0)
-
-    def calcular_carencias(self) -> int:
-        """Retorna a quantidade de carências registradas."""
-        return self.carencias or 0
-
 
 class ConfiguracaoPresenca(models.Model):
     """
     Placeholder legado para compatibilidade com cálculos estatísticos.
-    
+
     IMPORTANTE: Este modelo é um placeholder (managed=False) mantido apenas
     para compatibilidade retroativa com código legado que pode referenciar
     configurações de presença.
-    
+
     Não possui tabela no banco de dados e não deve ser usado em novos desenvolvimentos.
     As configurações de presença foram migradas para o modelo RegistroPresenca
     e lógica de negócio em services/calculadora_estatisticas.py.
-    
+
     Histórico:
     - Originalmente usado para configurar limites de carência por atividade/turma
     - Substituído pela nova arquitetura unificada em 2024
     - Mantido apenas para evitar quebrar imports em código legado
-    
+
     Status: DEPRECADO - Não adicionar novos recursos a este modelo.
     """
 
@@ -1,12 +1,15 @@
 """Repositório para consultas agregadas de Presença.
 Centraliza padrões de queries para reduzir N+1 e duplicações.
 Inclui um cache simples por período (turma/ano/mês) com TTL curto.
+
+As chaves embutem as gerações dos namespaces ``presencas``, ``("turma", id)``
+e ``("periodo", turma, ano, mês)``: alterações no período, na turma ou em
+lote invalidam o cache com um INCR, sem apagar chaves.
 """
 
 from typing import Dict
 
-from django.core.cache import cache
-
+from core import cache_versionado
 from presencas.models import RegistroPresenca
 
 try:  # Compatibilidade com versões antigas onde o modelo ainda existia
@@ -18,12 +21,8 @@ except ImportError:  # pragma: no cover - fallback quando o modelo foi removido
 CACHE_TTL_SECONDS = 60  # cache curto para evitar dados obsoletos após alterações
 
 
-def _key_presencas(turma_id: int, ano: int, mes: int) -> str:
-    return f"presencas:mapa:{turma_id}:{ano}:{mes}"
-
-
-def _key_convocacoes(turma_id: int, ano: int, mes: int) -> str:
-    return f"presencas:convocacoes:{turma_id}:{ano}:{mes}"
+def _namespaces(turma_id: int, ano: int, mes: int) -> list:
+    return ["presencas", ("turma", turma_id), ("periodo", turma_id, ano, mes)]
 
 
 def mapa_presencas_periodo(
@@ -32,11 +31,15 @@ def mapa_presencas_periodo(
     """Retorna mapa: atividade_id -> dia -> cpf -> dados de presença.
     Usa cache curto por período para reduzir consultas repetidas.
     """
-    cache_key = _key_presencas(turma_id, ano, mes)
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
+    return cache_versionado.obter_ou_calcular(
+        _namespaces(turma_id, ano, mes),
+        ("presencas:mapa", turma_id, ano, mes),
+        lambda: _calcular_mapa_presencas(turma_id, ano, mes),
+        CACHE_TTL_SECONDS,
+    )
+
 
+def _calcular_mapa_presencas(turma_id: int, ano: int, mes: int):
     qs = RegistroPresenca.objects.filter(
         turma_id=turma_id, data__year=ano, data__month=mes
     ).select_related("aluno", "atividade")
@@ -48,13 +51,13 @@ def mapa_presencas_periodo(
         by_cpf = by_dia.setdefault(dia, {})
         by_cpf[p.aluno.cpf] = {
             "id": p.id,
-            "presente": getattr(p, "presente", None)
-            if hasattr(p, "presente")
-            else p.status in {"P", "V1", "V2"},
+            "presente": (
+                getattr(p, "presente", None)
+                if hasattr(p, "presente")
+                else p.status in {"P", "V1", "V2"}
+            ),
             "justificativa": p.justificativa or "",
         }
-
-    cache.set(cache_key, estrutura, CACHE_TTL_SECONDS)
     return estrutura
 
 
@@ -62,27 +65,23 @@ def mapa_convocacoes_periodo(turma_id: int, ano: int, mes: int) -> Dict[tuple, b
     """Retorna mapa: (atividade_id, dia, cpf) -> convocado.
     Usa cache curto por período para reduzir consultas repetidas.
     """
-    cache_key = _key_convocacoes(turma_id, ano, mes)
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
+    return cache_versionado.obter_ou_calcular(
+        _namespaces(turma_id, ano, mes),
+        ("presencas:convocacoes", turma_id, ano, mes),
+        lambda: _calcular_mapa_convocacoes(turma_id, ano, mes),
+        CACHE_TTL_SECONDS,
+    )
+
 
+def _calcular_mapa_convocacoes(turma_id: int, ano: int, mes: int):
     if ConvocacaoPresenca is None:
-        mapa = {}
-    else:
-        qs = ConvocacaoPresenca.objects.filter(
-            turma_id=turma_id, data__year=ano, data__month=mes
-        )
-        mapa = {(str(c.atividade_id), c.data.day, c.aluno.cpf): c.convocado for c in qs}
-    cache.set(cache_key, mapa, CACHE_TTL_SECONDS)
-    return mapa
+        return {}
+    qs = ConvocacaoPresenca.objects.filter(
+        turma_id=turma_id, data__year=ano, data__month=mes
+    )
+    return {(str(c.atividade_id), c.data.day, c.aluno.cpf): c.convocado for c in qs}
 
 
 def invalidate_period_cache(turma_id: int, ano: int, mes: int) -> None:
     """Invalida caches do período para refletir alterações imediatas."""
-    cache.delete_many(
-        [
-            _key_presencas(turma_id, ano, mes),
-            _key_convocacoes(turma_id, ano, mes),
-        ]
-    )
+    cache_versionado.invalidar(("periodo", turma_id, ano, mes))
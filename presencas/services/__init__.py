@@ -65,6 +65,8 @@ from .consolidado_aluno import ConsolidadoAluno
 from .consolidado_turma import ConsolidadoTurma
 from .carencias import CalculadoraCarencias
 from .tabela_consolidada import TabelaConsolidada
+from .resumo_mensal import ResumoPresencaMensalService
+from .visao_agregada import VisaoPresencaDetalhada
 
 __all__ = [
     "CalculadoraEstatisticas",
@@ -72,6 +74,8 @@ __all__ = [
     "ConsolidadoTurma",
     "CalculadoraCarencias",
     "TabelaConsolidada",
+    "ResumoPresencaMensalService",
+    "VisaoPresencaDetalhada",
 ]
 
 # Nota: Outras funções stub mantidas para retrocompatibilidade com testes legados
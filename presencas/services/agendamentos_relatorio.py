@@ -0,0 +1,184 @@
+"""
+Despacho dos agendamentos de relatório vencidos.
+
+Executado periodicamente pelo Celery beat: reserva os agendamentos com
+``ativo=True`` e ``proxima_execucao <= agora`` (índice composto) usando
+``select_for_update(skip_locked=True)``, de modo que workers concorrentes
+nunca executem o mesmo agendamento. Agendamentos com a mesma configuração e
+parâmetros geram um único arquivo; cada dono de agendamento recebe um
+histórico próprio apontando para ele (o download é restrito ao dono), e os
+destinatários de cada agendamento recebem o link do seu dono. A próxima
+execução de todos é avançada em um único ``bulk_update``.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from relatorios_presenca.models import AgendamentoRelatorio
+
+from .artefatos_exportacao import ArtefatosExportacaoService
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_PADRAO = "consolidado_geral"
+
+
+class AgendamentosRelatorioService:
+    """
+    Execução dos agendamentos de relatório.
+
+    Responsabilidades:
+    - Reservar atomicamente os agendamentos vencidos
+    - Agrupar agendamentos idênticos e gerar cada relatório uma única vez
+    - Avançar a próxima execução dos agendamentos processados em lote
+    """
+
+    LIMITE_POR_DESPACHO = 200
+
+    @staticmethod
+    def pedido(agendamento: AgendamentoRelatorio) -> Tuple[str, str, Dict[str, Any]]:
+        """
+        Template, formato e configuração de exportação do agendamento.
+
+        Os parâmetros fixos do agendamento sobrescrevem os padrões da
+        configuração; ``template`` e ``formato`` podem vir de ambos.
+        """
+        config = {
+            **agendamento.configuracao.parametros_padrao,
+            **agendamento.parametros_fixos,
+        }
+        template = config.pop("template", TEMPLATE_PADRAO)
+        formato = config.pop("formato", agendamento.configuracao.formato_saida)
+        return template, formato, config
+
+    @staticmethod
+    def emails(agendamento: AgendamentoRelatorio) -> List[str]:
+        return [
+            email.strip()
+            for email in agendamento.emails_destino.split(",")
+            if email.strip()
+        ]
+
+    @classmethod
+    def despachar(cls, agora=None) -> Dict[str, int]:
+        """Reserva e executa os agendamentos vencidos."""
+        agora = agora or timezone.now()
+
+        with transaction.atomic():
+            vencidos = list(
+                AgendamentoRelatorio.objects.select_for_update(
+                    skip_locked=True, of=("self",)
+                )
+                .select_related("configuracao", "usuario")
+                .filter(ativo=True, proxima_execucao__lte=agora)
+                .order_by("proxima_execucao")[: cls.LIMITE_POR_DESPACHO]
+            )
+            if not vencidos:
+                return {"agendamentos": 0, "relatorios": 0}
+
+            relatorios = cls.executar(vencidos, agora)
+
+        logger.info(
+            f"Despacho de agendamentos: {len(vencidos)} agendamento(s), "
+            f"{len(relatorios)} relatório(s)"
+        )
+        return {"agendamentos": len(vencidos), "relatorios": len(relatorios)}
+
+    @classmethod
+    def executar(
+        cls, agendamentos: Iterable[AgendamentoRelatorio], agora=None
+    ) -> List[Dict[str, Any]]:
+        """
+        Solicita um relatório por grupo de agendamentos idênticos.
+
+        Deve rodar dentro da transação que reservou os agendamentos: as tasks
+        só são enfileiradas no commit, junto com o avanço das execuções.
+        """
+        agora = agora or timezone.now()
+        agendamentos = list(agendamentos)
+
+        grupos = defaultdict(list)
+        for agendamento in agendamentos:
+            template, formato, config = cls.pedido(agendamento)
+            try:
+                ArtefatosExportacaoService.validar(template, formato)
+            except ValueError as e:
+                # Pulado, mas avançado: não volta a ser reservado a cada despacho
+                logger.error(
+                    f"Agendamento {agendamento.pk} ({agendamento.nome}) ignorado: "
+                    f"{str(e)}"
+                )
+                continue
+            chave = ArtefatosExportacaoService.chave_parametros(
+                template, formato, config
+            )
+            grupos[chave].append((agendamento, template, formato, config))
+
+        relatorios = []
+        for itens in grupos.values():
+            relatorio = cls._solicitar_grupo(itens)
+            if relatorio:
+                relatorios.append(relatorio)
+
+        for agendamento in agendamentos:
+            agendamento.ultima_execucao = agora
+            agendamento.calcular_proxima_execucao(agora)
+        AgendamentoRelatorio.objects.bulk_update(
+            agendamentos, ["ultima_execucao", "proxima_execucao"]
+        )
+        return relatorios
+
+    @classmethod
+    def _solicitar_grupo(cls, itens) -> Optional[Dict[str, Any]]:
+        """
+        Gera o relatório do grupo uma única vez e o distribui por dono.
+
+        O arquivo é pedido em nome do primeiro dono; os demais donos recebem
+        registros próprios apontando para o mesmo arquivo, na hora se ele já
+        está pronto ou ao fim da geração em andamento (nunca uma segunda
+        geração do mesmo relatório).
+        """
+        _, template, formato, config = itens[0]
+        donos = {}
+        for agendamento, *_ in itens:
+            _, emails = donos.setdefault(
+                agendamento.usuario_id, (agendamento.usuario, [])
+            )
+            emails.extend(
+                email for email in cls.emails(agendamento) if email not in emails
+            )
+        ids = [item[0].pk for item in itens]
+        (usuario, emails), *outros = donos.values()
+
+        try:
+            historico, reaproveitado = ArtefatosExportacaoService.solicitar(
+                usuario, template, formato, config
+            )
+        except ValueError as e:
+            # Avança mesmo assim: um agendamento inválido não pode travar o despacho
+            logger.error(f"Agendamentos {ids} não executados: {str(e)}")
+            return None
+
+        # Pronto: registros e links na hora; em geração (deste ou de outro
+        # despacho): os demais donos aguardam a mesma geração
+        entregues = ArtefatosExportacaoService.enfileirar(
+            historico,
+            reaproveitado,
+            emails,
+            [(outro.pk, emails_outro) for outro, emails_outro in outros],
+        )
+        historicos = {usuario.pk: historico.pk, **entregues}
+
+        return {
+            "agendamentos": ids,
+            "historico_id": historico.pk,
+            "historicos": historicos,
+            "reaproveitado": reaproveitado,
+            "emails": list(
+                dict.fromkeys(email for _, lista in donos.values() for email in lista)
+            ),
+        }
@@ -0,0 +1,447 @@
+"""
+Armazenamento dos artefatos de exportação de presenças.
+
+As exportações pesadas são geradas pelo worker em um arquivo temporário e
+guardadas no armazenamento de relatórios gerados, com um HistoricoRelatorio
+registrando tamanho e checksum. O cliente acompanha o progresso por polling
+e baixa o arquivo por uma URL autenticada; os e-mails levam apenas o link.
+
+Pedidos idênticos (mesmo template, formato e filtros) dentro da janela
+``EXPORTACAO_REUTILIZAR_MINUTOS`` reaproveitam o artefato existente em vez de
+gerar outro arquivo. Enquanto o arquivo é gerado, os destinatários ficam em
+``HistoricoRelatorio.destinos_pendentes`` e só recebem o link na conclusão;
+pedidos em processamento há mais de ``EXPORTACAO_TIMEOUT_GERACAO_MINUTOS``
+são dados como abandonados.
+"""
+
+import hashlib
+import json
+import logging
+import tempfile
+from datetime import timedelta
+from importlib import import_module
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from relatorios_presenca.models import HistoricoRelatorio
+
+logger = logging.getLogger(__name__)
+
+# Extensão do arquivo por formato suportado em segundo plano
+EXTENSOES_EXPORTACAO = {"excel": ".xlsx", "csv": ".csv"}
+
+# Templates que cada formato sabe gravar em segundo plano
+TEMPLATES_EXPORTACAO = {
+    "excel": ("consolidado_geral",),
+    "csv": ("consolidado_geral", "por_turma"),
+}
+
+# Bytes lidos por vez ao calcular o checksum
+TAMANHO_BLOCO_CHECKSUM = 64 * 1024
+
+CHAVE_PROGRESSO = "exportacao:progresso:{}"
+TIMEOUT_PROGRESSO = 60 * 60
+
+
+class ArtefatosExportacaoService:
+    """
+    Ciclo de vida dos arquivos de exportação gerados em segundo plano.
+
+    Responsabilidades:
+    - Registrar o pedido e reaproveitar artefatos idênticos recentes
+    - Gerar o arquivo e gravá-lo com tamanho e checksum
+    - Informar o progresso e montar o link de download enviado por e-mail
+    """
+
+    @staticmethod
+    def chave_parametros(template: str, formato: str, config: Dict[str, Any]) -> str:
+        """Hash estável do pedido (independe da ordem das chaves)."""
+        conteudo = json.dumps(
+            {"template": template, "formato": formato, "config": config},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def solicitar(
+        cls, usuario, template: str, formato: str, config: Dict[str, Any]
+    ) -> Tuple[HistoricoRelatorio, bool]:
+        """
+        Registra um pedido de exportação.
+
+        Returns:
+            (historico, reaproveitado). Quando ``reaproveitado`` é falso o
+            chamador deve enfileirar a geração do arquivo.
+        """
+        cls.validar(template, formato)
+
+        chave = cls.chave_parametros(template, formato, config)
+        agora = timezone.now()
+        janela = getattr(settings, "EXPORTACAO_REUTILIZAR_MINUTOS", 30)
+        recentes = HistoricoRelatorio.objects.filter(
+            chave_parametros=chave,
+            data_geracao__gte=agora - timedelta(minutes=janela),
+        )
+        cls._expirar_abandonados(recentes, agora)
+
+        # Pedido do mesmo usuário já pronto ou em andamento
+        proprio = recentes.filter(
+            usuario=usuario, status__in=["processando", "concluido"]
+        ).first()
+        if proprio:
+            return proprio, True
+
+        # Arquivo pronto de outro usuário: novo registro apontando para ele
+        pronto = recentes.filter(status="concluido").first()
+        if pronto:
+            return cls.compartilhar(pronto, usuario.pk), True
+
+        historico = HistoricoRelatorio.objects.create(
+            usuario=usuario,
+            tipo_relatorio=template[:20],
+            parametros={"template": template, "formato": formato, "config": config},
+            chave_parametros=chave,
+            status="processando",
+        )
+        cls.atualizar_progresso(historico.pk, 0)
+        return historico, False
+
+    @staticmethod
+    def validar(template: str, formato: str) -> None:
+        """Garante que o worker sabe gerar o template no formato pedido."""
+        if formato not in EXTENSOES_EXPORTACAO:
+            raise ValueError(f"Formato não suportado: {formato}")
+        if template not in TEMPLATES_EXPORTACAO[formato]:
+            raise ValueError(
+                f"Template não suportado em segundo plano ({formato}): {template}"
+            )
+
+    @staticmethod
+    def _expirar_abandonados(historicos, agora) -> None:
+        """Marca como erro os pedidos parados em processamento (worker perdido)."""
+        timeout = getattr(settings, "EXPORTACAO_TIMEOUT_GERACAO_MINUTOS", 15)
+        abandonados = historicos.filter(
+            status="processando", data_geracao__lt=agora - timedelta(minutes=timeout)
+        )
+        for historico in abandonados.exclude(destinos_pendentes=[]):
+            logger.warning(
+                f"Pedido {historico.pk} abandonado; link não enviado para "
+                f"{historico.destinos_pendentes}"
+            )
+        abandonados.update(
+            status="erro",
+            mensagem_erro="Geração não concluída no tempo limite",
+            destinos_pendentes=[],
+        )
+
+    @staticmethod
+    def compartilhar(
+        historico: HistoricoRelatorio, usuario_id: int
+    ) -> HistoricoRelatorio:
+        """
+        Registro de um artefato concluído em nome de outro usuário.
+
+        O novo histórico aponta para o mesmo arquivo (o download só é liberado
+        ao dono do registro) e mantém a data original para não estender a
+        janela de reaproveitamento.
+        """
+        copia = HistoricoRelatorio.objects.create(
+            usuario_id=usuario_id,
+            tipo_relatorio=historico.tipo_relatorio,
+            parametros=historico.parametros,
+            arquivo_gerado=historico.arquivo_gerado.name,
+            nome_arquivo=historico.nome_arquivo,
+            tamanho_arquivo=historico.tamanho_arquivo,
+            checksum=historico.checksum,
+            chave_parametros=historico.chave_parametros,
+            status="concluido",
+        )
+        HistoricoRelatorio.objects.filter(pk=copia.pk).update(
+            data_geracao=historico.data_geracao
+        )
+        return copia
+
+    @classmethod
+    def enfileirar(
+        cls,
+        historico: HistoricoRelatorio,
+        reaproveitado: bool,
+        emails: List[str],
+        destinos: Optional[List[Tuple[int, List[str]]]] = None,
+    ) -> Dict[int, int]:
+        """
+        Entrega o pedido aos destinatários e, se necessário, enfileira a geração.
+
+        O dono do pedido recebe ``emails``; ``destinos`` são pares
+        (usuario_id, emails) de outros usuários que recebem o mesmo arquivo
+        em registro próprio. A geração só é enviada ao worker quando a
+        transação corrente é confirmada, para que ele enxergue o histórico.
+
+        Returns:
+            {usuario_id: historico_id} dos registros já entregues
+        """
+        entregues = cls.adicionar_destinatarios(
+            historico, [(historico.usuario_id, emails), *(destinos or [])]
+        )
+        if not reaproveitado:
+
+            def gerar():
+                tasks = import_module("presencas.tasks")
+                tasks.processar_exportacao_pesada.delay(historico.pk)
+
+            transaction.on_commit(gerar)
+        return entregues
+
+    @classmethod
+    def adicionar_destinatarios(
+        cls, historico: HistoricoRelatorio, destinos: List[Tuple[int, List[str]]]
+    ) -> Dict[int, int]:
+        """
+        Envia o link agora, se o arquivo está pronto, ou o deixa pendente.
+
+        A linha do pedido é travada para não concorrer com a conclusão no
+        worker: ou a conclusão já foi gravada e o envio é imediato, ou os
+        destinos ficam gravados e a conclusão os entrega.
+
+        Returns:
+            {usuario_id: historico_id} dos registros já entregues
+        """
+        destinos = [
+            (usuario_id, list(emails))
+            for usuario_id, emails in destinos
+            if emails or usuario_id != historico.usuario_id
+        ]
+        if not destinos:
+            return {}
+
+        with transaction.atomic():
+            atual = HistoricoRelatorio.objects.select_for_update().get(pk=historico.pk)
+            if atual.status == "concluido":
+                return cls._entregar(atual, destinos)
+            if atual.status == "erro":
+                logger.warning(
+                    f"Pedido {atual.pk} com erro; link não enviado para {destinos}"
+                )
+                return {}
+            atual.destinos_pendentes = [
+                *atual.destinos_pendentes,
+                *([usuario_id, emails] for usuario_id, emails in destinos),
+            ]
+            atual.save(update_fields=["destinos_pendentes"])
+        return {}
+
+    @classmethod
+    def concluir_entregas(cls, historico_id: int) -> Dict[int, int]:
+        """Entrega os destinos pendentes de um pedido concluído (no worker)."""
+        with transaction.atomic():
+            historico = HistoricoRelatorio.objects.select_for_update().get(
+                pk=historico_id
+            )
+            destinos = historico.destinos_pendentes
+            if not destinos or historico.status != "concluido":
+                return {}
+            historico.destinos_pendentes = []
+            historico.save(update_fields=["destinos_pendentes"])
+            return cls._entregar(historico, destinos)
+
+    @staticmethod
+    def registrar_erro(historico_id: int, mensagem: str) -> None:
+        """Marca o pedido como erro e descarta os destinos pendentes."""
+        with transaction.atomic():
+            historico = HistoricoRelatorio.objects.select_for_update().get(
+                pk=historico_id
+            )
+            if historico.destinos_pendentes:
+                logger.warning(
+                    f"Pedido {historico_id} falhou; link não enviado para "
+                    f"{historico.destinos_pendentes}"
+                )
+            historico.status = "erro"
+            historico.mensagem_erro = mensagem
+            historico.destinos_pendentes = []
+            historico.save(
+                update_fields=["status", "mensagem_erro", "destinos_pendentes"]
+            )
+
+    @classmethod
+    def _entregar(cls, historico: HistoricoRelatorio, destinos) -> Dict[int, int]:
+        """Registro de cada usuário (o do dono é o próprio pedido) e o e-mail."""
+        entregues = {}
+        for usuario_id, emails in destinos:
+            registro = (
+                historico
+                if usuario_id == historico.usuario_id
+                else cls.compartilhar(historico, usuario_id)
+            )
+            entregues[usuario_id] = registro.pk
+            if emails:
+                cls._enviar_link_apos_commit(registro.pk, emails)
+        return entregues
+
+    @staticmethod
+    def _enviar_link_apos_commit(historico_id: int, emails: List[str]) -> None:
+        def enviar():
+            tasks = import_module("presencas.tasks")
+            tasks.enviar_relatorio_email.delay(historico_id, emails)
+
+        transaction.on_commit(enviar)
+
+    @classmethod
+    def gerar(cls, historico: HistoricoRelatorio) -> HistoricoRelatorio:
+        """Gera o arquivo do pedido em disco e o registra no histórico."""
+        exportacao = import_module("presencas.views.exportacao")
+        template = historico.parametros["template"]
+        formato = historico.parametros["formato"]
+        config = historico.parametros.get("config", {})
+        cls.validar(template, formato)
+
+        processor = exportacao.ProcessarExportacaoView()
+        processor.request = None
+        dados = processor._obter_dados(template, config)
+        if "erro" in dados:
+            raise ValueError(dados["erro"])
+        cls.atualizar_progresso(historico.pk, 10)
+
+        extensao = EXTENSOES_EXPORTACAO[formato]
+        nome = f"presencas_{template}_{timezone.localtime():%Y%m%d_%H%M%S}{extensao}"
+
+        with tempfile.TemporaryFile(suffix=extensao) as arquivo:
+            cls._gravar(template, formato, dados, config, arquivo)
+            cls.atualizar_progresso(historico.pk, 80)
+
+            cls.registrar_arquivo(historico, arquivo, nome)
+
+        return historico
+
+    @staticmethod
+    def _gravar(
+        template: str, formato: str, dados: Dict[str, Any], config, arquivo
+    ) -> None:
+        """Grava no arquivo o layout do template (ver TEMPLATES_EXPORTACAO)."""
+        if formato == "excel":
+            exportacao = import_module("presencas.views.exportacao")
+            exportacao.ExcelAvancadoExporter().salvar_excel_consolidado_geral(
+                dados, config, arquivo
+            )
+            return
+
+        exporter = import_module("presencas.views.exportacao_parte2").CSVExporter()
+        if template == "por_turma":
+            response = exporter.gerar_csv_por_turma(dados, config)
+        else:
+            response = exporter.gerar_csv_consolidado(dados, config)
+        arquivo.writelines(response.streaming_content)
+
+    @classmethod
+    def registrar_arquivo(
+        cls, historico: HistoricoRelatorio, arquivo, nome_arquivo: str
+    ) -> HistoricoRelatorio:
+        """
+        Grava o arquivo gerado no armazenamento e conclui o histórico.
+
+        O checksum e o tamanho são calculados lendo o arquivo em blocos.
+        """
+        arquivo.seek(0)
+        digest = hashlib.sha256()
+        tamanho = 0
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_CHECKSUM), b""):
+            digest.update(bloco)
+            tamanho += len(bloco)
+        arquivo.seek(0)
+
+        nome_seguro = get_valid_filename(nome_arquivo)
+        historico.arquivo_gerado.save(
+            nome_seguro, File(arquivo, name=nome_seguro), save=False
+        )
+        historico.nome_arquivo = nome_arquivo
+        historico.tamanho_arquivo = tamanho
+        historico.checksum = digest.hexdigest()
+        historico.status = "concluido"
+        historico.tempo_processamento = timezone.now() - historico.data_geracao
+        historico.save(
+            update_fields=[
+                "arquivo_gerado",
+                "nome_arquivo",
+                "tamanho_arquivo",
+                "checksum",
+                "status",
+                "tempo_processamento",
+            ]
+        )
+        cls.atualizar_progresso(historico.pk, 100)
+        return historico
+
+    @staticmethod
+    def atualizar_progresso(historico_id: int, percentual: int) -> None:
+        cache.set(CHAVE_PROGRESSO.format(historico_id), percentual, TIMEOUT_PROGRESSO)
+
+    @classmethod
+    def progresso(cls, historico: HistoricoRelatorio) -> Dict[str, Any]:
+        """Situação do pedido para o polling do cliente."""
+        dados = {
+            "id": historico.pk,
+            "status": historico.status,
+            "progresso": 0,
+            "nome_arquivo": historico.nome_arquivo,
+        }
+        if historico.status == "concluido":
+            dados["progresso"] = 100
+            dados["tamanho"] = historico.tamanho_arquivo
+            dados["download_url"] = reverse(
+                "presencas:exportacao_download", args=[historico.pk]
+            )
+        elif historico.status == "erro":
+            dados["erro"] = historico.mensagem_erro
+        else:
+            dados["progresso"] = cache.get(CHAVE_PROGRESSO.format(historico.pk), 0)
+        return dados
+
+    @staticmethod
+    def url_download(historico: HistoricoRelatorio) -> str:
+        """URL absoluta de download (exige login)."""
+        caminho = reverse("presencas:exportacao_download", args=[historico.pk])
+        return f"{getattr(settings, 'SITE_URL', '').rstrip('/')}{caminho}"
+
+    @classmethod
+    def enviar_link_por_email(
+        cls,
+        historico: HistoricoRelatorio,
+        emails: Iterable[str],
+        assunto: Optional[str] = None,
+    ) -> int:
+        """Envia o link de download do artefato (sem anexo)."""
+        destinatarios = [email for email in emails if email]
+        if not destinatarios:
+            return 0
+
+        email = EmailMessage(
+            subject=assunto
+            or f"Relatório de Presenças - {timezone.localdate():%d/%m/%Y}",
+            body=f"""
+Olá,
+
+O relatório de presenças solicitado está disponível para download:
+
+{cls.url_download(historico)}
+
+Arquivo: {historico.nome_arquivo}
+Data de geração: {timezone.localtime(historico.data_geracao):%d/%m/%Y às %H:%M}
+
+O acesso exige login no sistema. Este é um email automático, não responda.
+
+Atenciosamente,
+Sistema OMAUM
+            """,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=destinatarios,
+        )
+        return email.send()
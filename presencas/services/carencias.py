@@ -4,25 +4,108 @@ Extraído de calculadora_estatisticas.py para melhor organização.
 """
 
 import logging
+import math
+import time
 from datetime import date
-from typing import Dict, Any, Optional
+from decimal import Decimal
+from importlib import import_module
+from typing import Dict, Any, Iterable, Optional
 
 from django.core.exceptions import ValidationError
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Floor, Greatest
+from django.db.models.lookups import LessThan
 from django.utils import timezone
 
-from ..models import PresencaDetalhada, ConfiguracaoPresenca
+from ..models import PresencaDetalhada, ResumoPresencaMensal
 
 logger = logging.getLogger(__name__)
 
 
+def get_turma_model():
+    """Obtém o modelo Turma dinamicamente."""
+    turmas_module = import_module("turmas.models")
+    return getattr(turmas_module, "Turma")
+
+
+def calcular_carencias_turma(
+    convocacoes: int, presencas: int, perc_presenca_minima: Optional[Decimal]
+) -> int:
+    """
+    Aplica a regra de carências pelo percentual mínimo da turma.
+
+    Mesma aritmética de ``expressao_carencias_turma``, para que o resumo
+    gravado incrementalmente e o recálculo em SQL produzam o mesmo valor.
+    """
+    if not convocacoes or convocacoes <= 0 or perc_presenca_minima is None:
+        return 0
+    minimo = float(perc_presenca_minima)
+    percentual = float(presencas) * 100.0 / convocacoes
+    if percentual >= minimo:
+        return 0
+    return max(0, math.floor(minimo * convocacoes / 100.0 - presencas))
+
+
+def expressao_carencias_turma():
+    """
+    Expressão SQL da regra de carências para linhas de ResumoPresencaMensal.
+
+    O percentual mínimo é lido da turma por subquery correlacionada, de modo
+    que um único UPDATE recalcula todas as linhas no banco.
+    """
+    Turma = get_turma_model()
+    perc_minima = Cast(
+        Subquery(
+            Turma.objects.filter(pk=OuterRef("turma_id")).values(
+                "perc_presenca_minima"
+            )[:1]
+        ),
+        FloatField(),
+    )
+    percentual = Cast(F("presencas"), FloatField()) * Value(100.0) / F("convocacoes")
+    faltantes = perc_minima * F("convocacoes") / Value(100.0) - F("presencas")
+
+    return Case(
+        When(convocacoes__lte=0, then=Value(0)),
+        When(
+            LessThan(percentual, perc_minima),
+            then=Greatest(Cast(Floor(faltantes), IntegerField()), Value(0)),
+        ),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def percentuais_minimos(turma_ids: Iterable[int]) -> Dict[int, Optional[Decimal]]:
+    """Carrega o percentual mínimo de presença de cada turma em uma query."""
+    return dict(
+        get_turma_model()
+        .objects.filter(id__in=set(turma_ids))
+        .values_list("id", "perc_presenca_minima")
+    )
+
+
 class CalculadoraCarencias:
     """
     Calculadora de carências para o sistema de presenças.
-    
+
     Responsabilidades:
     - Calcular carências por presença detalhada
     - Recalcular carências em lote
-    - Aplicar regras de configuração específica ou turma
+    - Aplicar a regra do percentual mínimo da turma
+
+    Regras por atividade (``ConfiguracaoPresenca``) não são suportadas: o
+    modelo é um placeholder legado sem tabela. O cálculo unitário, o
+    recálculo em lote e a visão agregada usam a mesma regra da turma.
     """
 
     @staticmethod
@@ -42,8 +125,8 @@ class CalculadoraCarencias:
             - carencias_antigas: Valor anterior (se existir)
             - carencias_novas: Valor calculado
             - diferenca: Diferença entre novo e antigo
-            - metodo_calculo: Método usado (configuracao_especifica/percentual_turma/sem_configuracao)
-            - configuracao_usada: ID da configuração (se aplicável)
+            - metodo_calculo: Método usado (percentual_turma/sem_configuracao)
+            - configuracao_usada: Sempre None (ConfiguracaoPresenca sem tabela)
             - percentual_presenca: Percentual atual
             - recalculado: Se foi recalculado
             - data_calculo: Timestamp
@@ -69,74 +152,27 @@ class CalculadoraCarencias:
                     "data_calculo": presenca.data_atualizacao,
                 }
 
-            # Buscar configuração
-            configuracao = None
-            try:
-                configuracao = ConfiguracaoPresenca.objects.get(
-                    turma=presenca.turma, atividade=presenca.atividade, ativo=True
-                )
-            except ConfiguracaoPresenca.DoesNotExist:
-                logger.warning(
-                    f"Configuração não encontrada para turma {presenca.turma.id} "
-                    f"e atividade {presenca.atividade.id}"
-                )
-
-            # Calcular carências
+            # Mesma regra do recálculo em lote e da visão agregada
             carencias_antigas = presenca.carencias
+            percentual_turma = presenca.turma.perc_presenca_minima
+            carencias_calculadas = calcular_carencias_turma(
+                presenca.convocacoes, presenca.presencas, percentual_turma
+            )
+            metodo_calculo = (
+                "percentual_turma"
+                if percentual_turma is not None
+                else "sem_configuracao"
+            )
 
-            if configuracao:
-                # Usar configuração específica
-                percentual_atual = presenca.calcular_percentual()
-                limite_carencia = configuracao.get_limite_carencia_por_percentual(
-                    percentual_atual
-                )
-
-                # Aplicar peso
-                carencia_permitida = int(
-                    limite_carencia * float(configuracao.peso_calculo)
-                )
-
-                # Calcular carências necessárias
-                if presenca.convocacoes > 0:
-                    presencas_necessarias = presenca.convocacoes - carencia_permitida
-                    carencias_calculadas = max(
-                        0, presencas_necessarias - presenca.presencas
-                    )
-                else:
-                    carencias_calculadas = 0
-
-                metodo_calculo = "configuracao_especifica"
-            else:
-                # Usar lógica padrão da turma
-                percentual_turma = getattr(
-                    presenca.turma,
-                    "perc_presenca_minima",
-                    getattr(presenca.turma, "perc_carencia", None),
-                )
-
-                if percentual_turma:
-                    percentual_atual = presenca.calcular_percentual()
-                    percentual_minimo = percentual_turma
-
-                    if percentual_atual < percentual_minimo:
-                        presencas_necessarias = (
-                            percentual_minimo * presenca.convocacoes
-                        ) / 100
-                        carencias_calculadas = int(
-                            presencas_necessarias - presenca.presencas
-                        )
-                        carencias_calculadas = max(0, carencias_calculadas)
-                    else:
-                        carencias_calculadas = 0
-
-                    metodo_calculo = "percentual_turma"
-                else:
-                    carencias_calculadas = 0
-                    metodo_calculo = "sem_configuracao"
-
-            # Atualizar presença
+            # A visão agregada é somente leitura: grava no resumo mensal, de
+            # onde as carências são lidas
+            ResumoPresencaMensal.objects.filter(
+                aluno_id=presenca.aluno_id,
+                turma_id=presenca.turma_id,
+                atividade_id=presenca.atividade_id,
+                periodo=presenca.periodo,
+            ).update(carencias=carencias_calculadas)
             presenca.carencias = carencias_calculadas
-            presenca.save()
 
             resultado = {
                 "presenca_id": presenca_detalhada_id,
@@ -144,8 +180,8 @@ class CalculadoraCarencias:
                 "carencias_novas": carencias_calculadas,
                 "diferenca": carencias_calculadas - (carencias_antigas or 0),
                 "metodo_calculo": metodo_calculo,
-                "configuracao_usada": configuracao.id if configuracao else None,
-                "percentual_presenca": float(presenca.percentual_presenca),
+                "configuracao_usada": None,
+                "percentual_presenca": presenca.calcular_percentual(),
                 "recalculado": True,
                 "data_calculo": timezone.now(),
             }
@@ -172,23 +208,37 @@ class CalculadoraCarencias:
         atividade_id: Optional[int] = None,
         periodo_inicio: Optional[date] = None,
         periodo_fim: Optional[date] = None,
+        em_lotes: bool = False,
+        batch_size: int = 2000,
     ) -> Dict[str, Any]:
         """
-        Recalcula todas as carências para um conjunto de presenças.
+        Recalcula as carências do resumo mensal de forma vetorizada.
+
+        Por padrão executa um único UPDATE no banco, com o percentual mínimo
+        de cada turma obtido por subquery. Com ``em_lotes=True`` os
+        percentuais são carregados uma vez por turma, as carências calculadas
+        em Python sobre tuplas de ``values_list`` e gravadas com
+        ``bulk_update`` em lotes. Em ambos os modos só linhas alteradas são
+        gravadas.
 
         Args:
             turma_id: ID da turma (opcional)
             atividade_id: ID da atividade (opcional)
             periodo_inicio: Data início (opcional)
             periodo_fim: Data fim (opcional)
+            em_lotes: Se True, usa cálculo em Python com bulk_update
+            batch_size: Tamanho dos lotes de leitura e gravação
 
         Returns:
             Dict com resultado do recálculo:
-            - total_presencas: Total de presenças processadas
-            - presencas_atualizadas: Total atualizado com sucesso
+            - total_presencas: Total de linhas de resumo avaliadas
+            - presencas_atualizadas: Total de linhas com carências alteradas
             - erros: Lista de erros encontrados
             - total_erros: Quantidade de erros
             - filtros_aplicados: Filtros usados
+            - metodo: "sql" ou "lotes"
+            - duracao_segundos: Tempo de execução
+            - linhas_por_segundo: Vazão do recálculo
             - data_recalculo: Timestamp
         """
         try:
@@ -203,39 +253,43 @@ class CalculadoraCarencias:
             if periodo_fim:
                 filtros["periodo__lte"] = periodo_fim
 
-            # Buscar presenças
-            presencas = PresencaDetalhada.objects.filter(**filtros).select_related(
-                "aluno", "turma", "atividade"
-            )
+            resumos = ResumoPresencaMensal.objects.filter(**filtros).order_by()
 
-            total_presencas = presencas.count()
-            presencas_atualizadas = 0
-            erros = []
+            inicio = time.perf_counter()
+            total_presencas = resumos.count()
 
             logger.info(f"Iniciando recálculo de {total_presencas} presenças")
 
-            for presenca in presencas:
-                try:
-                    resultado = CalculadoraCarencias.calcular(
-                        presenca.id, forcar_recalculo=True
-                    )
-                    if resultado["recalculado"]:
-                        presencas_atualizadas += 1
-                except Exception as e:
-                    erros.append({"presenca_id": presenca.id, "erro": str(e)})
+            if em_lotes:
+                presencas_atualizadas = CalculadoraCarencias._recalcular_em_lotes(
+                    resumos, batch_size
+                )
+            else:
+                expressao = expressao_carencias_turma()
+                presencas_atualizadas = resumos.exclude(carencias=expressao).update(
+                    carencias=expressao
+                )
+
+            duracao = time.perf_counter() - inicio
+            linhas_por_segundo = (
+                round(total_presencas / duracao, 1) if duracao > 0 else 0.0
+            )
 
             resultado = {
                 "total_presencas": total_presencas,
                 "presencas_atualizadas": presencas_atualizadas,
-                "erros": erros,
-                "total_erros": len(erros),
+                "erros": [],
+                "total_erros": 0,
                 "filtros_aplicados": filtros,
+                "metodo": "lotes" if em_lotes else "sql",
+                "duracao_segundos": round(duracao, 3),
+                "linhas_por_segundo": linhas_por_segundo,
                 "data_recalculo": timezone.now(),
             }
 
             logger.info(
-                f"Recálculo concluído: {presencas_atualizadas}/{total_presencas} atualizadas, "
-                f"{len(erros)} erros"
+                f"Recálculo concluído: {presencas_atualizadas}/{total_presencas} "
+                f"atualizadas em {duracao:.3f}s ({linhas_por_segundo} linhas/s)"
             )
 
             return resultado
@@ -243,3 +297,42 @@ class CalculadoraCarencias:
         except Exception as e:
             logger.error(f"Erro no recálculo geral de carências: {str(e)}")
             raise ValidationError(f"Erro no recálculo: {str(e)}")
+
+    @staticmethod
+    def _recalcular_em_lotes(resumos, batch_size: int) -> int:
+        """
+        Calcula carências em Python e grava apenas as alteradas com bulk_update.
+
+        Args:
+            resumos: QuerySet de ResumoPresencaMensal já filtrado
+            batch_size: Tamanho dos lotes de leitura e gravação
+
+        Returns:
+            Quantidade de linhas atualizadas
+        """
+        percentuais = percentuais_minimos(
+            resumos.values_list("turma_id", flat=True).distinct()
+        )
+
+        atualizadas = 0
+        alterados = []
+        linhas = resumos.values_list(
+            "id", "turma_id", "convocacoes", "presencas", "carencias"
+        ).iterator(chunk_size=batch_size)
+
+        for resumo_id, turma_id, convocacoes, presencas, carencias in linhas:
+            novas = calcular_carencias_turma(
+                convocacoes, presencas, percentuais.get(turma_id)
+            )
+            if novas != carencias:
+                alterados.append(ResumoPresencaMensal(id=resumo_id, carencias=novas))
+            if len(alterados) >= batch_size:
+                ResumoPresencaMensal.objects.bulk_update(alterados, ["carencias"])
+                atualizadas += len(alterados)
+                alterados = []
+
+        if alterados:
+            ResumoPresencaMensal.objects.bulk_update(alterados, ["carencias"])
+            atualizadas += len(alterados)
+
+        return atualizadas
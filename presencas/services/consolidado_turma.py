@@ -8,19 +8,43 @@ from decimal import Decimal
 from datetime import date
 from typing import Dict, Any, List, Optional
 
-from django.db.models import Sum, Count
+from importlib import import_module
+
+from django.db.models import Sum, Count, Q
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
-from ..models import PresencaDetalhada
+from ..models import ResumoPresencaMensal
 
 logger = logging.getLogger(__name__)
 
+SOMAS_PRESENCA = {
+    "convocacoes": Sum("convocacoes"),
+    "presencas": Sum("presencas"),
+    "faltas": Sum("faltas"),
+    "voluntario_extra": Sum("voluntario_extra"),
+    "voluntario_simples": Sum("voluntario_simples"),
+    "carencias": Sum("carencias"),
+}
+
+
+def get_turma_model():
+    """Obtém o modelo Turma dinamicamente."""
+    turmas_module = import_module("turmas.models")
+    return getattr(turmas_module, "Turma")
+
+
+def _percentual(presencas: int, convocacoes: int) -> float:
+    """Percentual de presença com duas casas decimais."""
+    if not convocacoes:
+        return 0.0
+    return float(round((Decimal(presencas) / Decimal(convocacoes)) * Decimal("100"), 2))
+
 
 class ConsolidadoTurma:
     """
     Calculadora de estatísticas consolidadas por turma.
-    
+
     Responsabilidades:
     - Calcular estatísticas gerais da turma
     - Agregar dados por atividade
@@ -61,13 +85,8 @@ class ConsolidadoTurma:
             if periodo_fim:
                 filtros["periodo__lte"] = periodo_fim
 
-            # Query otimizada
-            presencas = PresencaDetalhada.objects.filter(**filtros).select_related(
-                "aluno", "turma", "atividade"
-            )
-
-            if not presencas.exists():
-                return ConsolidadoTurma._criar_vazio(turma_id)
+            # Somente agregações no banco: nenhuma instância é materializada
+            presencas = ResumoPresencaMensal.objects.filter(**filtros).order_by()
 
             # Agregações gerais
             agregacoes = presencas.aggregate(
@@ -81,6 +100,9 @@ class ConsolidadoTurma:
                 atividades_distintas=Count("atividade", distinct=True),
             )
 
+            if not agregacoes["alunos_distintos"]:
+                return ConsolidadoTurma._criar_vazio(turma_id)
+
             # Percentual médio da turma
             percentual_medio = Decimal("0.00")
             if agregacoes["total_convocacoes"] and agregacoes["total_convocacoes"] > 0:
@@ -102,23 +124,17 @@ class ConsolidadoTurma:
             estatisticas_alunos = ConsolidadoTurma._calcular_por_aluno(presencas)
 
             # Distribuição de carências
-            distribuicao_carencias = (
-                ConsolidadoTurma._calcular_distribuicao_carencias(presencas)
+            distribuicao_carencias = ConsolidadoTurma._calcular_distribuicao_carencias(
+                presencas
             )
 
             # Informações da turma
-            turma_info = None
-            if presencas.exists():
-                primeira_presenca = presencas.first()
-                turma_info = {
-                    "id": primeira_presenca.turma.id,
-                    "nome": primeira_presenca.turma.nome,
-                    "perc_presenca_minima": getattr(
-                        primeira_presenca.turma,
-                        "perc_presenca_minima",
-                        getattr(primeira_presenca.turma, "perc_carencia", None),
-                    ),
-                }
+            turma_info = (
+                get_turma_model()
+                .objects.filter(id=turma_id)
+                .values("id", "nome", "perc_presenca_minima")
+                .first()
+            )
 
             estatisticas = {
                 "turma": turma_info,
@@ -177,7 +193,11 @@ class ConsolidadoTurma:
             Dict com valores zerados
         """
         return {
-            "turma": {"id": turma_id, "nome": "Sem registros", "perc_presenca_minima": None},
+            "turma": {
+                "id": turma_id,
+                "nome": "Sem registros",
+                "perc_presenca_minima": None,
+            },
             "periodo": {"inicio": None, "fim": None},
             "totais": {
                 "convocacoes": 0,
@@ -200,136 +220,72 @@ class ConsolidadoTurma:
     @staticmethod
     def _calcular_por_atividade(presencas_queryset) -> List[Dict[str, Any]]:
         """
-        Calcula estatísticas agrupadas por atividade.
+        Calcula estatísticas agrupadas por atividade em uma única query.
 
         Args:
-            presencas_queryset: QuerySet de PresencaDetalhada
+            presencas_queryset: QuerySet de ResumoPresencaMensal
 
         Returns:
             Lista de dicts com estatísticas por atividade
         """
-        atividades = {}
-
-        for presenca in presencas_queryset:
-            atividade_id = presenca.atividade.id
-
-            if atividade_id not in atividades:
-                atividades[atividade_id] = {
-                    "id": atividade_id,
-                    "nome": presenca.atividade.nome,
-                    "convocacoes": 0,
-                    "presencas": 0,
-                    "faltas": 0,
-                    "voluntario_extra": 0,
-                    "voluntario_simples": 0,
-                    "carencias": 0,
-                    "alunos": set(),
-                }
-
-            atividade = atividades[atividade_id]
-            atividade["convocacoes"] += presenca.convocacoes
-            atividade["presencas"] += presenca.presencas
-            atividade["faltas"] += presenca.faltas
-            atividade["voluntario_extra"] += presenca.voluntario_extra
-            atividade["voluntario_simples"] += presenca.voluntario_simples
-            atividade["carencias"] += presenca.carencias
-            atividade["alunos"].add(presenca.aluno.id)
-
-        # Calcular percentuais e finalizar
-        resultado = []
-        for atividade_data in atividades.values():
-            percentual = Decimal("0.00")
-            if atividade_data["convocacoes"] > 0:
-                percentual = round(
-                    (
-                        Decimal(atividade_data["presencas"])
-                        / Decimal(atividade_data["convocacoes"])
-                    )
-                    * Decimal("100"),
-                    2,
-                )
-
-            resultado.append(
-                {
-                    "id": atividade_data["id"],
-                    "nome": atividade_data["nome"],
-                    "convocacoes": atividade_data["convocacoes"],
-                    "presencas": atividade_data["presencas"],
-                    "faltas": atividade_data["faltas"],
-                    "voluntario_extra": atividade_data["voluntario_extra"],
-                    "voluntario_simples": atividade_data["voluntario_simples"],
-                    "carencias": atividade_data["carencias"],
-                    "total_alunos": len(atividade_data["alunos"]),
-                    "percentual_presenca": float(percentual),
-                }
-            )
-
-        # Ordenar por data (ID da atividade como proxy)
-        return sorted(resultado, key=lambda x: x["id"])
+        linhas = (
+            presencas_queryset.values("atividade_id", "atividade__nome")
+            .annotate(total_alunos=Count("aluno", distinct=True), **SOMAS_PRESENCA)
+            .order_by("atividade_id")
+        )
+
+        # Ordenado por ID da atividade (proxy de data)
+        return [
+            {
+                "id": linha["atividade_id"],
+                "nome": linha["atividade__nome"],
+                "convocacoes": linha["convocacoes"] or 0,
+                "presencas": linha["presencas"] or 0,
+                "faltas": linha["faltas"] or 0,
+                "voluntario_extra": linha["voluntario_extra"] or 0,
+                "voluntario_simples": linha["voluntario_simples"] or 0,
+                "carencias": linha["carencias"] or 0,
+                "total_alunos": linha["total_alunos"],
+                "percentual_presenca": _percentual(
+                    linha["presencas"] or 0, linha["convocacoes"] or 0
+                ),
+            }
+            for linha in linhas
+        ]
 
     @staticmethod
     def _calcular_por_aluno(presencas_queryset) -> List[Dict[str, Any]]:
         """
-        Calcula estatísticas agrupadas por aluno.
+        Calcula estatísticas agrupadas por aluno em uma única query.
 
         Args:
-            presencas_queryset: QuerySet de PresencaDetalhada
+            presencas_queryset: QuerySet de ResumoPresencaMensal
 
         Returns:
             Lista de dicts com estatísticas por aluno
         """
-        alunos = {}
-
-        for presenca in presencas_queryset:
-            aluno_id = presenca.aluno.id
-
-            if aluno_id not in alunos:
-                alunos[aluno_id] = {
-                    "id": aluno_id,
-                    "nome": presenca.aluno.nome,
-                    "convocacoes": 0,
-                    "presencas": 0,
-                    "faltas": 0,
-                    "voluntario_extra": 0,
-                    "voluntario_simples": 0,
-                    "carencias": 0,
-                }
-
-            aluno = alunos[aluno_id]
-            aluno["convocacoes"] += presenca.convocacoes
-            aluno["presencas"] += presenca.presencas
-            aluno["faltas"] += presenca.faltas
-            aluno["voluntario_extra"] += presenca.voluntario_extra
-            aluno["voluntario_simples"] += presenca.voluntario_simples
-            aluno["carencias"] += presenca.carencias
-
-        # Calcular percentuais e finalizar
-        resultado = []
-        for aluno_data in alunos.values():
-            percentual = Decimal("0.00")
-            if aluno_data["convocacoes"] > 0:
-                percentual = round(
-                    (
-                        Decimal(aluno_data["presencas"])
-                        / Decimal(aluno_data["convocacoes"])
-                    )
-                    * Decimal("100"),
-                    2,
-                )
-
-            resultado.append(
-                {
-                    "id": aluno_data["id"],
-                    "nome": aluno_data["nome"],
-                    "convocacoes": aluno_data["convocacoes"],
-                    "presencas": aluno_data["presencas"],
-                    "faltas": aluno_data["faltas"],
-                    "voluntario_extra": aluno_data["voluntario_extra"],
-                    "voluntario_simples": aluno_data["voluntario_simples"],
-                    "carencias": aluno_data["carencias"],
-                    "percentual_presenca": float(percentual),
-                }
-            )
+        linhas = (
+            presencas_queryset.values("aluno_id", "aluno__nome")
+            .annotate(**SOMAS_PRESENCA)
+            .order_by()
+        )
+
+        resultado = [
+            {
+                "id": linha["aluno_id"],
+                "nome": linha["aluno__nome"],
+                "convocacoes": linha["convocacoes"] or 0,
+                "presencas": linha["presencas"] or 0,
+                "faltas": linha["faltas"] or 0,
+                "voluntario_extra": linha["voluntario_extra"] or 0,
+                "voluntario_simples": linha["voluntario_simples"] or 0,
+                "carencias": linha["carencias"] or 0,
+                "percentual_presenca": _percentual(
+                    linha["presencas"] or 0, linha["convocacoes"] or 0
+                ),
+            }
+            for linha in linhas
+        ]
 
         # Ordenar por nome
         return sorted(resultado, key=lambda x: x["nome"])
@@ -339,36 +295,30 @@ class ConsolidadoTurma:
         """
         Calcula distribuição de alunos por faixa de carências.
 
+        Soma as carências por aluno em uma subquery e conta as faixas com
+        agregação condicional, tudo no banco.
+
         Args:
-            presencas_queryset: QuerySet de PresencaDetalhada
+            presencas_queryset: QuerySet de ResumoPresencaMensal
 
         Returns:
             Dict com contagem por faixa: sem_carencias, ate_3, ate_6, mais_de_6
         """
-        # Agregar carências por aluno
-        carencias_por_aluno = {}
-        for presenca in presencas_queryset:
-            aluno_id = presenca.aluno.id
-            if aluno_id not in carencias_por_aluno:
-                carencias_por_aluno[aluno_id] = 0
-            carencias_por_aluno[aluno_id] += presenca.carencias
-
-        # Distribuir em faixas
-        distribuicao = {
-            "sem_carencias": 0,
-            "ate_3": 0,
-            "ate_6": 0,
-            "mais_de_6": 0,
-        }
-
-        for carencias in carencias_por_aluno.values():
-            if carencias == 0:
-                distribuicao["sem_carencias"] += 1
-            elif carencias <= 3:
-                distribuicao["ate_3"] += 1
-            elif carencias <= 6:
-                distribuicao["ate_6"] += 1
-            else:
-                distribuicao["mais_de_6"] += 1
-
-        return distribuicao
+        distribuicao = (
+            presencas_queryset.values("aluno_id")
+            .annotate(total_carencias=Sum("carencias"))
+            .order_by()
+            .aggregate(
+                sem_carencias=Count("aluno_id", filter=Q(total_carencias=0)),
+                ate_3=Count(
+                    "aluno_id",
+                    filter=Q(total_carencias__gte=1, total_carencias__lte=3),
+                ),
+                ate_6=Count(
+                    "aluno_id",
+                    filter=Q(total_carencias__gte=4, total_carencias__lte=6),
+                ),
+                mais_de_6=Count("aluno_id", filter=Q(total_carencias__gt=6)),
+            )
+        )
+        return {faixa: total or 0 for faixa, total in distribuicao.items()}
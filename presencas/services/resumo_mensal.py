@@ -0,0 +1,404 @@
+"""
+Serviço de manutenção do resumo mensal de presenças.
+
+Mantém a tabela ResumoPresencaMensal sincronizada com RegistroPresenca por
+meio de upserts incrementais por chave (aluno, turma, atividade, período),
+evitando que painéis e relatórios reagreguem todo o histórico a cada consulta.
+"""
+
+import logging
+import threading
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+from ..models import RegistroPresenca, ResumoPresencaMensal
+from .carencias import calcular_carencias_turma, percentuais_minimos
+
+logger = logging.getLogger(__name__)
+
+# (aluno_id, turma_id, atividade_id, primeiro dia do mês)
+ChaveResumo = Tuple[int, int, int, date]
+
+CAMPOS_AGREGADOS = [
+    "convocacoes",
+    "presencas",
+    "faltas",
+    "voluntario_extra",
+    "voluntario_simples",
+    "carencias",
+]
+
+CAMPOS_CHAVE = ["aluno", "turma", "atividade", "periodo"]
+
+# Chaves pendentes por thread, processadas no commit da transação corrente
+_pendentes = threading.local()
+
+
+def _proximo_mes(periodo: date) -> date:
+    """Retorna o primeiro dia do mês seguinte ao período informado."""
+    if periodo.month == 12:
+        return date(periodo.year + 1, 1, 1)
+    return date(periodo.year, periodo.month + 1, 1)
+
+
+class ResumoPresencaMensalService:
+    """
+    Manutenção incremental da tabela de resumo mensal de presenças.
+
+    Responsabilidades:
+    - Recalcular apenas as chaves afetadas por gravações de RegistroPresenca
+    - Agendar a atualização para o commit da transação corrente
+    - Reconstruir e verificar o resumo a partir dos registros brutos
+    """
+
+    TAMANHO_LOTE = 200
+
+    @staticmethod
+    def chave(
+        aluno_id: int, turma_id: int, atividade_id: int, data: date
+    ) -> ChaveResumo:
+        """Monta a chave do resumo para um registro de presença."""
+        if isinstance(data, str):
+            data = date.fromisoformat(data)
+        return (aluno_id, turma_id, atividade_id, data.replace(day=1))
+
+    @classmethod
+    def chaves_de_registros(cls, registros: Iterable[Any]) -> Set[ChaveResumo]:
+        """
+        Extrai as chaves de resumo de registros ou dicionários de dados.
+
+        Args:
+            registros: Instâncias de RegistroPresenca ou dicts com
+                aluno_id, turma_id, atividade_id e data
+
+        Returns:
+            Conjunto de chaves afetadas
+        """
+        chaves = set()
+        for registro in registros:
+            if isinstance(registro, dict):
+                chaves.add(
+                    cls.chave(
+                        registro["aluno_id"],
+                        registro["turma_id"],
+                        registro["atividade_id"],
+                        registro["data"],
+                    )
+                )
+            else:
+                chaves.add(
+                    cls.chave(
+                        registro.aluno_id,
+                        registro.turma_id,
+                        registro.atividade_id,
+                        registro.data,
+                    )
+                )
+        return chaves
+
+    @staticmethod
+    def agregar(queryset):
+        """
+        Agrega registros de presença por aluno/turma/atividade/mês.
+
+        As carências não vêm da agregação: dependem do percentual mínimo da
+        turma e são aplicadas em ``_instanciar``.
+
+        Args:
+            queryset: QuerySet de RegistroPresenca já filtrado
+
+        Returns:
+            QuerySet de dicts com a chave e os contadores brutos do resumo
+        """
+        return (
+            queryset.order_by()
+            .annotate(periodo=TruncMonth("data"))
+            .values("aluno_id", "turma_id", "atividade_id", "periodo")
+            .annotate(
+                convocacoes=Count("id", filter=Q(convocado=True)),
+                presencas=Count("id", filter=Q(status="P")),
+                faltas=Count("id", filter=Q(status__in=["F", "J"])),
+                voluntario_extra=Count("id", filter=Q(status="V1")),
+                voluntario_simples=Count("id", filter=Q(status="V2")),
+            )
+        )
+
+    @classmethod
+    def atualizar(cls, chaves: Iterable[ChaveResumo]) -> Dict[str, int]:
+        """
+        Recalcula e grava o resumo das chaves informadas.
+
+        Chaves sem registros brutos têm sua linha de resumo removida.
+
+        Args:
+            chaves: Chaves (aluno_id, turma_id, atividade_id, periodo)
+
+        Returns:
+            Dict com quantidades de linhas atualizadas e removidas
+        """
+        chaves = list(set(chaves))
+        resultado = {"atualizados": 0, "removidos": 0}
+
+        for inicio in range(0, len(chaves), cls.TAMANHO_LOTE):
+            lote = chaves[inicio : inicio + cls.TAMANHO_LOTE]
+            atualizados, removidos = cls._atualizar_lote(lote)
+            resultado["atualizados"] += atualizados
+            resultado["removidos"] += removidos
+
+        if chaves:
+            # Importação tardia: visao_agregada depende deste módulo
+            from .visao_agregada import VisaoPresencaDetalhada
+
+            VisaoPresencaDetalhada.marcar_pendente()
+
+        return resultado
+
+    @classmethod
+    def agendar(cls, chaves: Iterable[ChaveResumo]) -> None:
+        """
+        Agenda a atualização das chaves para o commit da transação corrente.
+
+        Fora de transação a atualização é executada imediatamente. Dentro de
+        uma transação as chaves são acumuladas e processadas uma única vez
+        no commit, de modo que gravações em laço geram um só upsert.
+        """
+        chaves = set(chaves)
+        if not chaves:
+            return
+
+        if not transaction.get_connection().in_atomic_block:
+            cls.atualizar(chaves)
+            return
+
+        pendentes = getattr(_pendentes, "chaves", None)
+        if pendentes is None:
+            pendentes = _pendentes.chaves = set()
+        pendentes.update(chaves)
+        transaction.on_commit(cls._processar_pendentes)
+
+    @classmethod
+    def _processar_pendentes(cls) -> None:
+        """Processa as chaves acumuladas na transação que acabou de confirmar."""
+        pendentes = getattr(_pendentes, "chaves", None)
+        if not pendentes:
+            return
+        _pendentes.chaves = set()
+        try:
+            cls.atualizar(pendentes)
+        except Exception as e:
+            # O resumo pode ser reconstruído; não propagar erro após o commit
+            logger.error(f"Erro ao atualizar resumo mensal de presenças: {str(e)}")
+
+    @classmethod
+    def reconstruir(
+        cls,
+        turma_id: Optional[int] = None,
+        periodo_inicio: Optional[date] = None,
+        periodo_fim: Optional[date] = None,
+        batch_size: int = 1000,
+    ) -> Dict[str, int]:
+        """
+        Reconstrói o resumo a partir dos registros brutos.
+
+        Args:
+            turma_id: ID da turma (opcional)
+            periodo_inicio: Data início (opcional)
+            periodo_fim: Data fim (opcional)
+            batch_size: Tamanho dos lotes de inserção
+
+        Returns:
+            Dict com quantidades de linhas removidas e criadas
+        """
+        registros, resumos = cls._querysets_escopo(
+            turma_id, periodo_inicio, periodo_fim
+        )
+        percentuais = percentuais_minimos(
+            registros.order_by().values_list("turma_id", flat=True).distinct()
+        )
+
+        with transaction.atomic():
+            removidas, _ = resumos.delete()
+            criadas = 0
+            lote: List[ResumoPresencaMensal] = []
+            for linha in cls.agregar(registros).iterator(chunk_size=batch_size):
+                lote.append(cls._instanciar(linha, percentuais))
+                if len(lote) >= batch_size:
+                    ResumoPresencaMensal.objects.bulk_create(lote)
+                    criadas += len(lote)
+                    lote = []
+            if lote:
+                ResumoPresencaMensal.objects.bulk_create(lote)
+                criadas += len(lote)
+
+        logger.info(
+            f"Resumo mensal reconstruído: {removidas} removidas, {criadas} criadas"
+        )
+        return {"removidas": removidas, "criadas": criadas}
+
+    @classmethod
+    def verificar(
+        cls,
+        turma_id: Optional[int] = None,
+        periodo_inicio: Optional[date] = None,
+        periodo_fim: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Compara o resumo gravado com a agregação dos registros brutos.
+
+        Returns:
+            Lista de divergências com chave, valores esperados e atuais
+        """
+        registros, resumos = cls._querysets_escopo(
+            turma_id, periodo_inicio, periodo_fim
+        )
+        linhas = list(cls.agregar(registros))
+        percentuais = percentuais_minimos(linha["turma_id"] for linha in linhas)
+
+        esperados = {}
+        for linha in linhas:
+            resumo = cls._instanciar(linha, percentuais)
+            esperados[
+                (resumo.aluno_id, resumo.turma_id, resumo.atividade_id, resumo.periodo)
+            ] = tuple(getattr(resumo, campo) for campo in CAMPOS_AGREGADOS)
+        atuais = {
+            linha[:4]: tuple(linha[4:])
+            for linha in resumos.order_by().values_list(
+                "aluno_id", "turma_id", "atividade_id", "periodo", *CAMPOS_AGREGADOS
+            )
+        }
+
+        divergencias = []
+        for chave in sorted(set(esperados) | set(atuais), key=str):
+            if esperados.get(chave) != atuais.get(chave):
+                divergencias.append(
+                    {
+                        "chave": chave,
+                        "esperado": esperados.get(chave),
+                        "atual": atuais.get(chave),
+                    }
+                )
+        return divergencias
+
+    @classmethod
+    def _atualizar_lote(cls, chaves: List[ChaveResumo]) -> Tuple[int, int]:
+        """Recalcula um lote de chaves com uma leitura e um upsert."""
+        filtro_registros = Q()
+        for aluno_id, turma_id, atividade_id, periodo in chaves:
+            filtro_registros |= Q(
+                aluno_id=aluno_id,
+                turma_id=turma_id,
+                atividade_id=atividade_id,
+                data__gte=periodo,
+                data__lt=_proximo_mes(periodo),
+            )
+
+        linhas = list(cls.agregar(RegistroPresenca.objects.filter(filtro_registros)))
+        encontradas = {
+            (
+                linha["aluno_id"],
+                linha["turma_id"],
+                linha["atividade_id"],
+                linha["periodo"],
+            )
+            for linha in linhas
+        }
+        ausentes = [chave for chave in chaves if chave not in encontradas]
+
+        with transaction.atomic():
+            removidos = 0
+            if ausentes:
+                removidos, _ = ResumoPresencaMensal.objects.filter(
+                    cls._filtro_resumo(ausentes)
+                ).delete()
+            percentuais = percentuais_minimos(linha["turma_id"] for linha in linhas)
+            cls._gravar([cls._instanciar(linha, percentuais) for linha in linhas])
+
+        return len(linhas), removidos
+
+    @classmethod
+    def _gravar(cls, resumos: List[ResumoPresencaMensal]) -> None:
+        """Grava as linhas com upsert nativo ou remoção seguida de inserção."""
+        if not resumos:
+            return
+
+        if connection.features.supports_update_conflicts_with_target:
+            ResumoPresencaMensal.objects.bulk_create(
+                resumos,
+                update_conflicts=True,
+                unique_fields=CAMPOS_CHAVE,
+                update_fields=CAMPOS_AGREGADOS + ["atualizado_em"],
+            )
+            return
+
+        chaves = [(r.aluno_id, r.turma_id, r.atividade_id, r.periodo) for r in resumos]
+        ResumoPresencaMensal.objects.filter(cls._filtro_resumo(chaves)).delete()
+        ResumoPresencaMensal.objects.bulk_create(resumos)
+
+    @staticmethod
+    def _filtro_resumo(chaves: Iterable[ChaveResumo]) -> Q:
+        """Monta filtro OR com as chaves exatas do resumo."""
+        filtro = Q()
+        for aluno_id, turma_id, atividade_id, periodo in chaves:
+            filtro |= Q(
+                aluno_id=aluno_id,
+                turma_id=turma_id,
+                atividade_id=atividade_id,
+                periodo=periodo,
+            )
+        return filtro
+
+    @staticmethod
+    def _instanciar(
+        linha: Dict[str, Any], percentuais: Dict[int, Any]
+    ) -> ResumoPresencaMensal:
+        """
+        Cria instância (não salva) do resumo a partir de uma linha agregada.
+
+        Args:
+            linha: Linha retornada por ``agregar``
+            percentuais: Percentual mínimo de presença por turma
+        """
+        return ResumoPresencaMensal(
+            aluno_id=linha["aluno_id"],
+            turma_id=linha["turma_id"],
+            atividade_id=linha["atividade_id"],
+            periodo=linha["periodo"],
+            convocacoes=linha["convocacoes"],
+            presencas=linha["presencas"],
+            faltas=linha["faltas"],
+            voluntario_extra=linha["voluntario_extra"],
+            voluntario_simples=linha["voluntario_simples"],
+            carencias=calcular_carencias_turma(
+                linha["convocacoes"],
+                linha["presencas"],
+                percentuais.get(linha["turma_id"]),
+            ),
+        )
+
+    @staticmethod
+    def _querysets_escopo(
+        turma_id: Optional[int],
+        periodo_inicio: Optional[date],
+        periodo_fim: Optional[date],
+    ):
+        """Retorna (registros, resumos) restritos ao mesmo escopo de meses."""
+        registros = RegistroPresenca.objects.all()
+        resumos = ResumoPresencaMensal.objects.all()
+
+        if turma_id:
+            registros = registros.filter(turma_id=turma_id)
+            resumos = resumos.filter(turma_id=turma_id)
+        if periodo_inicio:
+            inicio = periodo_inicio.replace(day=1)
+            registros = registros.filter(data__gte=inicio)
+            resumos = resumos.filter(periodo__gte=inicio)
+        if periodo_fim:
+            fim = _proximo_mes(periodo_fim.replace(day=1))
+            registros = registros.filter(data__lt=fim)
+            resumos = resumos.filter(periodo__lt=fim)
+
+        return registros, resumos
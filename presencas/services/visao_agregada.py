@@ -0,0 +1,109 @@
+"""
+Manutenção da visão agregada legada ``presencas_presencadetalhada``.
+
+No PostgreSQL a visão é materializada (migração 0007) e precisa ser
+atualizada periodicamente; nos demais bancos continua sendo uma view comum,
+sempre atual.
+"""
+
+import logging
+import time
+from datetime import date
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+from django.db import connection
+
+from .resumo_mensal import ResumoPresencaMensalService
+
+logger = logging.getLogger(__name__)
+
+NOME_VISAO = "presencas_presencadetalhada"
+
+# Sinaliza que houve gravações desde a última atualização da visão
+CHAVE_PENDENTE = "presencas:visao_agregada:pendente"
+
+
+class VisaoPresencaDetalhada:
+    """
+    Atualização da visão materializada de presenças detalhadas.
+
+    Responsabilidades:
+    - Marcar a visão como desatualizada após gravações
+    - Executar REFRESH MATERIALIZED VIEW CONCURRENTLY quando necessário
+    - Atualizar parcialmente os agregados de uma turma
+    """
+
+    @staticmethod
+    def materializada() -> bool:
+        """Indica se o banco atual usa a visão materializada."""
+        return connection.vendor == "postgresql"
+
+    @staticmethod
+    def marcar_pendente() -> None:
+        """Marca a visão para ser atualizada na próxima execução agendada."""
+        cache.set(CHAVE_PENDENTE, True, None)
+
+    @classmethod
+    def atualizar(
+        cls, concorrente: bool = True, forcar: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Atualiza a visão materializada.
+
+        A atualização concorrente mantém a visão disponível para leitura
+        durante o recálculo, apoiada no índice único da chave.
+
+        Args:
+            concorrente: Se True, usa REFRESH ... CONCURRENTLY
+            forcar: Se True, atualiza mesmo sem gravações pendentes
+
+        Returns:
+            Dict com indicador de atualização, motivo e duração em segundos
+        """
+        if not cls.materializada():
+            return {"atualizada": False, "motivo": "visao_comum", "duracao": 0.0}
+
+        if not forcar and not cache.get(CHAVE_PENDENTE):
+            return {"atualizada": False, "motivo": "sem_alteracoes", "duracao": 0.0}
+
+        # Limpar antes do refresh: gravações durante o recálculo remarcam a visão
+        cache.delete(CHAVE_PENDENTE)
+
+        sql = "REFRESH MATERIALIZED VIEW {}{}".format(
+            "CONCURRENTLY " if concorrente else "", NOME_VISAO
+        )
+        inicio = time.monotonic()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+        except Exception:
+            cls.marcar_pendente()
+            raise
+        duracao = round(time.monotonic() - inicio, 3)
+
+        logger.info(f"Visão {NOME_VISAO} atualizada em {duracao}s")
+        return {"atualizada": True, "motivo": "atualizada", "duracao": duracao}
+
+    @classmethod
+    def atualizar_turma(
+        cls,
+        turma_id: int,
+        periodo_inicio: Optional[date] = None,
+        periodo_fim: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """
+        Atualiza parcialmente os agregados de uma turma.
+
+        O PostgreSQL não permite refresh parcial de visão materializada; a
+        fatia da turma é reconstruída no resumo mensal (lido pelos painéis)
+        e a visão fica marcada para o próximo refresh concorrente.
+
+        Returns:
+            Dict com o resultado da reconstrução do resumo da turma
+        """
+        resultado = ResumoPresencaMensalService.reconstruir(
+            turma_id=turma_id, periodo_inicio=periodo_inicio, periodo_fim=periodo_fim
+        )
+        cls.marcar_pendente()
+        return resultado
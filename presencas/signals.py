@@ -0,0 +1,71 @@
+"""
+Signals para o aplicativo de presenças.
+
+Mantêm o resumo mensal (ResumoPresencaMensal) atualizado sempre que um
+RegistroPresenca é criado, alterado ou excluído, e as carências alinhadas ao
+percentual mínimo de presença da turma.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import RegistroPresenca
+from .services.carencias import CalculadoraCarencias
+from .services.resumo_mensal import ResumoPresencaMensalService
+from .services.visao_agregada import VisaoPresencaDetalhada
+
+
+@receiver(post_save, sender=RegistroPresenca)
+def atualizar_resumo_apos_salvar(sender, instance, raw=False, **kwargs):
+    """
+    Agenda a atualização do resumo mensal para a chave do registro salvo.
+
+    Se aluno, turma, atividade ou data mudaram, a chave anterior também é
+    recalculada para não deixar contagens órfãs.
+    """
+    if raw:
+        return
+
+    chave = ResumoPresencaMensalService.chave(
+        instance.aluno_id, instance.turma_id, instance.atividade_id, instance.data
+    )
+    chaves = {chave}
+    chave_original = getattr(instance, "_chave_resumo_original", None)
+    if chave_original:
+        chaves.add(chave_original)
+    instance._chave_resumo_original = chave
+
+    ResumoPresencaMensalService.agendar(chaves)
+
+
+@receiver(post_delete, sender=RegistroPresenca)
+def atualizar_resumo_apos_excluir(sender, instance, **kwargs):
+    """Agenda a atualização do resumo mensal para a chave do registro excluído."""
+    ResumoPresencaMensalService.agendar(
+        ResumoPresencaMensalService.chaves_de_registros([instance])
+    )
+
+
+@receiver(post_save, sender="turmas.Turma")
+def recalcular_carencias_turma(
+    sender, instance, raw=False, created=False, update_fields=None, **kwargs
+):
+    """
+    Recalcula as carências da turma quando o percentual mínimo muda.
+
+    Saves que não gravam ``perc_presenca_minima`` ou que mantêm o valor lido
+    do banco (snapshot de ``Turma.from_db``) não disparam o recálculo.
+    """
+    if raw or created:
+        return
+    if update_fields is not None and "perc_presenca_minima" not in update_fields:
+        return
+    if not instance.campo_alterado("perc_presenca_minima"):
+        return
+
+    def recalcular():
+        CalculadoraCarencias.recalcular_todas(turma_id=instance.id)
+        VisaoPresencaDetalhada.marcar_pendente()
+
+    transaction.on_commit(recalcular)
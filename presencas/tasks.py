@@ -7,15 +7,14 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List
 
 from celery import shared_task
-from django.core.cache import cache
-from django.core.mail import EmailMessage
-from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from importlib import import_module
 
-from .models import PresencaDetalhada
-from omaum.relatorios_presenca.models import AgendamentoRelatorio
+from core import cache_versionado
 
+from .models import PresencaDetalhada
+from omaum.relatorios_presenca.models import AgendamentoRelatorio, HistoricoRelatorio
 
 logger = logging.getLogger(__name__)
 
@@ -37,79 +36,52 @@ def get_bulk_operations():
 
 
 @shared_task(bind=True, max_retries=3)
-def processar_exportacao_pesada(
-    self, filtros: Dict[str, Any], formato: str, email_destinatario: str = None
-):
+def processar_exportacao_pesada(self, historico_id: int):
     """
     Task para processar exportações pesadas em background.
 
+    O arquivo é gerado em disco e registrado no HistoricoRelatorio do pedido
+    (criado por ArtefatosExportacaoService.solicitar); o cliente acompanha o
+    progresso por polling. Ao concluir, os destinos pendentes do pedido
+    recebem o link de download (cada usuário em registro próprio).
+
     Args:
-        filtros: Filtros para a exportação
-        formato: Formato de saída (excel, csv, pdf)
-        email_destinatario: Email para envio do relatório
+        historico_id: ID do HistoricoRelatorio do pedido
     """
-    try:
-        logger.info(f"Iniciando exportação pesada: {formato} com filtros {filtros}")
-
-        # Simular progresso para tasks longas
-        self.update_state(state="PROGRESS", meta={"current": 0, "total": 100})
+    from .services.artefatos_exportacao import ArtefatosExportacaoService
 
-        # Importar classe de exportação
-        from .views.exportacao import ProcessarExportacaoView
-
-        processor = ProcessarExportacaoView()
-        dados = processor._obter_dados("consolidado_geral", filtros)
-
-        self.update_state(state="PROGRESS", meta={"current": 50, "total": 100})
-
-        # Gerar arquivo baseado no formato
-        if formato == "excel":
-            from .views.exportacao import ExcelAvancadoExporter
-
-            exporter = ExcelAvancadoExporter()
-            response = exporter.gerar_excel_consolidado_geral(dados, filtros)
-            arquivo_content = response.content
-            filename = (
-                f"presencas_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            )
-
-        elif formato == "csv":
-            from .views.exportacao_parte2 import CSVExporter
-
-            exporter = CSVExporter()
-            response = exporter.gerar_csv_consolidado(dados, filtros)
-            arquivo_content = response.content
-            filename = (
-                f"presencas_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            )
-
-        else:
-            raise ValueError(f"Formato não suportado: {formato}")
-
-        self.update_state(state="PROGRESS", meta={"current": 80, "total": 100})
-
-        # Enviar por email se solicitado
-        if email_destinatario:
-            enviar_relatorio_email.delay(
-                email_destinatario,
-                filename,
-                arquivo_content,
-                f"Relatório de Presenças - {datetime.now().strftime('%d/%m/%Y')}",
-            )
-
-        self.update_state(state="PROGRESS", meta={"current": 100, "total": 100})
-
-        logger.info(f"Exportação pesada concluída: {filename}")
-        return {
-            "status": "success",
-            "filename": filename,
-            "size": len(arquivo_content),
-            "email_sent": bool(email_destinatario),
-        }
-
-    except Exception as exc:
-        logger.error(f"Erro na exportação pesada: {str(exc)}")
-        self.retry(countdown=60, exc=exc)
+    try:
+        historico = HistoricoRelatorio.objects.get(pk=historico_id)
+    except HistoricoRelatorio.DoesNotExist:
+        logger.error(f"Pedido de exportação não encontrado: {historico_id}")
+        return {"error": "Pedido de exportação não encontrado"}
+
+    if historico.status == "concluido":
+        logger.info(f"Exportação {historico_id} já concluída; entregando pendentes")
+    else:
+        try:
+            logger.info(f"Iniciando exportação pesada: {historico.parametros}")
+            ArtefatosExportacaoService.gerar(historico)
+        except Exception as exc:
+            logger.error(f"Erro na exportação pesada: {str(exc)}")
+            # Pedido inválido ou dados incompatíveis: repetir não adianta
+            deterministico = isinstance(exc, (ValueError, KeyError))
+            if deterministico or self.request.retries >= self.max_retries:
+                ArtefatosExportacaoService.registrar_erro(historico.pk, str(exc))
+                raise
+            raise self.retry(countdown=60, exc=exc)
+
+    entregues = ArtefatosExportacaoService.concluir_entregas(historico.pk)
+
+    logger.info(f"Exportação pesada concluída: {historico.nome_arquivo}")
+    return {
+        "status": "success",
+        "historico_id": historico.pk,
+        "filename": historico.nome_arquivo,
+        "size": historico.tamanho_arquivo,
+        "checksum": historico.checksum,
+        "entregues": entregues,
+    }
 
 
 @shared_task(bind=True, max_retries=2)
@@ -142,16 +114,10 @@ def recalcular_estatisticas(
             turma_id=turma_id, periodo_inicio=periodo_inicio, periodo_fim=periodo_fim
         )
 
-        # Invalidar cache relacionado
-        cache_patterns = [
-            "presencas_filtros_*",
-            f"estatisticas_turma_{turma_id}*" if turma_id else "estatisticas_turma_*",
-            "turmas_listagem",
-            "atividades_listagem",
-        ]
-
-        for pattern in cache_patterns:
-            cache.delete_pattern(pattern)
+        # Invalidar cache relacionado (um INCR por namespace)
+        cache_versionado.invalidar(
+            ("turma", turma_id) if turma_id else "presencas", "turma"
+        )
 
         logger.info(
             f"Recálculo concluído: {stats['total_registros']} registros processados"
@@ -169,40 +135,20 @@ def recalcular_estatisticas(
 
 
 @shared_task
-def enviar_relatorio_email(
-    email_destinatario: str, filename: str, arquivo_content: bytes, assunto: str
-):
+def enviar_relatorio_email(historico_id: int, emails: List[str], assunto: str = None):
     """
-    Task para enviar relatórios por email.
+    Task para enviar por email o link de download de um relatório gerado.
     """
-    try:
-        logger.info(f"Enviando relatório por email para: {email_destinatario}")
+    from .services.artefatos_exportacao import ArtefatosExportacaoService
 
-        email = EmailMessage(
-            subject=assunto,
-            body=f"""
-Olá,
-
-Em anexo está o relatório de presenças solicitado.
-
-Arquivo: {filename}
-Data de geração: {datetime.now().strftime("%d/%m/%Y às %H:%M")}
-
-Este é um email automático, não responda.
-
-Atenciosamente,
-Sistema OMAUM
-            """,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[email_destinatario],
-        )
+    try:
+        logger.info(f"Enviando link do relatório {historico_id} para: {emails}")
 
-        # Anexar arquivo
-        email.attach(filename, arquivo_content, "application/octet-stream")
-        email.send()
+        historico = HistoricoRelatorio.objects.get(pk=historico_id)
+        ArtefatosExportacaoService.enviar_link_por_email(historico, emails, assunto)
 
-        logger.info(f"Email enviado com sucesso para: {email_destinatario}")
-        return {"status": "success", "email": email_destinatario}
+        logger.info(f"Email enviado com sucesso para: {emails}")
+        return {"status": "success", "emails": emails}
 
     except Exception as exc:
         logger.error(f"Erro ao enviar email: {str(exc)}")
@@ -226,8 +172,7 @@ def processar_bulk_presencas(
         stats = bulk_ops.criar_presencas_lote(dados_presencas, registrado_por)
 
         # Limpar cache relacionado após operação em lote
-        cache.delete_pattern("presencas_*")
-        cache.delete_pattern("estatisticas_*")
+        cache_versionado.invalidar("presencas")
 
         logger.info(f"Bulk operation concluída: {stats}")
         return stats
@@ -241,27 +186,18 @@ def processar_bulk_presencas(
 def limpar_cache_antigo():
     """
     Task periódica para limpeza de cache antigo.
+
+    Avança a geração do namespace de presenças: as chaves antigas deixam de
+    ser lidas e expiram pelo próprio timeout.
     """
     try:
         logger.info("Iniciando limpeza de cache antigo")
 
-        # Patterns de cache para limpar
-        patterns_to_clean = [
-            "presencas_filtros_*",
-            "api_presencas_*",
-            "estatisticas_*",
-        ]
-
-        total_cleaned = 0
-        for pattern in patterns_to_clean:
-            try:
-                cache.delete_pattern(pattern)
-                total_cleaned += 1
-            except Exception as e:
-                logger.warning(f"Erro ao limpar pattern {pattern}: {e}")
+        dominios = ["presencas"]
+        cache_versionado.invalidar(*dominios)
 
-        logger.info(f"Limpeza de cache concluída: {total_cleaned} patterns limpos")
-        return {"patterns_cleaned": total_cleaned}
+        logger.info(f"Limpeza de cache concluída: {dominios} invalidados")
+        return {"dominios_invalidados": dominios}
 
     except Exception as exc:
         logger.error(f"Erro na limpeza de cache: {str(exc)}")
@@ -306,44 +242,93 @@ def backup_dados_criticos():
 
 
 @shared_task
-def processar_agendamento_relatorio(agendamento_id: int):
+def atualizar_visao_presencas(forcar: bool = False):
     """
-    Task para processar agendamentos de relatório.
+    Task periódica que atualiza a visão materializada de presenças.
+
+    Usa REFRESH MATERIALIZED VIEW CONCURRENTLY, de modo que painéis e
+    relatórios continuam lendo a visão durante o recálculo. Sem gravações
+    pendentes a execução é ignorada.
     """
     try:
-        agendamento = AgendamentoRelatorio.objects.get(id=agendamento_id)
-
-        logger.info(f"Processando agendamento: {agendamento.nome}")
-
-        # Configurar filtros do agendamento
-        filtros = {
-            "formato": agendamento.formato,
-            "template": agendamento.template,
-            "periodo": agendamento.periodo,
-            "data_inicio": agendamento.data_inicio.isoformat()
-            if agendamento.data_inicio
-            else None,
-            "data_fim": agendamento.data_fim.isoformat()
-            if agendamento.data_fim
-            else None,
-            "turma_id": agendamento.turma_id,
-            "curso": agendamento.curso,
-        }
+        from .services.visao_agregada import VisaoPresencaDetalhada
+
+        resultado = VisaoPresencaDetalhada.atualizar(concorrente=True, forcar=forcar)
+        logger.info(f"Atualização da visão de presenças: {resultado}")
+        return resultado
+
+    except Exception as exc:
+        logger.error(f"Erro ao atualizar visão de presenças: {str(exc)}")
+        return {"error": str(exc)}
+
+
+@shared_task(bind=True, max_retries=2)
+def atualizar_agregados_turma(
+    self, turma_id: int, periodo_inicio: str = None, periodo_fim: str = None
+):
+    """
+    Task para atualização parcial dos agregados de uma turma.
 
-        # Executar exportação
-        result = processar_exportacao_pesada.delay(
-            filtros=filtros,
-            formato=agendamento.formato,
-            email_destinatario=agendamento.email_destinatario,
+    Args:
+        turma_id: ID da turma
+        periodo_inicio: Data início em formato YYYY-MM-DD (opcional)
+        periodo_fim: Data fim em formato YYYY-MM-DD (opcional)
+    """
+    try:
+        from .services.visao_agregada import VisaoPresencaDetalhada
+
+        if periodo_inicio:
+            periodo_inicio = datetime.strptime(periodo_inicio, "%Y-%m-%d").date()
+        if periodo_fim:
+            periodo_fim = datetime.strptime(periodo_fim, "%Y-%m-%d").date()
+
+        resultado = VisaoPresencaDetalhada.atualizar_turma(
+            turma_id, periodo_inicio=periodo_inicio, periodo_fim=periodo_fim
         )
+        logger.info(f"Agregados da turma {turma_id} atualizados: {resultado}")
+        return resultado
+
+    except Exception as exc:
+        logger.error(f"Erro ao atualizar agregados da turma {turma_id}: {str(exc)}")
+        self.retry(countdown=60, exc=exc)
+
+
+@shared_task
+def despachar_agendamentos_relatorio():
+    """
+    Task periódica que executa os agendamentos de relatório vencidos.
+
+    Os agendamentos são reservados com SKIP LOCKED, então execuções
+    concorrentes do despacho nunca processam o mesmo agendamento.
+    """
+    from .services.agendamentos_relatorio import AgendamentosRelatorioService
+
+    try:
+        return AgendamentosRelatorioService.despachar()
+    except Exception as exc:
+        logger.error(f"Erro no despacho de agendamentos: {str(exc)}")
+        return {"error": str(exc)}
+
+
+@shared_task
+def processar_agendamento_relatorio(agendamento_id: int):
+    """
+    Task para executar um agendamento de relatório imediatamente.
+    """
+    from .services.agendamentos_relatorio import AgendamentosRelatorioService
 
-        # Atualizar status do agendamento
-        agendamento.ultima_execucao = timezone.now()
-        agendamento.status = "executado"
-        agendamento.save()
+    try:
+        with transaction.atomic():
+            agendamento = (
+                AgendamentoRelatorio.objects.select_for_update()
+                .select_related("configuracao", "usuario")
+                .get(id=agendamento_id)
+            )
+            logger.info(f"Processando agendamento: {agendamento.nome}")
+            relatorios = AgendamentosRelatorioService.executar([agendamento])
 
         logger.info(f"Agendamento processado: {agendamento.nome}")
-        return {"status": "success", "task_id": result.task_id}
+        return {"status": "success", "relatorios": relatorios}
 
     except AgendamentoRelatorio.DoesNotExist:
         logger.error(f"Agendamento não encontrado: {agendamento_id}")
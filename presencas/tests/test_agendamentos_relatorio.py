@@ -0,0 +1,226 @@
+"""Testes do despacho de agendamentos de relatório."""
+
+import io
+import shutil
+import tempfile
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from presencas.services.agendamentos_relatorio import AgendamentosRelatorioService
+from presencas.services.artefatos_exportacao import ArtefatosExportacaoService
+from relatorios_presenca.models import (
+    AgendamentoRelatorio,
+    ConfiguracaoRelatorio,
+    HistoricoRelatorio,
+)
+
+
+class AgendamentosRelatorioServiceTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user(username="agenda", password="s")
+        cls.configuracao = ConfiguracaoRelatorio.objects.create(
+            nome="Consolidado",
+            tipo_relatorio="consolidado",
+            formato_saida="csv",
+            parametros_padrao={"periodo": "ano_atual"},
+        )
+
+    def _agendamento(self, nome, emails, vencido=True, usuario=None, **extras):
+        agora = timezone.now()
+        return AgendamentoRelatorio.objects.create(
+            nome=nome,
+            configuracao=self.configuracao,
+            usuario=usuario or self.usuario,
+            frequencia="diario",
+            hora_execucao=time(8, 0),
+            emails_destino=emails,
+            proxima_execucao=(
+                agora - timedelta(minutes=5) if vencido else agora + timedelta(hours=1)
+            ),
+            **extras,
+        )
+
+    def test_agrupa_agendamentos_identicos(self):
+        a = self._agendamento("A", "a@teste.com, comum@teste.com")
+        b = self._agendamento("B", "comum@teste.com,b@teste.com")
+        c = self._agendamento("C", "c@teste.com", parametros_fixos={"turma_id": "7"})
+        futuro = self._agendamento("Futuro", "f@teste.com", vencido=False)
+        inativo = self._agendamento("Inativo", "i@teste.com", ativo=False)
+        proximas = {ag.pk: ag.proxima_execucao for ag in (a, b, c, futuro, inativo)}
+
+        with self.captureOnCommitCallbacks() as enfileiradas:
+            resultado = AgendamentosRelatorioService.despachar()
+
+        self.assertEqual(resultado, {"agendamentos": 3, "relatorios": 2})
+        self.assertEqual(len(enfileiradas), 2)
+        self.assertEqual(HistoricoRelatorio.objects.count(), 2)
+
+        agora = timezone.now()
+        for ag in AgendamentoRelatorio.objects.all():
+            if ag.pk in (a.pk, b.pk, c.pk):
+                self.assertGreater(ag.proxima_execucao, agora)
+                self.assertIsNotNone(ag.ultima_execucao)
+            else:
+                self.assertEqual(ag.proxima_execucao, proximas[ag.pk])
+                self.assertIsNone(ag.ultima_execucao)
+
+        # Nada mais vencido: uma segunda execução não gera relatórios
+        self.assertEqual(
+            AgendamentosRelatorioService.despachar(),
+            {"agendamentos": 0, "relatorios": 0},
+        )
+
+    def test_grupo_envia_para_todos_os_destinatarios(self):
+        a = self._agendamento("A", "a@teste.com, comum@teste.com")
+        b = self._agendamento("B", "comum@teste.com,b@teste.com")
+
+        with self.captureOnCommitCallbacks():
+            relatorios = AgendamentosRelatorioService.executar([a, b])
+
+        self.assertEqual(len(relatorios), 1)
+        self.assertEqual(relatorios[0]["agendamentos"], [a.pk, b.pk])
+        self.assertEqual(
+            relatorios[0]["emails"], ["a@teste.com", "comum@teste.com", "b@teste.com"]
+        )
+        historico = HistoricoRelatorio.objects.get(pk=relatorios[0]["historico_id"])
+        self.assertEqual(
+            historico.parametros,
+            {
+                "template": "consolidado_geral",
+                "formato": "csv",
+                "config": {"periodo": "ano_atual"},
+            },
+        )
+
+    def test_grupo_com_donos_diferentes_gera_uma_vez(self):
+        outro = User.objects.create_user(username="outro", password="s")
+        a = self._agendamento("A", "a@teste.com")
+        b = self._agendamento("B", "b@teste.com", usuario=outro)
+
+        with self.captureOnCommitCallbacks() as enfileiradas:
+            relatorio = AgendamentosRelatorioService.executar([a, b])[0]
+
+        # Uma geração; o outro dono recebe o registro dele ao fim da geração
+        self.assertEqual(len(enfileiradas), 1)
+        self.assertEqual(HistoricoRelatorio.objects.count(), 1)
+        self.assertEqual(
+            relatorio["historicos"], {self.usuario.pk: relatorio["historico_id"]}
+        )
+
+    def test_geracao_em_andamento_recebe_os_demais_donos(self):
+        outro = User.objects.create_user(username="outro", password="s")
+        a = self._agendamento("A", "a@teste.com")
+        b = self._agendamento("B", "b@teste.com", usuario=outro)
+        template, formato, config = AgendamentosRelatorioService.pedido(a)
+        em_andamento, _ = ArtefatosExportacaoService.solicitar(
+            self.usuario, template, formato, config
+        )
+
+        with self.captureOnCommitCallbacks() as enfileiradas:
+            relatorio = AgendamentosRelatorioService.executar([a, b])[0]
+
+        # Nenhum link antes do arquivo e nenhuma segunda geração
+        self.assertEqual(enfileiradas, [])
+        self.assertEqual(HistoricoRelatorio.objects.count(), 1)
+        self.assertEqual(relatorio["historico_id"], em_andamento.pk)
+        em_andamento.refresh_from_db()
+        self.assertEqual(
+            em_andamento.destinos_pendentes,
+            [[self.usuario.pk, ["a@teste.com"]], [outro.pk, ["b@teste.com"]]],
+        )
+
+    def test_arquivo_pronto_vira_registro_de_cada_dono(self):
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        configuracoes = override_settings(RELATORIOS_GERADOS_ROOT=diretorio)
+        configuracoes.enable()
+        self.addCleanup(configuracoes.disable)
+
+        outro = User.objects.create_user(username="outro", password="s")
+        a = self._agendamento("A", "a@teste.com")
+        b = self._agendamento("B", "b@teste.com", usuario=outro)
+        template, formato, config = AgendamentosRelatorioService.pedido(a)
+        pronto, _ = ArtefatosExportacaoService.solicitar(
+            self.usuario, template, formato, config
+        )
+        ArtefatosExportacaoService.registrar_arquivo(
+            pronto, io.BytesIO(b"a;b\r\n"), "presencas.csv"
+        )
+
+        with self.captureOnCommitCallbacks() as enfileiradas:
+            relatorio = AgendamentosRelatorioService.executar([a, b])[0]
+
+        self.assertEqual(len(enfileiradas), 2)
+        registro = HistoricoRelatorio.objects.get(pk=relatorio["historicos"][outro.pk])
+        self.assertEqual(registro.usuario, outro)
+        self.assertEqual(registro.arquivo_gerado.name, pronto.arquivo_gerado.name)
+
+        # Os destinatários do outro dono recebem um link que ele consegue abrir
+        self.client.force_login(outro)
+        resposta = self.client.get(
+            reverse("presencas:exportacao_download", args=[registro.pk])
+        )
+        self.assertEqual(resposta.status_code, 200)
+        resposta.close()
+
+    def test_proxima_execucao_a_partir_do_instante_do_despacho(self):
+        ag = self._agendamento("A", "a@teste.com")
+        agora = timezone.make_aware(datetime(2030, 1, 10, 9, 0))
+
+        with self.captureOnCommitCallbacks():
+            AgendamentosRelatorioService.executar([ag], agora)
+
+        ag.refresh_from_db()
+        self.assertEqual(ag.ultima_execucao, agora)
+        self.assertEqual(
+            ag.proxima_execucao, timezone.make_aware(datetime(2030, 1, 11, 8, 0))
+        )
+
+    def test_formato_invalido_nao_trava_o_despacho(self):
+        ag = self._agendamento(
+            "PDF", "p@teste.com", parametros_fixos={"formato": "pdf"}
+        )
+
+        with self.captureOnCommitCallbacks() as enfileiradas:
+            resultado = AgendamentosRelatorioService.despachar()
+
+        self.assertEqual(resultado, {"agendamentos": 1, "relatorios": 0})
+        self.assertEqual(enfileiradas, [])
+        ag.refresh_from_db()
+        self.assertGreater(ag.proxima_execucao, timezone.now())
+
+    def test_template_sem_geracao_em_segundo_plano_e_ignorado(self):
+        ag = self._agendamento(
+            "Executivo",
+            "e@teste.com",
+            parametros_fixos={"template": "estatisticas_executivas"},
+        )
+        valido = self._agendamento("A", "a@teste.com")
+
+        with self.captureOnCommitCallbacks() as enfileiradas:
+            resultado = AgendamentosRelatorioService.despachar()
+
+        self.assertEqual(resultado, {"agendamentos": 2, "relatorios": 1})
+        self.assertEqual(len(enfileiradas), 1)
+        self.assertEqual(
+            list(HistoricoRelatorio.objects.values_list("tipo_relatorio", flat=True)),
+            ["consolidado_geral"],
+        )
+        ag.refresh_from_db()
+        self.assertGreater(ag.proxima_execucao, timezone.now())
+        valido.refresh_from_db()
+        self.assertIsNotNone(valido.ultima_execucao)
+
+
+class ProximaExecucaoTest(TestCase):
+    def test_soma_meses_limita_ao_fim_do_mes(self):
+        somar = AgendamentoRelatorio._somar_meses
+
+        self.assertEqual(somar(datetime(2025, 1, 31, 8), 1), datetime(2025, 2, 28, 8))
+        self.assertEqual(somar(datetime(2025, 11, 30, 8), 3), datetime(2026, 2, 28, 8))
+        self.assertEqual(somar(datetime(2025, 12, 15, 8), 1), datetime(2026, 1, 15, 8))
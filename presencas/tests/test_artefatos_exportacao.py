@@ -0,0 +1,344 @@
+"""Testes do armazenamento de artefatos de exportação."""
+
+import hashlib
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from atividades.models import Atividade
+from presencas.models import ResumoPresencaMensal
+from presencas.services.artefatos_exportacao import ArtefatosExportacaoService
+from presencas.views.exportacao import ProcessarExportacaoView
+from relatorios_presenca.models import HistoricoRelatorio
+
+CACHE_LOCAL = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "artefatos",
+    }
+}
+
+CONFIG = {"periodo": "ano_atual", "turma_id": "3", "multiplas_abas": False}
+
+
+class ArtefatosExportacaoTestBase(TestCase):
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.diretorio, ignore_errors=True)
+        configuracoes = override_settings(
+            RELATORIOS_GERADOS_ROOT=self.diretorio,
+            CACHES=CACHE_LOCAL,
+            SITE_URL="https://omaum.exemplo",
+        )
+        configuracoes.enable()
+        self.addCleanup(configuracoes.disable)
+
+        self.ana = User.objects.create_user(username="ana", password="s")
+        self.bruno = User.objects.create_user(username="bruno", password="s")
+
+    def _concluido(self, usuario, conteudo=b"a;b\r\n1;2\r\n", config=CONFIG):
+        historico, _ = ArtefatosExportacaoService.solicitar(
+            usuario, "consolidado_geral", "csv", config
+        )
+        return ArtefatosExportacaoService.registrar_arquivo(
+            historico, io.BytesIO(conteudo), "presencas.csv"
+        )
+
+
+class ArtefatosExportacaoServiceTest(ArtefatosExportacaoTestBase):
+    def test_registra_arquivo_com_tamanho_e_checksum(self):
+        conteudo = b"a;b\r\n1;2\r\n"
+
+        historico = self._concluido(self.ana, conteudo)
+        historico.refresh_from_db()
+
+        self.assertEqual(historico.status, "concluido")
+        self.assertEqual(historico.tamanho_arquivo, len(conteudo))
+        self.assertEqual(historico.checksum, hashlib.sha256(conteudo).hexdigest())
+        self.assertTrue(historico.arquivo_gerado.path.startswith(self.diretorio))
+        with historico.arquivo_gerado.open("rb") as arquivo:
+            self.assertEqual(arquivo.read(), conteudo)
+
+    def test_pedido_identico_reaproveita_artefato(self):
+        original = self._concluido(self.ana)
+        config_reordenada = dict(reversed(list(CONFIG.items())))
+
+        mesmo, reaproveitado = ArtefatosExportacaoService.solicitar(
+            self.ana, "consolidado_geral", "csv", config_reordenada
+        )
+        self.assertTrue(reaproveitado)
+        self.assertEqual(mesmo.pk, original.pk)
+
+        # Outro usuário recebe registro próprio apontando para o mesmo arquivo
+        copia, reaproveitado = ArtefatosExportacaoService.solicitar(
+            self.bruno, "consolidado_geral", "csv", CONFIG
+        )
+        copia.refresh_from_db()
+        self.assertTrue(reaproveitado)
+        self.assertNotEqual(copia.pk, original.pk)
+        self.assertEqual(copia.usuario, self.bruno)
+        self.assertEqual(copia.arquivo_gerado.name, original.arquivo_gerado.name)
+        self.assertEqual(copia.checksum, original.checksum)
+        self.assertEqual(copia.data_geracao, original.data_geracao)
+
+    def test_filtros_diferentes_ou_janela_expirada_geram_novo_arquivo(self):
+        original = self._concluido(self.ana)
+
+        _, reaproveitado = ArtefatosExportacaoService.solicitar(
+            self.ana, "consolidado_geral", "csv", {**CONFIG, "turma_id": "4"}
+        )
+        self.assertFalse(reaproveitado)
+
+        HistoricoRelatorio.objects.filter(pk=original.pk).update(
+            data_geracao=timezone.now() - timedelta(minutes=31)
+        )
+        novo, reaproveitado = ArtefatosExportacaoService.solicitar(
+            self.ana, "consolidado_geral", "csv", CONFIG
+        )
+        self.assertFalse(reaproveitado)
+        self.assertEqual(novo.status, "processando")
+
+    def test_destinatarios_aguardam_a_conclusao(self):
+        historico, _ = ArtefatosExportacaoService.solicitar(
+            self.ana, "consolidado_geral", "csv", CONFIG
+        )
+        mesmo, reaproveitado = ArtefatosExportacaoService.solicitar(
+            self.ana, "consolidado_geral", "csv", CONFIG
+        )
+        self.assertTrue(reaproveitado)
+
+        # Em processamento: nenhum link sai antes do arquivo existir
+        with self.captureOnCommitCallbacks() as enfileiradas:
+            ArtefatosExportacaoService.enfileirar(
+                mesmo, reaproveitado, ["ana@teste.com"], [(self.bruno.pk, ["b@x.com"])]
+            )
+        self.assertEqual(enfileiradas, [])
+        mesmo.refresh_from_db()
+        self.assertEqual(
+            mesmo.destinos_pendentes,
+            [[self.ana.pk, ["ana@teste.com"]], [self.bruno.pk, ["b@x.com"]]],
+        )
+
+        ArtefatosExportacaoService.registrar_arquivo(
+            historico, io.BytesIO(b"x"), "presencas.csv"
+        )
+        with self.captureOnCommitCallbacks() as enfileiradas:
+            entregues = ArtefatosExportacaoService.concluir_entregas(historico.pk)
+
+        self.assertEqual(len(enfileiradas), 2)
+        self.assertEqual(entregues[self.ana.pk], historico.pk)
+        copia = HistoricoRelatorio.objects.get(pk=entregues[self.bruno.pk])
+        self.assertEqual(copia.usuario, self.bruno)
+        historico.refresh_from_db()
+        self.assertEqual(historico.destinos_pendentes, [])
+
+    def test_pedido_abandonado_nao_e_reaproveitado(self):
+        parado, _ = ArtefatosExportacaoService.solicitar(
+            self.ana, "consolidado_geral", "csv", CONFIG
+        )
+        HistoricoRelatorio.objects.filter(pk=parado.pk).update(
+            data_geracao=timezone.now() - timedelta(minutes=20),
+            destinos_pendentes=[[self.ana.pk, ["ana@teste.com"]]],
+        )
+
+        novo, reaproveitado = ArtefatosExportacaoService.solicitar(
+            self.ana, "consolidado_geral", "csv", CONFIG
+        )
+
+        self.assertFalse(reaproveitado)
+        self.assertNotEqual(novo.pk, parado.pk)
+        parado.refresh_from_db()
+        self.assertEqual(parado.status, "erro")
+        self.assertEqual(parado.destinos_pendentes, [])
+
+    def test_formato_sem_geracao_em_segundo_plano(self):
+        with self.assertRaises(ValueError):
+            ArtefatosExportacaoService.solicitar(
+                self.ana, "consolidado_geral", "pdf", CONFIG
+            )
+
+    def test_template_sem_layout_em_segundo_plano(self):
+        for template, formato in [
+            ("estatisticas_executivas", "csv"),
+            ("por_turma", "excel"),
+        ]:
+            with self.assertRaises(ValueError):
+                ArtefatosExportacaoService.solicitar(
+                    self.ana, template, formato, CONFIG
+                )
+        self.assertFalse(HistoricoRelatorio.objects.exists())
+
+    def test_gera_csv_por_turma(self):
+        historico, _ = ArtefatosExportacaoService.solicitar(
+            self.ana, "por_turma", "csv", CONFIG
+        )
+        dados = {"dados_por_turma": {}, "filtros_aplicados": {}}
+
+        with patch.object(ProcessarExportacaoView, "_obter_dados", return_value=dados):
+            ArtefatosExportacaoService.gerar(historico)
+
+        historico.refresh_from_db()
+        self.assertEqual(historico.status, "concluido")
+        with historico.arquivo_gerado.open("rb") as arquivo:
+            self.assertIn("Relatório por Turma", arquivo.read().decode("utf-8-sig"))
+
+    def test_erro_deterministico_nao_e_repetido(self):
+        from presencas.tasks import processar_exportacao_pesada
+
+        historico, _ = ArtefatosExportacaoService.solicitar(
+            self.ana, "consolidado_geral", "csv", CONFIG
+        )
+
+        with patch.object(
+            ArtefatosExportacaoService, "gerar", side_effect=KeyError("atividades")
+        ), patch.object(processar_exportacao_pesada, "retry") as retry:
+            processar_exportacao_pesada.apply(args=[historico.pk])
+
+        retry.assert_not_called()
+        historico.refresh_from_db()
+        self.assertEqual(historico.status, "erro")
+
+    def test_email_leva_apenas_o_link(self):
+        historico = self._concluido(self.ana)
+
+        ArtefatosExportacaoService.enviar_link_por_email(
+            historico, ["ana@teste.com", ""]
+        )
+
+        self.assertEqual(len(mail.outbox), 1)
+        email = mail.outbox[0]
+        self.assertEqual(email.to, ["ana@teste.com"])
+        self.assertEqual(email.attachments, [])
+        self.assertIn(
+            "https://omaum.exemplo"
+            + reverse("presencas:exportacao_download", args=[historico.pk]),
+            email.body,
+        )
+
+    def test_gera_excel_no_armazenamento(self):
+        atividade = Atividade.objects.create(
+            nome="Aula",
+            tipo_atividade="AULA",
+            data_inicio=timezone.localdate(),
+            hora_inicio="08:00",
+        )
+        presencas = ResumoPresencaMensal.objects.none()
+        dados = {
+            "presencas_detalhadas": presencas,
+            "atividades": Atividade.objects.filter(pk=atividade.pk),
+            "estatisticas": ProcessarExportacaoView()._calcular_estatisticas_gerais(
+                presencas
+            ),
+            "filtros_aplicados": {},
+        }
+        historico, _ = ArtefatosExportacaoService.solicitar(
+            self.ana, "consolidado_geral", "excel", CONFIG
+        )
+
+        with patch.object(ProcessarExportacaoView, "_obter_dados", return_value=dados):
+            ArtefatosExportacaoService.gerar(historico)
+
+        historico.refresh_from_db()
+        self.assertEqual(historico.status, "concluido")
+        self.assertTrue(historico.nome_arquivo.endswith(".xlsx"))
+        with historico.arquivo_gerado.open("rb") as arquivo:
+            planilhas = openpyxl.load_workbook(arquivo).sheetnames
+        self.assertIn("Consolidado Geral", planilhas)
+        self.assertEqual(
+            ArtefatosExportacaoService.progresso(historico)["progresso"], 100
+        )
+
+
+class ArtefatosExportacaoViewsTest(ArtefatosExportacaoTestBase):
+    def test_progresso_do_pedido_em_andamento(self):
+        historico, _ = ArtefatosExportacaoService.solicitar(
+            self.ana, "consolidado_geral", "csv", CONFIG
+        )
+        ArtefatosExportacaoService.atualizar_progresso(historico.pk, 40)
+        self.client.force_login(self.ana)
+
+        resposta = self.client.get(
+            reverse("presencas:exportacao_progresso", args=[historico.pk])
+        )
+
+        self.assertEqual(
+            resposta.json(),
+            {
+                "id": historico.pk,
+                "status": "processando",
+                "progresso": 40,
+                "nome_arquivo": "",
+            },
+        )
+
+    def test_download_restrito_ao_dono(self):
+        historico = self._concluido(self.ana)
+        url = reverse("presencas:exportacao_download", args=[historico.pk])
+
+        self.client.force_login(self.bruno)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_login(self.ana)
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(b"".join(resposta.streaming_content), b"a;b\r\n1;2\r\n")
+        self.assertEqual(resposta["ETag"], f'"{historico.checksum}"')
+        self.assertIn("presencas.csv", resposta["Content-Disposition"])
+
+    def test_download_exige_login(self):
+        historico = self._concluido(self.ana)
+
+        resposta = self.client.get(
+            reverse("presencas:exportacao_download", args=[historico.pk])
+        )
+
+        self.assertEqual(resposta.status_code, 302)
+
+    def test_solicitacao_de_template_nao_suportado(self):
+        self.client.force_login(self.ana)
+
+        with self.captureOnCommitCallbacks() as enfileiradas:
+            resposta = self.client.post(
+                reverse("presencas:exportacao_solicitar"),
+                {"formato": "csv", "template": "estatisticas_executivas"},
+            )
+
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(enfileiradas, [])
+
+    def test_solicitacao_identica_devolve_link_pronto(self):
+        self.client.force_login(self.ana)
+        url = reverse("presencas:exportacao_solicitar")
+        formulario = {"formato": "csv", "periodo": "ano_atual", "turma_id": "3"}
+
+        with self.captureOnCommitCallbacks() as enfileiradas:
+            resposta = self.client.post(url, formulario)
+
+        self.assertEqual(resposta.status_code, 202)
+        self.assertEqual(len(enfileiradas), 1)
+        historico = HistoricoRelatorio.objects.get(pk=resposta.json()["id"])
+        ArtefatosExportacaoService.registrar_arquivo(
+            historico, io.BytesIO(b"x"), "presencas.csv"
+        )
+
+        with self.captureOnCommitCallbacks() as enfileiradas:
+            resposta = self.client.post(url, formulario)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(enfileiradas, [])
+        dados = resposta.json()
+        self.assertTrue(dados["reaproveitado"])
+        self.assertEqual(dados["id"], historico.pk)
+        self.assertEqual(
+            dados["download_url"],
+            reverse("presencas:exportacao_download", args=[historico.pk]),
+        )
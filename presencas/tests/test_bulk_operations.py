@@ -0,0 +1,100 @@
+"""Testes para o upsert em lote de BulkPresencaOperations."""
+
+from datetime import date
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from presencas.bulk_operations import BulkPresencaOperations
+from presencas.models import RegistroPresenca
+from tests.factories import criar_base_presencas
+
+
+class CriarPresencasLoteTest(TestCase):
+    """Garante contagens exatas e número constante de consultas."""
+
+    def setUp(self):
+        self.turma, self.alunos, self.atividades = criar_base_presencas(10)
+
+    def _dados(self, alunos, dias, presente=True):
+        return [
+            {
+                "aluno_id": aluno.id,
+                "turma_id": self.turma.id,
+                "atividade_id": atividade.id,
+                "data": date(2025, 3, dia),
+                "presente": presente,
+                "observacao": "" if presente else "Atestado",
+            }
+            for aluno in alunos
+            for atividade in self.atividades
+            for dia in dias
+        ]
+
+    def test_cria_e_atualiza_com_contagens_exatas(self):
+        BulkPresencaOperations.criar_presencas_lote(
+            self._dados(self.alunos[:5], [3, 10]), "teste"
+        )
+
+        stats = BulkPresencaOperations.criar_presencas_lote(
+            self._dados(self.alunos, [10, 17], presente=False), "outro"
+        )
+
+        self.assertEqual(stats["criadas"], 30)
+        self.assertEqual(stats["atualizadas"], 10)
+        self.assertEqual(stats["observacoes"], 40)
+        self.assertEqual(RegistroPresenca.objects.count(), 50)
+        atualizado = RegistroPresenca.objects.get(
+            aluno=self.alunos[0], atividade=self.atividades[0], data=date(2025, 3, 10)
+        )
+        self.assertEqual(atualizado.status, "F")
+        self.assertEqual(atualizado.justificativa, "Atestado")
+        self.assertEqual(atualizado.registrado_por, "outro")
+
+    def test_chaves_repetidas_prevalece_ultima(self):
+        dados = self._dados(self.alunos[:1], [3]) + self._dados(
+            self.alunos[:1], [3], presente=False
+        )
+
+        stats = BulkPresencaOperations.criar_presencas_lote(dados, "teste")
+
+        self.assertEqual(stats["criadas"], 2)
+        self.assertEqual(
+            set(RegistroPresenca.objects.values_list("status", flat=True)), {"F"}
+        )
+
+    def test_numero_de_consultas_nao_depende_do_volume(self):
+        BulkPresencaOperations.criar_presencas_lote(
+            self._dados(self.alunos, [3]), "teste"
+        )
+
+        # Volumes dentro de um lote do banco (SQLite limita parâmetros por query)
+        consultas = []
+        for dias in ([3], [3, 4, 5, 6, 7]):
+            with CaptureQueriesContext(connection) as contexto:
+                BulkPresencaOperations.criar_presencas_lote(
+                    self._dados(self.alunos, dias), "teste"
+                )
+            consultas.append(len(contexto.captured_queries))
+
+        self.assertEqual(consultas[0], consultas[1])
+        self.assertEqual(RegistroPresenca.objects.count(), 10 * 2 * 5)
+
+    def test_fallback_sem_suporte_a_conflito(self):
+        BulkPresencaOperations.criar_presencas_lote(
+            self._dados(self.alunos[:5], [3]), "teste"
+        )
+
+        with mock.patch.object(
+            connection.features, "supports_update_conflicts_with_target", False
+        ):
+            stats = BulkPresencaOperations.criar_presencas_lote(
+                self._dados(self.alunos, [3], presente=False), "teste"
+            )
+
+        self.assertEqual(
+            stats, {"criadas": 10, "atualizadas": 10, "observacoes": 20, "erros": 0}
+        )
+        self.assertEqual(RegistroPresenca.objects.filter(status="F").count(), 20)
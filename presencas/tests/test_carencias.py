@@ -0,0 +1,184 @@
+"""Testes para o recálculo vetorizado de carências do resumo mensal."""
+
+from datetime import date
+from decimal import Decimal
+from importlib import import_module
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+
+from presencas.models import PresencaDetalhada, RegistroPresenca, ResumoPresencaMensal
+from presencas.services.carencias import (
+    CalculadoraCarencias,
+    calcular_carencias_turma,
+)
+from presencas.services.resumo_mensal import ResumoPresencaMensalService
+from tests.factories import criar_base_presencas
+from turmas.models import Turma
+
+
+class CalcularCarenciasTurmaTest(TestCase):
+    """Regra de carências pelo percentual mínimo da turma."""
+
+    def test_regra(self):
+        self.assertEqual(calcular_carencias_turma(0, 0, Decimal("70")), 0)
+        self.assertEqual(calcular_carencias_turma(10, 5, None), 0)
+        self.assertEqual(calcular_carencias_turma(10, 7, Decimal("70")), 0)
+        self.assertEqual(calcular_carencias_turma(10, 5, Decimal("70")), 2)
+        self.assertEqual(calcular_carencias_turma(4, 0, Decimal("75")), 3)
+
+
+class RecalcularCarenciasTest(TestCase):
+    """O UPDATE em SQL e o modo em lotes produzem o mesmo resultado."""
+
+    def setUp(self):
+        self.turma, alunos, atividades = criar_base_presencas(6, total_atividades=1)
+        self.turma.perc_presenca_minima = Decimal("75.00")
+        self.turma.save()
+        self.casos = [(0, 0), (4, 4), (4, 2), (8, 1), (10, 7), (3, 0)]
+        ResumoPresencaMensal.objects.bulk_create(
+            [
+                ResumoPresencaMensal(
+                    aluno=aluno,
+                    turma=self.turma,
+                    atividade=atividades[0],
+                    periodo=date(2024, 1, 1),
+                    convocacoes=convocacoes,
+                    presencas=presencas,
+                    faltas=convocacoes - presencas,
+                    carencias=99,
+                )
+                for aluno, (convocacoes, presencas) in zip(alunos, self.casos)
+            ]
+        )
+
+    def _esperado(self):
+        return sorted(
+            calcular_carencias_turma(convocacoes, presencas, Decimal("75.00"))
+            for convocacoes, presencas in self.casos
+        )
+
+    def _atual(self):
+        return sorted(ResumoPresencaMensal.objects.values_list("carencias", flat=True))
+
+    def test_recalculo_sql(self):
+        resultado = CalculadoraCarencias.recalcular_todas(turma_id=self.turma.id)
+
+        self.assertEqual(resultado["metodo"], "sql")
+        self.assertEqual(resultado["total_presencas"], 6)
+        self.assertEqual(resultado["presencas_atualizadas"], 6)
+        self.assertIn("linhas_por_segundo", resultado)
+        self.assertEqual(self._atual(), self._esperado())
+
+        # Segunda execução não altera nenhuma linha
+        resultado = CalculadoraCarencias.recalcular_todas(turma_id=self.turma.id)
+        self.assertEqual(resultado["presencas_atualizadas"], 0)
+
+    def test_recalculo_em_lotes(self):
+        resultado = CalculadoraCarencias.recalcular_todas(em_lotes=True, batch_size=2)
+
+        self.assertEqual(resultado["metodo"], "lotes")
+        self.assertEqual(resultado["presencas_atualizadas"], 6)
+        self.assertEqual(self._atual(), self._esperado())
+
+    def test_alteracao_do_percentual_da_turma_recalcula(self):
+        CalculadoraCarencias.recalcular_todas()
+        self.turma.perc_presenca_minima = Decimal("0")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.turma.save()
+
+        self.assertEqual(set(self._atual()), {0})
+
+    def test_save_sem_alterar_percentual_nao_recalcula(self):
+        turma = Turma.objects.get(pk=self.turma.pk)
+
+        with patch.object(CalculadoraCarencias, "recalcular_todas") as recalcular:
+            with self.captureOnCommitCallbacks(execute=True):
+                turma.nome = "Turma Renomeada"
+                turma.save()
+                turma.perc_presenca_minima = Decimal("50")
+                turma.save(update_fields=["nome"])
+
+            recalcular.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                turma.save(update_fields=["perc_presenca_minima"])
+                # Snapshot atualizado: salvar de novo não recalcula outra vez
+                turma.save()
+
+            recalcular.assert_called_once_with(turma_id=turma.pk)
+
+    def test_percentual_sem_snapshot_conta_como_alterado(self):
+        carregada = Turma.objects.get(pk=self.turma.pk)
+        adiada = Turma.objects.only("id", "nome").get(pk=self.turma.pk)
+
+        self.assertFalse(carregada.campo_alterado("perc_presenca_minima"))
+        self.assertTrue(adiada.campo_alterado("perc_presenca_minima"))
+
+
+class VisaoCarenciasTest(TestCase):
+    """A visão agregada usa a mesma regra de carências do resumo mensal."""
+
+    def setUp(self):
+        # Visão não gerenciada: criada com a definição da migração 0009
+        migracao = import_module(
+            "presencas.migrations.0009_presencadetalhada_carencias_turma"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP VIEW IF EXISTS {migracao.VIEW_NAME}")
+            cursor.execute(f"DROP TABLE IF EXISTS {migracao.VIEW_NAME}")
+            cursor.execute(migracao.SQLITE_CREATE_VIEW)
+
+    def test_visao_e_resumo_concordam(self):
+        turma, alunos, atividades = criar_base_presencas(5, total_atividades=1)
+        turma.perc_presenca_minima = Decimal("75.00")
+        turma.save()
+        casos = [(4, 4), (4, 2), (8, 1), (10, 7), (3, 0)]
+        RegistroPresenca.objects.bulk_create(
+            [
+                RegistroPresenca(
+                    aluno=aluno,
+                    turma=turma,
+                    atividade=atividades[0],
+                    data=date(2024, 1, dia + 1),
+                    status="P" if dia < presencas else "F",
+                )
+                for aluno, (convocacoes, presencas) in zip(alunos, casos)
+                for dia in range(convocacoes)
+            ]
+        )
+        ResumoPresencaMensalService.reconstruir(turma_id=turma.id)
+
+        resumo = dict(ResumoPresencaMensal.objects.values_list("aluno_id", "carencias"))
+        visao = dict(PresencaDetalhada.objects.values_list("aluno_id", "carencias"))
+
+        self.assertEqual(visao, resumo)
+        self.assertEqual(sorted(visao.values()), [0, 0, 1, 2, 5])
+
+    def test_calculo_unitario_usa_a_mesma_regra(self):
+        turma, alunos, atividades = criar_base_presencas(1, total_atividades=1)
+        turma.perc_presenca_minima = Decimal("75.00")
+        turma.save()
+        RegistroPresenca.objects.bulk_create(
+            [
+                RegistroPresenca(
+                    aluno=alunos[0],
+                    turma=turma,
+                    atividade=atividades[0],
+                    data=date(2024, 1, dia + 1),
+                    status="P" if dia < 1 else "F",
+                )
+                for dia in range(8)
+            ]
+        )
+        ResumoPresencaMensalService.reconstruir(turma_id=turma.id)
+        ResumoPresencaMensal.objects.update(carencias=0)
+        presenca = PresencaDetalhada.objects.get()
+
+        resultado = CalculadoraCarencias.calcular(presenca.pk, forcar_recalculo=True)
+
+        self.assertEqual(resultado["metodo_calculo"], "percentual_turma")
+        self.assertEqual(resultado["carencias_novas"], presenca.carencias)
+        self.assertEqual(ResumoPresencaMensal.objects.get().carencias, 5)
@@ -0,0 +1,97 @@
+"""Testes e benchmark para o serviço ConsolidadoTurma."""
+
+import time
+from datetime import date
+
+import pytest
+from django.test import TestCase
+
+from presencas.models import ResumoPresencaMensal
+from presencas.services.consolidado_turma import ConsolidadoTurma
+from tests.factories import criar_base_presencas
+
+
+class ConsolidadoTurmaTest(TestCase):
+    """Garante o formato e os valores do consolidado por turma."""
+
+    def test_turma_sem_registros_retorna_vazio(self):
+        resultado = ConsolidadoTurma.calcular(turma_id=999)
+
+        self.assertEqual(resultado["totais"]["alunos"], 0)
+        self.assertEqual(resultado["por_aluno"], [])
+
+    def test_agrega_por_atividade_aluno_e_faixa_de_carencias(self):
+        turma, alunos, atividades = criar_base_presencas(3)
+        carencias_por_aluno = [0, 2, 7]
+        ResumoPresencaMensal.objects.bulk_create(
+            [
+                ResumoPresencaMensal(
+                    aluno=aluno,
+                    turma=turma,
+                    atividade=atividades[0],
+                    periodo=date(2024, 1, 1),
+                    convocacoes=10,
+                    presencas=10 - carencias,
+                    faltas=carencias,
+                    carencias=carencias,
+                )
+                for aluno, carencias in zip(alunos, carencias_por_aluno)
+            ]
+        )
+
+        resultado = ConsolidadoTurma.calcular(turma_id=turma.id)
+
+        self.assertEqual(resultado["turma"]["nome"], "Turma Consolidado")
+        self.assertEqual(resultado["totais"]["convocacoes"], 30)
+        self.assertEqual(resultado["totais"]["carencias"], 9)
+        self.assertEqual(resultado["percentuais"]["presenca_media"], 70.0)
+        self.assertEqual(len(resultado["por_atividade"]), 1)
+        self.assertEqual(resultado["por_atividade"][0]["total_alunos"], 3)
+        self.assertEqual(
+            [a["nome"] for a in resultado["por_aluno"]],
+            ["Aluno 000", "Aluno 001", "Aluno 002"],
+        )
+        self.assertEqual(resultado["por_aluno"][2]["percentual_presenca"], 30.0)
+        self.assertEqual(
+            resultado["distribuicao_carencias"],
+            {"sem_carencias": 1, "ate_3": 1, "ate_6": 0, "mais_de_6": 1},
+        )
+
+
+@pytest.mark.slow
+class ConsolidadoTurmaBenchmarkTest(TestCase):
+    """Benchmark: turma com 200 alunos e 24 meses de resumo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.turma, alunos, atividades = criar_base_presencas(200)
+        periodos = [date(2023 + m // 12, m % 12 + 1, 1) for m in range(24)]
+        ResumoPresencaMensal.objects.bulk_create(
+            [
+                ResumoPresencaMensal(
+                    aluno=aluno,
+                    turma=cls.turma,
+                    atividade=atividade,
+                    periodo=periodo,
+                    convocacoes=4,
+                    presencas=3,
+                    faltas=1,
+                    carencias=1,
+                )
+                for aluno in alunos
+                for atividade in atividades
+                for periodo in periodos
+            ],
+            batch_size=2000,
+        )
+
+    def test_calculo_usa_numero_constante_de_queries(self):
+        inicio = time.perf_counter()
+        with self.assertNumQueries(5):
+            resultado = ConsolidadoTurma.calcular(turma_id=self.turma.id)
+        duracao = time.perf_counter() - inicio
+
+        self.assertEqual(resultado["totais"]["alunos"], 200)
+        self.assertEqual(len(resultado["por_aluno"]), 200)
+        self.assertEqual(resultado["distribuicao_carencias"]["mais_de_6"], 200)
+        self.assertLess(duracao, 2.0, f"ConsolidadoTurma.calcular levou {duracao:.3f}s")
@@ -0,0 +1,146 @@
+"""Testes da exportação Excel em fluxo do consolidado de presenças."""
+
+from datetime import date
+
+import openpyxl
+from django.http import FileResponse
+from django.test import TestCase
+
+from alunos.models import Aluno
+from atividades.models import Atividade
+from cursos.models import Curso
+from presencas.models import ResumoPresencaMensal
+from presencas.views.exportacao import ExcelAvancadoExporter, ProcessarExportacaoView
+from turmas.models import Turma
+
+
+class ExcelAvancadoExporterTest(TestCase):
+    """O consolidado é montado a partir de tuplas, sem instâncias."""
+
+    @classmethod
+    def setUpTestData(cls):
+        curso = Curso.objects.create(nome="Curso Excel", ativo=True)
+        turma = Turma.objects.create(nome="Turma Excel", curso=curso)
+        cls.ana, cls.bruno = [
+            Aluno.objects.create(
+                nome=nome,
+                data_nascimento=date(2000, 1, 1),
+                numero_iniciatico=f"X00{i}",
+                email=f"excel{i}@teste.com",
+                cpf=f"{81000000000 + i:011d}",
+            )
+            for i, nome in enumerate(["Ana Excel", "Bruno Excel"])
+        ]
+        cls.aula, cls.ritual = [
+            Atividade.objects.create(
+                nome=nome,
+                tipo_atividade="AULA",
+                data_inicio=date(2025, 5, 1),
+                hora_inicio="08:00",
+            )
+            for nome in ("Aula", "Ritual")
+        ]
+        resumos = [
+            (cls.ana, cls.aula, date(2025, 5, 1), 4, 4, 0, 1),
+            (cls.ana, cls.aula, date(2025, 6, 1), 4, 2, 2, 0),
+            (cls.ana, cls.ritual, date(2025, 5, 1), 2, 1, 1, 0),
+            (cls.bruno, cls.aula, date(2025, 5, 1), 4, 1, 3, 2),
+        ]
+        ResumoPresencaMensal.objects.bulk_create(
+            [
+                ResumoPresencaMensal(
+                    aluno=aluno,
+                    turma=turma,
+                    atividade=atividade,
+                    periodo=periodo,
+                    convocacoes=conv,
+                    presencas=pres,
+                    faltas=faltas,
+                    voluntario_extra=voluntarios,
+                )
+                for aluno, atividade, periodo, conv, pres, faltas, voluntarios in resumos
+            ]
+        )
+
+    def _dados(self):
+        presencas = ResumoPresencaMensal.objects.select_related(
+            "aluno", "turma", "atividade"
+        ).order_by("aluno__nome", "periodo")
+        return {
+            "presencas_detalhadas": presencas,
+            "atividades": Atividade.objects.filter(
+                pk__in=[self.aula.pk, self.ritual.pk]
+            ).order_by("nome"),
+            "estatisticas": ProcessarExportacaoView()._calcular_estatisticas_gerais(
+                presencas
+            ),
+            "filtros_aplicados": {"turma_id": 1},
+        }
+
+    def test_estatisticas_em_uma_agregacao(self):
+        presencas = ResumoPresencaMensal.objects.all()
+
+        with self.assertNumQueries(1):
+            stats = ProcessarExportacaoView()._calcular_estatisticas_gerais(presencas)
+
+        self.assertEqual(
+            stats,
+            {
+                "total_alunos": 2,
+                "total_atividades": 2,
+                "total_presencas": 8,
+                "total_faltas": 6,
+                "percentual_medio": 57.14,
+                "voluntarios_total": 3,
+            },
+        )
+
+    def test_consolidado_em_arquivo_temporario(self):
+        dados = self._dados()
+        config = {"multiplas_abas": True, "incluir_graficos": True}
+
+        # Atividades, consolidado e detalhado: uma consulta cada
+        with self.assertNumQueries(3):
+            resposta = ExcelAvancadoExporter().gerar_excel_consolidado_geral(
+                dados, config
+            )
+
+        self.assertIsInstance(resposta, FileResponse)
+        self.assertIn("consolidado_geral.xlsx", resposta["Content-Disposition"])
+        wb = openpyxl.load_workbook(resposta.file_to_stream)
+        resposta.close()
+
+        self.assertEqual(
+            wb.sheetnames,
+            ["Consolidado Geral", "Estatísticas", "Dados Detalhados", "Gráficos"],
+        )
+        linhas = [
+            linha for linha in wb["Consolidado Geral"].values if linha and linha[0]
+        ]
+        cabecalho = [linha[0] for linha in linhas].index("Aluno")
+        ana, bruno = linhas[cabecalho + 1 :]
+
+        # Aula soma os dois meses; Ritual só tem um
+        self.assertEqual(ana[:6], ("Ana Excel", "Turma Excel", 8, 6, 2, 0.75))
+        self.assertEqual(ana[6:9], (2, 1, 1))
+        self.assertEqual(ana[10:13], (10, 7, 3))
+        self.assertEqual(bruno[6:10], (0, 0, 0, 0))
+        self.assertEqual(bruno[10:13], (4, 1, 3))
+
+        percentual = next(
+            linha[5]
+            for linha in wb["Consolidado Geral"].iter_rows()
+            if linha[0].value == "Ana Excel"
+        )
+        self.assertEqual(percentual.number_format, "0.00%")
+        self.assertEqual(percentual.fill.fgColor.rgb, "00FFEB9C")
+
+        detalhes = list(wb["Dados Detalhados"].iter_rows(min_row=4, values_only=True))
+        self.assertEqual(len(detalhes), 4)
+        self.assertEqual(
+            detalhes[2][:3] + detalhes[2][4:],
+            ("Ana Excel", "Turma Excel", "Aula", 4, 2, 2, 0.5),
+        )
+        self.assertEqual(
+            wb["Dados Detalhados"].tables["TabelaDadosDetalhados"].ref, "A3:H7"
+        )
@@ -0,0 +1,75 @@
+"""Testes para a gravação em lote do assistente de registro de presenças."""
+
+import json
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from presencas.models import RegistroPresenca
+from tests.factories import criar_base_presencas
+
+
+class RegistrarPresencaDiasAtividadesAjaxTest(TestCase):
+    """O endpoint grava a folha do mês com número fixo de consultas."""
+
+    def setUp(self):
+        self.turma, self.alunos, self.atividades = criar_base_presencas(30)
+        usuario = get_user_model().objects.create_user(
+            username="registro", password="senha-super-segura"
+        )
+        self.client.force_login(usuario)
+
+    def _iniciar_sessao(self):
+        sessao = self.client.session
+        sessao["presenca_turma_id"] = self.turma.id
+        sessao["presenca_ano"] = 2025
+        sessao["presenca_mes"] = 3
+        sessao.save()
+
+    def _payload(self, alunos, dias):
+        return {
+            str(atividade.id): {
+                str(dia): {
+                    aluno.cpf: {"presente": i % 2 == 0, "justificativa": "Viagem"}
+                    for i, aluno in enumerate(alunos)
+                }
+                for dia in dias
+            }
+            for atividade in self.atividades
+        }
+
+    def _enviar(self, payload):
+        # A sessão do assistente é limpa após cada gravação bem-sucedida
+        self._iniciar_sessao()
+        return self.client.post(
+            reverse("presencas:registrar_presenca_dias_atividades_ajax"),
+            {"presencas_json": json.dumps(payload)},
+        )
+
+    def test_grava_presencas_e_justificativas(self):
+        payload = self._payload(self.alunos[:2], [3, 10])
+        payload[str(self.atividades[0].id)]["3"]["cpf-inexistente"] = {"presente": True}
+
+        response = self._enviar(payload)
+
+        self.assertTrue(response.json()["success"])
+        self.assertEqual(RegistroPresenca.objects.count(), 8)
+        ausente = RegistroPresenca.objects.get(
+            aluno=self.alunos[1], atividade=self.atividades[0], data=date(2025, 3, 3)
+        )
+        self.assertEqual(ausente.status, "F")
+        self.assertEqual(ausente.justificativa, "Viagem")
+
+    def test_numero_de_consultas_nao_depende_do_tamanho_da_folha(self):
+        consultas = []
+        for alunos in (self.alunos[:2], self.alunos):
+            with CaptureQueriesContext(connection) as contexto:
+                self._enviar(self._payload(alunos, [3]))
+            consultas.append(len(contexto.captured_queries))
+
+        self.assertEqual(consultas[0], consultas[1])
+        self.assertEqual(RegistroPresenca.objects.count(), 60)
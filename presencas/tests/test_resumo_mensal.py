@@ -0,0 +1,116 @@
+"""Testes para a manutenção incremental do resumo mensal de presenças."""
+
+from datetime import date
+
+from django.test import TestCase
+
+from alunos.models import Aluno
+from atividades.models import Atividade
+from cursos.models import Curso
+from presencas.bulk_operations import BulkPresencaOperations
+from presencas.models import RegistroPresenca, ResumoPresencaMensal
+from presencas.services.resumo_mensal import ResumoPresencaMensalService
+from turmas.models import Turma
+
+
+class ResumoPresencaMensalTest(TestCase):
+    """Garante que o resumo acompanha criações, alterações e exclusões."""
+
+    def setUp(self):
+        self.curso = Curso.objects.create(nome="Curso Resumo", ativo=True)
+        self.turma = Turma.objects.create(nome="Turma Resumo", curso=self.curso)
+        self.aluno = Aluno.objects.create(
+            nome="Aluno Resumo",
+            data_nascimento=date(2000, 1, 1),
+            numero_iniciatico="R001",
+            email="resumo@teste.com",
+            cpf="00000000091",
+        )
+        self.atividade = Atividade.objects.create(
+            nome="Aula Resumo",
+            tipo_atividade="AULA",
+            data_inicio=date(2025, 3, 1),
+            hora_inicio="08:00",
+        )
+
+    def _registrar(self, dia, status="P", mes=3):
+        with self.captureOnCommitCallbacks(execute=True):
+            return RegistroPresenca.objects.create(
+                aluno=self.aluno,
+                turma=self.turma,
+                atividade=self.atividade,
+                data=date(2025, mes, dia),
+                status=status,
+            )
+
+    def _resumo(self, mes=3):
+        return ResumoPresencaMensal.objects.get(
+            aluno=self.aluno,
+            turma=self.turma,
+            atividade=self.atividade,
+            periodo=date(2025, mes, 1),
+        )
+
+    def test_criacao_atualiza_resumo(self):
+        self._registrar(3, "P")
+        self._registrar(10, "F")
+        self._registrar(17, "V1")
+
+        resumo = self._resumo()
+        self.assertEqual(resumo.convocacoes, 3)
+        self.assertEqual(resumo.presencas, 1)
+        self.assertEqual(resumo.faltas, 1)
+        self.assertEqual(resumo.voluntario_extra, 1)
+        self.assertEqual(resumo.carencias, 1)
+
+    def test_alteracao_de_data_move_contagem_entre_meses(self):
+        registro = self._registrar(3, "P")
+        registro = RegistroPresenca.objects.get(pk=registro.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registro.data = date(2025, 4, 7)
+            registro.save()
+
+        self.assertFalse(
+            ResumoPresencaMensal.objects.filter(periodo=date(2025, 3, 1)).exists()
+        )
+        self.assertEqual(self._resumo(mes=4).presencas, 1)
+
+    def test_exclusao_remove_linha_vazia(self):
+        registro = self._registrar(3, "F")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registro.delete()
+
+        self.assertFalse(ResumoPresencaMensal.objects.exists())
+
+    def test_operacao_em_lote_atualiza_resumo(self):
+        dados = [
+            {
+                "aluno_id": self.aluno.id,
+                "turma_id": self.turma.id,
+                "atividade_id": self.atividade.id,
+                "data": date(2025, 3, dia),
+                "presente": dia != 10,
+            }
+            for dia in (3, 10, 17)
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BulkPresencaOperations.criar_presencas_lote(dados, "teste")
+
+        resumo = self._resumo()
+        self.assertEqual(resumo.presencas, 2)
+        self.assertEqual(resumo.faltas, 1)
+
+    def test_reconstruir_e_verificar(self):
+        self._registrar(3, "P")
+        ResumoPresencaMensal.objects.update(presencas=99)
+
+        self.assertEqual(len(ResumoPresencaMensalService.verificar()), 1)
+
+        resultado = ResumoPresencaMensalService.reconstruir(turma_id=self.turma.id)
+
+        self.assertEqual(resultado["criadas"], 1)
+        self.assertEqual(ResumoPresencaMensalService.verificar(), [])
+        self.assertEqual(self._resumo().presencas, 1)
@@ -0,0 +1,59 @@
+"""Testes para a atualização da visão agregada de presenças."""
+
+from datetime import date
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from alunos.models import Aluno
+from atividades.models import Atividade
+from cursos.models import Curso
+from presencas.models import RegistroPresenca, ResumoPresencaMensal
+from presencas.services.visao_agregada import VisaoPresencaDetalhada
+from turmas.models import Turma
+
+
+class VisaoPresencaDetalhadaTest(TestCase):
+    """Comportamento fora do PostgreSQL e atualização parcial por turma."""
+
+    def test_visao_comum_nao_e_atualizada(self):
+        resultado = VisaoPresencaDetalhada.atualizar(forcar=True)
+
+        self.assertFalse(resultado["atualizada"])
+        self.assertEqual(resultado["motivo"], "visao_comum")
+
+    def test_atualizar_turma_reconstroi_resumo_e_marca_visao(self):
+        curso = Curso.objects.create(nome="Curso Visão", ativo=True)
+        turma = Turma.objects.create(nome="Turma Visão", curso=curso)
+        aluno = Aluno.objects.create(
+            nome="Aluno Visão",
+            data_nascimento=date(2000, 1, 1),
+            numero_iniciatico="V001",
+            email="visao@teste.com",
+            cpf="00000000092",
+        )
+        atividade = Atividade.objects.create(
+            nome="Aula Visão",
+            tipo_atividade="AULA",
+            data_inicio=date(2025, 5, 1),
+            hora_inicio="08:00",
+        )
+        RegistroPresenca.objects.bulk_create(
+            [
+                RegistroPresenca(
+                    aluno=aluno,
+                    turma=turma,
+                    atividade=atividade,
+                    data=date(2025, 5, dia),
+                    status="P",
+                )
+                for dia in (5, 12)
+            ]
+        )
+
+        with patch.object(VisaoPresencaDetalhada, "marcar_pendente") as marcar:
+            resultado = VisaoPresencaDetalhada.atualizar_turma(turma.id)
+
+        marcar.assert_called_once()
+        self.assertEqual(resultado["criadas"], 1)
+        self.assertEqual(ResumoPresencaMensal.objects.get().presencas, 2)
@@ -8,6 +8,7 @@ Estrutura modular para melhor manutenibilidade:
 - urls_detalhar.py: Visualização detalhada
 - urls_operacoes.py: CRUD e operações auxiliares
 - urls_reports.py: Relatórios
+- urls_exportacao.py: Exportações em segundo plano (progresso e download)
 - api/urls.py: API REST
 """
 
@@ -39,4 +40,7 @@ urlpatterns = [
     
     # Relatórios
     path("relatorios/", include("presencas.urls_reports")),
+    
+    # Exportações em segundo plano
+    path("exportacoes/", include("presencas.urls_exportacao")),
 ]
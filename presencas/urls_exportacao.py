@@ -0,0 +1,21 @@
+"""
+URLs das exportações geradas em segundo plano.
+"""
+
+from django.urls import path
+
+from .views import artefatos
+
+urlpatterns = [
+    path("", artefatos.solicitar_exportacao, name="exportacao_solicitar"),
+    path(
+        "<int:pk>/progresso/",
+        artefatos.progresso_exportacao,
+        name="exportacao_progresso",
+    ),
+    path(
+        "<int:pk>/download/",
+        artefatos.download_exportacao,
+        name="exportacao_download",
+    ),
+]
@@ -0,0 +1,87 @@
+"""
+Views das exportações geradas em segundo plano.
+
+O pedido é registrado e enfileirado no worker; o cliente consulta o
+progresso por polling e baixa o arquivo pronto pela URL autenticada.
+"""
+
+import logging
+
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
+
+from presencas.api.decorators import api_login_required
+from presencas.services.artefatos_exportacao import ArtefatosExportacaoService
+from relatorios_presenca.models import HistoricoRelatorio
+
+from .exportacao import ProcessarExportacaoView
+
+logger = logging.getLogger(__name__)
+
+
+def _historico_do_usuario(request, pk: int) -> HistoricoRelatorio:
+    """Histórico do pedido; apenas o dono ou a equipe têm acesso."""
+    historicos = HistoricoRelatorio.objects.all()
+    if not request.user.is_staff:
+        historicos = historicos.filter(usuario=request.user)
+    return get_object_or_404(historicos, pk=pk)
+
+
+@api_login_required
+@require_POST
+def solicitar_exportacao(request):
+    """Registra o pedido de exportação, reaproveitando um artefato recente."""
+    config = ProcessarExportacaoView()._extrair_configuracoes(request)
+    emails = [
+        email.strip()
+        for email in (config.pop("email_envio") or "").split(",")
+        if email.strip()
+    ]
+    template = request.POST.get("template", "consolidado_geral")
+    formato = request.POST.get("formato", "excel")
+
+    try:
+        historico, reaproveitado = ArtefatosExportacaoService.solicitar(
+            request.user, template, formato, config
+        )
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    ArtefatosExportacaoService.enfileirar(historico, reaproveitado, emails)
+
+    dados = ArtefatosExportacaoService.progresso(historico)
+    dados.update({"success": True, "reaproveitado": reaproveitado})
+    status = 200 if historico.status == "concluido" else 202
+    return JsonResponse(dados, status=status)
+
+
+@api_login_required
+@require_GET
+def progresso_exportacao(request, pk):
+    """Situação do pedido para polling."""
+    historico = _historico_do_usuario(request, pk)
+    return JsonResponse(ArtefatosExportacaoService.progresso(historico))
+
+
+@login_required
+@require_GET
+def download_exportacao(request, pk):
+    """Entrega o arquivo gerado (somente para o dono do pedido ou a equipe)."""
+    historico = _historico_do_usuario(request, pk)
+    if historico.status != "concluido" or not historico.arquivo_gerado:
+        raise Http404("Arquivo ainda não disponível")
+
+    try:
+        arquivo = historico.arquivo_gerado.open("rb")
+    except FileNotFoundError:
+        logger.error(f"Arquivo do relatório {pk} ausente: {historico.arquivo_gerado}")
+        raise Http404("Arquivo não encontrado")
+
+    response = FileResponse(
+        arquivo, as_attachment=True, filename=historico.nome_arquivo
+    )
+    if historico.checksum:
+        response["ETag"] = f'"{historico.checksum}"'
+    return response
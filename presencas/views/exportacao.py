@@ -3,17 +3,22 @@ Views para exportação avançada de dados de presenças.
 Implementa múltiplos formatos, formatação profissional e agendamento.
 """
 
-import io
 import logging
+import tempfile
+import warnings
+from collections import Counter
 from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
 from typing import Dict, List, Any
 
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, JsonResponse
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views import View
 from django.views.generic import TemplateView
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import Coalesce
 
 # Verificar se as bibliotecas estão disponíveis
 try:
@@ -22,8 +27,9 @@ try:
     from openpyxl.utils import get_column_letter
     from openpyxl.chart import BarChart, PieChart, Reference, Series
     from openpyxl.chart.label import DataLabelList
+    from openpyxl.cell import WriteOnlyCell
     from openpyxl.formatting.rule import ColorScaleRule
-    from openpyxl.worksheet.table import Table, TableStyleInfo
+    from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
 
     OPENPYXL_AVAILABLE = True
 except ImportError:
@@ -62,12 +68,23 @@ except ImportError:
         return func
 
 
-from ..models import PresencaDetalhada, Turma
-from .consolidado import ConsolidadoPresencasView
-
+from ..models import PresencaDetalhada
+from .consolidado import ConsolidadoPresencasView, Turma
 
 logger = logging.getLogger(__name__)
 
+CONTENT_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Linhas lidas do banco por vez nas exportações em fluxo
+TAMANHO_BLOCO_EXPORTACAO = 2000
+
+# Cores da formatação condicional dos percentuais (>= 80%, >= 60%, abaixo)
+CORES_FAIXA_PERCENTUAL = {
+    "alto": "92D050",
+    "medio": "FFEB9C",
+    "baixo": "FFC7CE",
+}
+
 
 class ExportacaoAvancadaView(LoginRequiredMixin, TemplateView):
     """
@@ -299,9 +316,9 @@ class ProcessarExportacaoView(LoginRequiredMixin, View):
             dados_por_turma[turma_id]["estatisticas"]["total_alunos"].add(
                 presenca.aluno.id
             )
-            dados_por_turma[turma_id]["estatisticas"]["total_presencas"] += (
-                presenca.presencas
-            )
+            dados_por_turma[turma_id]["estatisticas"][
+                "total_presencas"
+            ] += presenca.presencas
             dados_por_turma[turma_id]["estatisticas"]["total_faltas"] += presenca.faltas
 
         # Finalizar estatísticas
@@ -529,43 +546,32 @@ class ProcessarExportacaoView(LoginRequiredMixin, View):
         }
 
     def _calcular_estatisticas_gerais(self, presencas_detalhadas) -> Dict[str, Any]:
-        """Calcula estatísticas gerais dos dados."""
-
-        if not presencas_detalhadas:
-            return {
-                "total_alunos": 0,
-                "total_atividades": 0,
-                "total_presencas": 0,
-                "total_faltas": 0,
-                "percentual_medio": 0,
-                "voluntarios_total": 0,
-            }
-
-        alunos_unicos = set()
-        atividades_unicas = set()
-        total_presencas = 0
-        total_faltas = 0
-        total_voluntarios = 0
-
-        for presenca in presencas_detalhadas:
-            alunos_unicos.add(presenca.aluno.id)
-            atividades_unicas.add(presenca.atividade.id)
-            total_presencas += presenca.presencas
-            total_faltas += presenca.faltas
-            total_voluntarios += presenca.total_voluntarios
+        """Calcula estatísticas gerais dos dados (uma agregação no banco)."""
+
+        totais = presencas_detalhadas.order_by().aggregate(
+            total_alunos=Count("aluno_id", distinct=True),
+            total_atividades=Count("atividade_id", distinct=True),
+            total_presencas=Coalesce(Sum("presencas"), 0),
+            total_faltas=Coalesce(Sum("faltas"), 0),
+            voluntarios_total=Coalesce(
+                Sum(F("voluntario_extra") + F("voluntario_simples")), 0
+            ),
+        )
 
-        total_convocacoes = total_presencas + total_faltas
+        total_convocacoes = totais["total_presencas"] + totais["total_faltas"]
         percentual_medio = (
-            (total_presencas / total_convocacoes * 100) if total_convocacoes > 0 else 0
+            (totais["total_presencas"] / total_convocacoes * 100)
+            if total_convocacoes > 0
+            else 0
         )
 
         return {
-            "total_alunos": len(alunos_unicos),
-            "total_atividades": len(atividades_unicas),
-            "total_presencas": total_presencas,
-            "total_faltas": total_faltas,
+            "total_alunos": totais["total_alunos"],
+            "total_atividades": totais["total_atividades"],
+            "total_presencas": totais["total_presencas"],
+            "total_faltas": totais["total_faltas"],
             "percentual_medio": round(percentual_medio, 2),
-            "voluntarios_total": total_voluntarios,
+            "voluntarios_total": totais["voluntarios_total"],
         }
 
     def _calcular_tendencias_temporais(self, query) -> List[Dict[str, Any]]:
@@ -723,16 +729,37 @@ class ProcessarExportacaoView(LoginRequiredMixin, View):
 class ExcelAvancadoExporter:
     """
     Classe para geração de arquivos Excel com formatação avançada.
+
+    O workbook é gerado em modo somente escrita do openpyxl: as linhas são
+    lidas do banco como tuplas (``values_list``) em blocos e gravadas em
+    fluxo, e os estilos são calculados uma única vez por workbook e
+    compartilhados por todas as células. O arquivo final vai para um
+    arquivo temporário em disco, de modo que o consumo de memória não
+    cresce com o número de linhas.
     """
 
     def __init__(self):
         self.wb = None
         self.estilos = {}
-        self._configurar_estilos()
+        self._xf = {}
+        self._linhas = Counter()
 
     def _configurar_estilos(self):
         """Configura estilos para formatação profissional."""
 
+        borda_escura = Border(
+            left=Side(style="thin", color="000000"),
+            right=Side(style="thin", color="000000"),
+            top=Side(style="thin", color="000000"),
+            bottom=Side(style="thin", color="000000"),
+        )
+        borda_clara = Border(
+            left=Side(style="thin", color="CCCCCC"),
+            right=Side(style="thin", color="CCCCCC"),
+            top=Side(style="thin", color="CCCCCC"),
+            bottom=Side(style="thin", color="CCCCCC"),
+        )
+
         # Estilo de cabeçalho principal
         self.estilos["header_principal"] = NamedStyle(name="header_principal")
         self.estilos["header_principal"].font = Font(bold=True, color="FFFFFF", size=12)
@@ -742,12 +769,7 @@ class ExcelAvancadoExporter:
         self.estilos["header_principal"].alignment = Alignment(
             horizontal="center", vertical="center", wrap_text=True
         )
-        self.estilos["header_principal"].border = Border(
-            left=Side(style="thin", color="000000"),
-            right=Side(style="thin", color="000000"),
-            top=Side(style="thin", color="000000"),
-            bottom=Side(style="thin", color="000000"),
-        )
+        self.estilos["header_principal"].border = borda_escura
 
         # Estilo de cabeçalho secundário
         self.estilos["header_secundario"] = NamedStyle(name="header_secundario")
@@ -760,12 +782,13 @@ class ExcelAvancadoExporter:
         self.estilos["header_secundario"].alignment = Alignment(
             horizontal="center", vertical="center"
         )
-        self.estilos["header_secundario"].border = Border(
-            left=Side(style="thin", color="000000"),
-            right=Side(style="thin", color="000000"),
-            top=Side(style="thin", color="000000"),
-            bottom=Side(style="thin", color="000000"),
-        )
+        self.estilos["header_secundario"].border = borda_escura
+
+        # Textos informativos (data de geração e filtros)
+        self.estilos["info"] = NamedStyle(name="info")
+        self.estilos["info"].font = Font(size=9, italic=True)
+        self.estilos["info_destaque"] = NamedStyle(name="info_destaque")
+        self.estilos["info_destaque"].font = Font(size=9, bold=True)
 
         # Estilo de dados
         self.estilos["dados"] = NamedStyle(name="dados")
@@ -773,12 +796,16 @@ class ExcelAvancadoExporter:
         self.estilos["dados"].alignment = Alignment(
             horizontal="left", vertical="center"
         )
-        self.estilos["dados"].border = Border(
-            left=Side(style="thin", color="CCCCCC"),
-            right=Side(style="thin", color="CCCCCC"),
-            top=Side(style="thin", color="CCCCCC"),
-            bottom=Side(style="thin", color="CCCCCC"),
+        self.estilos["dados"].border = borda_clara
+
+        # Estilo de período (mês de referência)
+        self.estilos["periodo"] = NamedStyle(name="periodo")
+        self.estilos["periodo"].font = Font(size=9)
+        self.estilos["periodo"].alignment = Alignment(
+            horizontal="center", vertical="center"
         )
+        self.estilos["periodo"].number_format = "mm/yyyy"
+        self.estilos["periodo"].border = borda_clara
 
         # Estilo numérico
         self.estilos["numerico"] = NamedStyle(name="numerico")
@@ -786,42 +813,107 @@ class ExcelAvancadoExporter:
         self.estilos["numerico"].alignment = Alignment(
             horizontal="center", vertical="center"
         )
-        self.estilos["numerico"].border = Border(
-            left=Side(style="thin", color="CCCCCC"),
-            right=Side(style="thin", color="CCCCCC"),
-            top=Side(style="thin", color="CCCCCC"),
-            bottom=Side(style="thin", color="CCCCCC"),
-        )
+        self.estilos["numerico"].border = borda_clara
+
+        # Estilo percentual, com uma variante por faixa da formatação
+        # condicional (o preenchimento faz parte do estilo compartilhado)
+        for faixa, cor in CORES_FAIXA_PERCENTUAL.items():
+            nome = f"percentual_{faixa}"
+            self.estilos[nome] = NamedStyle(name=nome)
+            self.estilos[nome].font = Font(size=9, bold=True)
+            self.estilos[nome].alignment = Alignment(
+                horizontal="center", vertical="center"
+            )
+            self.estilos[nome].number_format = "0.00%"
+            self.estilos[nome].border = borda_clara
+            self.estilos[nome].fill = PatternFill(
+                start_color=cor, end_color=cor, fill_type="solid"
+            )
 
-        # Estilo percentual
-        self.estilos["percentual"] = NamedStyle(name="percentual")
-        self.estilos["percentual"].font = Font(size=9, bold=True)
-        self.estilos["percentual"].alignment = Alignment(
-            horizontal="center", vertical="center"
-        )
-        self.estilos["percentual"].number_format = "0.00%"
-        self.estilos["percentual"].border = Border(
-            left=Side(style="thin", color="CCCCCC"),
-            right=Side(style="thin", color="CCCCCC"),
-            top=Side(style="thin", color="CCCCCC"),
-            bottom=Side(style="thin", color="CCCCCC"),
-        )
+    def _novo_workbook(self):
+        """Cria workbook em modo somente escrita com os estilos registrados."""
+
+        self.wb = openpyxl.Workbook(write_only=True)
+
+        # Estilos nomeados são vinculados a um único workbook
+        self.estilos = {}
+        self._configurar_estilos()
+        self._xf = {}
+        self._linhas = Counter()
+        for nome, estilo in self.estilos.items():
+            self.wb.add_named_style(estilo)
+            self._xf[nome] = estilo.as_tuple()
+
+    def _celula(self, ws, valor, estilo: str = None):
+        """Cria célula de escrita com um dos estilos pré-calculados."""
+
+        celula = WriteOnlyCell(ws, value=valor)
+        if estilo:
+            celula._style = self._xf[estilo]
+        return celula
+
+    def _escrever(self, ws, linha: List):
+        """Acrescenta uma linha à planilha, contando as linhas escritas."""
+
+        ws.append(linha)
+        self._linhas[ws.title] += 1
+
+    def _linha_seguinte(self, ws) -> int:
+        """Número da próxima linha (planilhas de escrita não o expõem)."""
+
+        return self._linhas[ws.title] + 1
+
+    @staticmethod
+    def _estilo_percentual(fracao: float) -> str:
+        """Estilo percentual correspondente à faixa da fração (0 a 1)."""
+
+        if fracao >= 0.8:
+            return "percentual_alto"
+        if fracao >= 0.6:
+            return "percentual_medio"
+        return "percentual_baixo"
+
+    @staticmethod
+    def _definir_larguras(ws, larguras: List[int]):
+        """Define larguras das colunas (antes de escrever qualquer linha)."""
+
+        for coluna, largura in enumerate(larguras, 1):
+            ws.column_dimensions[get_column_letter(coluna)].width = largura
 
     def gerar_excel_consolidado_geral(
         self, dados: Dict[str, Any], config: Dict[str, Any]
-    ) -> HttpResponse:
+    ) -> FileResponse:
         """Gera Excel para consolidado geral."""
 
-        self.wb = openpyxl.Workbook()
+        arquivo = tempfile.TemporaryFile(suffix=".xlsx")
+        try:
+            self.salvar_excel_consolidado_geral(dados, config, arquivo)
+        except Exception:
+            arquivo.close()
+            raise
+        arquivo.seek(0)
+
+        # O arquivo temporário é removido quando a resposta o fecha
+        return FileResponse(
+            arquivo,
+            as_attachment=True,
+            filename="consolidado_geral.xlsx",
+            content_type=CONTENT_TYPE_XLSX,
+        )
+
+    def salvar_excel_consolidado_geral(
+        self, dados: Dict[str, Any], config: Dict[str, Any], destino
+    ):
+        """
+        Grava o Excel do consolidado geral em ``destino``.
 
-        # Remover planilha padrão
-        if "Sheet" in self.wb.sheetnames:
-            self.wb.remove(self.wb["Sheet"])
+        Args:
+            dados: Dados do template consolidado geral
+            config: Configurações da exportação
+            destino: Caminho ou arquivo binário aberto para escrita
+        """
 
-        # Adicionar estilos ao workbook
-        for estilo in self.estilos.values():
-            if estilo.name not in [s.name for s in self.wb.named_styles]:
-                self.wb.add_named_style(estilo)
+        self._novo_workbook()
 
         # Criar aba principal
         ws_principal = self.wb.create_sheet("Consolidado Geral")
@@ -841,105 +933,96 @@ class ExcelAvancadoExporter:
             ws_graficos = self.wb.create_sheet("Gráficos")
             self._criar_aba_graficos(ws_graficos, dados)
 
-        # Gerar resposta HTTP
-        return self._gerar_resposta_excel("consolidado_geral.xlsx")
+        self.wb.save(destino)
 
     def _criar_aba_consolidado_principal(
         self, ws, dados: Dict[str, Any], config: Dict[str, Any]
     ):
         """Cria aba principal do consolidado."""
 
+        atividades = list(dados["atividades"])
+        headers = self._cabecalhos_consolidado(atividades)
+        self._definir_larguras(
+            ws, [30, 20] + [max(10, min(len(h) + 2, 30)) for h in headers[2:]]
+        )
+
         # Título
-        titulo = config.get(
-            "titulo_personalizado", "Relatório Consolidado de Presenças"
+        titulo = config.get("titulo_personalizado") or (
+            "Relatório Consolidado de Presenças"
         )
-        ws.merge_cells("A1:P1")
-        ws["A1"] = titulo
-        ws["A1"].style = "header_principal"
+        ws.merged_cells.add("A1:P1")
         ws.row_dimensions[1].height = 25
+        self._escrever(ws, [self._celula(ws, titulo, "header_principal")])
+        self._escrever(ws, [])
 
         # Informações do relatório
-        row = 3
-        ws[f"A{row}"] = f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-        ws[f"A{row}"].font = Font(size=9, italic=True)
+        self._escrever(
+            ws,
+            [
+                self._celula(
+                    ws,
+                    f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+                    "info",
+                )
+            ],
+        )
 
-        row += 1
         filtros = dados["filtros_aplicados"]
         if filtros:
-            ws[f"A{row}"] = "Filtros aplicados:"
-            ws[f"A{row}"].font = Font(size=9, bold=True)
-            row += 1
-
+            self._escrever(
+                ws, [self._celula(ws, "Filtros aplicados:", "info_destaque")]
+            )
             for chave, valor in filtros.items():
                 if valor:
-                    ws[f"B{row}"] = f"{chave}: {valor}"
-                    ws[f"B{row}"].font = Font(size=9)
-                    row += 1
+                    self._escrever(
+                        ws, [None, self._celula(ws, f"{chave}: {valor}", "dados")]
+                    )
 
         # Estatísticas resumo
-        row += 2
-        stats = dados["estatisticas"]
-
-        # Criar tabela de estatísticas
-        self._criar_tabela_estatisticas_resumo(ws, row, stats)
+        self._escrever(ws, [])
+        self._escrever(ws, [])
+        self._criar_tabela_estatisticas_resumo(ws, dados["estatisticas"])
 
         # Dados consolidados
-        row += 8
-        self._criar_tabela_dados_consolidados(ws, row, dados)
+        self._escrever(ws, [])
+        self._criar_tabela_dados_consolidados(
+            ws, headers, dados["presencas_detalhadas"], atividades
+        )
 
-    def _criar_tabela_estatisticas_resumo(
-        self, ws, start_row: int, stats: Dict[str, Any]
-    ):
+    def _criar_tabela_estatisticas_resumo(self, ws, stats: Dict[str, Any]):
         """Cria tabela de estatísticas resumo."""
 
         # Cabeçalho
-        ws[f"A{start_row}"] = "ESTATÍSTICAS GERAIS"
-        ws[f"A{start_row}"].style = "header_principal"
-        ws.merge_cells(f"A{start_row}:D{start_row}")
+        linha = self._linha_seguinte(ws)
+        ws.merged_cells.add(f"A{linha}:D{linha}")
+        self._escrever(
+            ws, [self._celula(ws, "ESTATÍSTICAS GERAIS", "header_principal")]
+        )
 
-        # Dados
+        percentual = stats["percentual_medio"] / 100
         estatisticas_dados = [
-            ["Total de Alunos", stats["total_alunos"]],
-            ["Total de Atividades", stats["total_atividades"]],
-            ["Total de Presenças", stats["total_presencas"]],
-            ["Total de Faltas", stats["total_faltas"]],
-            ["Percentual Médio", f"{stats['percentual_medio']:.2f}%"],
-            ["Total de Voluntários", stats.get("voluntarios_total", 0)],
+            ("Total de Alunos", stats["total_alunos"], "numerico"),
+            ("Total de Atividades", stats["total_atividades"], "numerico"),
+            ("Total de Presenças", stats["total_presencas"], "numerico"),
+            ("Total de Faltas", stats["total_faltas"], "numerico"),
+            ("Percentual Médio", percentual, self._estilo_percentual(percentual)),
+            ("Total de Voluntários", stats.get("voluntarios_total", 0), "numerico"),
         ]
 
-        for i, (label, valor) in enumerate(estatisticas_dados, start=start_row + 1):
-            ws[f"A{i}"] = label
-            ws[f"A{i}"].style = "header_secundario"
-            ws[f"B{i}"] = valor
-            ws[f"B{i}"].style = "numerico"
-
-        # Formatação condicional para percentual
-        percentual_cell = ws[f"B{start_row + 5}"]
-        if stats["percentual_medio"] >= 80:
-            percentual_cell.fill = PatternFill(
-                start_color="92D050", end_color="92D050", fill_type="solid"
-            )
-        elif stats["percentual_medio"] >= 60:
-            percentual_cell.fill = PatternFill(
-                start_color="FFEB9C", end_color="FFEB9C", fill_type="solid"
-            )
-        else:
-            percentual_cell.fill = PatternFill(
-                start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"
+        for label, valor, estilo in estatisticas_dados:
+            self._escrever(
+                ws,
+                [
+                    self._celula(ws, label, "header_secundario"),
+                    self._celula(ws, valor, estilo),
+                ],
             )
 
-    def _criar_tabela_dados_consolidados(
-        self, ws, start_row: int, dados: Dict[str, Any]
-    ):
-        """Cria tabela principal de dados consolidados."""
+    @staticmethod
+    def _cabecalhos_consolidado(atividades) -> List[str]:
+        """Cabeçalhos da tabela consolidada (quatro colunas por atividade)."""
 
-        presencas_detalhadas = dados["presencas_detalhadas"]
-        atividades = dados["atividades"]
-
-        # Cabeçalhos
         headers = ["Aluno", "Turma"]
-
-        # Headers dinâmicos por atividade
         for atividade in atividades:
             headers.extend(
                 [
@@ -949,86 +1032,90 @@ class ExcelAvancadoExporter:
                     f"{atividade.nome} - %",
                 ]
             )
-
         headers.extend(["Total Conv.", "Total Pres.", "Total Faltas", "% Médio"])
+        return headers
+
+    def _criar_tabela_dados_consolidados(
+        self, ws, headers: List[str], presencas_detalhadas, atividades
+    ):
+        """Cria tabela principal de dados consolidados."""
+
+        inicio = self._linha_seguinte(ws)
+        self._escrever(ws, [self._celula(ws, h, "header_principal") for h in headers])
+
+        ids_atividades = [atividade.id for atividade in atividades]
+        vazio = (0, 0, 0)
+
+        for nome, turma, por_atividade, totais in self.iterar_linhas_consolidadas(
+            presencas_detalhadas
+        ):
+            linha = [self._celula(ws, nome, "dados"), self._celula(ws, turma, "dados")]
+
+            for contagens in [por_atividade.get(i, vazio) for i in ids_atividades] + [
+                totais
+            ]:
+                convocacoes, presencas, faltas = contagens
+                fracao = presencas / convocacoes if convocacoes else 0
+                linha.extend(
+                    [
+                        self._celula(ws, convocacoes, "numerico"),
+                        self._celula(ws, presencas, "numerico"),
+                        self._celula(ws, faltas, "numerico"),
+                        self._celula(ws, fracao, self._estilo_percentual(fracao)),
+                    ]
+                )
 
-        # Escrever cabeçalhos
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=start_row, column=col, value=header)
-            cell.style = "header_principal"
+            self._escrever(ws, linha)
 
-        # Agrupar dados por aluno
-        dados_por_aluno = self._agrupar_dados_por_aluno(
-            presencas_detalhadas, atividades
+        self._criar_tabela_formatada(
+            ws, "TabelaConsolidado", headers, inicio, self._linha_seguinte(ws) - 1
         )
 
-        # Escrever dados
-        row = start_row + 1
-        for aluno_dados in dados_por_aluno.values():
-            col = 1
-
-            # Dados básicos
-            ws.cell(
-                row=row, column=col, value=aluno_dados["aluno"].nome
-            ).style = "dados"
-            col += 1
-            ws.cell(
-                row=row, column=col, value=aluno_dados["turma"].nome
-            ).style = "dados"
-            col += 1
-
-            # Dados por atividade
-            for atividade in atividades:
-                presenca = aluno_dados["atividades"].get(atividade.id)
-                if presenca:
-                    ws.cell(
-                        row=row, column=col, value=presenca.convocacoes
-                    ).style = "numerico"
-                    ws.cell(
-                        row=row, column=col + 1, value=presenca.presencas
-                    ).style = "numerico"
-                    ws.cell(
-                        row=row, column=col + 2, value=presenca.faltas
-                    ).style = "numerico"
-
-                    # Percentual com formatação condicional
-                    perc_cell = ws.cell(
-                        row=row,
-                        column=col + 3,
-                        value=float(presenca.percentual_presenca) / 100,
-                    )
-                    perc_cell.style = "percentual"
-                    self._aplicar_formatacao_condicional_percentual(perc_cell)
-                else:
-                    for i in range(4):
-                        ws.cell(row=row, column=col + i, value=0).style = "numerico"
-                col += 4
-
-            # Totais
-            totais = aluno_dados["totais"]
-            ws.cell(row=row, column=col, value=totais["convocacoes"]).style = "numerico"
-            ws.cell(
-                row=row, column=col + 1, value=totais["presencas"]
-            ).style = "numerico"
-            ws.cell(row=row, column=col + 2, value=totais["faltas"]).style = "numerico"
-
-            # Percentual médio
-            perc_medio = (
-                totais["presencas"] / totais["convocacoes"]
-                if totais["convocacoes"] > 0
-                else 0
+    @staticmethod
+    def iterar_linhas_consolidadas(presencas_detalhadas):
+        """
+        Percorre o consolidado por aluno sem carregar instâncias.
+
+        Convocações, presenças e faltas são somadas no banco por
+        aluno/atividade (todos os períodos) e lidas em ordem de aluno; só as
+        atividades do aluno corrente ficam em memória.
+
+        Yields:
+            Tuplas ``(aluno, turma, {atividade_id: (conv, pres, faltas)},
+            (conv, pres, faltas))`` com os totais do aluno por último.
+        """
+
+        linhas = (
+            presencas_detalhadas.order_by()
+            .values("aluno_id", "aluno__nome", "atividade_id")
+            .annotate(
+                turma_nome=Min("turma__nome"),
+                total_convocacoes=Sum("convocacoes"),
+                total_presencas=Sum("presencas"),
+                total_faltas=Sum("faltas"),
             )
-            perc_cell = ws.cell(row=row, column=col + 3, value=perc_medio)
-            perc_cell.style = "percentual"
-            self._aplicar_formatacao_condicional_percentual(perc_cell)
-
-            row += 1
+            .order_by("aluno__nome", "aluno_id")
+            .values_list(
+                "aluno_id",
+                "aluno__nome",
+                "turma_nome",
+                "atividade_id",
+                "total_convocacoes",
+                "total_presencas",
+                "total_faltas",
+            )
+            .iterator(chunk_size=TAMANHO_BLOCO_EXPORTACAO)
+        )
 
-        # Ajustar largura das colunas
-        self._ajustar_largura_colunas(ws)
+        for _, grupo in groupby(linhas, key=itemgetter(0)):
+            por_atividade = {}
+            nome = turma = None
+            for _, nome, turma_atividade, atividade_id, conv, pres, faltas in grupo:
+                turma = turma or turma_atividade
+                por_atividade[atividade_id] = (conv or 0, pres or 0, faltas or 0)
 
-        # Criar tabela formatada
-        self._criar_tabela_formatada(ws, start_row, row - 1, len(headers))
+            totais = tuple(sum(valores) for valores in zip(*por_atividade.values()))
+            yield nome, turma, por_atividade, totais
 
     def _agrupar_dados_por_aluno(
         self, presencas_detalhadas, atividades
@@ -1058,49 +1145,21 @@ class ExcelAvancadoExporter:
 
         return dados_por_aluno
 
-    def _aplicar_formatacao_condicional_percentual(self, cell):
-        """Aplica formatação condicional baseada no percentual."""
-
-        valor = cell.value if cell.value else 0
-
-        if valor >= 0.8:  # >= 80%
-            cell.fill = PatternFill(
-                start_color="92D050", end_color="92D050", fill_type="solid"
-            )
-        elif valor >= 0.6:  # >= 60%
-            cell.fill = PatternFill(
-                start_color="FFEB9C", end_color="FFEB9C", fill_type="solid"
-            )
-        else:  # < 60%
-            cell.fill = PatternFill(
-                start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"
-            )
-
-    def _ajustar_largura_colunas(self, ws):
-        """Ajusta largura das colunas automaticamente."""
-
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except (ValueError, TypeError):
-                    pass
-
-            adjusted_width = min(max_length + 2, 30)
-            ws.column_dimensions[column_letter].width = adjusted_width
-
-    def _criar_tabela_formatada(self, ws, start_row: int, end_row: int, num_cols: int):
+    def _criar_tabela_formatada(
+        self, ws, nome: str, headers: List[str], start_row: int, end_row: int
+    ):
         """Cria tabela formatada com estilo do Excel."""
 
         # Definir referência da tabela
-        ref = f"A{start_row}:{get_column_letter(num_cols)}{end_row}"
-
-        # Criar tabela
-        table = Table(displayName="TabelaConsolidado", ref=ref)
+        ref = f"A{start_row}:{get_column_letter(len(headers))}{end_row}"
+
+        # Criar tabela; no modo somente escrita as colunas não podem ser lidas
+        # da planilha, então os nomes vêm dos próprios cabeçalhos
+        table = Table(displayName=nome, ref=ref)
+        table.tableColumns = [
+            TableColumn(id=indice, name=header)
+            for indice, header in enumerate(headers, 1)
+        ]
 
         # Estilo da tabela
         style = TableStyleInfo(
@@ -1112,119 +1171,135 @@ class ExcelAvancadoExporter:
         )
         table.tableStyleInfo = style
 
-        # Adicionar tabela à planilha
-        ws.add_table(table)
+        # Adicionar tabela à planilha (o aviso do modo somente escrita sobre
+        # colunas manuais não se aplica: elas já foram definidas acima)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            ws.add_table(table)
 
     def _criar_aba_estatisticas(self, ws, estatisticas: Dict[str, Any]):
         """Cria aba de estatísticas detalhadas."""
 
-        # Título
-        ws.merge_cells("A1:D1")
-        ws["A1"] = "ESTATÍSTICAS DETALHADAS"
-        ws["A1"].style = "header_principal"
+        self._definir_larguras(ws, [25, 15])
 
-        row = 3
+        # Título
+        ws.merged_cells.add("A1:D1")
+        self._escrever(
+            ws, [self._celula(ws, "ESTATÍSTICAS DETALHADAS", "header_principal")]
+        )
+        self._escrever(ws, [])
 
         # Resumo geral
+        percentual = estatisticas["percentual_medio"] / 100
         self._criar_secao_estatisticas(
             ws,
-            row,
             "Resumo Geral",
             [
-                ["Total de Alunos", estatisticas["total_alunos"]],
-                ["Total de Atividades", estatisticas["total_atividades"]],
-                ["Total de Presenças", estatisticas["total_presencas"]],
-                ["Total de Faltas", estatisticas["total_faltas"]],
-                ["Percentual Médio", f"{estatisticas['percentual_medio']:.2f}%"],
+                ["Total de Alunos", estatisticas["total_alunos"], "numerico"],
+                ["Total de Atividades", estatisticas["total_atividades"], "numerico"],
+                ["Total de Presenças", estatisticas["total_presencas"], "numerico"],
+                ["Total de Faltas", estatisticas["total_faltas"], "numerico"],
+                ["Percentual Médio", percentual, self._estilo_percentual(percentual)],
             ],
         )
 
-        self._ajustar_largura_colunas(ws)
-
-    def _criar_secao_estatisticas(
-        self, ws, start_row: int, titulo: str, dados: List[List]
-    ):
+    def _criar_secao_estatisticas(self, ws, titulo: str, dados: List[List]):
         """Cria uma seção de estatísticas."""
 
         # Título da seção
-        ws[f"A{start_row}"] = titulo
-        ws[f"A{start_row}"].style = "header_secundario"
-        ws.merge_cells(f"A{start_row}:B{start_row}")
+        linha = self._linha_seguinte(ws)
+        ws.merged_cells.add(f"A{linha}:B{linha}")
+        self._escrever(ws, [self._celula(ws, titulo, "header_secundario")])
 
         # Dados
-        for i, (label, valor) in enumerate(dados, start=start_row + 1):
-            ws[f"A{i}"] = label
-            ws[f"A{i}"].style = "dados"
-            ws[f"B{i}"] = valor
-            ws[f"B{i}"].style = "numerico"
+        for label, valor, estilo in dados:
+            self._escrever(
+                ws, [self._celula(ws, label, "dados"), self._celula(ws, valor, estilo)]
+            )
 
-        return start_row + len(dados) + 2
+        self._escrever(ws, [])
 
     def _criar_aba_dados_detalhados(self, ws, presencas_detalhadas):
         """Cria aba com dados detalhados linha por linha."""
 
-        # Título
-        ws.merge_cells("A1:H1")
-        ws["A1"] = "DADOS DETALHADOS POR PRESENÇA"
-        ws["A1"].style = "header_principal"
-
-        # Cabeçalhos
         headers = [
             "Aluno",
             "Turma",
             "Atividade",
-            "Data",
+            "Período",
             "Convocações",
             "Presenças",
             "Faltas",
             "Percentual",
         ]
+        self._definir_larguras(ws, [30, 20, 30, 10, 13, 11, 9, 12])
+
+        # Título
+        ws.merged_cells.add("A1:H1")
+        self._escrever(
+            ws, [self._celula(ws, "DADOS DETALHADOS POR PRESENÇA", "header_principal")]
+        )
+        self._escrever(ws, [])
 
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=3, column=col, value=header)
-            cell.style = "header_secundario"
+        # Cabeçalhos
+        self._escrever(ws, [self._celula(ws, h, "header_secundario") for h in headers])
 
         # Dados
-        row = 4
-        for presenca in presencas_detalhadas:
-            ws.cell(row=row, column=1, value=presenca.aluno.nome).style = "dados"
-            ws.cell(row=row, column=2, value=presenca.turma.nome).style = "dados"
-            ws.cell(row=row, column=3, value=presenca.atividade.nome).style = "dados"
-            ws.cell(row=row, column=4, value=presenca.atividade.data).style = "dados"
-            ws.cell(row=row, column=5, value=presenca.convocacoes).style = "numerico"
-            ws.cell(row=row, column=6, value=presenca.presencas).style = "numerico"
-            ws.cell(row=row, column=7, value=presenca.faltas).style = "numerico"
-
-            perc_cell = ws.cell(
-                row=row, column=8, value=float(presenca.percentual_presenca) / 100
+        linhas = presencas_detalhadas.values_list(
+            "aluno__nome",
+            "turma__nome",
+            "atividade__nome",
+            "periodo",
+            "convocacoes",
+            "presencas",
+            "faltas",
+        ).iterator(chunk_size=TAMANHO_BLOCO_EXPORTACAO)
+
+        for aluno, turma, atividade, periodo, convocacoes, presencas, faltas in linhas:
+            fracao = presencas / convocacoes if convocacoes else 0
+            self._escrever(
+                ws,
+                [
+                    self._celula(ws, aluno, "dados"),
+                    self._celula(ws, turma, "dados"),
+                    self._celula(ws, atividade, "dados"),
+                    self._celula(ws, periodo, "periodo"),
+                    self._celula(ws, convocacoes, "numerico"),
+                    self._celula(ws, presencas, "numerico"),
+                    self._celula(ws, faltas, "numerico"),
+                    self._celula(ws, fracao, self._estilo_percentual(fracao)),
+                ],
             )
-            perc_cell.style = "percentual"
-            self._aplicar_formatacao_condicional_percentual(perc_cell)
-
-            row += 1
 
         # Criar tabela
-        if row > 4:
-            self._criar_tabela_formatada(ws, 3, row - 1, len(headers))
-
-        self._ajustar_largura_colunas(ws)
+        if self._linha_seguinte(ws) - 1 > 3:
+            self._criar_tabela_formatada(
+                ws, "TabelaDadosDetalhados", headers, 3, self._linha_seguinte(ws) - 1
+            )
 
     def _criar_aba_graficos(self, ws, dados: Dict[str, Any]):
         """Cria aba com gráficos."""
 
+        self._definir_larguras(ws, [25, 15])
+
         # Título
-        ws.merge_cells("A1:H1")
-        ws["A1"] = "GRÁFICOS E ANÁLISES"
-        ws["A1"].style = "header_principal"
+        ws.merged_cells.add("A1:H1")
+        self._escrever(
+            ws, [self._celula(ws, "GRÁFICOS E ANÁLISES", "header_principal")]
+        )
+        self._escrever(ws, [])
 
         # Preparar dados para gráfico de barras - estatísticas gerais
         stats = dados["estatisticas"]
 
-        # Dados para gráfico
-        ws["A3"] = "Estatística"
-        ws["B3"] = "Valor"
-        ws["A3"].style = "header_secundario"
-        ws["B3"].style = "header_secundario"
+        # Dados para gráfico (linha 3 em diante)
+        self._escrever(
+            ws,
+            [
+                self._celula(ws, "Estatística", "header_secundario"),
+                self._celula(ws, "Valor", "header_secundario"),
+            ],
+        )
 
         grafico_dados = [
             ["Presenças", stats["total_presencas"]],
@@ -1232,11 +1307,11 @@ class ExcelAvancadoExporter:
             ["Voluntários", stats.get("voluntarios_total", 0)],
         ]
 
-        for i, (label, valor) in enumerate(grafico_dados, 4):
-            ws[f"A{i}"] = label
-            ws[f"B{i}"] = valor
-            ws[f"A{i}"].style = "dados"
-            ws[f"B{i}"].style = "numerico"
+        for label, valor in grafico_dados:
+            self._escrever(
+                ws,
+                [self._celula(ws, label, "dados"), self._celula(ws, valor, "numerico")],
+            )
 
         # Criar gráfico de barras
         chart = BarChart()
@@ -1255,17 +1330,18 @@ class ExcelAvancadoExporter:
         ws.add_chart(chart, "D3")
 
         # Gráfico de pizza para percentuais
-        row_pizza = 3 + len(grafico_dados) + 5
+        for _ in range(4):
+            self._escrever(ws, [])
 
-        ws[f"A{row_pizza}"] = "Distribuição Percentual"
-        ws[f"A{row_pizza}"].style = "header_secundario"
-        ws.merge_cells(f"A{row_pizza}:B{row_pizza}")
+        row_pizza = self._linha_seguinte(ws)
+        ws.merged_cells.add(f"A{row_pizza}:B{row_pizza}")
+        self._escrever(
+            ws, [self._celula(ws, "Distribuição Percentual", "header_secundario")]
+        )
 
         row_pizza += 1
-        ws[f"A{row_pizza}"] = "Presenças"
-        ws[f"B{row_pizza}"] = stats["total_presencas"]
-        ws[f"A{row_pizza + 1}"] = "Faltas"
-        ws[f"B{row_pizza + 1}"] = stats["total_faltas"]
+        self._escrever(ws, ["Presenças", stats["total_presencas"]])
+        self._escrever(ws, ["Faltas", stats["total_faltas"]])
 
         # Criar gráfico de pizza
         pie_chart = PieChart()
@@ -1284,22 +1360,5 @@ class ExcelAvancadoExporter:
         # Posicionar gráfico de pizza
         ws.add_chart(pie_chart, f"D{row_pizza}")
 
-    def _gerar_resposta_excel(self, nome_arquivo: str) -> HttpResponse:
-        """Gera resposta HTTP com arquivo Excel."""
-
-        # Salvar em buffer
-        buffer = io.BytesIO()
-        self.wb.save(buffer)
-        buffer.seek(0)
-
-        # Criar resposta
-        response = HttpResponse(
-            buffer.getvalue(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-        response["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
-
-        return response
-
 
 # Continua na próxima parte do arquivo...
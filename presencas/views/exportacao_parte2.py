@@ -3,16 +3,11 @@ Continuação das views de exportação avançada.
 Implementa CSV, PDF e agendamento.
 """
 
-import csv
-import tempfile
-import os
 import io
 from typing import Dict, Any, List
 from datetime import datetime
-from django.http import HttpResponse
-from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.core.mail import EmailMessage
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView
 from celery import shared_task
@@ -31,6 +26,8 @@ from reportlab.graphics.charts.barcharts import VerticalBarChart
 from reportlab.graphics.charts.piecharts import Pie
 import logging
 
+from core.exportacao_csv import resposta_csv
+
 # Importações da parte 1
 from .exportacao import ProcessarExportacaoView, ExcelAvancadoExporter
 
@@ -40,51 +37,52 @@ logger = logging.getLogger(__name__)
 class CSVExporter:
     """
     Classe para exportação em formato CSV.
+
+    As respostas são geradas em fluxo (``core.exportacao_csv``), com ";"
+    como separador e BOM UTF-8 para o Excel em português.
     """
 
     def gerar_csv_consolidado(
         self, dados: Dict[str, Any], config: Dict[str, Any]
-    ) -> HttpResponse:
+    ) -> StreamingHttpResponse:
         """Gera arquivo CSV do consolidado."""
 
-        response = HttpResponse(content_type="text/csv; charset=utf-8")
-        response["Content-Disposition"] = (
-            'attachment; filename="consolidado_presencas.csv"'
+        return resposta_csv(
+            self._linhas_consolidado(dados),
+            "consolidado_presencas.csv",
+            delimitador=";",
+            bom=True,
         )
 
-        # Adicionar BOM para Excel
-        response.write("\ufeff")
-
-        writer = csv.writer(response, delimiter=";")  # Usar ; para Excel brasileiro
+    def _linhas_consolidado(self, dados: Dict[str, Any]):
+        """Linhas do CSV consolidado; os dados por aluno são lidos em fluxo."""
 
         # Cabeçalho com informações
-        writer.writerow(
-            [f"Relatório gerado em: {timezone.now().strftime('%d/%m/%Y %H:%M')}"]
-        )
-        writer.writerow([])
+        yield [f"Relatório gerado em: {timezone.now().strftime('%d/%m/%Y %H:%M')}"]
+        yield []
 
         # Filtros aplicados
         filtros = dados["filtros_aplicados"]
         if filtros:
-            writer.writerow(["Filtros aplicados:"])
+            yield ["Filtros aplicados:"]
             for chave, valor in filtros.items():
                 if valor:
-                    writer.writerow([f"{chave}: {valor}"])
-            writer.writerow([])
+                    yield [f"{chave}: {valor}"]
+            yield []
 
         # Estatísticas resumo
         stats = dados["estatisticas"]
-        writer.writerow(["ESTATÍSTICAS GERAIS"])
-        writer.writerow(["Total de Alunos", stats["total_alunos"]])
-        writer.writerow(["Total de Atividades", stats["total_atividades"]])
-        writer.writerow(["Total de Presenças", stats["total_presencas"]])
-        writer.writerow(["Total de Faltas", stats["total_faltas"]])
-        writer.writerow(["Percentual Médio", f"{stats['percentual_medio']:.2f}%"])
-        writer.writerow([])
+        yield ["ESTATÍSTICAS GERAIS"]
+        yield ["Total de Alunos", stats["total_alunos"]]
+        yield ["Total de Atividades", stats["total_atividades"]]
+        yield ["Total de Presenças", stats["total_presencas"]]
+        yield ["Total de Faltas", stats["total_faltas"]]
+        yield ["Percentual Médio", f"{stats['percentual_medio']:.2f}%"]
+        yield []
 
         # Cabeçalhos da tabela principal
         headers = ["Aluno", "Turma"]
-        atividades = dados["atividades"]
+        atividades = list(dados["atividades"])
 
         for atividade in atividades:
             headers.extend(
@@ -99,106 +97,76 @@ class CSVExporter:
         headers.extend(
             ["Total Convocações", "Total Presenças", "Total Faltas", "Percentual Médio"]
         )
-        writer.writerow(headers)
-
-        # Dados consolidados
-        excel_exporter = ExcelAvancadoExporter()
-        dados_por_aluno = excel_exporter._agrupar_dados_por_aluno(
-            dados["presencas_detalhadas"], atividades
-        )
-
-        for aluno_dados in dados_por_aluno.values():
-            row = [aluno_dados["aluno"].nome, aluno_dados["turma"].nome]
-
-            # Dados por atividade
-            for atividade in atividades:
-                presenca = aluno_dados["atividades"].get(atividade.id)
-                if presenca:
-                    row.extend(
-                        [
-                            presenca.convocacoes,
-                            presenca.presencas,
-                            presenca.faltas,
-                            f"{float(presenca.percentual_presenca):.2f}%",
-                        ]
-                    )
-                else:
-                    row.extend([0, 0, 0, "0.00%"])
-
-            # Totais
-            totais = aluno_dados["totais"]
-            perc_medio = (
-                totais["presencas"] / totais["convocacoes"] * 100
-                if totais["convocacoes"] > 0
-                else 0
-            )
-
-            row.extend(
-                [
-                    totais["convocacoes"],
-                    totais["presencas"],
-                    totais["faltas"],
-                    f"{perc_medio:.2f}%",
-                ]
-            )
-
-            writer.writerow(row)
-
-        return response
+        yield headers
+
+        # Dados consolidados (por atividade e, por último, os totais do aluno)
+        ids_atividades = [atividade.id for atividade in atividades]
+        vazio = (0, 0, 0)
+
+        for (
+            nome,
+            turma,
+            por_atividade,
+            totais,
+        ) in ExcelAvancadoExporter.iterar_linhas_consolidadas(
+            dados["presencas_detalhadas"]
+        ):
+            row = [nome, turma]
+            for convocacoes, presencas, faltas in [
+                por_atividade.get(i, vazio) for i in ids_atividades
+            ] + [totais]:
+                percentual = presencas / convocacoes * 100 if convocacoes else 0
+                row.extend([convocacoes, presencas, faltas, f"{percentual:.2f}%"])
+
+            yield row
 
     def gerar_csv_por_turma(
         self, dados: Dict[str, Any], config: Dict[str, Any]
-    ) -> HttpResponse:
+    ) -> StreamingHttpResponse:
         """Gera CSV agrupado por turma."""
 
-        response = HttpResponse(content_type="text/csv; charset=utf-8")
-        response["Content-Disposition"] = (
-            'attachment; filename="presencas_por_turma.csv"'
+        return resposta_csv(
+            self._linhas_por_turma(dados),
+            "presencas_por_turma.csv",
+            delimitador=";",
+            bom=True,
         )
-        response.write("\ufeff")
 
-        writer = csv.writer(response, delimiter=";")
+    def _linhas_por_turma(self, dados: Dict[str, Any]):
+        """Linhas do CSV agrupado por turma."""
 
         # Cabeçalho
-        writer.writerow(
-            [f"Relatório por Turma - {timezone.now().strftime('%d/%m/%Y %H:%M')}"]
-        )
-        writer.writerow([])
+        yield [f"Relatório por Turma - {timezone.now().strftime('%d/%m/%Y %H:%M')}"]
+        yield []
 
         # Dados por turma
         for turma_data in dados["dados_por_turma"].values():
             turma = turma_data["turma"]
             stats = turma_data["estatisticas"]
 
-            writer.writerow([f"TURMA: {turma.nome}"])
-            writer.writerow(["Total de Alunos", stats["total_alunos"]])
-            writer.writerow(["Total de Presenças", stats["total_presencas"]])
-            writer.writerow(["Total de Faltas", stats["total_faltas"]])
-            writer.writerow(["Percentual Médio", f"{stats['percentual_medio']:.2f}%"])
-            writer.writerow([])
+            yield [f"TURMA: {turma.nome}"]
+            yield ["Total de Alunos", stats["total_alunos"]]
+            yield ["Total de Presenças", stats["total_presencas"]]
+            yield ["Total de Faltas", stats["total_faltas"]]
+            yield ["Percentual Médio", f"{stats['percentual_medio']:.2f}%"]
+            yield []
 
             # Dados detalhados da turma
-            writer.writerow(
-                ["Aluno", "Atividade", "Data", "Presenças", "Faltas", "Percentual"]
-            )
+            yield ["Aluno", "Atividade", "Período", "Presenças", "Faltas", "Percentual"]
 
             for presenca in turma_data["presencas"]:
-                writer.writerow(
-                    [
-                        presenca.aluno.nome,
-                        presenca.atividade.nome,
-                        presenca.atividade.data.strftime("%d/%m/%Y"),
-                        presenca.presencas,
-                        presenca.faltas,
-                        f"{float(presenca.percentual_presenca):.2f}%",
-                    ]
-                )
-
-            writer.writerow([])
-            writer.writerow(["-" * 50])
-            writer.writerow([])
+                yield [
+                    presenca.aluno.nome,
+                    presenca.atividade.nome,
+                    presenca.periodo.strftime("%m/%Y"),
+                    presenca.presencas,
+                    presenca.faltas,
+                    f"{presenca.calcular_percentual():.2f}%",
+                ]
 
-        return response
+            yield []
+            yield ["-" * 50]
+            yield []
 
 
 class PDFExporter:
@@ -465,125 +433,17 @@ class PDFExporter:
 class AgendadorRelatorios:
     """
     Classe para agendamento de relatórios automáticos.
+
+    A execução fica a cargo de AgendamentosRelatorioService (despachado pelo
+    Celery beat em presencas.tasks.despachar_agendamentos_relatorio).
     """
 
     @shared_task
     def processar_relatorio_agendado(agendamento_id: int):
         """Task do Celery para processar relatório agendado."""
+        from ..tasks import processar_agendamento_relatorio
 
-        try:
-            from ..models import AgendamentoRelatorio
-
-            agendamento = AgendamentoRelatorio.objects.get(id=agendamento_id)
-
-            # Configurar parâmetros
-            config = {
-                "formato": agendamento.formato,
-                "template": agendamento.template,
-                "periodo": agendamento.periodo,
-                "data_inicio": agendamento.data_inicio,
-                "data_fim": agendamento.data_fim,
-                "turma_id": agendamento.turma_id,
-                "curso": agendamento.curso,
-                "incluir_graficos": agendamento.incluir_graficos,
-                "incluir_estatisticas": agendamento.incluir_estatisticas,
-                "titulo_personalizado": agendamento.titulo_personalizado,
-            }
-
-            # Processar exportação
-            processor = ProcessarExportacaoView()
-            dados = processor._obter_dados(agendamento.template, config)
-
-            # Gerar arquivo
-            arquivo_temp = None
-
-            if agendamento.formato.startswith("excel"):
-                exporter = ExcelAvancadoExporter()
-                response = exporter.gerar_excel_consolidado_geral(dados, config)
-                arquivo_temp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
-
-            elif agendamento.formato == "csv":
-                exporter = CSVExporter()
-                response = exporter.gerar_csv_consolidado(dados, config)
-                arquivo_temp = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
-
-            elif agendamento.formato.startswith("pdf"):
-                exporter = PDFExporter()
-                response = exporter.gerar_pdf_consolidado(dados, config)
-                arquivo_temp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
-
-            if arquivo_temp:
-                arquivo_temp.write(response.content)
-                arquivo_temp.close()
-
-                # Enviar por email
-                AgendadorRelatorios._enviar_email_relatorio(
-                    agendamento, arquivo_temp.name
-                )
-
-                # Limpar arquivo temporário
-                os.unlink(arquivo_temp.name)
-
-            # Atualizar última execução
-            agendamento.ultima_execucao = timezone.now()
-            agendamento.save()
-
-            logger.info(f"Relatório agendado {agendamento_id} processado com sucesso")
-
-        except Exception as e:
-            logger.error(
-                f"Erro ao processar relatório agendado {agendamento_id}: {str(e)}"
-            )
-            raise
-
-    @staticmethod
-    def _enviar_email_relatorio(agendamento, arquivo_path: str):
-        """Envia relatório por email."""
-
-        try:
-            # Preparar email
-            assunto = f"Relatório Automático - {agendamento.nome}"
-
-            corpo = f"""
-            Relatório gerado automaticamente.
-            
-            Nome: {agendamento.nome}
-            Template: {agendamento.get_template_display()}
-            Formato: {agendamento.get_formato_display()}
-            Data de geração: {timezone.now().strftime("%d/%m/%Y %H:%M")}
-            
-            Atenciosamente,
-            Sistema de Presenças OMAUM
-            """
-
-            # Criar email
-            email = EmailMessage(
-                subject=assunto,
-                body=corpo,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=agendamento.emails_destino.split(","),
-            )
-
-            # Anexar arquivo
-            with open(arquivo_path, "rb") as arquivo:
-                nome_arquivo = f"relatorio_{agendamento.nome}_{timezone.now().strftime('%Y%m%d_%H%M')}"
-                if arquivo_path.endswith(".xlsx"):
-                    nome_arquivo += ".xlsx"
-                elif arquivo_path.endswith(".csv"):
-                    nome_arquivo += ".csv"
-                elif arquivo_path.endswith(".pdf"):
-                    nome_arquivo += ".pdf"
-
-                email.attach(nome_arquivo, arquivo.read())
-
-            # Enviar
-            email.send()
-
-            logger.info(f"Email enviado para: {agendamento.emails_destino}")
-
-        except Exception as e:
-            logger.error(f"Erro ao enviar email: {str(e)}")
-            raise
+        return processar_agendamento_relatorio(agendamento_id)
 
 
 class GerenciarAgendamentosView(LoginRequiredMixin, TemplateView):
@@ -596,7 +456,7 @@ class GerenciarAgendamentosView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        from ..models import AgendamentoRelatorio
+        from relatorios_presenca.models import AgendamentoRelatorio
 
         context["agendamentos"] = AgendamentoRelatorio.objects.filter(
             usuario=self.request.user, ativo=True
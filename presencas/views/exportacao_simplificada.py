@@ -3,19 +3,21 @@ Views simplificadas para exportação avançada de dados de presenças.
 Versão que funciona sem dependências externas opcionais.
 """
 
-import csv
 import io
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any
 from importlib import import_module
 
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views import View
 from django.views.generic import TemplateView
 from django.utils import timezone
 from django.db.models import Sum, Count
+from django.db.models.functions import Coalesce
+
+from core.exportacao_csv import TAMANHO_LOTE_CSV, resposta_csv
 
 from ..models import PresencaDetalhada
 from .consolidado import ConsolidadoPresencasView
@@ -177,13 +179,13 @@ class ProcessarExportacaoView(LoginRequiredMixin, View):
                 "aluno", "turma", "atividade"
             )
             if filtros.get("data_inicio"):
-                query = query.filter(atividade__data__gte=filtros["data_inicio"])
+                query = query.filter(atividade__data_inicio__gte=filtros["data_inicio"])
             if filtros.get("data_fim"):
-                query = query.filter(atividade__data__lte=filtros["data_fim"])
+                query = query.filter(atividade__data_inicio__lte=filtros["data_fim"])
             if filtros.get("turma_id"):
                 query = query.filter(turma_id=filtros["turma_id"])
 
-            presencas_detalhadas = list(query[:1000])  # Limitar para performance
+            presencas_detalhadas = query[:1000]  # Limitar para performance
             atividades = []
 
         # Calcular estatísticas gerais
@@ -230,9 +232,9 @@ class ProcessarExportacaoView(LoginRequiredMixin, View):
             dados_por_turma[turma_id]["estatisticas"]["total_alunos"].add(
                 presenca.aluno.id
             )
-            dados_por_turma[turma_id]["estatisticas"]["total_presencas"] += (
-                presenca.presencas
-            )
+            dados_por_turma[turma_id]["estatisticas"][
+                "total_presencas"
+            ] += presenca.presencas
             dados_por_turma[turma_id]["estatisticas"]["total_faltas"] += presenca.faltas
 
         # Finalizar estatísticas
@@ -295,160 +297,162 @@ class ProcessarExportacaoView(LoginRequiredMixin, View):
         }
 
     def _calcular_estatisticas_gerais(self, presencas_detalhadas) -> Dict[str, Any]:
-        """Calcula estatísticas gerais dos dados."""
-
-        if not presencas_detalhadas:
-            return {
-                "total_alunos": 0,
-                "total_atividades": 0,
-                "total_presencas": 0,
-                "total_faltas": 0,
-                "percentual_medio": 0,
-            }
+        """Calcula estatísticas gerais dos dados (uma agregação no banco)."""
 
-        alunos_unicos = set()
-        atividades_unicas = set()
-        total_presencas = 0
-        total_faltas = 0
-
-        for presenca in presencas_detalhadas:
-            alunos_unicos.add(presenca.aluno.id)
-            atividades_unicas.add(presenca.atividade.id)
-            total_presencas += presenca.presencas
-            total_faltas += presenca.faltas
+        totais = presencas_detalhadas.aggregate(
+            total_alunos=Count("aluno_id", distinct=True),
+            total_atividades=Count("atividade_id", distinct=True),
+            total_presencas=Coalesce(Sum("presencas"), 0),
+            total_faltas=Coalesce(Sum("faltas"), 0),
+        )
 
-        total_convocacoes = total_presencas + total_faltas
+        total_convocacoes = totais["total_presencas"] + totais["total_faltas"]
         percentual_medio = (
-            (total_presencas / total_convocacoes * 100) if total_convocacoes > 0 else 0
+            (totais["total_presencas"] / total_convocacoes * 100)
+            if total_convocacoes > 0
+            else 0
         )
 
         return {
-            "total_alunos": len(alunos_unicos),
-            "total_atividades": len(atividades_unicas),
-            "total_presencas": total_presencas,
-            "total_faltas": total_faltas,
+            "total_alunos": totais["total_alunos"],
+            "total_atividades": totais["total_atividades"],
+            "total_presencas": totais["total_presencas"],
+            "total_faltas": totais["total_faltas"],
             "percentual_medio": round(percentual_medio, 2),
         }
 
     def _gerar_csv(
         self, template: str, dados: Dict[str, Any], config: Dict[str, Any]
-    ) -> HttpResponse:
+    ) -> StreamingHttpResponse:
         """Gera arquivo CSV do relatório."""
 
-        response = HttpResponse(content_type="text/csv; charset=utf-8")
-        response["Content-Disposition"] = (
-            'attachment; filename="relatorio_presencas.csv"'
+        # Usar ; e BOM para o Excel brasileiro
+        return resposta_csv(
+            self._linhas_csv(template, dados, config),
+            "relatorio_presencas.csv",
+            delimitador=";",
+            bom=True,
         )
 
-        # Adicionar BOM para Excel
-        response.write("\ufeff")
-
-        writer = csv.writer(response, delimiter=";")  # Usar ; para Excel brasileiro
+    def _linhas_csv(self, template: str, dados: Dict[str, Any], config: Dict[str, Any]):
+        """Linhas do CSV do relatório, geradas sob demanda."""
 
         # Cabeçalho com informações
         titulo = config.get("titulo_personalizado", "Relatório de Presenças")
-        writer.writerow([titulo])
-        writer.writerow([f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}"])
-        writer.writerow([])
+        yield [titulo]
+        yield [f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}"]
+        yield []
 
         if template == "consolidado_geral":
-            self._escrever_csv_consolidado_geral(writer, dados)
+            yield from self._linhas_csv_consolidado_geral(dados)
         elif template == "por_turma":
-            self._escrever_csv_por_turma(writer, dados)
+            yield from self._linhas_csv_por_turma(dados)
         elif template == "estatisticas_executivas":
-            self._escrever_csv_estatisticas(writer, dados)
-
-        return response
+            yield from self._linhas_csv_estatisticas(dados)
 
-    def _escrever_csv_consolidado_geral(self, writer, dados: Dict[str, Any]):
-        """Escreve dados do consolidado geral no CSV."""
+    def _linhas_csv_consolidado_geral(self, dados: Dict[str, Any]):
+        """Linhas do consolidado geral; os registros são lidos em blocos."""
 
         # Estatísticas resumo
         stats = dados["estatisticas"]
-        writer.writerow(["ESTATÍSTICAS GERAIS"])
-        writer.writerow(["Total de Alunos", stats["total_alunos"]])
-        writer.writerow(["Total de Atividades", stats["total_atividades"]])
-        writer.writerow(["Total de Presenças", stats["total_presencas"]])
-        writer.writerow(["Total de Faltas", stats["total_faltas"]])
-        writer.writerow(["Percentual Médio", f"{stats['percentual_medio']:.2f}%"])
-        writer.writerow([])
+        yield ["ESTATÍSTICAS GERAIS"]
+        yield ["Total de Alunos", stats["total_alunos"]]
+        yield ["Total de Atividades", stats["total_atividades"]]
+        yield ["Total de Presenças", stats["total_presencas"]]
+        yield ["Total de Faltas", stats["total_faltas"]]
+        yield ["Percentual Médio", f"{stats['percentual_medio']:.2f}%"]
+        yield []
 
         # Cabeçalhos da tabela de dados
-        writer.writerow(
-            [
-                "Aluno",
-                "Turma",
-                "Atividade",
-                "Data",
-                "Convocações",
-                "Presenças",
-                "Faltas",
-                "Percentual",
-            ]
-        )
+        yield [
+            "Aluno",
+            "Turma",
+            "Atividade",
+            "Período",
+            "Convocações",
+            "Presenças",
+            "Faltas",
+            "Percentual",
+        ]
 
         # Dados detalhados
-        for presenca in dados["presencas_detalhadas"]:
-            writer.writerow(
-                [
-                    presenca.aluno.nome,
-                    presenca.turma.nome,
-                    presenca.atividade.nome,
-                    presenca.atividade.data.strftime("%d/%m/%Y"),
-                    presenca.convocacoes,
-                    presenca.presencas,
-                    presenca.faltas,
-                    f"{float(presenca.percentual_presenca):.2f}%",
-                ]
+        registros = (
+            dados["presencas_detalhadas"]
+            .values_list(
+                "aluno__nome",
+                "turma__nome",
+                "atividade__nome",
+                "periodo",
+                "convocacoes",
+                "presencas",
+                "faltas",
             )
+            .iterator(chunk_size=TAMANHO_LOTE_CSV)
+        )
+        for (
+            aluno,
+            turma,
+            atividade,
+            periodo,
+            convocacoes,
+            presencas,
+            faltas,
+        ) in registros:
+            percentual = presencas / convocacoes * 100 if convocacoes else 0
+            yield [
+                aluno,
+                turma,
+                atividade,
+                periodo.strftime("%m/%Y"),
+                convocacoes,
+                presencas,
+                faltas,
+                f"{percentual:.2f}%",
+            ]
 
-    def _escrever_csv_por_turma(self, writer, dados: Dict[str, Any]):
-        """Escreve dados agrupados por turma no CSV."""
+    def _linhas_csv_por_turma(self, dados: Dict[str, Any]):
+        """Linhas dos dados agrupados por turma."""
 
         for turma_data in dados["dados_por_turma"].values():
             turma = turma_data["turma"]
             stats = turma_data["estatisticas"]
 
-            writer.writerow([f"TURMA: {turma.nome}"])
-            writer.writerow(["Total de Alunos", stats["total_alunos"]])
-            writer.writerow(["Total de Presenças", stats["total_presencas"]])
-            writer.writerow(["Total de Faltas", stats["total_faltas"]])
-            writer.writerow(["Percentual Médio", f"{stats['percentual_medio']:.2f}%"])
-            writer.writerow([])
+            yield [f"TURMA: {turma.nome}"]
+            yield ["Total de Alunos", stats["total_alunos"]]
+            yield ["Total de Presenças", stats["total_presencas"]]
+            yield ["Total de Faltas", stats["total_faltas"]]
+            yield ["Percentual Médio", f"{stats['percentual_medio']:.2f}%"]
+            yield []
 
             # Dados detalhados da turma
-            writer.writerow(
-                ["Aluno", "Atividade", "Data", "Presenças", "Faltas", "Percentual"]
-            )
+            yield ["Aluno", "Atividade", "Período", "Presenças", "Faltas", "Percentual"]
 
             for presenca in turma_data["presencas"]:
-                writer.writerow(
-                    [
-                        presenca.aluno.nome,
-                        presenca.atividade.nome,
-                        presenca.atividade.data.strftime("%d/%m/%Y"),
-                        presenca.presencas,
-                        presenca.faltas,
-                        f"{float(presenca.percentual_presenca):.2f}%",
-                    ]
-                )
+                yield [
+                    presenca.aluno.nome,
+                    presenca.atividade.nome,
+                    presenca.periodo.strftime("%m/%Y"),
+                    presenca.presencas,
+                    presenca.faltas,
+                    f"{presenca.calcular_percentual():.2f}%",
+                ]
 
-            writer.writerow([])
-            writer.writerow(["-" * 50])
-            writer.writerow([])
+            yield []
+            yield ["-" * 50]
+            yield []
 
-    def _escrever_csv_estatisticas(self, writer, dados: Dict[str, Any]):
-        """Escreve estatísticas executivas no CSV."""
+    def _linhas_csv_estatisticas(self, dados: Dict[str, Any]):
+        """Linhas das estatísticas executivas."""
 
         stats = dados["estatisticas_executivas"]["resumo_geral"]
 
-        writer.writerow(["ESTATÍSTICAS EXECUTIVAS"])
-        writer.writerow([])
-        writer.writerow(["Total de Alunos", stats["total_alunos"]])
-        writer.writerow(["Total de Atividades", stats["total_atividades"]])
-        writer.writerow(["Total de Presenças", stats["total_presencas"]])
-        writer.writerow(["Total de Faltas", stats["total_faltas"]])
-        writer.writerow(["Percentual Geral", f"{stats['percentual_geral']:.2f}%"])
+        yield ["ESTATÍSTICAS EXECUTIVAS"]
+        yield []
+        yield ["Total de Alunos", stats["total_alunos"]]
+        yield ["Total de Atividades", stats["total_atividades"]]
+        yield ["Total de Presenças", stats["total_presencas"]]
+        yield ["Total de Faltas", stats["total_faltas"]]
+        yield ["Percentual Geral", f"{stats['percentual_geral']:.2f}%"]
 
     def _gerar_excel_basico(
         self, template: str, dados: Dict[str, Any], config: Dict[str, Any]
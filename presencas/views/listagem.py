@@ -15,6 +15,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.utils import timezone
 from django.db.models import F
 
+from core import cache_versionado
 from presencas.models import RegistroPresenca
 from alunos.services import (
     listar_alunos as listar_alunos_service,
@@ -40,7 +41,7 @@ logger = logging.getLogger(__name__)
 def listar_presencas_academicas(request):
     """
     Lista presenças com filtros, paginação e cache.
-    
+
     Parâmetros GET:
     - aluno: CPF ou ID do aluno
     - turma: ID da turma
@@ -55,7 +56,16 @@ def listar_presencas_academicas(request):
     data_fim = request.GET.get("data_fim", "")
 
     # Cache para queries de filtros complexos
-    cache_key = f"presencas_filtros_{aluno_id}_{turma_id}_{atividade_id}_{data_inicio}_{data_fim}"
+    namespaces = ["presencas"] + ([("turma", turma_id)] if turma_id else [])
+    cache_key = cache_versionado.chave(
+        namespaces,
+        "presencas_filtros",
+        aluno_id,
+        turma_id,
+        atividade_id,
+        data_inicio,
+        data_fim,
+    )
     cached_result = cache.get(cache_key)
 
     if cached_result:
@@ -107,9 +117,10 @@ def listar_presencas_academicas(request):
         alunos = []
 
     # Carregamento otimizado de listas de referência com cache
-    turmas_cache_key = "turmas_listagem"
-    atividades_cache_key = "atividades_listagem"
-    cursos_cache_key = "cursos_listagem"
+    geracao_turma = cache_versionado.geracao("turma")
+    turmas_cache_key = f"turmas_listagem:g{geracao_turma}"
+    atividades_cache_key = f"atividades_listagem:g{geracao_turma}"
+    cursos_cache_key = f"cursos_listagem:g{geracao_turma}"
 
     cursos = cache.get(cursos_cache_key)
     if not cursos:
@@ -164,7 +175,7 @@ def registrar_presenca_academica(request):
             aluno = buscar_aluno_por_cpf_service(aluno_id)
             turma = get_object_or_404(Turma, id=turma_id)
             atividade = get_object_or_404(Atividade, id=atividade_id)
-            
+
             if not aluno:
                 messages.error(request, f"Aluno com CPF {aluno_id} não encontrado.")
                 return redirect("presencas:listar_presencas_academicas")
@@ -180,16 +191,16 @@ def registrar_presenca_academica(request):
                     "data_registro": timezone.now(),
                 },
             )
-            
+
             if not created:
                 presenca.status = status
                 presenca.registrado_por = request.user.username
                 presenca.data_registro = timezone.now()
-                
+
             presenca.save()
             messages.success(request, "Presença registrada com sucesso!")
             return redirect("presencas:listar_presencas_academicas")
-            
+
         except (Turma.DoesNotExist, Atividade.DoesNotExist) as e:
             messages.error(request, f"Dados inválidos: {str(e)}")
             return redirect("presencas:listar_presencas_academicas")
@@ -266,6 +277,7 @@ def detalhar_presenca_academica(request, pk):
 
 # Helpers para fluxos indisponíveis (em desenvolvimento)
 
+
 def _redirect_fluxo_indisponivel(request, mensagem):
     """Redireciona com mensagem informativa."""
     messages.info(request, mensagem)
@@ -471,5 +483,3 @@ def listar_observacoes_presenca(request):
         "O histórico de observações está em atualização.",
     )
     return redirect("presencas:listar_presencas_academicas")
-
-
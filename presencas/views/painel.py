@@ -16,7 +16,7 @@ from django.utils import timezone
 from django.contrib import messages
 
 from ..services.calculadora_estatisticas import CalculadoraEstatisticas
-from ..models import PresencaDetalhada
+from ..models import ResumoPresencaMensal
 
 # Importação dinâmica de modelos
 from importlib import import_module
@@ -132,7 +132,7 @@ class PainelEstatisticasView(LoginRequiredMixin, TemplateView):
         """Calcula métricas principais do painel."""
         try:
             # Filtrar presenças
-            presencas_qs = PresencaDetalhada.objects.all()
+            presencas_qs = ResumoPresencaMensal.objects.all()
 
             if filtros.get("turma_id"):
                 presencas_qs = presencas_qs.filter(turma_id=filtros["turma_id"])
@@ -260,7 +260,7 @@ class PainelEstatisticasView(LoginRequiredMixin, TemplateView):
         """Prepara dados para gráfico de evolução temporal (linha)."""
         try:
             # Filtrar e agregar por mês diretamente no banco
-            presencas_qs = PresencaDetalhada.objects.all()
+            presencas_qs = ResumoPresencaMensal.objects.all()
 
             if filtros.get("turma_id"):
                 presencas_qs = presencas_qs.filter(turma_id=filtros["turma_id"])
@@ -393,7 +393,7 @@ class PainelEstatisticasView(LoginRequiredMixin, TemplateView):
         """Prepara dados para gráfico de carências por turma (barras)."""
         try:
             # Filtrar base
-            presencas_qs = PresencaDetalhada.objects.all()
+            presencas_qs = ResumoPresencaMensal.objects.all()
 
             if filtros.get("atividade_id"):
                 presencas_qs = presencas_qs.filter(atividade_id=filtros["atividade_id"])
@@ -444,7 +444,7 @@ class PainelEstatisticasView(LoginRequiredMixin, TemplateView):
         """Prepara dados para gráfico de performance por atividades (radar)."""
         try:
             # Filtrar base
-            presencas_qs = PresencaDetalhada.objects.all()
+            presencas_qs = ResumoPresencaMensal.objects.all()
 
             if filtros.get("turma_id"):
                 presencas_qs = presencas_qs.filter(turma_id=filtros["turma_id"])
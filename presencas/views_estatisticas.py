@@ -2,6 +2,7 @@
 Views para estatísticas de presença usando o CalculadoraEstatisticas.
 """
 
+import hashlib
 import logging
 from datetime import datetime
 from importlib import import_module
@@ -13,6 +14,8 @@ from django.core.exceptions import ValidationError
 from django.core.cache import cache
 from django.utils import timezone
 
+from core import cache_versionado
+
 from .services.calculadora_estatisticas import CalculadoraEstatisticas
 from .models import PresencaDetalhada, ConfiguracaoPresenca
 
@@ -46,7 +49,12 @@ def consolidado_aluno(request, aluno_id):
     try:
         # Cache baseado nos parâmetros da requisição
         params = request.GET.copy()
-        cache_key = f"consolidado_aluno_{aluno_id}_{hash(str(sorted(params.items())))}"
+        cache_key = cache_versionado.chave(
+            "presencas",
+            "consolidado_aluno",
+            aluno_id,
+            hashlib.md5(str(sorted(params.lists())).encode()).hexdigest(),
+        )
 
         cached_result = cache.get(cache_key)
         if cached_result:
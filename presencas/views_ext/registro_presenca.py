@@ -40,6 +40,7 @@ AtividadeAcademica = _get_model("atividades", "AtividadeAcademica")
 @csrf_exempt
 def toggle_convocacao_ajax(request):
     import json
+
     # from presencas.models import ConvocacaoPresenca  # Modelo removido
 
     try:
@@ -84,6 +85,75 @@ def get_model_class(model_name):
 logger = logging.getLogger(__name__)
 
 
+def _salvar_presencas_periodo(turma, ano, mes, celulas, registrado_por):
+    """
+    Grava as presenças de um período da turma em lote.
+
+    Alunos e atividades são resolvidos com um ``in_bulk`` cada, os registros
+    gravados por ``BulkPresencaOperations.criar_presencas_lote`` (upsert) e o
+    cache do período invalidado uma única vez.
+
+    Args:
+        turma: Turma dos registros
+        ano: Ano do período
+        mes: Mês do período
+        celulas: Iterável de tuplas (cpf, atividade_id, dia, presente, justificativa)
+        registrado_por: Username do usuário que está registrando
+
+    Returns:
+        Quantidade de presenças gravadas
+    """
+    celulas = list(celulas)
+    if not celulas:
+        return 0
+
+    Atividade = get_model_class("Atividade")
+    alunos = Aluno.objects.in_bulk(
+        {cpf for cpf, _, _, _, _ in celulas}, field_name="cpf"
+    )
+    atividades = Atividade.objects.in_bulk(
+        {int(atividade_id) for _, atividade_id, _, _, _ in celulas}
+    )
+
+    dados = []
+    ignoradas = 0
+    for cpf, atividade_id, dia, presente, justificativa in celulas:
+        aluno = alunos.get(cpf)
+        atividade = atividades.get(int(atividade_id))
+        try:
+            data_presenca = date(int(ano), int(mes), int(dia))
+        except (TypeError, ValueError):
+            data_presenca = None
+        if aluno is None or atividade is None or data_presenca is None:
+            ignoradas += 1
+            continue
+        dados.append(
+            {
+                "aluno_id": aluno.id,
+                "turma_id": turma.id,
+                "atividade_id": atividade.id,
+                "data": data_presenca,
+                "presente": presente,
+                "observacao": justificativa,
+            }
+        )
+
+    if ignoradas:
+        logger.warning(
+            f"{ignoradas} presença(s) ignorada(s) na turma {turma.id} "
+            f"({mes}/{ano}): aluno, atividade ou dia inválido"
+        )
+
+    if dados:
+        from presencas.bulk_operations import BulkPresencaOperations
+        from presencas.repositories.presenca_repo import invalidate_period_cache
+
+        BulkPresencaOperations.criar_presencas_lote(dados, registrado_por)
+        invalidate_period_cache(turma.id, int(ano), int(mes))
+
+    return len(dados)
+
+
 @login_required
 def registrar_presenca_dados_basicos(request):
     """Exibe o formulário de dados básicos para registro de presença acadêmica."""
@@ -190,7 +260,9 @@ def registrar_presenca_totais_atividades(request):
             Atividade = get_model_class("Atividade")
             atividades_ids = []
             for key, value in totais_atividades.items():
-                aid = key.replace("qtd_ativ_", "") if key.startswith("qtd_ativ_") else key
+                aid = (
+                    key.replace("qtd_ativ_", "") if key.startswith("qtd_ativ_") else key
+                )
                 try:
                     if int(value) > 0:
                         atividades_ids.append(int(aid))
@@ -203,7 +275,9 @@ def registrar_presenca_totais_atividades(request):
                     qtd = int(totais_atividades.get(key, 0))
                 except (ValueError, TypeError):
                     qtd = 0
-                totais_registrados.append(SimpleNamespace(atividade=a, qtd_ativ_mes=qtd))
+                totais_registrados.append(
+                    SimpleNamespace(atividade=a, qtd_ativ_mes=qtd)
+                )
 
     logger.debug(
         "IDs das atividades passadas para o formulário: %s", [a.id for a in atividades]
@@ -300,17 +374,21 @@ def registrar_presenca_dias_atividades(request):
         turma_id = request.session.get("presenca_turma_id")
         ano = request.session.get("presenca_ano")
         mes = request.session.get("presenca_mes")
-        
+
         # Validação: se algum dado está faltando, redireciona para o primeiro passo
         if not all([turma_id, ano, mes]):
-            messages.warning(request, "Sessão expirada ou incompleta. Por favor, comece novamente.")
+            messages.warning(
+                request, "Sessão expirada ou incompleta. Por favor, comece novamente."
+            )
             return redirect("presencas:registrar_presenca_academica")
-        
+
         turma = Turma.objects.get(id=turma_id) if turma_id else None
-        
+
         # Validação adicional: turma deve existir
         if not turma:
-            messages.error(request, "Turma não encontrada. Por favor, comece novamente.")
+            messages.error(
+                request, "Turma não encontrada. Por favor, comece novamente."
+            )
             return redirect("presencas:registrar_presenca_academica")
 
         totais_atividades = request.session.get("presenca_totais_atividades", {})
@@ -435,7 +513,9 @@ def registrar_presenca_dias_atividades(request):
                         presente = request.POST.get(key) == "1"
                         justificativa = request.POST.get(
                             f"justificativa_{atividade_id}_{dia}_{cpf_aluno}", ""
-                        ) or obs_por_dia_atividade.get((str(atividade_id), str(dia)), "")
+                        ) or obs_por_dia_atividade.get(
+                            (str(atividade_id), str(dia)), ""
+                        )
                         try:
                             aluno = Aluno.objects.get(cpf=cpf_aluno)
                             Atividade = get_model_class("Atividade")
@@ -450,7 +530,9 @@ def registrar_presenca_dias_atividades(request):
                                 atividade=atividade,
                                 defaults={
                                     "status": "P" if presente else "F",
-                                    "justificativa": justificativa if not presente else "",
+                                    "justificativa": (
+                                        justificativa if not presente else ""
+                                    ),
                                     "registrado_por": request.user.username,
                                     "data_registro": timezone.now(),
                                 },
@@ -539,7 +621,9 @@ def registrar_presenca_alunos(request):
             ).first()
             # Aluno usa cpf como primary_key, então use aluno.pk
             key = f"{aluno.pk}_{atividade.id}"
-            convocacoes[key] = regs_no_mes.convocado if regs_no_mes else True  # Default: convocado
+            convocacoes[key] = (
+                regs_no_mes.convocado if regs_no_mes else True
+            )  # Default: convocado
 
     # Prepara resumo das atividades
     resumo_atividades = []
@@ -559,9 +643,9 @@ def registrar_presenca_alunos(request):
             {
                 "nome": atividade.nome,
                 "total_dias": total_dias,
-                "dias_selecionados": sorted(dias_selecionados)
-                if dias_selecionados
-                else [],
+                "dias_selecionados": (
+                    sorted(dias_selecionados) if dias_selecionados else []
+                ),
             }
         )
 
@@ -918,13 +1002,17 @@ def registrar_presenca_confirmar_ajax(request):
         atividades_processadas.append((atividade_index, atividade, dias))
 
     # Processar formulário
+    alunos_turma = None
+    celulas = []
     for atividade_index, atividade, dias in atividades_processadas:
         # Determinar alunos para esta atividade
         if atividade.convocacao and str(atividade.id) in convocados_dict:
             alunos_ids = convocados_dict[str(atividade.id)]
         else:
             # Se não tem convocação, usar todos os alunos da turma
-            alunos_ids = [aluno.cpf for aluno in turma.alunos.all()]
+            if alunos_turma is None:
+                alunos_turma = list(turma.alunos.values_list("cpf", flat=True))
+            alunos_ids = alunos_turma
 
         for aluno_cpf in alunos_ids:
             # Verificar se o aluno está presente nesta atividade
@@ -939,28 +1027,11 @@ def registrar_presenca_confirmar_ajax(request):
                 )
                 justificativa = request.POST.get(campo_justificativa, "").strip()
 
-            # Buscar aluno
-            try:
-                aluno = Aluno.objects.get(cpf=aluno_cpf)
-            except Aluno.DoesNotExist:
-                logger.warning(f"Aluno com CPF {aluno_cpf} não encontrado")
-                continue
-
-            # Criar registros de presença para cada dia
+            # Um registro por dia
             for dia in dias:
-                data = date(int(ano), int(mes), dia)
-                RegistroPresenca.objects.update_or_create(
-                    aluno=aluno,
-                    turma=turma,
-                    atividade=atividade,
-                    data=data,
-                    defaults={
-                        "status": "P" if presente else "F",
-                        "justificativa": justificativa if not presente else "",
-                        "registrado_por": request.user.username,
-                        "data_registro": timezone.now(),
-                    },
-                )
+                celulas.append((aluno_cpf, atividade.id, dia, presente, justificativa))
+
+    _salvar_presencas_periodo(turma, ano, mes, celulas, request.user.username)
 
     # Limpar sessão
     session_keys = [
@@ -1012,25 +1083,15 @@ def obter_limites_calendario_ajax(request):
 @require_POST
 def registrar_presenca_dias_atividades_ajax(request):
     import json
-    from datetime import date
-    from django.utils import timezone
 
-    # ANALISE REVERSA - LOGGING ULTRA DETALHADO
-    logger.info("=" * 60)
-    logger.info("[REVERSE] ANALISE REVERSA - DIAGNOSTICO COMPLETO")
-    logger.info("=" * 60)
-
-    # 1 Dados da sessao
     turma_id = request.session.get("presenca_turma_id")
     ano = request.session.get("presenca_ano")
     mes = request.session.get("presenca_mes")
-    logger.info(f"[SESSION] Sessao - Turma: {turma_id}, Ano: {ano}, Mes: {mes}")
 
     turma = Turma.objects.get(id=turma_id) if turma_id else None
-    logger.info(f"[TURMA] Turma encontrada: {turma.nome if turma else 'NENHUMA'}")
 
     if not turma or not ano or not mes:
-        logger.error("[ERROR] Dados de sessao ausentes")
+        logger.error("Dados de sessão ausentes no registro de presenças")
         return JsonResponse(
             {
                 "success": False,
@@ -1038,119 +1099,56 @@ def registrar_presenca_dias_atividades_ajax(request):
             }
         )
 
-    # 2 Analise completa do POST
-    logger.info("[POST] DADOS RECEBIDOS NO POST:")
-    for key, value in request.POST.items():
-        if key == "presencas_json":
-            logger.info(f"   [TARGET] {key}: {value}")
-            try:
-                parsed = json.loads(value)
-                logger.info(
-                    f"   [TARGET] {key} (parsed): {json.dumps(parsed, indent=2)}"
-                )
-            except json.JSONDecodeError as e:
-                logger.error(f"   [ERROR] {key} - ERRO AO PARSEAR JSON: {e}")
-        else:
-            logger.info(f"   [OTHER] {key}: {value}")
-
     try:
         with transaction.atomic():
             presencas_processadas = 0
-            logger.info("[PROC] Iniciando processamento...")
 
-            # Processa presenças do JSON (dados do modal)
+            # Processa presenças do JSON (dados do modal):
+            # {atividade_id: {dia: {cpf: {"presente": bool, "justificativa": str}}}}
             presencas_json = request.POST.get("presencas_json")
-            logger.info(f"[PROC] presencas_json recebido: {bool(presencas_json)}")
-            logger.info(f"[PROC] presencas_json conteudo: {presencas_json}")
 
             if presencas_json:
                 try:
                     presencas_data = json.loads(presencas_json)
-                    logger.info(
-                        f"[SUCCESS] JSON parsed com sucesso: {json.dumps(presencas_data, indent=2)}"
-                    )
-
-                    for atividade_id, dias_data in presencas_data.items():
-                        logger.info(
-                            f"[PROC] Processando atividade {atividade_id}: {dias_data}"
-                        )
-                        for dia, alunos_data in dias_data.items():
-                            logger.info(f"[PROC] Processando dia {dia}: {alunos_data}")
-                            for cpf_aluno, presenca_info in alunos_data.items():
-                                logger.info(
-                                    f"[PROC] Processando aluno {cpf_aluno}: {presenca_info}"
-                                )
-                                try:
-                                    aluno = Aluno.objects.get(cpf=cpf_aluno)
-                                    Atividade = get_model_class("Atividade")
-                                    atividade = Atividade.objects.get(id=atividade_id)
-                                    data_presenca = date(int(ano), int(mes), int(dia))
-
-                                    logger.info(
-                                        f"[SUCCESS] Criando presenca: Aluno={aluno.nome}, Atividade={atividade.nome}, Data={data_presenca}"
-                                    )
-
-                                    # Registra a presença - modelo unificado
-                                    try:
-                                        presenca_obj, created = (
-                                            RegistroPresenca.objects.update_or_create(
-                                                aluno=aluno,
-                                                turma=turma,
-                                                data=data_presenca,
-                                                atividade=atividade,
-                                                defaults={
-                                                    "status": "P"
-                                                    if presenca_info.get("presente", True)
-                                                    else "F",
-                                                    "justificativa": presenca_info.get("justificativa", "")
-                                                    if not presenca_info.get("presente", True)
-                                                    else "",
-                                                    "registrado_por": request.user.username,
-                                                    "data_registro": timezone.now(),
-                                                },
-                                            )
-                                        )
-                                        presencas_processadas += 1
-                                        logger.info(
-                                            f"[SUCCESS] Presenca {'criada' if created else 'atualizada'}: ID={presenca_obj.id}"
-                                        )
-                                        logger.info(
-                                            f"[SUCCESS] SUCESSO na presenca {presencas_processadas}: {aluno.nome} - {atividade.nome} - {data_presenca}"
-                                        )
-
-                                    except Exception as save_error:
-                                        logger.error(
-                                            f"[ERROR] ERRO ESPECIFICO ao salvar presenca: {save_error}"
-                                        )
-                                        logger.error(
-                                            f"[ERROR] Dados da presenca: aluno={aluno.id}, turma={turma.id}, atividade={atividade.id}, data={data_presenca}"
-                                        )
-                                        import traceback
-
-                                        logger.error(
-                                            f"[ERROR] Traceback: {traceback.format_exc()}"
-                                        )
-                                        continue
-
-                                except Exception as e:
-                                    logger.error(
-                                        f"[ERROR] Erro ao processar presenca {cpf_aluno}: {e}"
-                                    )
-                                    continue
-
                 except json.JSONDecodeError as e:
-                    logger.error(f"[ERROR] Erro ao decodificar JSON de presencas: {e}")
+                    logger.error(f"Erro ao decodificar JSON de presencas: {e}")
                     return JsonResponse(
                         {
                             "success": False,
                             "message": "Erro nos dados de presenças. Tente novamente.",
                         }
                     )
+
+                celulas = []
+                for atividade_id, dias_data in presencas_data.items():
+                    if not str(atividade_id).isdigit():
+                        continue
+                    for dia, alunos_data in dias_data.items():
+                        for cpf_aluno, presenca_info in alunos_data.items():
+                            presente = presenca_info.get("presente", True)
+                            celulas.append(
+                                (
+                                    cpf_aluno,
+                                    atividade_id,
+                                    dia,
+                                    presente,
+                                    (
+                                        ""
+                                        if presente
+                                        else presenca_info.get("justificativa", "")
+                                    ),
+                                )
+                            )
+
+                presencas_processadas = _salvar_presencas_periodo(
+                    turma, ano, mes, celulas, request.user.username
+                )
             else:
-                logger.warning("[WARNING] presencas_json nao encontrado no POST")
+                logger.warning("presencas_json não encontrado no POST")
 
             logger.info(
-                f"[RESULT] RESULTADO FINAL: {presencas_processadas} presencas processadas"
+                f"Registro de presenças da turma {turma.id} ({mes}/{ano}): "
+                f"{presencas_processadas} presenças processadas"
             )
 
             # Processa observações dos dias (funcionalidade original)
@@ -1169,16 +1167,18 @@ def registrar_presenca_dias_atividades_ajax(request):
                                 atividade = Atividade.objects.get(id=atividade_id)
                                 data = date(int(ano), int(mes), int(dia))
 
-                                registro, created = RegistroPresenca.objects.get_or_create(
-                                    aluno=None,
-                                    turma=turma,
-                                    data=data,
-                                    atividade=atividade,
-                                    defaults={
-                                        "status": "P",
-                                        "justificativa": obs,
-                                        "registrado_por": request.user.username,
-                                    },
+                                registro, created = (
+                                    RegistroPresenca.objects.get_or_create(
+                                        aluno=None,
+                                        turma=turma,
+                                        data=data,
+                                        atividade=atividade,
+                                        defaults={
+                                            "status": "P",
+                                            "justificativa": obs,
+                                            "registrado_por": request.user.username,
+                                        },
+                                    )
                                 )
                                 if not created:
                                     registro.justificativa = obs
@@ -1187,7 +1187,6 @@ def registrar_presenca_dias_atividades_ajax(request):
                                 continue
 
             if presencas_processadas > 0:
-                logger.info("[SUCCESS] SUCESSO - Limpando sessao e retornando sucesso")
                 # Limpa dados da sessão após sucesso
                 session_keys = [
                     "presenca_turma_id",
@@ -1207,11 +1206,10 @@ def registrar_presenca_dias_atividades_ajax(request):
                     }
                 )
             else:
-                logger.warning("[ERROR] FALHA - Nenhuma presenca processada")
                 logger.warning(
-                    f"[ERROR] presencas_json estava presente? {bool(presencas_json)}"
+                    f"Nenhuma presença processada (presencas_json presente: "
+                    f"{bool(presencas_json)})"
                 )
-                logger.warning(f"[ERROR] Conteudo do POST: {dict(request.POST)}")
                 return JsonResponse(
                     {
                         "success": False,
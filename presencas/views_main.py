@@ -14,6 +14,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.utils import timezone
 from django.db.models import F
 
+from core import cache_versionado
 from presencas.models import RegistroPresenca
 from alunos.services import (
     listar_alunos as listar_alunos_service,
@@ -43,7 +44,16 @@ def listar_presencas_academicas(request):
     data_fim = request.GET.get("data_fim", "")
 
     # FASE 3B: Cache para queries de filtros complexos
-    cache_key = f"presencas_filtros_{aluno_id}_{turma_id}_{atividade_id}_{data_inicio}_{data_fim}"
+    namespaces = ["presencas"] + ([("turma", turma_id)] if turma_id else [])
+    cache_key = cache_versionado.chave(
+        namespaces,
+        "presencas_filtros",
+        aluno_id,
+        turma_id,
+        atividade_id,
+        data_inicio,
+        data_fim,
+    )
     cached_result = cache.get(cache_key)
 
     if cached_result:
@@ -96,9 +106,10 @@ def listar_presencas_academicas(request):
         alunos = []
 
     # Carregamento otimizado de listas de referência com cache
-    turmas_cache_key = "turmas_listagem"
-    atividades_cache_key = "atividades_listagem"
-    cursos_cache_key = "cursos_listagem"
+    geracao_turma = cache_versionado.geracao("turma")
+    turmas_cache_key = f"turmas_listagem:g{geracao_turma}"
+    atividades_cache_key = f"atividades_listagem:g{geracao_turma}"
+    cursos_cache_key = f"cursos_listagem:g{geracao_turma}"
 
     cursos = cache.get(cursos_cache_key)
     if not cursos:
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:49
+
+import django.db.models.deletion
+import omaum.relatorios_presenca.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('relatorios_presenca', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfiguracaoRelatorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(help_text='Nome identificador da configuração', max_length=200, verbose_name='Nome da Configuração')),
+                ('tipo_relatorio', models.CharField(choices=[('consolidado', 'Consolidado por Período (grau)'), ('mensal', 'Apuração Mensal (mes01-99)'), ('coleta', 'Formulário de Coleta (mod)'), ('controle_geral', 'Controle Geral da Turma (pcg)')], max_length=20, verbose_name='Tipo de Relatório')),
+                ('formato_saida', models.CharField(choices=[('excel', 'Excel (.xlsx)'), ('pdf', 'PDF (.pdf)'), ('csv', 'CSV (.csv)')], default='excel', max_length=10, verbose_name='Formato de Saída')),
+                ('template_excel', models.FileField(blank=True, help_text='Arquivo Excel modelo para manter formatação visual', null=True, upload_to='templates_relatorio/', verbose_name='Template Excel')),
+                ('parametros_padrao', models.JSONField(blank=True, default=dict, help_text='Configurações padrão em formato JSON', verbose_name='Parâmetros Padrão')),
+                ('ativo', models.BooleanField(default=True, verbose_name='Configuração Ativa')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Criado por')),
+            ],
+            options={
+                'verbose_name': 'Configuração de Relatório',
+                'verbose_name_plural': 'Configurações de Relatórios',
+                'ordering': ['tipo_relatorio', 'nome'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AgendamentoRelatorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=200, verbose_name='Nome do Agendamento')),
+                ('frequencia', models.CharField(choices=[('diario', 'Diário'), ('semanal', 'Semanal'), ('quinzenal', 'Quinzenal'), ('mensal', 'Mensal'), ('trimestral', 'Trimestral')], max_length=15, verbose_name='Frequência')),
+                ('hora_execucao', models.TimeField(default='08:00', verbose_name='Hora de Execução')),
+                ('emails_destino', models.TextField(help_text='E-mails separados por vírgula', verbose_name='E-mails de Destino')),
+                ('parametros_fixos', models.JSONField(blank=True, default=dict, help_text='Parâmetros que não mudam entre execuções', verbose_name='Parâmetros Fixos')),
+                ('ativo', models.BooleanField(default=True, verbose_name='Agendamento Ativo')),
+                ('proxima_execucao', models.DateTimeField(blank=True, null=True, verbose_name='Próxima Execução')),
+                ('ultima_execucao', models.DateTimeField(blank=True, null=True, verbose_name='Última Execução')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuário Responsável')),
+                ('configuracao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='relatorios_presenca.configuracaorelatorio', verbose_name='Configuração do Relatório')),
+            ],
+            options={
+                'verbose_name': 'Agendamento de Relatório',
+                'verbose_name_plural': 'Agendamentos de Relatórios',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TemplatePersonalizado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=200, verbose_name='Nome do Template')),
+                ('tipo_relatorio', models.CharField(choices=[('consolidado', 'Consolidado por Período (grau)'), ('mensal', 'Apuração Mensal (mes01-99)'), ('coleta', 'Formulário de Coleta (mod)'), ('controle_geral', 'Controle Geral da Turma (pcg)')], max_length=20, verbose_name='Tipo de Relatório')),
+                ('arquivo_template', models.FileField(upload_to='templates_personalizados/', verbose_name='Arquivo do Template')),
+                ('descricao', models.TextField(blank=True, null=True, verbose_name='Descrição')),
+                ('ativo', models.BooleanField(default=True, verbose_name='Template Ativo')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Criado por')),
+            ],
+            options={
+                'verbose_name': 'Template Personalizado',
+                'verbose_name_plural': 'Templates Personalizados',
+                'ordering': ['tipo_relatorio', 'nome'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistoricoRelatorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_relatorio', models.CharField(max_length=20, verbose_name='Tipo de Relatório')),
+                ('parametros', models.JSONField(default=dict, help_text='Parâmetros específicos usados na geração', verbose_name='Parâmetros Utilizados')),
+                ('arquivo_gerado', models.FileField(blank=True, null=True, storage=omaum.relatorios_presenca.models.ArmazenamentoRelatoriosGerados(), upload_to='%Y/%m/', verbose_name='Arquivo Gerado')),
+                ('nome_arquivo', models.CharField(blank=True, max_length=255, verbose_name='Nome do Arquivo')),
+                ('tamanho_arquivo', models.PositiveIntegerField(blank=True, null=True, verbose_name='Tamanho do Arquivo (bytes)')),
+                ('checksum', models.CharField(blank=True, max_length=64, verbose_name='Checksum (SHA-256)')),
+                ('chave_parametros', models.CharField(blank=True, help_text='Hash do template, formato e filtros (reaproveitamento)', max_length=64, verbose_name='Chave dos Parâmetros')),
+                ('status', models.CharField(choices=[('processando', 'Processando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='processando', max_length=15, verbose_name='Status')),
+                ('mensagem_erro', models.TextField(blank=True, null=True, verbose_name='Mensagem de Erro')),
+                ('tempo_processamento', models.DurationField(blank=True, null=True, verbose_name='Tempo de Processamento')),
+                ('data_geracao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Geração')),
+                ('configuracao', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='relatorios_presenca.configuracaorelatorio', verbose_name='Configuração Utilizada')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relatorios_gerados', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Histórico de Relatório',
+                'verbose_name_plural': 'Históricos de Relatórios',
+                'ordering': ['-data_geracao'],
+                'indexes': [models.Index(fields=['usuario', 'data_geracao'], name='relatorios__usuario_ef06c4_idx'), models.Index(fields=['tipo_relatorio'], name='relatorios__tipo_re_44e4c1_idx'), models.Index(fields=['status'], name='relatorios__status_5ebded_idx'), models.Index(fields=['chave_parametros', 'data_geracao'], name='historico_chave_data_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relatorios_presenca', '0002_relatorios_historico_agendamento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agendamentorelatorio',
+            index=models.Index(fields=['ativo', 'proxima_execucao'], name='agendamento_ativo_prox_idx'),
+        ),
+    ]
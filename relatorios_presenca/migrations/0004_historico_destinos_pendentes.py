@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relatorios_presenca', '0003_agendamento_ativo_proxima_execucao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicorelatorio',
+            name='destinos_pendentes',
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text='Pares [usuario_id, emails] que recebem o link ao concluir',
+                verbose_name='Destinos Pendentes',
+            ),
+        ),
+    ]
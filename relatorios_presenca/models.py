@@ -1 +1,20 @@
-# Create your models here.
+"""
+Modelos de relatórios de presença.
+
+As definições ficam em ``omaum.relatorios_presenca.models``; são importadas
+aqui para que este app (o instalado) registre as tabelas e migrações.
+"""
+
+from omaum.relatorios_presenca.models import (
+    AgendamentoRelatorio,
+    ConfiguracaoRelatorio,
+    HistoricoRelatorio,
+    TemplatePersonalizado,
+)
+
+__all__ = [
+    "AgendamentoRelatorio",
+    "ConfiguracaoRelatorio",
+    "HistoricoRelatorio",
+    "TemplatePersonalizado",
+]
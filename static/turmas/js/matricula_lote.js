@@ -14,6 +14,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const badgeContador = document.getElementById('badge-contador-selecionados');
     const tbodyAlunos = document.getElementById('tbody-alunos-elegiveis');
     const loadingAlunos = document.getElementById('loading-alunos');
+    const btnCarregarMais = document.getElementById('btn-carregar-mais-alunos');
     const turmaIdElement = document.getElementById('turma-id');
     
     // Verificar se os elementos essenciais existem
@@ -46,11 +47,26 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     /**
-     * Busca alunos elegíveis com filtros via AJAX
+     * Atualiza o botão "Carregar mais" com o cursor da próxima página
      */
-    function buscarAlunosElegiveis() {
+    function atualizarCarregarMais(proximo) {
+        if (!btnCarregarMais) {
+            return;
+        }
+        btnCarregarMais.dataset.cursor = proximo || '';
+        btnCarregarMais.style.display = proximo ? '' : 'none';
+    }
+
+    /**
+     * Busca alunos elegíveis com filtros via AJAX.
+     * Sem cursor substitui a tabela; com cursor acrescenta a próxima página.
+     */
+    function buscarAlunosElegiveis(cursor = '') {
         const formData = new FormData(formFiltros);
         const params = new URLSearchParams(formData);
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
         
         // Mostrar loading
         loadingAlunos.style.display = 'flex';
@@ -70,7 +86,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 tbodyAlunos.style.opacity = '1';
                 
                 if (data.success) {
-                    renderizarTabela(data.alunos);
+                    renderizarTabela(data.alunos, data.situacoes, Boolean(cursor));
+                    atualizarCarregarMais(data.proximo);
                 } else {
                     console.error('API retornou erro:', data.error);
                     mostrarErro('Erro ao carregar alunos: ' + data.error);
@@ -92,10 +109,10 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     /**
-     * Renderiza a tabela de alunos
+     * Renderiza a tabela de alunos (ou acrescenta linhas, ao carregar mais)
      */
-    function renderizarTabela(alunos) {
-        if (alunos.length === 0) {
+    function renderizarTabela(alunos, situacoes, acrescentar = false) {
+        if (alunos.length === 0 && !acrescentar) {
             tbodyAlunos.innerHTML = `
                 <tr>
                     <td colspan="6" class="text-center text-muted">
@@ -106,7 +123,7 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
 
-        tbodyAlunos.innerHTML = alunos.map(aluno => {
+        const linhas = alunos.map(aluno => {
             const isChecked = alunosSelecionados.has(aluno.id);
             return `
                 <tr>
@@ -119,13 +136,19 @@ document.addEventListener('DOMContentLoaded', function() {
                     </td>
                     <td>${aluno.nome}</td>
                     <td>${aluno.cpf}</td>
-                    <td>${aluno.numero_iniciatico}</td>
-                    <td>${aluno.situacao}</td>
-                    <td>${aluno.grau}</td>
+                    <td>${aluno.numero_iniciatico || 'N/A'}</td>
+                    <td>${situacoes[aluno.situacao] || aluno.situacao}</td>
+                    <td>${aluno.grau_atual || 'N/A'}</td>
                 </tr>
             `;
         }).join('');
 
+        if (acrescentar) {
+            tbodyAlunos.insertAdjacentHTML('beforeend', linhas);
+        } else {
+            tbodyAlunos.innerHTML = linhas;
+        }
+
         // Reattach event listeners
         attachCheckboxListeners();
     }
@@ -343,6 +366,14 @@ document.addEventListener('DOMContentLoaded', function() {
         btnMatricularSelecionados.addEventListener('click', matricularSelecionados);
     }
 
+    if (btnCarregarMais) {
+        btnCarregarMais.addEventListener('click', function() {
+            if (this.dataset.cursor) {
+                buscarAlunosElegiveis(this.dataset.cursor);
+            }
+        });
+    }
+
     // Inicializar listeners dos checkboxes existentes (tabela já renderizada pelo Django)
     attachCheckboxListeners();
     
@@ -146,6 +146,7 @@ LOGGING = {
 
 # Configurações de media para testes
 MEDIA_ROOT = "/tmp/omaum_test_media"
+RELATORIOS_GERADOS_ROOT = "/tmp/omaum_test_relatorios"
 
 
 # Configuração de arquivos estáticos para testes
@@ -471,6 +471,49 @@ class PresencaCompletoFactory(PresencaFactory):
         self.turma.alunos.add(self.aluno)
 
 
+def criar_base_presencas(total_alunos, total_atividades=2):
+    """
+    Cria uma turma, ``total_alunos`` alunos e ``total_atividades`` atividades.
+
+    Base comum dos testes de presenças (consolidado, carências, operações em
+    lote); não depende do factory_boy.
+
+    Returns:
+        (turma, alunos, atividades)
+    """
+    from datetime import date
+
+    from alunos.models import Aluno
+    from atividades.models import Atividade
+    from cursos.models import Curso
+    from turmas.models import Turma
+
+    curso = Curso.objects.create(nome="Curso Consolidado", ativo=True)
+    turma = Turma.objects.create(nome="Turma Consolidado", curso=curso)
+    alunos = Aluno.objects.bulk_create(
+        [
+            Aluno(
+                nome=f"Aluno {i:03d}",
+                data_nascimento=date(2000, 1, 1),
+                numero_iniciatico=f"C{i:04d}",
+                email=f"consolidado{i}@teste.com",
+                cpf=f"{90000000000 + i:011d}",
+            )
+            for i in range(total_alunos)
+        ]
+    )
+    atividades = [
+        Atividade.objects.create(
+            nome=f"Atividade {i}",
+            tipo_atividade="AULA",
+            data_inicio=date(2024, 1, 1),
+            hora_inicio="08:00",
+        )
+        for i in range(total_atividades)
+    ]
+    return turma, alunos, atividades
+
+
 # Factories para dados de teste específicos
 class DadosTesteCompletos:
     """Classe para criar conjuntos completos de dados de teste."""
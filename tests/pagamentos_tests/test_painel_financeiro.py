@@ -0,0 +1,94 @@
+"""Testes das agregações financeiras dos painéis de pagamentos."""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from alunos.models import Aluno
+from pagamentos.models import Pagamento
+from pagamentos.services import PainelFinanceiroService
+
+CACHE_LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class PainelFinanceiroServiceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hoje = date.today()
+        aluno = Aluno.objects.create(
+            nome="Aluno Financeiro",
+            cpf="12345678903",
+            email="financeiro@teste.com",
+            data_nascimento=date(1990, 1, 1),
+        )
+        mes_atual = self.hoje.replace(day=1)
+        Pagamento.objects.bulk_create(
+            [
+                Pagamento(
+                    aluno=aluno,
+                    valor=Decimal("100.00"),
+                    valor_pago=Decimal("90.00"),
+                    data_vencimento=mes_atual,
+                    data_pagamento=mes_atual,
+                    status="PAGO",
+                    metodo_pagamento="PIX",
+                ),
+                Pagamento(
+                    aluno=aluno,
+                    valor=Decimal("50.00"),
+                    data_vencimento=mes_atual,
+                    data_pagamento=mes_atual,
+                    status="PAGO",
+                ),
+                Pagamento(
+                    aluno=aluno,
+                    valor=Decimal("70.00"),
+                    data_vencimento=self.hoje + timedelta(days=40),
+                    status="PENDENTE",
+                ),
+                Pagamento(
+                    aluno=aluno,
+                    valor=Decimal("30.00"),
+                    data_vencimento=self.hoje - timedelta(days=20),
+                    status="ATRASADO",
+                ),
+                Pagamento(
+                    aluno=aluno,
+                    valor=Decimal("10.00"),
+                    data_vencimento=self.hoje - timedelta(days=400),
+                    status="CANCELADO",
+                ),
+            ]
+        )
+
+    def test_agregacoes_em_numero_fixo_de_consultas(self):
+        with self.assertNumQueries(4):
+            dados = PainelFinanceiroService.obter()
+
+        self.assertEqual(
+            dados["contagens"],
+            {"total": 5, "pagos": 2, "pendentes": 1, "atrasados": 1, "cancelados": 1},
+        )
+        self.assertEqual(dados["valores"]["pago"], Decimal("140.00"))
+        self.assertEqual(dados["valores"]["pendente"], Decimal("70.00"))
+        self.assertEqual(dados["faixas_atraso"]["15_30"], 1)
+        self.assertEqual(len(dados["por_mes"]), 6)
+        self.assertEqual(dados["por_mes"][-1]["valor_pago"], Decimal("140.00"))
+        self.assertEqual(dados["pagos_por_dia"][0]["valor"], Decimal("140.00"))
+        self.assertEqual(dados["metodos"][0]["total"], 1)
+
+        with self.assertNumQueries(0):
+            PainelFinanceiroService.obter()
+
+    def test_alteracao_invalida_cache_do_dia(self):
+        PainelFinanceiroService.obter()
+        pagamento = Pagamento.objects.get(status="PENDENTE")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pagamento.status = "CANCELADO"
+            pagamento.save()
+
+        self.assertEqual(PainelFinanceiroService.obter()["contagens"]["cancelados"], 2)
@@ -0,0 +1,99 @@
+"""Testes do resumo em cache de pagamentos atrasados."""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from alunos.models import Aluno
+from omaum.context_processors import pagamentos_context
+from pagamentos.models import Pagamento
+
+CACHE_LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ResumoAtrasadosTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="financeiro", password="x")
+        self.aluno = Aluno.objects.create(
+            nome="Aluno Devedor",
+            cpf="12345678901",
+            email="devedor@teste.com",
+            data_nascimento=date(1990, 1, 1),
+        )
+        hoje = date.today()
+        for dias in range(1, 9):
+            self._criar_pagamento(hoje - timedelta(days=dias * 10))
+        self.request = RequestFactory().get("/")
+        self.request.user = self.user
+
+    def _criar_pagamento(self, vencimento):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Pagamento.objects.create(
+                aluno=self.aluno,
+                valor=Decimal("100.00"),
+                data_vencimento=vencimento,
+                status="ATRASADO",
+            )
+
+    def test_contexto_nao_consulta_banco_se_nao_usado(self):
+        with self.assertNumQueries(0):
+            pagamentos_context(self.request)
+
+    def test_resumo_em_cache_com_itens_mais_atrasados(self):
+        contexto = pagamentos_context(self.request)
+        self.assertEqual(contexto["pagamentos_atrasados_count"](), 8)
+        itens = contexto["pagamentos_atrasados"]()
+        self.assertEqual(len(itens), 5)
+        self.assertEqual(itens[0]["dias_atraso"], 80)
+        self.assertEqual(itens[0]["aluno"]["nome"], "Aluno Devedor")
+
+        with self.assertNumQueries(0):
+            pagamentos_context(self.request)["pagamentos_atrasados_count"]()
+
+    def test_alteracao_invalida_resumo(self):
+        pagamentos_context(self.request)["pagamentos_atrasados_count"]()
+
+        self._criar_pagamento(date.today() - timedelta(days=1))
+
+        contexto = pagamentos_context(self.request)
+        self.assertEqual(contexto["pagamentos_atrasados_count"](), 9)
+
+    def test_usuario_anonimo(self):
+        self.request.user = AnonymousUser()
+        contexto = pagamentos_context(self.request)
+        self.assertEqual(contexto["pagamentos_atrasados_count"], 0)
+
+    def test_lista_completa_via_ajax(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("pagamentos:pagamentos_atrasados_ajax"), {"por_pagina": 3}
+        )
+
+        dados = response.json()
+        self.assertEqual(dados["total"], 8)
+        self.assertEqual(dados["paginas"], 3)
+        self.assertEqual(len(dados["itens"]), 3)
+        self.assertEqual(dados["itens"][0]["aluno_nome"], "Aluno Devedor")
+        self.assertEqual(dados["itens"][0]["observacoes"], "")
+        self.assertEqual(
+            dados["itens"][0]["url"],
+            reverse("pagamentos:detalhar_pagamento", args=[dados["itens"][0]["id"]]),
+        )
+
+    def test_por_pagina_limitado_entre_1_e_200(self):
+        self.client.force_login(self.user)
+        url = reverse("pagamentos:pagamentos_atrasados_ajax")
+
+        for valor in ("0", "-5"):
+            dados = self.client.get(url, {"por_pagina": valor}).json()
+            self.assertEqual(len(dados["itens"]), 1)
+            self.assertEqual(dados["paginas"], 8)
+
+        dados = self.client.get(url, {"por_pagina": "1000"}).json()
+        self.assertEqual(len(dados["itens"]), 8)
@@ -0,0 +1,61 @@
+"""Testes da transição em lote PENDENTE -> ATRASADO."""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from alunos.models import Aluno
+from pagamentos.models import Pagamento
+from pagamentos.services import StatusPagamentoService
+
+
+class MarcarAtrasadosTest(TestCase):
+    def setUp(self):
+        self.aluno = Aluno.objects.create(
+            nome="Aluno Pendente",
+            cpf="12345678902",
+            email="pendente@teste.com",
+            data_nascimento=date(1990, 1, 1),
+        )
+        hoje = date.today()
+        # bulk_create não passa por Pagamento.save(): simula linhas antigas
+        Pagamento.objects.bulk_create(
+            [
+                Pagamento(
+                    aluno=self.aluno,
+                    valor=Decimal("50.00"),
+                    data_vencimento=hoje + timedelta(days=dias),
+                    status=status,
+                )
+                for dias, status in [
+                    (-30, "PENDENTE"),
+                    (-1, "PENDENTE"),
+                    (0, "PENDENTE"),
+                    (10, "PENDENTE"),
+                    (-5, "PAGO"),
+                    (-5, "CANCELADO"),
+                ]
+            ]
+        )
+
+    def test_atualiza_em_um_unico_update(self):
+        # UPDATE + aquecimento: resumo de atrasados (2) e painel financeiro (4)
+        with self.assertNumQueries(7):
+            resultado = StatusPagamentoService.marcar_atrasados()
+
+        self.assertEqual(resultado["atualizados"], 2)
+        self.assertEqual(Pagamento.objects.filter(status="ATRASADO").count(), 2)
+        self.assertEqual(Pagamento.objects.filter(status="PENDENTE").count(), 2)
+
+    def test_comando(self):
+        saida = StringIO()
+        call_command(
+            "marcar_pagamentos_atrasados",
+            data=(date.today() + timedelta(days=1)).isoformat(),
+            stdout=saida,
+        )
+
+        self.assertIn("3 pagamento(s)", saida.getvalue())
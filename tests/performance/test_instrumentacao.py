@@ -0,0 +1,116 @@
+"""Testes da instrumentação por requisição (execute wrapper + cache)."""
+
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from cursos.models import Curso
+from omaum.middleware.performance import (
+    ColetorRequisicao,
+    PerformanceMonitoringMiddleware,
+    normalizar_sql,
+)
+from turmas.models import Turma
+
+CACHE_LOCAL = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "instrumentacao",
+    }
+}
+
+MIDDLEWARE_MONITORADO = [
+    "django.middleware.security.SecurityMiddleware",
+    "omaum.middleware.performance.PerformanceMonitoringMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+]
+
+
+class NormalizarSqlTest(TestCase):
+    def test_literais_e_listas_viram_marcadores(self):
+        self.assertEqual(
+            normalizar_sql(
+                "SELECT *  FROM t1 WHERE nome = 'Ana' AND id IN (1, 2, 3) LIMIT 21"
+            ),
+            "SELECT * FROM t1 WHERE nome = ? AND id IN (...) LIMIT ?",
+        )
+        self.assertEqual(
+            normalizar_sql("SELECT * FROM t WHERE id IN (%s, %s)"),
+            "SELECT * FROM t WHERE id IN (...)",
+        )
+
+
+class ColetorRequisicaoTest(TestCase):
+    def test_conta_queries_sem_debug(self):
+        coletor = ColetorRequisicao(max_lentas=1)
+        with coletor.ativar():
+            User.objects.count()
+            list(User.objects.filter(username="x"))
+
+        self.assertEqual(coletor.queries, 2)
+        self.assertGreater(coletor.tempo_db, 0)
+        self.assertEqual(len(coletor.mais_lentas()), 1)
+        self.assertIn("auth_user", coletor.mais_repetida()[0])
+
+    @override_settings(CACHES=CACHE_LOCAL)
+    def test_conta_hits_e_misses_do_cache(self):
+        cache.set("presente", 0)
+        coletor = ColetorRequisicao()
+        with coletor.ativar():
+            self.assertEqual(cache.get("presente"), 0)
+            self.assertIsNone(cache.get("ausente"))
+            cache.get_many(["presente", "ausente", "outra"])
+
+        self.assertEqual((coletor.cache_hits, coletor.cache_misses), (2, 3))
+        # Fora da requisição monitorada nada é contabilizado
+        cache.get("presente")
+        self.assertEqual(coletor.cache_hits, 2)
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE_MONITORADO)
+class PerformanceMonitoringMiddlewareTest(TestCase):
+    def setUp(self):
+        curso = Curso.objects.create(nome="Curso", ativo=True)
+        turma = Turma.objects.create(nome="Turma", curso=curso, status="A")
+        self.url = reverse("turmas:api_alunos_elegiveis", args=[turma.id])
+
+    def test_cabecalhos_apenas_para_staff(self):
+        usuario = User.objects.create_user(username="comum", password="senha")
+        self.client.force_login(usuario)
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotIn("X-DB-Queries", resposta)
+
+        usuario.is_staff = True
+        usuario.save()
+        resposta = self.client.get(self.url)
+        self.assertGreater(int(resposta["X-DB-Queries"]), 0)
+        self.assertIn("X-DB-Time", resposta)
+        self.assertIn("db;dur=", resposta["Server-Timing"])
+
+    def test_streaming_conta_queries_do_corpo(self):
+        def linhas():
+            for _ in range(3):
+                yield f"{User.objects.count()}\n"
+
+        middleware = PerformanceMonitoringMiddleware(
+            lambda request: StreamingHttpResponse(linhas())
+        )
+        with mock.patch(
+            "omaum.middleware.performance.MetricasPerformance.registrar"
+        ) as registrar:
+            resposta = middleware(RequestFactory().get("/exportar/"))
+            registrar.assert_not_called()
+            self.assertEqual(b"".join(resposta.streaming_content), b"0\n0\n0\n")
+            resposta.close()
+
+        registrar.assert_called_once()
+        self.assertEqual(registrar.call_args.args[2], 3)
@@ -0,0 +1,98 @@
+"""Testes do armazém de métricas por view."""
+
+import threading
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from omaum.metricas import MetricasPerformance, _armazem_local, percentil
+
+
+class MetricasPerformanceTest(TestCase):
+    def setUp(self):
+        _armazem_local.limpar()
+        self.addCleanup(_armazem_local.limpar)
+
+    def test_percentis_e_erros(self):
+        for _ in range(90):
+            MetricasPerformance.registrar("app.rapida", 0.008, 2, 200)
+        for _ in range(10):
+            MetricasPerformance.registrar("app.rapida", 0.4, 30, 500)
+        MetricasPerformance.registrar("app.lenta", 3.0, 1, 404)
+
+        lenta, rapida = MetricasPerformance.mais_lentas(ordenar_por="p99_ms")
+
+        self.assertEqual(lenta["view"], "app.lenta")
+        self.assertEqual(lenta["erros_4xx"], 1)
+        self.assertEqual(lenta["p50_ms"], 5000)
+        self.assertEqual(rapida["requisicoes"], 100)
+        self.assertEqual((rapida["p50_ms"], rapida["p95_ms"]), (10, 500))
+        self.assertEqual(rapida["erros_5xx"], 10)
+        self.assertEqual(rapida["queries_media"], 4.8)
+        self.assertEqual(
+            MetricasPerformance.totais(),
+            {"total_requests": 101, "slow_requests": 1, "errors": 10},
+        )
+
+    def test_reiniciar_descarta_metricas(self):
+        MetricasPerformance.registrar("app.view", 0.02, 3, 200)
+
+        call_command("views_lentas", "--reiniciar", stdout=StringIO())
+
+        self.assertEqual(MetricasPerformance.resumo(), [])
+        MetricasPerformance.registrar("app.view", 0.02, 3, 200)
+        self.assertEqual(MetricasPerformance.resumo()[0]["requisicoes"], 1)
+
+    def test_percentil_sem_amostras(self):
+        self.assertEqual(percentil([0] * 11, 0.95), 0)
+
+    def test_incrementos_concorrentes_nao_se_perdem(self):
+        def registrar():
+            for _ in range(200):
+                MetricasPerformance.registrar("app.view", 0.01, 1, 200)
+
+        threads = [threading.Thread(target=registrar) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(MetricasPerformance.resumo()[0]["requisicoes"], 1600)
+
+    def test_endpoint_restrito_a_staff(self):
+        MetricasPerformance.registrar("app.view", 0.02, 3, 200)
+        usuario = User.objects.create_user(username="u", password="s")
+        self.client.force_login(usuario)
+        url = reverse("metricas_performance")
+
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        usuario.is_staff = True
+        usuario.save()
+        dados = self.client.get(url, {"minutos": 30, "ordenar": "p50_ms"}).json()
+        self.assertEqual(dados["views"][0]["view"], "app.view")
+        self.assertEqual(dados["totais"]["total_requests"], 1)
+        self.assertEqual(self.client.get(url, {"ordenar": "nome"}).status_code, 400)
+
+    def test_janela_limitada_a_retencao(self):
+        usuario = User.objects.create_user(username="s", password="s", is_staff=True)
+        self.client.force_login(usuario)
+
+        with override_settings(METRICAS_RETENCAO_HORAS=2):
+            dados = self.client.get(
+                reverse("metricas_performance"), {"minutos": 100000000}
+            ).json()
+
+        self.assertEqual(dados["minutos"], 120)
+
+    def test_comando_lista_views(self):
+        MetricasPerformance.registrar("app.view_lenta", 1.2, 3, 200)
+        saida = StringIO()
+
+        call_command("views_lentas", "--minutos", "15", stdout=saida)
+
+        self.assertIn("app.view_lenta", saida.getvalue())
+        self.assertIn("2500", saida.getvalue())
@@ -4,8 +4,10 @@ from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
+from core.models import CamposRastreadosMixin
 
-class Turma(models.Model):
+
+class Turma(CamposRastreadosMixin):
     """
     Modelo para representar uma turma no sistema OMAUM.
     """
@@ -139,6 +141,9 @@ class Turma(models.Model):
         except Exception:
             return f"{self.nome} - [Curso não encontrado]"
 
+    # Campos cujo valor lido do banco é guardado para detectar alterações
+    CAMPOS_RASTREADOS = ("perc_presenca_minima", "curso_id")
+
     class Meta:
         verbose_name = "Turma"
         verbose_name_plural = "Turmas"
@@ -297,8 +297,11 @@ def criar_turma(request):
 @login_required
 def detalhar_turma(request, turma_id):
     """Exibe os detalhes de uma turma."""
-    from matriculas.services import obter_alunos_sem_matricula_ativa
-    
+    from matriculas.services import (
+        codificar_cursor_alunos,
+        obter_alunos_sem_matricula_ativa,
+    )
+
     Turma = get_turma_model()
     turma = get_object_or_404(Turma, id=turma_id)
     
@@ -322,8 +325,16 @@ def detalhar_turma(request, turma_id):
         turma.matriculas.filter(status="A") if hasattr(turma, "matriculas") else []
     )
     
-    # Obter alunos elegíveis para matrícula em lote
+    # Obter alunos elegíveis para matrícula em lote (primeira página; as
+    # seguintes vêm de api_alunos_elegiveis a partir do cursor)
     alunos_elegiveis = obter_alunos_sem_matricula_ativa()
+    total_alunos_elegiveis = alunos_elegiveis.count()
+    primeira_pagina = list(alunos_elegiveis[:20])
+    cursor_alunos_elegiveis = (
+        codificar_cursor_alunos(primeira_pagina[-1].nome, primeira_pagina[-1].id)
+        if total_alunos_elegiveis > len(primeira_pagina)
+        else ""
+    )
     
     # Obter graus para filtro
     try:
@@ -338,8 +349,9 @@ def detalhar_turma(request, turma_id):
         "alunos_matriculados_count": alunos_matriculados_count,
         "vagas_disponiveis": vagas_disponiveis,
         "tem_pendencia_instrutoria": tem_pendencia_instrutoria,
-        "alunos_elegiveis": alunos_elegiveis[:20],  # Primeiros 20 para exibição inicial
-        "total_alunos_elegiveis": alunos_elegiveis.count(),
+        "alunos_elegiveis": primeira_pagina,
+        "total_alunos_elegiveis": total_alunos_elegiveis,
+        "cursor_alunos_elegiveis": cursor_alunos_elegiveis,
         "graus": graus,
     }
     return render(request, "turmas/detalhar_turma.html", context)
@@ -1238,10 +1250,19 @@ def turmas_por_curso(request):
 def api_alunos_elegiveis(request, turma_id):
     """
     API para retornar alunos elegíveis para matrícula em lote.
-    Retorna apenas alunos sem matrícula ativa e aplica filtros.
+
+    Retorna apenas alunos sem matrícula ativa, com filtros e paginação por
+    cursor: ``?cursor=`` recebe o valor de ``proximo`` da página anterior e
+    ``?limite=`` define o tamanho da página (máximo 200).
     """
-    from matriculas.services import obter_alunos_sem_matricula_ativa
-    
+    from matriculas.services import (
+        LIMITE_PAGINA_ELEGIVEIS,
+        obter_alunos_sem_matricula_ativa,
+        paginar_alunos_elegiveis,
+    )
+
+    Aluno = get_aluno_model()
+
     # Obter filtros da query string
     filtros = {
         'nome': request.GET.get('nome', ''),
@@ -1250,29 +1271,25 @@ def api_alunos_elegiveis(request, turma_id):
         'situacao': request.GET.get('situacao', ''),
         'grau': request.GET.get('grau', ''),
     }
-    
+
     # Remover filtros vazios
     filtros = {k: v for k, v in filtros.items() if v}
-    
+
     try:
-        alunos = obter_alunos_sem_matricula_ativa(filtros)
-        
-        # Serializar dados
-        alunos_data = [{
-            'id': aluno.id,
-            'nome': aluno.nome,
-            'cpf': aluno.cpf,
-            'numero_iniciatico': aluno.numero_iniciatico or 'N/A',
-            'situacao': aluno.get_situacao_display(),
-            'grau': aluno.grau_atual.nome if aluno.grau_atual else 'N/A',
-        } for aluno in alunos]
-        
-        return JsonResponse({
-            'success': True,
-            'alunos': alunos_data,
-            'total': len(alunos_data)
-        })
-        
+        limite = min(
+            max(int(request.GET.get('limite', LIMITE_PAGINA_ELEGIVEIS)), 1), 200
+        )
+    except ValueError:
+        limite = LIMITE_PAGINA_ELEGIVEIS
+
+    try:
+        alunos, proximo = paginar_alunos_elegiveis(
+            obter_alunos_sem_matricula_ativa(filtros),
+            cursor=request.GET.get('cursor') or None,
+            limite=limite,
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
         logger.error(f"Erro ao buscar alunos elegíveis: {str(e)}")
         return JsonResponse({
@@ -1280,13 +1297,24 @@ def api_alunos_elegiveis(request, turma_id):
             'error': str(e)
         }, status=500)
 
+    # Formato compacto: apenas os campos exibidos, situação como código e
+    # os rótulos enviados uma única vez
+    return JsonResponse(
+        {
+            'success': True,
+            'alunos': alunos,
+            'situacoes': dict(Aluno.SITUACAO_CHOICES),
+            'proximo': proximo,
+        }
+    )
+
 
 @login_required
 def matricular_alunos_em_lote(request, turma_id):
     """
     View para matricular múltiplos alunos em uma turma de uma vez.
     """
-    from matriculas.services import criar_matriculas_em_lote
+    from matriculas.services import LIMITE_MATRICULAS_LOTE, criar_matriculas_em_lote
     import json
     
     if request.method != 'POST':
@@ -1314,11 +1342,13 @@ def matricular_alunos_em_lote(request, turma_id):
         alunos_ids = [int(id) for id in alunos_ids]
         
         # Validar limite
-        if len(alunos_ids) > 100:
-            return JsonResponse({
-                'success': False,
-                'mensagem': 'Limite de 100 alunos por vez excedido'
-            })
+        if len(alunos_ids) > LIMITE_MATRICULAS_LOTE:
+            return JsonResponse(
+                {
+                    'success': False,
+                    'mensagem': f'Limite de {LIMITE_MATRICULAS_LOTE} alunos por vez excedido',
+                }
+            )
         
         # Processar matrículas
         resultado = criar_matriculas_em_lote(turma_id, alunos_ids)